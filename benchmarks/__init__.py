@@ -0,0 +1,8 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Offline benchmarks for DeerFlow.
+"""
+
+# DeerFlow的离线基准测试
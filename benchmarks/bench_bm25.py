@@ -0,0 +1,95 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark ingestion and query latency of the local BM25 index.
+
+Builds an index of synthetic chunks whose words follow a Zipf distribution
+(as natural text does) in a temp dir, then measures the latency of 2-3 term
+queries, the size of the compressed postings and the cost of adding one more
+document to the large index.
+
+Usage:
+    python -m benchmarks.bench_bm25 --chunks 1000000
+"""
+
+# 对本地BM25索引的导入和查询延迟进行基准测试。
+# 在临时目录中用词频服从Zipf分布（与自然文本一致）的合成块构建索引，然后测量2-3个词项查询的延迟、
+# 压缩后倒排列表的大小，以及向大索引再添加一个文档的开销。
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from src.rag.bm25 import BM25Store
+
+
+def run(
+    chunks: int = 200000,
+    words: int = 60,
+    vocabulary: int = 50000,
+    queries: int = 200,
+    top_k: int = 10,
+) -> dict:
+    rng = np.random.default_rng(0)
+    terms = np.array([f"w{i}" for i in range(vocabulary)])
+
+    # Zipf ranks clipped to the vocabulary 截断到词表大小的Zipf排名
+    def sample(size: int) -> np.ndarray:
+        return terms[np.minimum(rng.zipf(1.2, size), vocabulary) - 1]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BM25Store(directory)
+        start = time.perf_counter()
+        per_doc = 100
+        batch_docs = 100
+        for doc in range(0, chunks // per_doc):
+            texts = [" ".join(row) for row in sample((per_doc, words))]
+            store.add_document(f"doc{doc}", texts, commit=False)
+            if (doc + 1) % batch_docs == 0:
+                store.commit()
+        store.commit()
+        ingest_seconds = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(queries):
+            query = " ".join(sample(int(rng.integers(2, 4))))
+            start = time.perf_counter()
+            store.search(query, top_k)
+            latencies.append((time.perf_counter() - start) * 1e3)
+
+        start = time.perf_counter()
+        store.add_document("extra", [" ".join(sample(words))])
+        add_ms = (time.perf_counter() - start) * 1e3
+
+        segments = store._manifest["segments"]
+        postings = sum(info["postings"] for info in segments)
+        size = sum(info["bytes"] for info in segments)
+    return {
+        "chunks": chunks,
+        "segments": len(segments),
+        "postings": postings,
+        "postings_bytes_per_entry": size / postings if postings else 0.0,
+        "ingest_chunks_per_second": chunks / ingest_seconds,
+        "query_ms_median": statistics.median(latencies),
+        "query_ms_p95": statistics.quantiles(latencies, n=20)[-1],
+        "incremental_add_ms": add_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the local BM25 index")
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            run(args.chunks, args.words, args.vocabulary, args.queries), indent=2
+        )
+    )
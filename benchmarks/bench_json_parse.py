@@ -0,0 +1,106 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark parsing planner output into a `Plan`.
+
+Compares the previous pipeline (`json_repair` on every response, serialize,
+`json.loads`, `Plan.model_validate`) with `parse_model_output`, which
+validates well-formed JSON straight from the string and only repairs on
+failure. `planner_node` parses its response with `parse_model_output`
+whenever the streaming parser could not decode it, e.g. fenced or malformed
+output. The corpus in `benchmarks/data/planner_outputs.json` holds plain,
+fenced and malformed planner responses.
+
+Usage:
+    python -m benchmarks.bench_json_parse --repeat 200
+"""
+
+# 对将规划员输出解析为`Plan`进行基准测试。
+# 比较之前的流程（每个响应都经过`json_repair`、序列化、`json.loads`、`Plan.model_validate`）
+# 与`parse_model_output`：后者直接从字符串校验格式正确的JSON，只在失败时修复。
+# 流式解析器无法解码响应时（例如带代码块或格式错误的输出），`planner_node`使用`parse_model_output`解析。
+
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+
+import json_repair
+
+from src.prompts.planner_model import Plan
+from src.utils.json_utils import parse_model_output
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "planner_outputs.json")
+
+
+def _legacy_parse(content: str) -> Plan:
+    """The pipeline used before the fast path was introduced."""
+    # 引入快速路径之前使用的流程
+    content = content.strip()
+    if content.startswith(("{", "[")) or "```json" in content or "```ts" in content:
+        try:
+            if content.startswith("```json"):
+                content = content.removeprefix("```json")
+            if content.startswith("```ts"):
+                content = content.removeprefix("```ts")
+            if content.endswith("```"):
+                content = content.removesuffix("```")
+            content = json.dumps(json_repair.loads(content), ensure_ascii=False)
+        except Exception:
+            pass
+    return Plan.model_validate(json.loads(content))
+
+
+def _time(func, texts: list[str], repeat: int) -> tuple[float, int]:
+    """Return seconds per call and the number of texts that parsed."""
+    # 返回每次调用的秒数以及解析成功的文本数
+    parsed = 0
+    for text in texts:
+        try:
+            func(text)
+            parsed += 1
+        except Exception:
+            pass
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            try:
+                func(text)
+            except Exception:
+                pass
+    return (time.perf_counter() - start) / (repeat * len(texts)), parsed
+
+
+def run(repeat: int = 200, corpus_path: str = CORPUS_PATH) -> dict:
+    with open(corpus_path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    by_kind: dict[str, list[str]] = defaultdict(list)
+    for sample in corpus:
+        by_kind[sample["kind"]].append(sample["text"])
+    by_kind["all"] = [sample["text"] for sample in corpus]
+
+    results = {}
+    for kind, texts in sorted(by_kind.items()):
+        legacy, legacy_parsed = _time(_legacy_parse, texts, repeat)
+        fast, fast_parsed = _time(
+            lambda text: parse_model_output(text, Plan), texts, repeat
+        )
+        results[kind] = {
+            "samples": len(texts),
+            "legacy_us_per_call": legacy * 1e6,
+            "fast_us_per_call": fast * 1e6,
+            "speedup": legacy / fast,
+            "legacy_parsed": legacy_parsed,
+            "fast_parsed": fast_parsed,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark planner output parsing")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.corpus), indent=2))
@@ -0,0 +1,89 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark brute-force and IVF search of the local vector store.
+
+Builds a store of clustered random unit vectors in a temp dir, then measures
+query latency with exact (brute-force) and IVF search and the recall@k of IVF
+against the exact results.
+
+Usage:
+    python -m benchmarks.bench_local_rag --rows 200000 --dim 256
+"""
+
+# 对本地向量存储的暴力搜索和IVF搜索进行基准测试。
+# 在临时目录中构建由成簇随机单位向量组成的存储，然后测量精确（暴力）搜索和IVF搜索的查询延迟，
+# 以及IVF相对精确结果的recall@k。
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from src.rag.local import LocalVectorStore
+
+
+def run(
+    rows: int = 200000,
+    dim: int = 256,
+    queries: int = 50,
+    top_k: int = 10,
+    nprobe: int = 8,
+) -> dict:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, rows // 500), dim))
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalVectorStore(directory, dim, ivf_min_rows=rows + 1, nprobe=nprobe)
+        start = time.perf_counter()
+        batch = 50000
+        for offset in range(0, rows, batch):
+            count = min(batch, rows - offset)
+            data = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(
+                size=(count, dim)
+            )
+            data /= np.linalg.norm(data, axis=1, keepdims=True)
+            store.add_document(f"doc{offset}", [""] * count, data.astype(np.float32))
+        ingest_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        store.build_index()
+        index_seconds = time.perf_counter() - start
+
+        probes = np.asarray(store._embeddings[rng.integers(0, rows, queries)])
+        exact_ms, ivf_ms, recalls = [], [], []
+        for query in probes:
+            start = time.perf_counter()
+            exact = store.search(query, top_k, exact=True)
+            exact_ms.append((time.perf_counter() - start) * 1e3)
+            start = time.perf_counter()
+            approximate = store.search(query, top_k)
+            ivf_ms.append((time.perf_counter() - start) * 1e3)
+            recalls.append(
+                len({r for r, _ in exact} & {r for r, _ in approximate}) / top_k
+            )
+    return {
+        "rows": rows,
+        "dim": dim,
+        "nlist": store._manifest["ivf"]["nlist"],
+        "nprobe": nprobe,
+        "ingest_seconds": ingest_seconds,
+        "index_seconds": index_seconds,
+        "exact_ms_median": statistics.median(exact_ms),
+        "ivf_ms_median": statistics.median(ivf_ms),
+        f"ivf_recall_at_{top_k}": statistics.mean(recalls),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local vector search")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+    print(
+        json.dumps(run(args.rows, args.dim, args.queries, nprobe=args.nprobe), indent=2)
+    )
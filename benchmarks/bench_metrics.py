@@ -0,0 +1,129 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Measure the overhead the metrics middleware adds to an SSE streaming response.
+
+Usage:
+    python -m benchmarks.bench_metrics --events 20000 --repeat 5
+"""
+
+# 测量指标中间件给SSE流式响应带来的开销
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from src.server.metrics import SSE_STREAMS_IN_FLIGHT, MetricsMiddleware
+
+
+def _make_app(events: int, instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    message = {
+        "thread_id": "bench",
+        "agent": "reporter",
+        "id": "run-00000000-0000-0000-0000-000000000000",
+        "role": "assistant",
+        "content": "token",
+    }
+
+    async def generator():
+        # Encode every event like the chat stream does
+        # 像聊天流一样编码每个事件
+        if instrumented:
+            SSE_STREAMS_IN_FLIGHT.inc()
+        try:
+            for _ in range(events):
+                data = json.dumps(message, ensure_ascii=False)
+                yield f"event: message_chunk\ndata: {data}\n\n"
+        finally:
+            if instrumented:
+                SSE_STREAMS_IN_FLIGHT.dec()
+
+    @app.post("/api/chat/stream")
+    async def chat_stream():
+        return StreamingResponse(generator(), media_type="text/event-stream")
+
+    return app
+
+
+async def _drive(app: FastAPI) -> float:
+    """Call the ASGI app directly so only server-side work is measured."""
+    # 直接调用ASGI应用，只测量服务端开销
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat/stream",
+        "raw_path": b"/api/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)  # 模拟保持连接的客户端
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        return None
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def run(events: int = 20000, repeat: int = 5) -> dict:
+    """
+    Stream `events` SSE events with and without the metrics middleware.
+
+    Returns:
+        Dictionary with the best durations and the per-event overhead
+    """
+    # 在有/无指标中间件的情况下流式发送`events`个SSE事件
+    apps = {
+        "baseline": _make_app(events, instrumented=False),
+        "instrumented": _make_app(events, instrumented=True),
+    }
+    samples = {name: [] for name in apps}
+    for name, app in apps.items():
+        asyncio.run(_drive(app))  # warm-up 预热
+    # Interleave the runs so machine noise affects both variants equally
+    # 交替运行，使机器噪声对两种变体的影响相同
+    for _ in range(repeat):
+        for name, app in apps.items():
+            samples[name].append(asyncio.run(_drive(app)))
+    # The fastest run is the least disturbed by scheduling noise
+    # 最快的一次运行受调度噪声影响最小
+    results = {name: min(values) for name, values in samples.items()}
+    overhead = results["instrumented"] - results["baseline"]
+    return {
+        "events": events,
+        "baseline_seconds": results["baseline"],
+        "instrumented_seconds": results["instrumented"],
+        "overhead_per_event_ns": overhead / events * 1e9,
+        "overhead_percent": overhead / results["baseline"] * 100,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.events, args.repeat), indent=2))
@@ -0,0 +1,72 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark cold and warm marp renders of a PPT deck.
+
+`cold` runs `marp` once per deck (`PPT_RENDER_MODE=cli`, the default of the PPT
+workflow), `warm` renders through a long-lived `marp --server` process of the
+renderer pool after one warm-up render. Needs marp-cli on the PATH (or
+`PPT_MARP_COMMAND`).
+
+Usage:
+    python -m benchmarks.bench_ppt_render --runs 5
+"""
+
+# 对PPT演示文稿的marp冷渲染和热渲染进行基准测试。
+# `cold`每份演示文稿运行一次`marp`（`PPT_RENDER_MODE=cli`，即PPT工作流的默认做法），
+# `warm`在一次预热渲染后通过渲染进程池中长期运行的`marp --server`进程渲染。
+# 需要PATH中有marp-cli（或设置`PPT_MARP_COMMAND`）。
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import time
+
+from src.ppt.renderer import MarpRendererPool
+
+DECK = "---\nmarp: true\n---\n\n# Benchmark deck\n\n" + "\n\n---\n\n".join(
+    f"## Slide {i}\n\n- point a\n- point b\n- point c" for i in range(10)
+)
+
+
+def run(runs: int = 5) -> dict:
+    results = {}
+    for name, mode in (("cold", "cli"), ("warm", "server")):
+        pool = MarpRendererPool(mode=mode, concurrency=1, warm_workers=0)
+        try:
+            if mode == "server":
+                # Starts the server outside the measured runs
+                # 在测量之外启动服务进程
+                pool.render(DECK)
+            latencies = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                pool.render(DECK)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            pool.close()
+        results[name] = {
+            "mode": pool.mode,  # cli if the server was exposed and the pool fell back
+            "runs": runs,
+            "render_ms_median": statistics.median(latencies) * 1e3,
+            "render_ms_max": max(latencies) * 1e3,
+        }
+    results["speedup"] = (
+        results["cold"]["render_ms_median"] / results["warm"]["render_ms_median"]
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold and warm marp renders")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    if not shutil.which(os.getenv("PPT_MARP_COMMAND", "marp")):
+        sys.exit(
+            "marp-cli is not installed; install it with `npm install -g @marp-team/marp-cli`"
+        )
+    print(json.dumps(run(args.runs), indent=2))
@@ -0,0 +1,78 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark the first coder snippet of a new session in the Python REPL pool.
+
+Every run uses a new session, so a new worker has to be started, and executes
+a typical data snippet that imports pandas and numpy. Spare workers are
+disabled to expose the start cost: `spawn` starts a fresh interpreter that
+imports the preloaded modules itself, `template` forks from a process that has
+imported them already.
+
+Usage:
+    python -m benchmarks.bench_python_repl --runs 5
+"""
+
+# 对Python REPL工作进程池中新会话的第一个编码员代码片段进行基准测试。
+# 每次运行使用新会话，因此必须启动新的工作进程，并执行导入pandas和numpy的典型数据代码。
+# 禁用备用工作进程以暴露启动开销：`spawn`启动新解释器并自行导入预加载模块，
+# `template`从已导入这些模块的进程派生。
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from src.tools.python_sandbox import PythonREPLPool
+
+SNIPPET = """
+import numpy as np
+import pandas as pd
+
+df = pd.DataFrame(np.random.rand(1000, 4), columns=list("abcd"))
+print(df.describe().loc["mean"].round(2).to_dict())
+"""
+
+
+def run(runs: int = 5) -> dict:
+    methods = ["spawn"] + (["template"] if hasattr(os, "fork") else [])
+    results = {}
+    for method in methods:
+        pool = PythonREPLPool(warm_workers=0, start_method=method)
+        try:
+            # The template itself starts once per pool, outside the measured runs
+            # 模板本身每个连接池只启动一次，不计入测量
+            pool.execute("pass", session_id="warm-up")
+            latencies, saved = [], []
+            for i in range(runs):
+                start = time.perf_counter()
+                result = pool.execute(SNIPPET, session_id=f"session-{i}")
+                latencies.append(time.perf_counter() - start)
+                saved.append(result.import_seconds_saved)
+                if not result.ok:
+                    raise RuntimeError(result.error)
+        finally:
+            pool.close()
+        results[method] = {
+            "runs": runs,
+            "first_call_ms_median": statistics.median(latencies) * 1e3,
+            "first_call_ms_max": max(latencies) * 1e3,
+            "import_seconds_saved_median": statistics.median(saved),
+        }
+    if "template" in results:
+        results["speedup"] = (
+            results["spawn"]["first_call_ms_median"]
+            / results["template"]["first_call_ms_median"]
+        )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark Python REPL worker start-up"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs), indent=2))
@@ -0,0 +1,128 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark the memory and `to_dict` cost of retrieval results.
+
+Builds the same result, `chunks` chunks spread over `documents` documents,
+with the flat-buffer `Document`/`Chunk` classes and with plain per-chunk
+objects like the earlier ones, and measures the memory retained after a
+first `to_dict` with tracemalloc and the time to serialize the result again.
+
+Usage:
+    python -m benchmarks.bench_rag_documents --chunks 10000 --chunk-chars 300
+"""
+
+# 对检索结果的内存和`to_dict`开销进行基准测试。
+# 分别用扁平缓冲区的`Document`/`Chunk`类和与早期实现相同的逐块普通对象，
+# 构建包含分布在`documents`个文档中的`chunks`个块的相同结果，
+# 用tracemalloc测量第一次`to_dict`后保留的内存，并测量再次序列化结果的时间。
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from src.rag.retriever import Chunk, Document
+
+
+class _PlainChunk:
+    def __init__(self, content: str, similarity: float):
+        self.content = content
+        self.similarity = similarity
+
+
+class _PlainDocument:
+    def __init__(self, id: str, url: str, title: str, chunks: list):
+        self.id = id
+        self.url = url
+        self.title = title
+        self.chunks = chunks
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "content": "\n\n".join([chunk.content for chunk in self.chunks]),
+            "url": self.url,
+            "title": self.title,
+        }
+
+
+def _measure(build) -> tuple[list, int]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    # Serialize once, as the agent does, so lazily joined contents are counted
+    # 序列化一次（与智能体的使用方式相同），使延迟连接的内容也被计入
+    for doc in result:
+        doc.to_dict()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, retained
+
+
+def run(chunks: int = 10000, documents: int = 100, chunk_chars: int = 300) -> dict:
+    rng = random.Random(0)
+    words = [
+        "deer",
+        "flow",
+        "research",
+        "retrieval",
+        "孙悟空",
+        "白骨精",
+        "chunk",
+        "memory",
+    ]
+
+    def text(i: int) -> str:
+        body = " ".join(rng.choice(words) for _ in range(chunk_chars // 6))
+        return f"{i} {body}"[:chunk_chars]
+
+    # Decoded response data, kept out of the measurement as both layouts start from it
+    # 解码后的响应数据，不计入测量，因为两种布局都从它开始构建
+    rows = [(f"doc{i % documents}", text(i), rng.random()) for i in range(chunks)]
+
+    def build(document_cls, chunk_cls):
+        def make():
+            docs = {}
+            for doc_id, content, similarity in rows:
+                # Copy the string, as a parsed response would hold its own
+                # 复制字符串，因为解析后的响应会持有自己的字符串
+                content = "".join(content)
+                doc = docs.get(doc_id)
+                if doc is None:
+                    doc = docs[doc_id] = document_cls(
+                        doc_id, f"rag://dataset/d#{doc_id}", doc_id, []
+                    )
+                doc.chunks.append(chunk_cls(content, similarity))
+            return list(docs.values())
+
+        return make
+
+    results = {"chunks": chunks, "documents": documents, "chunk_chars": chunk_chars}
+    for name, document_cls, chunk_cls in (
+        ("plain", _PlainDocument, _PlainChunk),
+        ("compact", Document, Chunk),
+    ):
+        docs, retained = _measure(build(document_cls, chunk_cls))
+        start = time.perf_counter()
+        for _ in range(5):
+            serialized = [doc.to_dict() for doc in docs]
+        results[f"{name}_bytes"] = retained
+        results[f"{name}_bytes_per_chunk"] = retained / chunks
+        results[f"{name}_to_dict_ms"] = (time.perf_counter() - start) * 1e3 / 5
+        del docs, serialized
+    results["memory_saved"] = 1 - results["compact_bytes"] / results["plain_bytes"]
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retrieval result memory")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--chunk-chars", type=int, default=300)
+    args = parser.parse_args()
+    print(json.dumps(run(args.chunks, args.documents, args.chunk_chars), indent=2))
@@ -0,0 +1,62 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Compare two JSON reports written by `benchmarks.run`.
+
+Usage:
+    python -m benchmarks.compare before.json after.json
+"""
+
+# 比较`benchmarks.run`生成的两个JSON报告
+
+import argparse
+import json
+import sys
+
+
+def flatten(value, prefix: str = "") -> dict[str, float]:
+    """Flatten nested report values into dotted keys with numeric leaves."""
+    # 将嵌套的报告值展开为以点分隔的键和数值叶子
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def compare(before: dict, after: dict) -> list[tuple[str, float, float, float]]:
+    """Return `(key, before, after, change_percent)` for metrics in both reports."""
+    # 返回两个报告中共有指标的`(键, 之前, 之后, 变化百分比)`
+    old = flatten(before.get("results", {}))
+    new = flatten(after.get("results", {}))
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        rows.append((key, old[key], new[key], change))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    rows = compare(before, after)
+    width = max((len(row[0]) for row in rows), default=10)
+    print(f"{'metric':<{width}}  {'before':>14}  {'after':>14}  {'change':>8}")
+    for key, old, new, change in rows:
+        print(f"{key:<{width}}  {old:>14.6g}  {new:>14.6g}  {change:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
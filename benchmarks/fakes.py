@@ -0,0 +1,523 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Deterministic stand-ins for the LLM, search, crawl, RAG and TTS providers.
+
+Nothing here talks to the network: chat models are scripted per agent role,
+search tools return canned results, and Jina, RAGFlow and volcengine TTS are
+served by a local HTTP server. Every fake accepts an artificial latency so the
+workflow's own overhead can be separated from provider time.
+"""
+
+# 用于LLM、搜索、爬取、RAG和TTS提供者的确定性替身。
+# 这里不访问网络：聊天模型按代理角色编写脚本，搜索工具返回固定结果，
+# Jina、RAGFlow和火山引擎TTS由本地HTTP服务器提供。每个替身都可设置人为延迟，
+# 以便将工作流自身的开销与提供者耗时区分开。
+
+import asyncio
+import base64
+import contextlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional, Sequence
+from unittest import mock
+from urllib.parse import urlparse
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, Field
+
+ARTICLE_HTML = """<html><head><title>{title}</title></head><body>
+<article><h1>{title}</h1>
+{paragraphs}
+</article></body></html>"""
+
+# 20ms of 24kHz 16-bit mono silence, enough to exercise audio handling
+# 24kHz 16位单声道的20毫秒静音，足以覆盖音频处理流程
+SILENT_AUDIO = b"\x00\x00" * 480
+
+
+@dataclass
+class Latencies:
+    """Artificial latencies (seconds) applied by the fakes."""
+
+    # 替身使用的人为延迟（秒）
+
+    llm: float = 0.0  # per chat model call 每次聊天模型调用
+    llm_token: float = 0.0  # per streamed chunk 每个流式输出块
+    search: float = 0.0  # per search tool call 每次搜索工具调用
+    crawl: float = 0.0  # per Jina request 每次Jina请求
+    rag: float = 0.0  # per RAGFlow request 每次RAGFlow请求
+    tts: float = 0.0  # per TTS request 每次TTS请求
+
+
+@dataclass
+class Scenario:
+    """Shape of the scripted research run."""
+
+    # 脚本化研究流程的形态
+
+    steps: int = 3  # plan steps 计划步骤数
+    tool_calls_per_step: int = 2  # search + crawl rounds per researcher step
+    report_paragraphs: int = 20  # size of the final report 最终报告的段落数
+    chunk_size: int = 16  # characters per streamed chunk 每个流式块的字符数
+    latencies: Latencies = field(default_factory=Latencies)
+
+
+def _role(messages: Sequence[BaseMessage]) -> str:
+    """Infer which agent is calling from its system prompt."""
+    # 根据系统提示推断调用方代理
+    system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+    if not isinstance(system, str):
+        system = str(system)
+    if "You are DeerFlow" in system:
+        return "coordinator"
+    if "professional Deep Researcher" in system:
+        return "planner"
+    if "You are `researcher` agent" in system:
+        return "researcher"
+    if "You are `coder` agent" in system:
+        return "coder"
+    if "podcast" in system:
+        return "podcast_script_writer"
+    if "PPT" in system:
+        return "ppt_composer"
+    return "reporter"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers every agent of the workflow with scripted output.
+    """
+
+    # 用脚本化输出回答工作流中每个代理的聊天模型
+
+    scenario: Scenario = Field(default_factory=Scenario)
+    calls: dict = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    # -- tool binding / structured output -------------------------------------------
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        def parse(message: BaseMessage):
+            return schema.model_validate(json.loads(message.content))
+
+        return self.bind(response_format={"type": "json_object"}) | RunnableLambda(
+            parse
+        )
+
+    # -- scripted behaviour ---------------------------------------------------------
+
+    def _respond(self, messages: Sequence[BaseMessage], **kwargs: Any) -> AIMessage:
+        role = _role(messages)
+        self.calls[role] = self.calls.get(role, 0) + 1
+        tool_names = [t["function"]["name"] for t in kwargs.get("tools") or []]
+        scenario = self.scenario
+
+        if role == "coordinator":
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "id": "call_handoff",
+                        "name": "handoff_to_planner",
+                        "args": {
+                            "research_topic": _last_human_text(messages),
+                            "locale": "en-US",
+                        },
+                    }
+                ],
+            )
+        if role == "planner":
+            return AIMessage(content=json.dumps(planner_output(scenario.steps)))
+        if role in ("researcher", "coder"):
+            rounds = sum(1 for m in messages if isinstance(m, ToolMessage))
+            if rounds < scenario.tool_calls_per_step and tool_names:
+                name = _pick_tool(tool_names, rounds)
+                return AIMessage(
+                    content="",
+                    tool_calls=[
+                        {
+                            "id": f"call_{role}_{rounds}",
+                            "name": name,
+                            "args": _tool_args(name, rounds),
+                        }
+                    ],
+                )
+            return AIMessage(content=_finding(role, rounds))
+        if role == "podcast_script_writer":
+            lines = [
+                {
+                    "speaker": "male" if i % 2 == 0 else "female",
+                    "paragraph": f"Line {i} of the scripted podcast.",
+                }
+                for i in range(scenario.report_paragraphs)
+            ]
+            return AIMessage(content=json.dumps({"locale": "en", "lines": lines}))
+        if role == "ppt_composer":
+            slides = "\n\n---\n\n".join(
+                f"## Slide {i}\n\n- point a\n- point b"
+                for i in range(scenario.report_paragraphs)
+            )
+            return AIMessage(content=f"# Scripted deck\n\n---\n\n{slides}")
+        return AIMessage(content=report_output(scenario.report_paragraphs))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.scenario.latencies.llm)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._respond(messages, **kwargs))]
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.scenario.latencies.llm)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._respond(messages, **kwargs))]
+        )
+
+    def _chunks(self, message: AIMessage) -> Iterator[AIMessageChunk]:
+        if message.tool_calls:
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {
+                        "id": call["id"],
+                        "name": call["name"],
+                        "args": json.dumps(call["args"]),
+                        "index": i,
+                    }
+                    for i, call in enumerate(message.tool_calls)
+                ],
+            )
+            return
+        size = self.scenario.chunk_size
+        text = message.content
+        for start in range(0, len(text), size):
+            yield AIMessageChunk(content=text[start : start + size])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.scenario.latencies.llm)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            time.sleep(self.scenario.latencies.llm_token)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.scenario.latencies.llm)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            await asyncio.sleep(self.scenario.latencies.llm_token)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+
+def _last_human_text(messages: Sequence[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if message.type == "human" and isinstance(message.content, str):
+            return message.content
+    return "benchmark topic"
+
+
+def _pick_tool(tool_names: list[str], rounds: int) -> str:
+    preferred = ["web_search", "crawl_tool", "python_repl_tool"]
+    available = [name for name in preferred if name in tool_names] or tool_names
+    return available[rounds % len(available)]
+
+
+def _tool_args(name: str, rounds: int) -> dict:
+    if name == "crawl_tool":
+        return {"url": f"https://example.com/article/{rounds}"}
+    if name == "python_repl_tool":
+        return {"code": f"print(sum(range({(rounds + 1) * 1000})))"}
+    if name == "local_search_tool":
+        return {"keywords": f"benchmark keywords {rounds}"}
+    return {"query": f"benchmark query {rounds}"}
+
+
+def _finding(role: str, rounds: int) -> str:
+    body = " ".join(f"Observation {i} gathered by the {role}." for i in range(30))
+    return f"## Findings\n\n{body}\n\n## References\n\n- [Example](https://example.com/{rounds})"
+
+
+def planner_output(steps: int) -> dict:
+    """The plan returned by the scripted planner."""
+    # 脚本化规划员返回的计划
+    return {
+        "locale": "en-US",
+        "has_enough_context": False,
+        "thought": "Scripted plan used by the offline benchmark.",
+        "title": "Benchmark research plan",
+        "steps": [
+            {
+                "need_search": i % 3 != 2,
+                "title": f"Step {i}",
+                "description": f"Collect data point {i} for the benchmark.",
+                "step_type": "research" if i % 3 != 2 else "processing",
+            }
+            for i in range(steps)
+        ],
+    }
+
+
+def report_output(paragraphs: int) -> str:
+    body = "\n\n".join(
+        f"Paragraph {i}: " + "scripted report text " * 20 for i in range(paragraphs)
+    )
+    return f"# Benchmark report\n\n## Key Points\n\n- one\n- two\n\n{body}"
+
+
+class FakeSearchInput(BaseModel):
+    query: str = Field(description="search query to look up")
+
+
+class FakeSearchTool(BaseTool):
+    """Search tool returning canned results after an artificial latency."""
+
+    # 在人为延迟后返回固定结果的搜索工具
+
+    name: str = "web_search"
+    description: str = "Search the web for a query."
+    args_schema: type[BaseModel] = FakeSearchInput
+    max_results: int = 3
+    latency: float = 0.0
+
+    def _results(self, query: str) -> list[dict]:
+        return [
+            {
+                "type": "page",
+                "title": f"Result {i} for {query}",
+                "url": f"https://example.com/{i}",
+                "content": f"Canned content {i} about {query}. " * 5,
+                "score": 1.0 - i * 0.1,
+            }
+            for i in range(self.max_results)
+        ]
+
+    def _run(
+        self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None
+    ) -> list[dict]:
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> list[dict]:
+        await asyncio.sleep(self.latency)
+        return self._results(query)
+
+
+class _BackendHandler(BaseHTTPRequestHandler):
+    """Serves Jina reader, RAGFlow and volcengine TTS shaped responses."""
+
+    # 提供Jina、RAGFlow和火山引擎TTS格式的响应
+
+    server: "FakeBackendServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence request logging
+        return
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        return json.loads(raw or b"{}")
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/api/v1/datasets":
+            time.sleep(self.server.latencies.rag)
+            return self._send_json(
+                {
+                    "data": [
+                        {"id": f"dataset{i}", "name": f"Dataset {i}", "description": ""}
+                        for i in range(5)
+                    ]
+                }
+            )
+        self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        payload = self._read_json()
+        if path == "/api/v1/retrieval":
+            time.sleep(self.server.latencies.rag)
+            return self._send_json(
+                {
+                    "data": {
+                        "doc_aggs": [{"doc_id": "doc0", "doc_name": "Doc 0"}],
+                        "chunks": [
+                            {
+                                "document_id": "doc0",
+                                "content": f"Chunk {i} about {payload.get('question')}",
+                                "similarity": 1.0 - i * 0.05,
+                            }
+                            for i in range(payload.get("page_size", 10))
+                        ],
+                    }
+                }
+            )
+        if path == "/api/v1/tts":
+            time.sleep(self.server.latencies.tts)
+            return self._send_json(
+                {"code": 3000, "data": base64.b64encode(SILENT_AUDIO).decode()}
+            )
+        # Anything else is treated as the Jina reader endpoint
+        # 其余请求视为Jina读取接口
+        time.sleep(self.server.latencies.crawl)
+        url = payload.get("url", "")
+        paragraphs = "\n".join(
+            f"<p>Paragraph {i} of {url}. " + "Readable article text. " * 15 + "</p>"
+            for i in range(12)
+        )
+        body = ARTICLE_HTML.format(title=f"Article {url}", paragraphs=paragraphs)
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeBackendServer(ThreadingHTTPServer):
+    """Local HTTP stand-in for Jina, RAGFlow and TTS, running in a thread."""
+
+    # 在线程中运行的Jina、RAGFlow和TTS本地HTTP替身
+
+    daemon_threads = True
+
+    def __init__(self, latencies: Latencies):
+        super().__init__(("127.0.0.1", 0), _BackendHandler)
+        self.latencies = latencies
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        return False
+
+
+_LLM_TYPES = ("basic", "reasoning", "vision")
+
+
+@contextlib.contextmanager
+def offline_providers(scenario: Scenario) -> Iterator[dict]:
+    """
+    Replace every external provider used by the workflow with a fake.
+
+    Args:
+        scenario: Shape of the scripted run and the artificial latencies
+
+    Yields:
+        Dictionary with the fake chat model and the backend server
+    """
+    # 将工作流使用的所有外部提供者替换为替身
+    import requests
+
+    from src.llms import llm as llm_module
+
+    latencies = scenario.latencies
+    model = ScriptedChatModel(scenario=scenario)
+    real_post = requests.post
+
+    with FakeBackendServer(latencies) as backend:
+
+        def redirect_post(url, *args, **kwargs):
+            # Route the hard-coded provider hosts to the local stand-in
+            # 将硬编码的提供者地址路由到本地替身
+            parsed = urlparse(url)
+            if parsed.hostname in ("r.jina.ai", "openspeech.bytedance.com"):
+                url = backend.url + (parsed.path or "/")
+            return real_post(url, *args, **kwargs)
+
+        def extract_html(html: str, **kwargs):
+            # Readability.js shells out to node (and npm on first use); the
+            # pure-Python extractor keeps runs offline and deterministic
+            # Readability.js会调用node（首次使用时还会调用npm），
+            # 纯Python提取器让运行保持离线且确定
+            from readabilipy import simple_json_from_html_string
+
+            return simple_json_from_html_string(html, use_readability=False)
+
+        def search_tool(max_search_results: int = 3, max_results: int = 0, **kwargs):
+            return FakeSearchTool(
+                max_results=max_results or max_search_results,
+                latency=latencies.search,
+            )
+
+        saved_cache = dict(llm_module._llm_cache)
+        llm_module._llm_cache.update({llm_type: model for llm_type in _LLM_TYPES})
+        patches = [
+            mock.patch("src.graph.nodes.get_web_search_tool", side_effect=search_tool),
+            mock.patch("src.graph.nodes.LoggedTavilySearch", side_effect=search_tool),
+            mock.patch(
+                "src.crawler.jina_client.requests.post", side_effect=redirect_post
+            ),
+            mock.patch("src.tools.tts.requests.post", side_effect=redirect_post),
+            mock.patch(
+                "src.crawler.readability_extractor.simple_json_from_html_string",
+                side_effect=extract_html,
+            ),
+            mock.patch.dict(
+                "os.environ",
+                {
+                    "RAGFLOW_API_URL": backend.url,
+                    "RAGFLOW_API_KEY": "benchmark",
+                    "VOLCENGINE_TTS_APPID": "benchmark",
+                    "VOLCENGINE_TTS_ACCESS_TOKEN": "benchmark",
+                    # Every run should pay for synthesis, not reuse earlier runs
+                    # 每次运行都应执行合成，而不是复用之前运行的结果
+                    "TTS_CACHE_MAX_MB": "0",
+                },
+            ),
+        ]
+        try:
+            for patcher in patches:
+                patcher.start()
+            yield {"model": model, "backend": backend}
+        finally:
+            for patcher in reversed(patches):
+                patcher.stop()
+            llm_module._llm_cache.clear()
+            llm_module._llm_cache.update(saved_cache)
@@ -0,0 +1,355 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Offline benchmark runner for the DeerFlow workflow and API server.
+
+Every provider is replaced by the deterministic fakes in `benchmarks.fakes`,
+so the numbers measure the workflow's own overhead plus whatever artificial
+latency is configured.
+
+Usage:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --suites workflow,api --llm-latency 0.05 --runs 10
+    python -m benchmarks.compare old.json new.json
+"""
+
+# DeerFlow工作流和API服务器的离线基准测试运行器。
+# 所有提供者都被`benchmarks.fakes`中的确定性替身替换，
+# 因此结果衡量的是工作流自身的开销加上配置的人为延迟。
+
+import os
+
+# Tool modules read their API keys at import time
+# 工具模块在导入时读取API密钥
+os.environ.setdefault("TAVILY_API_KEY", "benchmark")
+os.environ.setdefault("SEARCH_API", "tavily")
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Callable
+
+from benchmarks.fakes import Latencies, Scenario, offline_providers
+
+SUITES: dict[str, Callable[[argparse.Namespace, Scenario], dict]] = {}
+
+
+def suite(name: str):
+    """Register a benchmark suite under `name`."""
+
+    # 以`name`注册一个基准测试套件
+    def decorator(func):
+        SUITES[name] = func
+        return func
+
+    return decorator
+
+
+def _workflow_input(topic: str) -> dict:
+    return {
+        "messages": [{"role": "user", "content": topic}],
+        "auto_accepted_plan": True,
+        "enable_background_investigation": True,
+    }
+
+
+def _workflow_config(thread_id: str) -> dict:
+    return {
+        "configurable": {
+            "thread_id": thread_id,
+            "max_plan_iterations": 1,
+            "max_step_num": 3,
+            "max_search_results": 3,
+        },
+        "recursion_limit": 100,
+    }
+
+
+def _percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": pick(0.5),
+        "p95": pick(0.95),
+        "max": ordered[-1],
+    }
+
+
+def _node_snapshot() -> dict[str, tuple[float, int]]:
+    from src.utils.metrics import NODE_DURATION
+
+    return {
+        key[1]: (child.sum, child.count)
+        for key, child in NODE_DURATION._children.items()
+        if key[0] == "deerflow"
+    }
+
+
+@suite("workflow")
+def bench_workflow(args: argparse.Namespace, scenario: Scenario) -> dict:
+    """Throughput and per-node time of `build_graph()` runs."""
+    # `build_graph()`运行的吞吐量和各节点耗时
+    from src.graph.builder import build_graph
+
+    graph = build_graph()
+
+    async def one(i: int) -> float:
+        start = time.perf_counter()
+        await graph.ainvoke(_workflow_input(f"topic {i}"), _workflow_config(f"wf-{i}"))
+        return time.perf_counter() - start
+
+    async def main() -> tuple[list[float], float, dict]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(i: int) -> float:
+            async with semaphore:
+                return await one(i)
+
+        await one(-1)  # warm-up 预热
+        before_nodes = _node_snapshot()
+        before = time.perf_counter()
+        durations = await asyncio.gather(*(bounded(i) for i in range(args.runs)))
+        return list(durations), time.perf_counter() - before, before_nodes
+
+    durations, wall, before_nodes = asyncio.run(main())
+    after_nodes = _node_snapshot()
+
+    nodes = {}
+    for node, (total, count) in sorted(after_nodes.items()):
+        prev_total, prev_count = before_nodes.get(node, (0.0, 0))
+        if count > prev_count:
+            nodes[node] = {
+                "calls": count - prev_count,
+                "mean_seconds": (total - prev_total) / (count - prev_count),
+            }
+    return {
+        "runs": args.runs,
+        "concurrency": args.concurrency,
+        "throughput_per_second": args.runs / wall,
+        "latency_seconds": _percentiles(durations),
+        "nodes": nodes,
+    }
+
+
+@suite("memory")
+def bench_memory(args: argparse.Namespace, scenario: Scenario) -> dict:
+    """Memory retained per thread by `build_graph_with_memory()`."""
+    # `build_graph_with_memory()`每个线程保留的内存
+    from src.graph.builder import build_graph_with_memory
+    from src.server.metrics import checkpointer_stats
+
+    graph = build_graph_with_memory()
+
+    async def run_threads(start: int, count: int):
+        for i in range(start, start + count):
+            await graph.ainvoke(
+                _workflow_input(f"topic {i}"), _workflow_config(f"mem-{i}")
+            )
+
+    asyncio.run(run_threads(0, 1))  # warm-up: import caches, compiled agents 预热
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    asyncio.run(run_threads(1, args.threads))
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = checkpointer_stats(graph.checkpointer)
+    return {
+        "threads": args.threads,
+        "retained_bytes_per_thread": (current - baseline) / args.threads,
+        "peak_bytes": peak - baseline,
+        "checkpoints_per_thread": stats["checkpoints"] / stats["threads"],
+        "checkpointer_bytes_per_thread": stats["bytes"] / stats["threads"],
+    }
+
+
+@suite("api")
+def bench_api(args: argparse.Namespace, scenario: Scenario) -> dict:
+    """End-to-end `/api/chat/stream` through the FastAPI app, plus SSE encoding cost."""
+    # 通过FastAPI应用端到端调用`/api/chat/stream`，并测量SSE编码开销
+    import importlib
+
+    # `src.server` re-exports the FastAPI instance under the module's name
+    # `src.server`以模块同名导出了FastAPI实例
+    app_module = importlib.import_module("src.server.app")
+
+    request = {
+        "messages": [{"role": "user", "content": "benchmark topic"}],
+        "auto_accepted_plan": True,
+        "enable_background_investigation": True,
+    }
+    captured: list[tuple[str, dict]] = []
+    real_make_event = app_module._make_event
+
+    def capture(event_type: str, data: dict) -> str:
+        captured.append((event_type, dict(data)))
+        return real_make_event(event_type, data)
+
+    async def one() -> tuple[float, float, int]:
+        # Drive the ASGI app directly: in-process HTTP clients buffer the
+        # whole body, which would hide the time to the first event
+        # 直接驱动ASGI应用：进程内HTTP客户端会缓冲整个响应体，从而掩盖首个事件的时间
+        body = json.dumps(dict(request, thread_id=str(uuid.uuid4()))).encode()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/api/chat/stream",
+            "raw_path": b"/api/chat/stream",
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("127.0.0.1", 8000),
+        }
+        body_sent = False
+        first = None
+        events = 0
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(3600)  # 模拟保持连接的客户端
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal first, events
+            if message["type"] == "http.response.body" and message.get("body"):
+                events += message["body"].count(b"event: ")
+                if first is None:
+                    first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await app_module.app(scope, receive, send)
+        return first or 0.0, time.perf_counter() - start, events
+
+    async def main():
+        await one()  # warm-up 预热
+        return [await one() for _ in range(args.runs)]
+
+    app_module._make_event = capture
+    try:
+        results = asyncio.run(main())
+    finally:
+        app_module._make_event = real_make_event
+
+    # Re-encode the captured events to isolate the SSE encoding cost
+    # 重新编码捕获的事件，以单独测量SSE编码开销
+    samples = captured[: min(len(captured), 5000)]
+    start = time.perf_counter()
+    for event_type, data in samples:
+        real_make_event(event_type, dict(data))
+    encode = (time.perf_counter() - start) / max(1, len(samples))
+
+    return {
+        "runs": args.runs,
+        "time_to_first_event_seconds": _percentiles([r[0] for r in results]),
+        "total_seconds": _percentiles([r[1] for r in results]),
+        "events_per_stream": statistics.fmean(r[2] for r in results),
+        "sse_encode_seconds_per_event": encode,
+    }
+
+
+@suite("metrics")
+def bench_metrics_overhead(args: argparse.Namespace, scenario: Scenario) -> dict:
+    """Overhead of the metrics middleware on a streaming response."""
+    # 指标中间件在流式响应上的开销
+    from benchmarks import bench_metrics
+
+    return bench_metrics.run(events=20000, repeat=5)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description="Run offline DeerFlow benchmarks")
+    parser.add_argument(
+        "--suites",
+        default=",".join(SUITES),
+        help=f"Comma separated suites to run (default: {','.join(SUITES)})",
+    )
+    parser.add_argument("--runs", type=int, default=10, help="Workflow runs per suite")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=10, help="Threads for memory")
+    parser.add_argument("--steps", type=int, default=3, help="Plan steps")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--llm-token-latency", type=float, default=0.0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--crawl-latency", type=float, default=0.0)
+    parser.add_argument("--rag-latency", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    scenario = Scenario(
+        steps=args.steps,
+        latencies=Latencies(
+            llm=args.llm_latency,
+            llm_token=args.llm_token_latency,
+            search=args.search_latency,
+            crawl=args.crawl_latency,
+            rag=args.rag_latency,
+            tts=args.tts_latency,
+        ),
+    )
+    selected = [name.strip() for name in args.suites.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SUITES]
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scenario": {
+                "steps": scenario.steps,
+                "latencies": vars(scenario.latencies),
+            },
+        },
+        "results": {},
+    }
+    with offline_providers(scenario):
+        for name in selected:
+            report["results"][name] = SUITES[name](args, scenario)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
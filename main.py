@@ -8,6 +8,9 @@ Entry point script for the DeerFlow project.
 
 import argparse
 import asyncio
+import json
+import logging
+import os
 
 from InquirerPy import inquirer
 
@@ -21,6 +24,7 @@ def ask(
     max_plan_iterations=1,
     max_step_num=3,
     enable_background_investigation=True,
+    output_format="text",
 ):
     """Run the agent workflow with the given question.
 
@@ -30,6 +34,7 @@ def ask(
         max_plan_iterations: Maximum number of plan iterations
         max_step_num: Maximum number of steps in a plan
         enable_background_investigation: If True, performs web search before planning to enhance context
+        output_format: "text" prints tokens as they arrive, "jsonl" writes one JSON event per line
     """
     # 使用给定的问题运行代理工作流
     #
@@ -39,6 +44,7 @@ def ask(
     #     max_plan_iterations: 计划迭代的最大次数
     #     max_step_num: 计划中步骤的最大数量
     #     enable_background_investigation: 如果为True，在规划前执行网络搜索以增强上下文
+    #     output_format: "text"在令牌到达时打印它们，"jsonl"每个事件写一行JSON
     asyncio.run(
         run_agent_workflow_async(
             user_input=question,
@@ -46,6 +52,7 @@ def ask(
             max_plan_iterations=max_plan_iterations,
             max_step_num=max_step_num,
             enable_background_investigation=enable_background_investigation,
+            output_format=output_format,
         )
     )
 
@@ -55,6 +62,7 @@ def main(
     max_plan_iterations=1,
     max_step_num=3,
     enable_background_investigation=True,
+    output_format="text",
 ):
     """Interactive mode with built-in questions.
 
@@ -63,6 +71,7 @@ def main(
         debug: If True, enables debug level logging
         max_plan_iterations: Maximum number of plan iterations
         max_step_num: Maximum number of steps in a plan
+        output_format: "text" prints tokens as they arrive, "jsonl" writes one JSON event per line
     """
     # 带有内置问题的交互模式
     #
@@ -71,6 +80,7 @@ def main(
     #     debug: 如果为True，启用调试级别的日志记录
     #     max_plan_iterations: 计划迭代的最大次数
     #     max_step_num: 计划中步骤的最大数量
+    #     output_format: "text"在令牌到达时打印它们，"jsonl"每个事件写一行JSON
     
     # First select language
     # 首先选择语言
@@ -114,6 +124,7 @@ def main(
         max_plan_iterations=max_plan_iterations,
         max_step_num=max_step_num,
         enable_background_investigation=enable_background_investigation,
+        output_format=output_format,
     )
 
 
@@ -146,10 +157,56 @@ if __name__ == "__main__":
         dest="enable_background_investigation",
         help="Disable background investigation before planning",  # 在规划前禁用背景调查
     )
+    parser.add_argument(
+        "--format",
+        choices=["text", "jsonl"],
+        default="text",
+        help="Stream tokens as text, or events as JSON lines for scripts (default: text)",  # 以文本流式输出令牌，或以JSON行输出事件供脚本使用
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Run every query of a JSONL file concurrently",  # 并发运行JSONL文件中的每个查询
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="JSONL file for the batch reports and metrics (default: <batch file>.results.jsonl)",  # 批量报告和指标的JSONL文件
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Workflows run at the same time in batch mode (default: 4)",  # 批量模式下同时运行的工作流数量
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds before a batch query is abandoned",  # 放弃批量查询前的秒数
+    )
 
     args = parser.parse_args()
 
-    if args.interactive:
+    if args.batch:
+        # Run the batch file; a rerun skips the queries already done
+        # 运行批量文件；再次运行会跳过已完成的查询
+        from src.batch import run_batch
+
+        if args.debug:
+            logging.getLogger("src").setLevel(logging.DEBUG)
+        summary = asyncio.run(
+            run_batch(
+                args.batch,
+                args.output or f"{os.path.splitext(args.batch)[0]}.results.jsonl",
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                max_plan_iterations=args.max_plan_iterations,
+                max_step_num=args.max_step_num,
+                enable_background_investigation=args.enable_background_investigation,
+            )
+        )
+        print(json.dumps(summary, indent=2))
+    elif args.interactive:
         # Pass command line arguments to main function
         # 将命令行参数传递给main函数
         main(
@@ -157,6 +214,7 @@ if __name__ == "__main__":
             max_plan_iterations=args.max_plan_iterations,
             max_step_num=args.max_step_num,
             enable_background_investigation=args.enable_background_investigation,
+            output_format=args.format,
         )
     else:
         # Parse user input from command line arguments or user input
@@ -174,4 +232,5 @@ if __name__ == "__main__":
             max_plan_iterations=args.max_plan_iterations,
             max_step_num=args.max_step_num,
             enable_background_investigation=args.enable_background_investigation,
+            output_format=args.format,
         )
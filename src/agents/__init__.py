@@ -1,6 +1,6 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
-from .agents import create_agent  # 导入创建代理的函数
+from .agents import create_agent, invalidate_agent_cache  # 导入代理相关的函数
 
-__all__ = ["create_agent"]  # 导出的函数列表
+__all__ = ["create_agent", "invalidate_agent_cache"]  # 导出的函数列表
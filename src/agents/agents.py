@@ -1,21 +1,129 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
 from langgraph.prebuilt import create_react_agent
 
 from src.prompts import apply_prompt_template
 from src.llms.llm import get_llm_by_type
 from src.config.agents import AGENT_LLM_MAP
+from src.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_AGENT_CACHE_SIZE = 32
+
+# Compiled agents keyed by name, type, prompt, model and tool fingerprints
+# 按名称、类型、提示、模型和工具指纹缓存的已编译代理
+_agent_cache: OrderedDict[tuple, Any] = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+
+def _get_agent_cache_size() -> int:
+    """Maximum number of compiled agents to keep, from `AGENT_CACHE_SIZE` (0 disables)."""
+    # 从`AGENT_CACHE_SIZE`读取保留的已编译代理的最大数量（0表示禁用）
+    env_value_str = os.getenv("AGENT_CACHE_SIZE", str(DEFAULT_AGENT_CACHE_SIZE))
+    try:
+        return max(0, int(env_value_str))
+    except ValueError:
+        logger.warning(
+            f"AGENT_CACHE_SIZE value '{env_value_str}' is not an integer. "
+            f"Using default value {DEFAULT_AGENT_CACHE_SIZE}."
+        )
+        return DEFAULT_AGENT_CACHE_SIZE
+
+
+def _fingerprint_default(value: Any) -> str:
+    # Callables (tool functions, MCP session closures, schema classes) are
+    # compared by identity; other objects such as retrievers or API wrappers
+    # are configured from the environment and compared by type
+    # 可调用对象（工具函数、MCP会话闭包、模式类）按身份比较；
+    # 检索器或API包装器等其他对象由环境变量配置，按类型比较
+    if callable(value):
+        return f"callable:{id(value)}"
+    return f"{type(value).__module__}.{type(value).__qualname__}"
+
+
+def _tool_fingerprint(tool: Any) -> str:
+    """A string that is equal for tools that behave the same."""
+    # 对行为相同的工具返回相同的字符串
+    try:
+        fields = tool.model_dump(exclude={"callbacks", "callback_manager"})
+    except Exception:
+        return f"object:{id(tool)}"
+    return f"{type(tool).__module__}.{type(tool).__qualname__}:" + json.dumps(
+        fields, default=_fingerprint_default, sort_keys=True
+    )
+
+
+def invalidate_agent_cache(agent_type: Optional[str] = None) -> None:
+    """
+    Drop cached agents, e.g. after MCP servers change their tool sets.
+
+    Args:
+        agent_type: Only drop agents of this type; all agents when None
+    """
+    # 丢弃缓存的代理，例如在MCP服务器的工具集变化之后
+    with _agent_cache_lock:
+        if agent_type is None:
+            _agent_cache.clear()
+            return
+        for key in [key for key in _agent_cache if key[1] == agent_type]:
+            del _agent_cache[key]
 
 
 # Create agents using configured LLM types
 # 使用配置的LLM类型创建代理
 def create_agent(agent_name: str, agent_type: str, tools: list, prompt_template: str):
-    """Factory function to create agents with consistent configuration."""
-    # 工厂函数，用于创建具有一致配置的代理
-    return create_react_agent(
+    """
+    Factory function to create agents with consistent configuration.
+
+    Compiled agents are reused for the same name, type, prompt template, model
+    and tools, so every plan step does not recompile the ReAct graph and
+    re-convert the tool schemas. Step data reaches the agent through its input
+    state and the prompt is rendered from state, so reuse is safe.
+    """
+    # 工厂函数，用于创建具有一致配置的代理。
+    # 名称、类型、提示模板、模型和工具相同时复用已编译的代理，
+    # 这样每个计划步骤都不必重新编译ReAct图和转换工具模式。
+    # 步骤数据通过输入状态传给代理，提示也从状态渲染，因此复用是安全的。
+    model = get_llm_by_type(AGENT_LLM_MAP[agent_type])
+    cache_size = _get_agent_cache_size()
+    key = None
+    if cache_size:
+        # The cached agent keeps the model alive, so its id cannot be reused
+        # 缓存的代理持有模型引用，因此其id不会被复用
+        key = (
+            agent_name,
+            agent_type,
+            prompt_template,
+            id(model),
+            tuple(_tool_fingerprint(tool) for tool in tools),
+        )
+        with _agent_cache_lock:
+            agent = _agent_cache.get(key)
+            if agent is not None:
+                _agent_cache.move_to_end(key)
+        record_cache_lookup("agent", agent is not None)
+        if agent is not None:
+            return agent
+
+    agent = create_react_agent(
         name=agent_name,
-        model=get_llm_by_type(AGENT_LLM_MAP[agent_type]),
+        model=model,
         tools=tools,
         prompt=lambda state: apply_prompt_template(prompt_template, state),
     )
+    if key is not None:
+        with _agent_cache_lock:
+            _agent_cache[key] = agent
+            _agent_cache.move_to_end(key)
+            while len(_agent_cache) > cache_size:
+                _agent_cache.popitem(last=False)
+    return agent
@@ -0,0 +1,331 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Batch research: run the workflow for many queries from a JSONL file.
+
+All workflows run concurrently in one process, so they share the cached LLM
+clients and their connection pools, the compiled agents, the MCP session pool,
+the Python REPL workers and the RAG caches. Each query gets its own thread ID.
+Every finished query is appended to the output JSONL file with its final
+report and metrics, and that file is the checkpoint: a rerun skips the
+queries already reported as successful and retries the others.
+
+Input lines are JSON objects with a `query` and optionally an `id` and the
+per-query settings `max_plan_iterations`, `max_step_num` and
+`enable_background_investigation`, or plain JSON strings. Without an `id`, a
+query is identified by a hash of its text.
+"""
+
+# 批量研究：为JSONL文件中的多个查询运行工作流。
+# 所有工作流在同一进程中并发运行，因此共享缓存的LLM客户端及其连接池、已编译的智能体、MCP会话池、Python REPL工作进程和RAG缓存。
+# 每个查询有自己的线程ID。每个完成的查询连同最终报告和指标追加到输出JSONL文件中，该文件就是检查点：
+# 再次运行会跳过已报告成功的查询并重试其他查询。
+# 输入行是包含`query`以及可选的`id`和每个查询设置的JSON对象，或者纯JSON字符串。没有`id`时，查询由其文本的哈希标识。
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.workflow import build_initial_state, build_workflow_config
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_CONCURRENCY = 4
+QUERY_SETTINGS = (
+    "max_plan_iterations",
+    "max_step_num",
+    "enable_background_investigation",
+)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Count the LLM calls, tokens and tool calls of one workflow run."""
+
+    # 统计一次工作流运行的LLM调用、词元和工具调用
+
+    run_inline = True  # 在事件循环中直接调用，无需线程池
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.llm_errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.tool_calls = 0
+        self.tool_errors = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        self.llm_calls += 1
+        counted = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage:
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+                    counted = True
+        if not counted:
+            # OpenAI-compatible clients without usage metadata on the message
+            # 消息上没有用量元数据的OpenAI兼容客户端
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            self.input_tokens += usage.get("prompt_tokens", 0)
+            self.output_tokens += usage.get("completion_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.llm_errors += 1
+
+    def on_tool_start(self, serialized: dict, input_str: str, **kwargs: Any) -> None:
+        self.tool_calls += 1
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self.tool_errors += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "llm_errors": self.llm_errors,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tool_calls": self.tool_calls,
+            "tool_errors": self.tool_errors,
+        }
+
+
+def query_id(query: str) -> str:
+    """Stable ID of a query without an explicit `id`."""
+    # 没有显式`id`的查询的稳定ID
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+
+
+def read_queries(path: str) -> list[dict]:
+    """
+    Read the queries of a batch file.
+
+    Raises:
+        ValueError: If a line is not valid JSON, has no query, or reuses an ID
+    """
+    # 读取批量文件中的查询
+    queries: list[dict] = []
+    seen: set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON: {e}")
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not str(item.get("query") or "").strip():
+                raise ValueError(
+                    f"{path}:{number}: a line must be a query string or an object with a query"
+                )
+            item["id"] = str(item.get("id") or query_id(item["query"]))
+            if item["id"] in seen:
+                raise ValueError(f"{path}:{number}: duplicate query id {item['id']}")
+            seen.add(item["id"])
+            queries.append(item)
+    return queries
+
+
+def read_finished(path: str) -> set[str]:
+    """IDs of the queries already reported as successful in an output file."""
+    # 输出文件中已报告成功的查询ID
+    finished: set[str] = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by a crash 因崩溃而被截断的行
+            if isinstance(record, dict) and record.get("status") == "ok":
+                finished.add(record.get("id"))
+    return finished
+
+
+class _ReportWriter:
+    """Append records to the output file, durably and one whole line at a time."""
+
+    # 以持久化的方式逐整行向输出文件追加记录
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+", encoding="utf-8")
+        # Terminate a line cut short by a crash, so the next record starts on its own line
+        # 结束因崩溃而被截断的行，使下一条记录从新行开始
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell():
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchRunner:
+    """
+    Run the research workflow for every query of a batch file, `concurrency` at a time.
+
+    Args:
+        graph: Compiled workflow graph; defaults to the graph of `src.workflow`
+        concurrency: Workflows running at the same time
+        timeout: Seconds after which a query is abandoned and reported as a timeout
+        max_plan_iterations, max_step_num, enable_background_investigation:
+            Defaults for queries that do not set them
+    """
+
+    # 为批量文件中的每个查询运行研究工作流，同时运行`concurrency`个
+
+    def __init__(
+        self,
+        graph=None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: Optional[float] = None,
+        max_plan_iterations: int = 1,
+        max_step_num: int = 3,
+        enable_background_investigation: bool = True,
+    ):
+        if graph is None:
+            from src.workflow import graph
+        self.graph = graph
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.defaults = {
+            "max_plan_iterations": max_plan_iterations,
+            "max_step_num": max_step_num,
+            "enable_background_investigation": enable_background_investigation,
+        }
+
+    async def run_query(self, item: dict) -> dict:
+        """Run one query and return its output record; failures are recorded, not raised."""
+        # 运行一个查询并返回其输出记录；失败被记录而不是抛出
+        settings = {
+            **self.defaults,
+            **{key: item[key] for key in QUERY_SETTINGS if key in item},
+        }
+        thread_id = f"batch-{item['id']}-{uuid.uuid4().hex[:8]}"
+        config = build_workflow_config(
+            thread_id, settings["max_plan_iterations"], settings["max_step_num"]
+        )
+        usage = UsageCallbackHandler()
+        config["callbacks"] = [usage]
+        record = {"id": item["id"], "query": item["query"], "thread_id": thread_id}
+
+        start = time.perf_counter()
+        try:
+            state = await asyncio.wait_for(
+                self.graph.ainvoke(
+                    build_initial_state(
+                        item["query"], settings["enable_background_investigation"]
+                    ),
+                    config,
+                ),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            record.update(
+                status="timeout", error=f"Timed out after {self.timeout} seconds"
+            )
+        except Exception as e:
+            logger.exception(f"Batch query {item['id']} failed")
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        else:
+            state = state or {}
+            plan = state.get("current_plan")
+            record.update(
+                status="ok",
+                final_report=state.get("final_report", ""),
+                plan_steps=len(getattr(plan, "steps", None) or []),
+                messages=len(state.get("messages", [])),
+            )
+        record["seconds"] = time.perf_counter() - start
+        record["metrics"] = usage.to_dict()
+        record["finished_at"] = datetime.now(timezone.utc).isoformat()
+        return record
+
+    async def run(self, input_path: str, output_path: str) -> dict:
+        """
+        Run the queries of `input_path` that have no successful record in `output_path` yet.
+
+        Returns:
+            Counts of queries, skipped (already done), succeeded and failed, and the elapsed seconds
+        """
+        # 运行`input_path`中在`output_path`里还没有成功记录的查询
+        queries = read_queries(input_path)
+        finished = read_finished(output_path)
+        todo = [item for item in queries if item["id"] not in finished]
+        summary = {
+            "queries": len(queries),
+            "skipped": len(queries) - len(todo),
+            "succeeded": 0,
+            "failed": 0,
+        }
+        logger.info(
+            f"Running {len(todo)} of {len(queries)} queries with concurrency {self.concurrency}"
+        )
+
+        start = time.perf_counter()
+        pending: asyncio.Queue = asyncio.Queue()
+        for item in todo:
+            pending.put_nowait(item)
+        writer = _ReportWriter(output_path)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await self.run_query(item)
+                writer.write(record)
+                summary["succeeded" if record["status"] == "ok" else "failed"] += 1
+                done = summary["succeeded"] + summary["failed"]
+                logger.info(
+                    f"Query {item['id']} {record['status']} in {record['seconds']:.1f}s "
+                    f"({done}/{len(todo)} done)"
+                )
+
+        try:
+            await asyncio.gather(
+                *(worker() for _ in range(min(self.concurrency, len(todo))))
+            )
+        finally:
+            writer.close()
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+
+async def run_batch(input_path: str, output_path: str, **kwargs) -> dict:
+    """
+    Run a batch file with a `BatchRunner` built from `kwargs`.
+
+    Args:
+        input_path: JSONL file of queries
+        output_path: JSONL file the reports and metrics are appended to
+
+    Returns:
+        The summary of `BatchRunner.run`
+    """
+    # 使用由`kwargs`构建的`BatchRunner`运行批量文件
+    return await BatchRunner(**kwargs).run(input_path, output_path)
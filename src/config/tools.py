@@ -24,6 +24,9 @@ SELECTED_SEARCH_ENGINE = os.getenv("SEARCH_API", SearchEngine.TAVILY.value)  # 
 class RAGProvider(enum.Enum):
     """RAG提供者枚举类"""
     RAGFLOW = "ragflow"
+    LOCAL = "local"  # 本地嵌入式向量检索
+    BM25 = "bm25"  # 本地BM25词法检索
+    HYBRID = "hybrid"  # 并发查询多个提供者并融合结果
 
 
 SELECTED_RAG_PROVIDER = os.getenv("RAG_PROVIDER")  # 选择的RAG提供者
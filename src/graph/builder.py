@@ -4,6 +4,7 @@
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 from src.prompts.planner_model import StepType
+from src.utils.metrics import instrument_node
 
 from .types import State
 from .nodes import (
@@ -35,19 +36,25 @@ def continue_to_running_research_team(state: State):
     return "planner"  # 默认返回规划员
 
 
+def _add_node(builder: StateGraph, name: str, node) -> None:
+    """Add a node to the graph with its execution time recorded in the metrics."""
+    # 向图中添加节点，并在指标中记录其执行耗时
+    builder.add_node(name, instrument_node("deerflow", name, node))
+
+
 def _build_base_graph():
     """Build and return the base state graph with all nodes and edges."""
     # 构建并返回包含所有节点和边的基础状态图
     builder = StateGraph(State)
     builder.add_edge(START, "coordinator")  # 添加从开始到协调员的边
-    builder.add_node("coordinator", coordinator_node)  # 添加协调员节点
-    builder.add_node("background_investigator", background_investigation_node)  # 添加背景调查员节点
-    builder.add_node("planner", planner_node)  # 添加规划员节点
-    builder.add_node("reporter", reporter_node)  # 添加报告员节点
-    builder.add_node("research_team", research_team_node)  # 添加研究团队节点
-    builder.add_node("researcher", researcher_node)  # 添加研究员节点
-    builder.add_node("coder", coder_node)  # 添加编码员节点
-    builder.add_node("human_feedback", human_feedback_node)  # 添加人类反馈节点
+    _add_node(builder, "coordinator", coordinator_node)  # 添加协调员节点
+    _add_node(builder, "background_investigator", background_investigation_node)  # 添加背景调查员节点
+    _add_node(builder, "planner", planner_node)  # 添加规划员节点
+    _add_node(builder, "reporter", reporter_node)  # 添加报告员节点
+    _add_node(builder, "research_team", research_team_node)  # 添加研究团队节点
+    _add_node(builder, "researcher", researcher_node)  # 添加研究员节点
+    _add_node(builder, "coder", coder_node)  # 添加编码员节点
+    _add_node(builder, "human_feedback", human_feedback_node)  # 添加人类反馈节点
     builder.add_edge("background_investigator", "planner")  # 添加从背景调查员到规划员的边
     builder.add_conditional_edges(
         "research_team",
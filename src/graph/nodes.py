@@ -1,16 +1,18 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import json
 import logging
 import os
-from typing import Annotated, Literal
+from typing import Annotated, Literal, Optional
 
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
+from pydantic import ValidationError
 from langchain_core.tools import tool
+from langgraph.config import get_stream_writer
 from langgraph.types import Command, interrupt
-from langchain_mcp_adapters.client import MultiServerMCPClient
 
 from src.agents import create_agent
 from src.tools.search import LoggedTavilySearch
@@ -19,15 +21,18 @@ from src.tools import (
     get_web_search_tool,
     get_retriever_tool,
     python_repl_tool,
+    get_mcp_session_pool,
 )
 
 from src.config.agents import AGENT_LLM_MAP
 from src.config.configuration import Configuration
 from src.llms.llm import get_llm_by_type
-from src.prompts.planner_model import Plan
+from src.prompts.planner_model import Plan, Step, StepType
 from src.prompts.template import apply_prompt_template
-from src.utils.json_utils import repair_json_output
+from src.utils.json_stream import JSONStreamParser
+from src.utils.json_utils import parse_model_output
 
+from .prefetch import PREFETCH_WAIT_SECONDS, get_prefetch_step_limit, search_prefetcher
 from .types import State
 from ..config import SELECTED_SEARCH_ENGINE, SearchEngine
 
@@ -98,6 +103,100 @@ def background_investigation_node(state: State, config: RunnableConfig):
     }
 
 
+def _get_stream_writer():
+    """Return the graph's custom stream writer, or a no-op outside a graph run."""
+    # 返回图的自定义流写入器，在图运行之外返回空操作
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _: None
+
+
+class _PlanStreamHandler:
+    """
+    Parse the planner response while it streams.
+
+    Completed plan fields and steps are published as custom stream events, and
+    the first research steps get their web search prefetched. Prefetching is
+    only enabled for plans that are accepted automatically, since a plan the
+    user reviews may still be edited or rejected.
+    """
+    # 在规划员响应流式输出时进行解析。
+    # 已完成的计划字段和步骤作为自定义流事件发布，前几个研究步骤的网络搜索会被预取。
+    # 仅对自动接受的计划启用预取，因为需要用户审查的计划仍可能被编辑或拒绝。
+
+    def __init__(self, config: RunnableConfig, prefetch: bool = True):
+        self._parser = JSONStreamParser(array_fields=("steps",))
+        self._writer = _get_stream_writer()
+        self._thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        self._max_search_results = Configuration.from_runnable_config(
+            config
+        ).max_search_results
+        self._prefetch_left = (
+            get_prefetch_step_limit() if prefetch and self._thread_id else 0
+        )
+
+    @property
+    def text(self) -> str:
+        return self._parser.text
+
+    @property
+    def parsed(self) -> Optional[dict]:
+        """The plan decoded while streaming, if the whole response was valid JSON."""
+        # 流式解析得到的计划，仅当整个响应都是有效JSON时返回
+        return self._parser.result if self._parser.complete else None
+
+    def feed(self, content: str) -> None:
+        for event in self._parser.feed(content):
+            if event.kind == "item":
+                self._on_step(event.index, event.value)
+            elif event.key != "steps":
+                self._writer(
+                    {
+                        "event": "plan_field",
+                        "agent": "planner",
+                        "field": event.key,
+                        "value": event.value,
+                    }
+                )
+
+    def _on_step(self, index: int, value) -> None:
+        try:
+            step = Step.model_validate(value)
+        except ValidationError as e:
+            logger.debug(f"Skipping invalid streamed plan step {index}: {e}")
+            return
+        self._writer(
+            {
+                "event": "plan_step",
+                "agent": "planner",
+                "index": index,
+                "step": step.model_dump(mode="json", exclude_none=True),
+            }
+        )
+        if (
+            self._prefetch_left > 0
+            and step.need_search
+            and step.step_type == StepType.RESEARCH
+            and not self._parser.result.get("has_enough_context")
+        ):
+            self._prefetch_left -= 1
+            max_search_results = self._max_search_results
+            search_prefetcher.submit(
+                self._thread_id,
+                step.title,
+                lambda: get_web_search_tool(max_search_results).invoke(step.title),
+            )
+
+
+def _discard_prefetched_searches(config: RunnableConfig) -> None:
+    # Searches prefetched for a plan that is replaced or finished are never claimed
+    # 为被替换或已完成的计划预取的搜索不会再被取用
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    if thread_id:
+        search_prefetcher.discard(thread_id)
+
+
 def planner_node(
     state: State, config: RunnableConfig
 ) -> Command[Literal["human_feedback", "reporter"]]:
@@ -112,6 +211,7 @@ def planner_node(
         命令，指示下一步是人类反馈还是报告员
     """
     logger.info("Planner generating full plan")  # 规划员正在生成完整计划
+    _discard_prefetched_searches(config)  # 新计划替换之前的计划
     configurable = Configuration.from_runnable_config(config)  # 从可运行配置创建配置
     plan_iterations = state["plan_iterations"] if state.get("plan_iterations", 0) else 0  # 获取计划迭代次数
     messages = apply_prompt_template("planner", state, configurable)  # 应用规划员提示模板
@@ -131,9 +231,10 @@ def planner_node(
         ]  # 添加背景调查结果消息
 
     if AGENT_LLM_MAP["planner"] == "basic":
-        llm = get_llm_by_type(AGENT_LLM_MAP["planner"]).with_structured_output(
-            Plan,
-            method="json_mode",  # 使用JSON模式输出结构化数据
+        # JSON mode, streamed so the plan can be parsed while it is written
+        # JSON模式，并以流式输出，以便在写出计划的同时解析计划
+        llm = get_llm_by_type(AGENT_LLM_MAP["planner"]).bind(
+            response_format={"type": "json_object"}
         )  # 获取基本规划员LLM
     else:
         llm = get_llm_by_type(AGENT_LLM_MAP["planner"])  # 获取规划员LLM
@@ -143,42 +244,39 @@ def planner_node(
     if plan_iterations >= configurable.max_plan_iterations:
         return Command(goto="reporter")  # 返回报告员命令
 
-    full_response = ""  # 完整响应
-    if AGENT_LLM_MAP["planner"] == "basic":
-        response = llm.invoke(messages)  # 调用LLM
-        full_response = response.model_dump_json(indent=4, exclude_none=True)  # 将响应转换为JSON字符串
-    else:
-        response = llm.stream(messages)  # 流式调用LLM
-        for chunk in response:
-            full_response += chunk.content  # 累加响应内容
+    plan_stream = _PlanStreamHandler(
+        config, prefetch=bool(state.get("auto_accepted_plan"))
+    )  # 计划流处理器
+    for chunk in llm.stream(messages):  # 流式调用LLM
+        plan_stream.feed(chunk.content)  # 增量解析响应内容
+    full_response = plan_stream.text  # 完整响应
     logger.debug(f"Current state messages: {state['messages']}")  # 记录当前状态消息
     logger.info(f"Planner response: {full_response}")  # 记录规划员响应
 
+    # Well-formed responses were already decoded while streaming; the plan is
+    # validated once here and stored as a model for the nodes that follow
+    # 格式正确的响应在流式输出时已经解码；计划只在这里校验一次，并以模型形式存储供后续节点使用
+    curr_plan = plan_stream.parsed
     try:
-        curr_plan = json.loads(repair_json_output(full_response))  # 修复并解析JSON输出
-    except json.JSONDecodeError:
-        logger.warning("Planner response is not a valid JSON")  # 规划员响应不是有效的JSON
+        if curr_plan is None:
+            # 将响应直接解析为计划模型，仅在需要时修复JSON
+            new_plan = parse_model_output(full_response, Plan)
+        else:
+            new_plan = Plan.model_validate(curr_plan)  # 验证计划模型
+    except (json.JSONDecodeError, ValidationError):
+        logger.warning("Planner response is not a valid plan")  # 规划员响应不是有效的计划
         if plan_iterations > 0:
             return Command(goto="reporter")  # 如果已经有计划迭代，返回报告员命令
         else:
             return Command(goto="__end__")  # 否则结束
-    if curr_plan.get("has_enough_context"):
+    update = {
+        "messages": [AIMessage(content=full_response, name="planner")],  # 更新消息
+        "current_plan": new_plan,  # 更新当前计划
+    }
+    if new_plan.has_enough_context:
         logger.info("Planner response has enough context.")  # 规划员响应有足够的上下文
-        new_plan = Plan.model_validate(curr_plan)  # 验证计划模型
-        return Command(
-            update={
-                "messages": [AIMessage(content=full_response, name="planner")],  # 更新消息
-                "current_plan": new_plan,  # 更新当前计划
-            },
-            goto="reporter",  # 前往报告员
-        )
-    return Command(
-        update={
-            "messages": [AIMessage(content=full_response, name="planner")],  # 更新消息
-            "current_plan": full_response,  # 更新当前计划为完整响应
-        },
-        goto="human_feedback",  # 前往人类反馈
-    )
+        return Command(update=update, goto="reporter")  # 前往报告员
+    return Command(update=update, goto="human_feedback")  # 前往人类反馈
 
 
 def human_feedback_node(
@@ -193,7 +291,7 @@ def human_feedback_node(
     返回:
         命令，指示下一步是规划员、研究团队、报告员还是结束
     """
-    current_plan = state.get("current_plan", "")  # 获取当前计划
+    current_plan = state.get("current_plan")  # 获取当前计划
     # check if the plan is auto accepted
     # 检查计划是否自动接受
     auto_accepted_plan = state.get("auto_accepted_plan", False)  # 获取是否自动接受计划
@@ -219,29 +317,19 @@ def human_feedback_node(
     # if the plan is accepted, run the following node
     # 如果计划被接受，运行以下节点
     plan_iterations = state["plan_iterations"] if state.get("plan_iterations", 0) else 0  # 获取计划迭代次数
-    goto = "research_team"  # 默认前往研究团队
-    try:
-        current_plan = repair_json_output(current_plan)  # 修复JSON输出
-        # increment the plan iterations
-        # 增加计划迭代次数
-        plan_iterations += 1  # 计划迭代次数加1
-        # parse the plan
-        # 解析计划
-        new_plan = json.loads(current_plan)  # 解析JSON
-        if new_plan["has_enough_context"]:  # 如果有足够的上下文
-            goto = "reporter"  # 前往报告员
-    except json.JSONDecodeError:
-        logger.warning("Planner response is not a valid JSON")  # 规划员响应不是有效的JSON
-        if plan_iterations > 0:
-            return Command(goto="reporter")  # 如果已经有计划迭代，返回报告员命令
-        else:
-            return Command(goto="__end__")  # 否则结束
+    # increment the plan iterations
+    # 增加计划迭代次数
+    plan_iterations += 1  # 计划迭代次数加1
+    # the planner already validated the plan
+    # 规划员已经校验过计划
+    new_plan = current_plan
+    goto = "reporter" if new_plan.has_enough_context else "research_team"  # 有足够的上下文时前往报告员
 
     return Command(
         update={
-            "current_plan": Plan.model_validate(new_plan),  # 验证并更新当前计划
+            "current_plan": new_plan,  # 更新当前计划
             "plan_iterations": plan_iterations,  # 更新计划迭代次数
-            "locale": new_plan["locale"],  # 更新区域设置
+            "locale": new_plan.locale,  # 更新区域设置
         },
         goto=goto,  # 前往下一个节点
     )
@@ -320,6 +408,7 @@ def reporter_node(state: State, config: RunnableConfig):
         包含最终报告的字典
     """
     logger.info("Reporter write final report")  # 报告员编写最终报告
+    _discard_prefetched_searches(config)  # 研究已经结束
     configurable = Configuration.from_runnable_config(config)  # 从可运行配置创建配置
     current_plan = state.get("current_plan")  # 获取当前计划
     input_ = {
@@ -369,7 +458,7 @@ def research_team_node(state: State):
 
 
 async def _execute_agent_step(
-    state: State, agent, agent_name: str
+    state: State, agent, agent_name: str, thread_id: Optional[str] = None
 ) -> Command[Literal["research_team"]]:
     """
     执行代理步骤的辅助函数
@@ -378,6 +467,7 @@ async def _execute_agent_step(
         state: 当前状态
         agent: 代理对象
         agent_name: 代理名称
+        thread_id: 线程ID，用于取用规划时预取的搜索结果
         
     返回:
         命令，指示下一步是研究团队
@@ -437,6 +527,27 @@ async def _execute_agent_step(
                 )
             )
 
+        if thread_id and current_step.need_search:
+            # Search results fetched while the planner was still streaming
+            # 规划员仍在流式输出时获取的搜索结果
+            prefetched = await asyncio.to_thread(
+                search_prefetcher.take,
+                thread_id,
+                current_step.title,
+                PREFETCH_WAIT_SECONDS,
+            )
+            if prefetched:
+                if not isinstance(prefetched, str):
+                    prefetched = json.dumps(prefetched, ensure_ascii=False)
+                agent_input["messages"].append(
+                    HumanMessage(
+                        content="# Prefetched Search Results\n\n"
+                        f"Web search results for `{current_step.title}`, gathered while the plan was written. "
+                        "Use them and only search again for information they do not cover.\n\n"
+                        + prefetched,
+                    )
+                )
+
         agent_input["messages"].append(
             HumanMessage(
                 content="IMPORTANT: DO NOT include inline citations in the text. Instead, track all sources and include a References section at the end using link reference format. Include an empty line between each citation for better readability. Use this format for each reference:\n- [Source Title](URL)\n\n- [Another Source](URL)",
@@ -517,6 +628,7 @@ async def _setup_and_execute_agent_step(
         Command to update state and go to research_team
     """
     configurable = Configuration.from_runnable_config(config)
+    thread_id = config.get("configurable", {}).get("thread_id")
     mcp_servers = {}
     enabled_tools = {}
 
@@ -537,20 +649,20 @@ async def _setup_and_execute_agent_step(
 
     # Create and execute agent with MCP tools if available
     if mcp_servers:
-        async with MultiServerMCPClient(mcp_servers) as client:
-            loaded_tools = default_tools[:]
-            for tool in client.get_tools():
-                if tool.name in enabled_tools:
-                    tool.description = (
-                        f"Powered by '{enabled_tools[tool.name]}'.\n{tool.description}"
-                    )
+        # Sessions come from a long-lived pool instead of being opened per step
+        # 会话来自长期连接池，而不是每个步骤重新打开
+        pool = get_mcp_session_pool()
+        loaded_tools = default_tools[:]
+        for server_name, server_config in mcp_servers.items():
+            for tool in await pool.get_tools(server_name, server_config):
+                if enabled_tools.get(tool.name) == server_name:
                     loaded_tools.append(tool)
-            agent = create_agent(agent_type, agent_type, loaded_tools, agent_type)
-            return await _execute_agent_step(state, agent, agent_type)
+        agent = create_agent(agent_type, agent_type, loaded_tools, agent_type)
+        return await _execute_agent_step(state, agent, agent_type, thread_id)
     else:
         # Use default tools if no MCP servers are configured
         agent = create_agent(agent_type, agent_type, default_tools, agent_type)
-        return await _execute_agent_step(state, agent, agent_type)
+        return await _execute_agent_step(state, agent, agent_type, thread_id)
 
 
 async def researcher_node(
@@ -0,0 +1,122 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Background search prefetch for plan steps.
+
+While the planner is still streaming, the first research steps are already
+known. Their search is started in a thread pool so the researcher can pick the
+results up instead of waiting for its own first search round.
+"""
+
+# 计划步骤的后台搜索预取。
+# 规划员仍在流式输出时，前几个研究步骤就已经确定。
+# 它们的搜索会在线程池中提前开始，研究员可以直接取用结果，而不必等待自己的第一轮搜索。
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Research steps prefetched per plan 每个计划预取的研究步骤数
+DEFAULT_PREFETCH_STEPS = 1
+# Unclaimed results are dropped after this 未被取用的结果在此之后丢弃
+DEFAULT_TTL_SECONDS = 600.0
+# How long a step waits for a pending prefetch 步骤等待未完成预取的时长
+PREFETCH_WAIT_SECONDS = 5.0
+
+
+def get_prefetch_step_limit() -> int:
+    """Number of research steps to prefetch per plan, from `PLANNER_PREFETCH_STEPS`."""
+    # 从`PLANNER_PREFETCH_STEPS`读取每个计划预取的研究步骤数
+    env_value_str = os.getenv("PLANNER_PREFETCH_STEPS", str(DEFAULT_PREFETCH_STEPS))
+    try:
+        return max(0, int(env_value_str))
+    except ValueError:
+        logger.warning(
+            f"PLANNER_PREFETCH_STEPS value '{env_value_str}' is not an integer. "
+            f"Using default value {DEFAULT_PREFETCH_STEPS}."
+        )
+        return DEFAULT_PREFETCH_STEPS
+
+
+class SearchPrefetcher:
+    """
+    Run searches ahead of time, keyed by thread id and step title.
+
+    Results are handed out once: `take` removes the entry, `discard` drops the
+    entries of a replaced plan, and entries nobody claims expire after `ttl`
+    seconds.
+    """
+
+    # 按线程ID和步骤标题提前运行搜索。
+    # 结果只交付一次：`take`会移除条目，`discard`丢弃被替换计划的条目，无人取用的条目在`ttl`秒后过期。
+
+    def __init__(self, max_workers: int = 4, ttl: float = DEFAULT_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="search-prefetch"
+        )
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[float, Future]] = {}
+
+    def submit(self, thread_id: str, key: str, search: Callable[[], Any]) -> bool:
+        """
+        Start `search` in the background unless the same key is already pending.
+
+        Returns:
+            True if a new search was started
+        """
+        # 在后台启动`search`，除非相同的键已在等待中。返回是否启动了新的搜索
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if (thread_id, key) in self._entries:
+                return False
+            self._entries[(thread_id, key)] = (now, self._executor.submit(search))
+        logger.info(f"Prefetching search for step: {key}")
+        return True
+
+    def take(self, thread_id: str, key: str, timeout: float = 0.0) -> Optional[Any]:
+        """
+        Claim a prefetched result, waiting up to `timeout` seconds for it.
+
+        Returns:
+            The search result, or None if nothing usable was prefetched
+        """
+        # 取用预取的结果，最多等待`timeout`秒。没有可用结果时返回None
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.pop((thread_id, key), None)
+        if entry is None:
+            return None
+        future = entry[1]
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.info(f"Prefetched search for step '{key}' not ready, skipping")
+        except Exception as e:
+            logger.warning(f"Prefetched search for step '{key}' failed: {e}")
+        return None
+
+    def discard(self, thread_id: str) -> None:
+        """Drop every pending entry of a thread."""
+        # 丢弃某个线程的所有待处理条目
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                self._entries.pop(key)[1].cancel()
+
+    def _expire(self, now: float) -> None:
+        for key, (created, future) in list(self._entries.items()):
+            if now - created > self._ttl:
+                future.cancel()
+                del self._entries[key]
+
+
+search_prefetcher = SearchPrefetcher()
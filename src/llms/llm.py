@@ -9,6 +9,7 @@ from langchain_openai import ChatOpenAI
 
 from src.config import load_yaml_config
 from src.config.agents import LLMType
+from src.utils.metrics import record_cache_lookup
 
 # Cache for LLM instances
 # LLM实例的缓存
@@ -74,7 +75,9 @@ def get_llm_by_type(
     """
     # 通过类型获取LLM实例。如果可用，返回缓存的实例。
     if llm_type in _llm_cache:
+        record_cache_lookup("llm", True)
         return _llm_cache[llm_type]
+    record_cache_lookup("llm", False)
 
     conf = load_yaml_config(
         str((Path(__file__).parent.parent.parent / "conf.yaml").resolve())
@@ -0,0 +1,345 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Streaming mixer for podcast audio.
+
+TTS lines arrive as 16-bit mono PCM. The mixer normalizes the loudness of each
+line, inserts pauses between lines (longer when the speaker changes), fades the
+line edges to avoid clicks and feeds the result to an incremental encoder, so
+only one line is held in memory at a time and encoded audio is yielded as soon
+as it is ready.
+
+MP3 is encoded by an `ffmpeg` subprocess; when `ffmpeg` is not installed the
+mixer falls back to WAV, which needs no encoder.
+"""
+
+# 播客音频的流式混音器。
+# TTS的每一行以16位单声道PCM到达。混音器对每行进行响度归一化，在行之间插入停顿（换说话者时更长），
+# 淡入淡出行的边缘以避免爆音，并将结果送入增量编码器，因此内存中一次只保留一行，编码后的音频一就绪就输出。
+# MP3由`ffmpeg`子进程编码；未安装`ffmpeg`时混音器回退到无需编码器的WAV。
+
+import logging
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+SAMPLE_RATE = 24000  # volcengine TTS PCM output rate 火山引擎TTS的PCM输出采样率
+SAMPLE_WIDTH = 2  # 16-bit samples 16位采样
+CHANNELS = 1
+
+DEFAULT_PAUSE_MS = 200  # Between lines of the same speaker 同一说话者的行之间
+DEFAULT_SPEAKER_PAUSE_MS = 450  # When the speaker changes 换说话者时
+DEFAULT_TARGET_DBFS = -20.0  # Target RMS loudness of each line 每行的目标RMS响度
+PEAK_DBFS = -1.0  # Peak ceiling after gain 增益后的峰值上限
+MAX_GAIN_DB = 18.0  # Do not boost quiet lines (or noise) beyond this 不将安静的行（或噪声）提升超过该值
+FADE_MS = 8
+# Feed the encoder one second at a time 每次向编码器送入一秒
+ENCODE_BLOCK_SAMPLES = SAMPLE_RATE
+# Content-Type of each output format 每种输出格式的Content-Type
+MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav"}
+
+
+def _env_float(name: str, default: float) -> float:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return float(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not a number. Using default value {default}."
+        )
+        return default
+
+
+def _db_to_ratio(db: float) -> float:
+    return 10 ** (db / 20)
+
+
+def pcm_to_samples(pcm: bytes) -> np.ndarray:
+    """Decode 16-bit little-endian PCM into float samples in [-1, 1]."""
+    # 将16位小端PCM解码为[-1, 1]范围内的浮点采样
+    usable = len(pcm) - len(pcm) % SAMPLE_WIDTH
+    return np.frombuffer(pcm[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def samples_to_pcm(samples: np.ndarray) -> bytes:
+    """Encode float samples in [-1, 1] as 16-bit little-endian PCM."""
+    # 将[-1, 1]范围内的浮点采样编码为16位小端PCM
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768.0).astype("<i2").tobytes()
+
+
+def normalize_loudness(
+    samples: np.ndarray, target_dbfs: float = DEFAULT_TARGET_DBFS
+) -> np.ndarray:
+    """
+    Scale samples to `target_dbfs` RMS without letting peaks exceed `PEAK_DBFS`.
+
+    Silence is returned unchanged and gain is capped at `MAX_GAIN_DB`.
+    """
+    # 将采样缩放到`target_dbfs`的RMS响度，同时不让峰值超过`PEAK_DBFS`。静音原样返回，增益上限为`MAX_GAIN_DB`。
+    if samples.size == 0:
+        return samples
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.max(np.abs(samples)))
+    if rms == 0.0 or peak == 0.0:
+        return samples
+    gain = min(
+        _db_to_ratio(target_dbfs) / rms,
+        _db_to_ratio(PEAK_DBFS) / peak,
+        _db_to_ratio(MAX_GAIN_DB),
+    )
+    return samples * gain
+
+
+def _fade_edges(samples: np.ndarray) -> np.ndarray:
+    fade = min(int(SAMPLE_RATE * FADE_MS / 1000), samples.size // 2)
+    if fade:
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        samples = samples.copy()
+        samples[:fade] *= ramp
+        samples[-fade:] *= ramp[::-1]
+    return samples
+
+
+class WavStreamEncoder:
+    """
+    Write PCM as a WAV stream.
+
+    The header is sent before the length is known, so its size fields hold the
+    maximum value, which players treat as "read until the end". Use
+    `fix_wav_header` to set the real sizes once the whole file is available.
+    """
+
+    # 以WAV流的形式写出PCM。
+    # 头部在长度未知时就已发送，因此其大小字段为最大值，播放器会将其视为"读取到结尾"。
+    # 获得完整文件后，可以用`fix_wav_header`设置真实的大小。
+
+    format = "wav"
+    media_type = MEDIA_TYPES["wav"]
+
+    def __init__(self):
+        self._header_sent = False
+
+    def _header(self) -> bytes:
+        byte_rate = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH
+        return (
+            b"RIFF"
+            + struct.pack("<I", 0xFFFFFFFF)
+            + b"WAVEfmt "
+            + struct.pack(
+                "<IHHIIHH",
+                16,  # fmt chunk size fmt块大小
+                1,  # PCM
+                CHANNELS,
+                SAMPLE_RATE,
+                byte_rate,
+                CHANNELS * SAMPLE_WIDTH,  # block align 块对齐
+                SAMPLE_WIDTH * 8,  # bits per sample 每个采样的位数
+            )
+            + b"data"
+            + struct.pack("<I", 0xFFFFFFFF - 36)
+        )
+
+    def encode(self, pcm: bytes) -> bytes:
+        if not self._header_sent:
+            self._header_sent = True
+            return self._header() + pcm
+        return pcm
+
+    def flush(self) -> bytes:
+        return b"" if self._header_sent else self._header()
+
+    def close(self) -> None:
+        pass
+
+
+def fix_wav_header(data: bytes) -> bytes:
+    """Replace the streaming size fields of a complete WAV file written by `WavStreamEncoder`."""
+    # 替换`WavStreamEncoder`写出的完整WAV文件中的流式大小字段
+    if len(data) < 44:
+        return data
+    return (
+        data[:4]
+        + struct.pack("<I", len(data) - 8)
+        + data[8:40]
+        + struct.pack("<I", len(data) - 44)
+        + data[44:]
+    )
+
+
+class FFmpegMP3Encoder:
+    """Encode PCM to MP3 incrementally through an `ffmpeg` subprocess."""
+
+    # 通过`ffmpeg`子进程将PCM增量编码为MP3
+
+    format = "mp3"
+    media_type = MEDIA_TYPES["mp3"]
+
+    def __init__(self, bitrate: str = "64k", ffmpeg: str = "ffmpeg"):
+        self._process = subprocess.Popen(
+            [
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-f",
+                "s16le",
+                "-ar",
+                str(SAMPLE_RATE),
+                "-ac",
+                str(CHANNELS),
+                "-i",
+                "pipe:0",
+                "-codec:a",
+                "libmp3lame",
+                "-b:a",
+                bitrate,
+                "-f",
+                "mp3",
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # A reader thread drains stdout so writing to stdin can never deadlock
+        # 读取线程持续读取stdout，因此写入stdin永远不会死锁
+        self._output: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._reader = threading.Thread(
+            target=self._read, name="podcast-mp3-reader", daemon=True
+        )
+        self._reader.start()
+
+    def _read(self) -> None:
+        while True:
+            chunk = self._process.stdout.read1(64 * 1024)
+            if not chunk:
+                break
+            self._output.put(chunk)
+        self._output.put(None)
+
+    def _drain(self, wait: bool = False) -> bytes:
+        chunks = []
+        while True:
+            try:
+                chunk = self._output.get(block=wait)
+            except queue.Empty:
+                break
+            if chunk is None:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def encode(self, pcm: bytes) -> bytes:
+        self._process.stdin.write(pcm)
+        self._process.stdin.flush()
+        return self._drain()
+
+    def flush(self) -> bytes:
+        self._process.stdin.close()
+        remaining = self._drain(wait=True)
+        if self._process.wait() != 0:
+            error = self._process.stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed to encode podcast audio: {error}")
+        return remaining
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+def create_encoder(audio_format: Optional[str] = None):
+    """
+    Return an encoder for `audio_format` (`PODCAST_AUDIO_FORMAT`, default mp3).
+
+    MP3 needs `ffmpeg` on the PATH; without it WAV is used instead.
+    """
+    # 返回`audio_format`（`PODCAST_AUDIO_FORMAT`，默认mp3）的编码器。MP3需要PATH中有`ffmpeg`，否则改用WAV。
+    audio_format = (audio_format or os.getenv("PODCAST_AUDIO_FORMAT", "mp3")).lower()
+    if audio_format == "mp3":
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg:
+            return FFmpegMP3Encoder(ffmpeg=ffmpeg)
+        logger.warning(
+            "ffmpeg is not installed, so podcast audio is encoded as WAV, which is "
+            "about 6x larger than MP3. Install ffmpeg or set PODCAST_AUDIO_FORMAT=wav."
+        )
+    elif audio_format != "wav":
+        logger.warning(
+            f"PODCAST_AUDIO_FORMAT value '{audio_format}' is not supported. Using WAV."
+        )
+    return WavStreamEncoder()
+
+
+def mix_lines(
+    lines: Iterable[tuple[str, bytes]],
+    encoder,
+    pause_ms: Optional[float] = None,
+    speaker_pause_ms: Optional[float] = None,
+    target_dbfs: Optional[float] = None,
+) -> Iterator[bytes]:
+    """
+    Mix TTS lines into one encoded audio stream.
+
+    Args:
+        lines: `(speaker, pcm)` pairs in playback order; may be a lazy iterator
+        encoder: A `WavStreamEncoder` or `FFmpegMP3Encoder`, see `create_encoder`
+        pause_ms: Silence between lines of the same speaker (`PODCAST_PAUSE_MS`)
+        speaker_pause_ms: Silence when the speaker changes (`PODCAST_SPEAKER_PAUSE_MS`)
+        target_dbfs: Loudness each line is normalized to (`PODCAST_TARGET_DBFS`)
+
+    Yields:
+        Encoded audio chunks as soon as the encoder produces them
+    """
+    # 将TTS各行混合为一个编码后的音频流，编码器一产出数据就立即输出
+    pause_ms = (
+        pause_ms
+        if pause_ms is not None
+        else _env_float("PODCAST_PAUSE_MS", DEFAULT_PAUSE_MS)
+    )
+    speaker_pause_ms = (
+        speaker_pause_ms
+        if speaker_pause_ms is not None
+        else _env_float("PODCAST_SPEAKER_PAUSE_MS", DEFAULT_SPEAKER_PAUSE_MS)
+    )
+    target_dbfs = (
+        target_dbfs
+        if target_dbfs is not None
+        else _env_float("PODCAST_TARGET_DBFS", DEFAULT_TARGET_DBFS)
+    )
+    previous_speaker = None
+    try:
+        for speaker, pcm in lines:
+            samples = pcm_to_samples(pcm)
+            if samples.size == 0:
+                continue
+            if previous_speaker is not None:
+                pause = speaker_pause_ms if speaker != previous_speaker else pause_ms
+                silence = bytes(
+                    int(SAMPLE_RATE * pause / 1000) * SAMPLE_WIDTH * CHANNELS
+                )
+                chunk = encoder.encode(silence)
+                if chunk:
+                    yield chunk
+            previous_speaker = speaker
+            samples = _fade_edges(normalize_loudness(samples, target_dbfs))
+            for start in range(0, samples.size, ENCODE_BLOCK_SAMPLES):
+                chunk = encoder.encode(
+                    samples_to_pcm(samples[start : start + ENCODE_BLOCK_SAMPLES])
+                )
+                if chunk:
+                    yield chunk
+        chunk = encoder.flush()
+        if chunk:
+            yield chunk
+    finally:
+        encoder.close()
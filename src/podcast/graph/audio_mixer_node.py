@@ -3,6 +3,7 @@
 
 import logging
 
+from src.podcast.audio import create_encoder, fix_wav_header, mix_lines
 from src.podcast.graph.state import PodcastState
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
@@ -12,16 +13,32 @@ def audio_mixer_node(state: PodcastState):
     """
     音频混合节点函数
     
-    将多个音频块合并为一个完整的音频文件
+    完成播客音频文件。文本转语音节点已经逐行混音和编码时，只需为WAV写入真实的大小；
+    状态中带有PCM音频块时（例如调用方直接提供已合成的行），在PCM层面逐行混合它们：
+    对每行进行响度归一化，在行之间插入停顿（换说话者时更长），并增量编码
+    （安装了ffmpeg时为MP3，否则为WAV）
     
     参数:
         state: 播客状态对象
         
     返回:
-        包含最终混合音频的字典
+        包含最终混合音频及其格式的字典
     """
     logger.info("Mixing audio chunks for podcast...")  # 记录正在混合播客音频块的信息
-    audio_chunks = state["audio_chunks"]  # 获取音频块列表
-    combined_audio = b"".join(audio_chunks)  # 将所有音频块连接成一个字节序列
+    audio_chunks = state.get("audio_chunks") or []  # 获取音频块列表
+    if audio_chunks:
+        speakers = state.get("audio_speakers") or []
+        if len(speakers) != len(audio_chunks):
+            speakers = [""] * len(audio_chunks)  # 说话者未知时统一使用同一说话者的停顿
+        encoder = create_encoder()  # 创建增量编码器
+        output = bytearray()
+        for chunk in mix_lines(zip(speakers, audio_chunks), encoder):
+            output += chunk  # 逐块累积编码后的音频
+        combined_audio, audio_format = bytes(output), encoder.format
+    else:
+        combined_audio = state.get("output") or b""
+        audio_format = state.get("output_format", "mp3")
+    if audio_format == "wav":
+        combined_audio = fix_wav_header(combined_audio)  # 写入WAV文件的真实大小
     logger.info("The podcast audio is now ready.")  # 记录播客音频已准备就绪的信息
-    return {"output": combined_audio}  # 返回包含合并音频的字典
+    return {"output": combined_audio, "output_format": audio_format}  # 返回包含混合音频的字典
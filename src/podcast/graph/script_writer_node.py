@@ -1,41 +1,96 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import json
 import logging
+from typing import Iterator, Optional
 
 from langchain.schema import HumanMessage, SystemMessage
+from pydantic import ValidationError
 
 from src.config.agents import AGENT_LLM_MAP
 from src.llms.llm import get_llm_by_type
 from src.prompts.template import get_prompt_template
+from src.utils.json_stream import JSONStreamParser
+from src.utils.json_utils import parse_json_output
 
-from ..types import Script
-from .state import PodcastState
+from ..types import Script, ScriptLine
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
 
-def script_writer_node(state: PodcastState):
+class ScriptStream:
     """
-    脚本编写节点函数
-    
-    使用LLM生成播客脚本
-    
-    参数:
-        state: 播客状态对象
-        
-    返回:
-        包含生成脚本和空音频块列表的字典
+    Iterate over podcast script lines while the LLM is still writing them.
+
+    The JSON response is streamed and parsed incrementally, so each line is
+    yielded as soon as its object is closed and TTS can start on it before the
+    rest of the script exists. When the response is not valid JSON, it is
+    repaired once complete and the lines after the last streamed one are
+    yielded. After iteration `script` holds the lines that were yielded.
     """
-    logger.info("Generating script for podcast...")  # 记录正在生成播客脚本的信息
-    model = get_llm_by_type(
-        AGENT_LLM_MAP["podcast_script_writer"]  # 获取播客脚本编写器的LLM类型
-    ).with_structured_output(Script, method="json_mode")  # 配置LLM以生成结构化的Script输出
-    script = model.invoke(
-        [
+    # 在LLM仍在编写时逐行迭代播客脚本。
+    # JSON响应以流式输出并增量解析，每一行的对象闭合后立即输出，因此TTS可以在脚本其余部分生成之前开始合成。
+    # 响应不是有效JSON时，在完整后修复并输出最后一个流式行之后的行。迭代结束后`script`保存已输出的行。
+
+    def __init__(self, content: str):
+        self.content = content
+        self.script: Optional[Script] = None  # Set once iteration finishes 迭代结束后设置
+
+    def _messages(self):
+        return [
             SystemMessage(content=get_prompt_template("podcast/podcast_script_writer")),  # 系统消息，包含播客脚本编写器的提示模板
-            HumanMessage(content=state["input"]),  # 人类消息，包含输入内容
-        ],
-    )  # 调用LLM生成脚本
-    print(script)  # 打印生成的脚本
-    return {"script": script, "audio_chunks": []}  # 返回包含脚本和空音频块列表的字典
+            HumanMessage(content=self.content),  # 人类消息，包含输入内容
+        ]
+
+    @staticmethod
+    def _to_line(index: int, value) -> Optional[ScriptLine]:
+        try:
+            return ScriptLine.model_validate(value)
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid podcast script line {index}: {e}")
+            return None
+
+    def __iter__(self) -> Iterator[ScriptLine]:
+        # JSON mode, streamed so lines can be parsed while the script is written
+        # JSON模式，并以流式输出，以便在编写脚本的同时解析各行
+        model = get_llm_by_type(
+            AGENT_LLM_MAP["podcast_script_writer"]  # 获取播客脚本编写器的LLM类型
+        ).bind(response_format={"type": "json_object"})
+        parser = JSONStreamParser(array_fields=("lines",))
+        lines: list[ScriptLine] = []
+        last_index = -1
+        for chunk in model.stream(self._messages()):  # 流式调用LLM
+            for event in parser.feed(chunk.content):  # 增量解析响应内容
+                if event.kind != "item" or event.key != "lines":
+                    continue
+                last_index = event.index
+                line = self._to_line(event.index, event.value)
+                if line is not None:
+                    lines.append(line)
+                    yield line
+
+        # Well-formed responses were already decoded while streaming
+        # 格式正确的响应在流式输出时已经解码
+        data = parser.result if parser.complete else None
+        if data is None:
+            try:
+                data = parse_json_output(parser.text)  # 解析JSON输出，必要时修复
+            except json.JSONDecodeError:
+                data = None
+            if not isinstance(data, dict):
+                if not lines:
+                    raise ValueError("Podcast script response is not a valid JSON object")
+                logger.warning("Podcast script response is not a valid JSON object")
+                data = {}
+            remaining = data.get("lines")
+            for index, value in enumerate(remaining if isinstance(remaining, list) else []):
+                if index > last_index:
+                    line = self._to_line(index, value)
+                    if line is not None:
+                        lines.append(line)
+                        yield line
+        locale = data.get("locale")
+        self.script = Script(lines=lines, **({"locale": locale} if locale in ("en", "zh") else {}))
+        logger.info(f"Podcast script written with {len(lines)} lines")
+
@@ -22,8 +22,10 @@ class PodcastState(MessagesState):
     # Output
     # 输出
     output: Optional[bytes] = None  # 最终输出的音频字节数据
+    output_format: str = "mp3"  # 输出音频的格式（mp3或wav）
 
     # Assets
     # 资源
     script: Optional[Script] = None  # 生成的脚本
-    audio_chunks: list[bytes] = []  # 音频块列表
+    audio_chunks: list[bytes] = []  # 已合成待混音的音频块列表（16位单声道PCM），文本转语音节点直接编码而不使用它
+    audio_speakers: list[str] = []  # 每个音频块的说话者
@@ -4,40 +4,264 @@
 import base64
 import logging
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Iterator, Optional, Sized
 
+from langgraph.config import get_stream_writer
+
+from src.podcast.audio import create_encoder, mix_lines
+from src.podcast.graph.script_writer_node import ScriptStream
 from src.podcast.graph.state import PodcastState
-from src.tools.tts import VolcengineTTS
+from src.podcast.types import ScriptLine
+from src.tools.tts import VolcengineTTS, get_tts_cache
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
+DEFAULT_TTS_CONCURRENCY = 4  # 默认并发合成的行数
+DEFAULT_TTS_RETRIES = 2  # 默认每行的重试次数
+RETRY_BACKOFF_SECONDS = 0.5  # 重试的初始退避时间
+
+
+def _env_int(name: str, default: int) -> int:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return max(0, int(env_value_str))
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not an integer. "
+            f"Using default value {default}."
+        )
+        return default
+
+
+def _get_stream_writer():
+    """Return the graph's custom stream writer, or a no-op outside a graph run."""
+    # 返回图的自定义流写入器，在图运行之外返回空操作
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _: None
+
+
+def _voice_type(line: ScriptLine) -> str:
+    # 男性使用BV002，女性使用BV001
+    return "BV002_streaming" if line.speaker == "male" else "BV001_streaming"
+
+
+def _synthesize_line(
+    tts_client: VolcengineTTS, line: ScriptLine, retries: int
+) -> tuple[Optional[bytes], int, Optional[str]]:
+    """
+    Synthesize one script line, retrying failed requests with exponential backoff.
+
+    Returns:
+        The decoded audio (None on failure), the number of attempts and the last error
+    """
+    # 合成一行脚本，失败的请求按指数退避重试
+    error = None
+    for attempt in range(retries + 1):
+        try:
+            result = tts_client.text_to_speech(
+                line.paragraph,
+                encoding="pcm",  # Raw PCM for the mixer 为混音器提供原始PCM
+                speed_ratio=1.05,
+                voice_type=_voice_type(line),
+            )  # 调用TTS API将文本转换为语音，语速稍快
+            if result["success"]:
+                return base64.b64decode(result["audio_data"]), attempt + 1, None
+            error = str(result["error"])
+        except Exception as e:
+            # A raising client or undecodable audio fails the attempt like an error response
+            # 抛出异常的客户端或无法解码的音频与错误响应一样视为本次尝试失败
+            error = f"{type(e).__name__}: {e}"
+        if attempt < retries:
+            time.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+    return None, retries + 1, error
+
+
+def iter_synthesized_lines(
+    lines: Iterable[ScriptLine],
+    tts_client: Optional[VolcengineTTS] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> Iterator[tuple[int, ScriptLine, Optional[bytes]]]:
+    """
+    Synthesize lines concurrently and yield them in script order.
+
+    `lines` may be a lazy iterator such as a `ScriptStream`: a feeder thread
+    submits each line to the TTS pool as soon as it is produced, so synthesis
+    overlaps with writing the rest of the script. Line `i` is yielded as soon as
+    it and every line before it are done, so a consumer can start playing or
+    mixing while later lines are synthesized. Concurrency comes from
+    `PODCAST_TTS_CONCURRENCY` and retries per line from `PODCAST_TTS_RETRIES`.
+    An error raised by `lines` is re-raised here. Closing the generator cancels
+    lines not yet started and stops reading `lines`.
+
+    Args:
+        lines: Script lines in playback order
+        tts_client: Client to use; created from the environment when None
+        on_progress: Called with a `podcast_line` event whenever a line finishes;
+            `total` is None while the number of lines is not known yet
+
+    Yields:
+        `(index, line, audio)` where `audio` is 16-bit mono PCM, or None if the
+        line failed after all retries
+    """
+    # 并发合成各行，并按脚本顺序输出。
+    # `lines`可以是`ScriptStream`这样的惰性迭代器：供给线程在每一行产生后立即将其提交到TTS线程池，
+    # 因此合成与编写脚本的其余部分重叠进行。
+    # 第`i`行及其之前的所有行都完成后立即输出第`i`行，因此使用方可以在后续行合成的同时开始播放或混音。
+    # `lines`抛出的错误会在此重新抛出。关闭生成器会取消尚未开始的行并停止读取`lines`。
+    tts_client = tts_client or _create_tts_client()  # 创建TTS客户端
+    total = len(lines) if isinstance(lines, Sized) else None
+    concurrency = max(1, _env_int("PODCAST_TTS_CONCURRENCY", DEFAULT_TTS_CONCURRENCY))
+    retries = _env_int("PODCAST_TTS_RETRIES", DEFAULT_TTS_RETRIES)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="podcast-tts")
+    events: "queue.Queue[tuple]" = queue.Queue()
+    scheduled: dict[int, ScriptLine] = {}
+    stop = threading.Event()
+
+    def on_done(index: int, future: Future) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # Report the line as failed instead of losing the error in the callback
+            # 将该行报告为失败，而不是在回调中丢失错误
+            events.put(("line", index, (None, 1, f"{type(error).__name__}: {error}")))
+        else:
+            events.put(("line", index, future.result()))
+
+    def feed() -> None:
+        iterator = iter(lines)
+        count = 0
+        try:
+            for line in iterator:
+                if stop.is_set():
+                    return
+                scheduled[count] = line
+                future = executor.submit(_synthesize_line, tts_client, line, retries)
+                future.add_done_callback(partial(on_done, count))
+                count += 1
+            events.put(("end", count))
+        except BaseException as e:
+            events.put(("error", e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    feeder = threading.Thread(target=feed, name="podcast-tts-feeder", daemon=True)
+    feeder.start()
+    try:
+        results: dict[int, Optional[bytes]] = {}
+        completed = 0
+        next_index = 0
+        while total is None or next_index < total:
+            kind, *payload = events.get()
+            if kind == "error":
+                raise payload[0]
+            if kind == "end":
+                total = payload[0]
+                continue
+            index, (audio, attempts, error) = payload
+            results[index] = audio
+            completed += 1
+            if error is not None:
+                logger.error(f"TTS failed for line {index} after {attempts} attempts: {error}")  # 记录错误信息
+            if on_progress is not None:
+                on_progress(
+                    {
+                        "event": "podcast_line",
+                        "index": index,
+                        "total": total,
+                        "completed": completed,
+                        "success": audio is not None,
+                        "attempts": attempts,
+                    }
+                )
+            # Results are released in script order as soon as the prefix is complete
+            # 一旦前缀完整，就按脚本顺序释放结果
+            while next_index in results:
+                yield next_index, scheduled.pop(next_index), results.pop(next_index)
+                next_index += 1
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_mixed_audio(
+    lines: Iterable[ScriptLine],
+    encoder,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> Iterator[bytes]:
+    """
+    Synthesize and mix `lines`, yielding encoded audio as soon as it is ready.
+
+    Each line's PCM is handed to the mixer as soon as it and the lines before it
+    are synthesized and is dropped once encoded, so only the lines in flight are
+    held in memory. The concatenated chunks form one valid file in the encoder's
+    format. Closing the iterator cancels the lines that have not started yet.
+
+    Args:
+        lines: Script lines in playback order; may be a lazy iterator
+        encoder: Encoder from `src.podcast.audio.create_encoder`
+        on_progress: See `iter_synthesized_lines`
+
+    Yields:
+        Encoded audio chunks
+    """
+    # 合成并混合`lines`，编码后的音频一就绪就输出。
+    # 每行的PCM在其本身及之前的行合成完成后立即交给混音器，编码后即被丢弃，因此内存中只保留正在处理的行。
+    # 所有块拼接起来是一个符合编码器格式的有效文件。关闭迭代器会取消尚未开始的行。
+    synthesized = iter_synthesized_lines(lines, on_progress=on_progress)
+
+    def speaker_audio():
+        for _, line, audio in synthesized:
+            if audio is not None:
+                yield line.speaker, audio
+
+    try:
+        yield from mix_lines(speaker_audio(), encoder)
+    finally:
+        synthesized.close()
+
 
 def tts_node(state: PodcastState):
     """
     文本转语音节点函数
     
-    将脚本中的每一行文本转换为语音
+    并发地将脚本中的每一行文本转换为语音，并按脚本顺序逐行混音和编码，
+    因此整个播客不会以PCM形式保存在内存或状态中。
+    状态中没有脚本时，使用`ScriptStream`根据输入编写脚本，并在每一行写完后立即开始合成，
+    使脚本编写与语音合成重叠进行，而不是两个串行阶段。
+    并发数由`PODCAST_TTS_CONCURRENCY`控制，每行的重试次数由`PODCAST_TTS_RETRIES`控制。
+    每完成一行，都会写出一个`podcast_line`自定义流事件报告进度。
     
     参数:
         state: 播客状态对象
         
     返回:
-        包含音频块列表的字典
+        包含脚本、编码后的音频及其格式的字典
     """
-    logger.info("Generating audio chunks for podcast...")  # 记录正在生成播客音频块的信息
-    tts_client = _create_tts_client()  # 创建TTS客户端
-    for line in state["script"].lines:
-        tts_client.voice_type = (
-            "BV002_streaming" if line.speaker == "male" else "BV001_streaming"
-        )  # 根据说话者性别设置语音类型，男性使用BV002，女性使用BV001
-        result = tts_client.text_to_speech(line.paragraph, speed_ratio=1.05)  # 调用TTS API将文本转换为语音，语速稍快
-        if result["success"]:
-            audio_data = result["audio_data"]  # 获取音频数据
-            audio_chunk = base64.b64decode(audio_data)  # 解码base64音频数据
-            state["audio_chunks"].append(audio_chunk)  # 将音频块添加到状态中
-        else:
-            logger.error(result["error"])  # 记录错误信息
+    logger.info("Generating audio for podcast...")  # 记录正在生成播客音频的信息
+    script = state.get("script")
+    if script is not None:
+        lines = script.lines
+    else:
+        logger.info("Generating script for podcast...")  # 记录正在生成播客脚本的信息
+        lines = stream = ScriptStream(state["input"])  # 边编写边合成
+    encoder = create_encoder()  # 创建增量编码器
+    output = bytearray()
+    for chunk in iter_mixed_audio(lines, encoder, on_progress=_get_stream_writer()):
+        output += chunk  # 只累积编码后的音频
     return {
-        "audio_chunks": state["audio_chunks"],  # 返回音频块列表
+        "script": script if script is not None else stream.script,  # 返回脚本
+        "output": bytes(output),  # 编码后的音频
+        "output_format": encoder.format,  # 音频格式
     }
 
 
@@ -63,4 +287,5 @@ def _create_tts_client():
         access_token=access_token,
         cluster=cluster,
         voice_type=voice_type,
+        cache=get_tts_cache(),  # 与/api/tts共享音频缓存
     )  # 返回火山引擎TTS客户端实例
@@ -0,0 +1,69 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Stream podcast audio while later lines are still being written and synthesized.
+"""
+
+# 在后续行仍在编写和合成时流式输出播客音频
+
+import asyncio
+import logging
+from typing import Iterable, Iterator
+
+from src.podcast.graph.script_writer_node import ScriptStream
+from src.podcast.graph.tts_node import iter_mixed_audio
+from src.podcast.types import ScriptLine
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+
+def stream_podcast_audio(lines: Iterable[ScriptLine], encoder) -> Iterator[bytes]:
+    """
+    Synthesize and mix `lines`, yielding encoded audio as soon as it is ready.
+
+    Lines are synthesized concurrently and mixed in script order, so the first
+    audio is yielded once the first line is done. `lines` may be a lazy
+    iterator such as a `ScriptStream`, in which case synthesis starts while the
+    script is still being written. The concatenated chunks form one valid file
+    in the encoder's format. Closing the iterator cancels the lines that have
+    not started yet.
+
+    Args:
+        lines: The podcast script lines in playback order
+        encoder: Encoder from `src.podcast.audio.create_encoder`
+
+    Yields:
+        Encoded audio chunks
+    """
+    # 合成并混合`lines`，编码后的音频一就绪就输出。
+    # 各行并发合成并按脚本顺序混音，因此第一行完成后就会输出第一段音频。
+    # `lines`可以是`ScriptStream`这样的惰性迭代器，此时在脚本仍在编写时就开始合成。
+    # 所有块拼接起来是一个符合编码器格式的有效文件。关闭迭代器会取消尚未开始的行。
+    return iter_mixed_audio(lines, encoder)
+
+
+async def open_podcast_stream(content: str, encoder) -> Iterator[bytes]:
+    """
+    Start writing the script for `content` and return its audio stream.
+
+    Returns once the first script line is written, so a failing LLM call is
+    raised here, before any response is sent, instead of ending a stream early.
+    The encoder is closed when that happens.
+    """
+    # 开始为`content`编写脚本并返回其音频流。
+    # 在第一行脚本写完后返回，因此LLM调用失败会在发送任何响应之前在此抛出，而不是提前结束音频流。
+    lines = iter(ScriptStream(content))
+    try:
+        first_line = await asyncio.to_thread(next, lines, None)
+        if first_line is None:
+            raise ValueError("The podcast script has no lines")
+    except BaseException:
+        encoder.close()
+        raise
+
+    def script_lines():
+        yield first_line
+        yield from lines
+
+    return stream_podcast_audio(script_lines(), encoder)
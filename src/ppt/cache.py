@@ -0,0 +1,124 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Two-level artifact cache of the PPT workflow.
+
+The first level maps a report to the slide markdown the composer wrote for it,
+the second maps slide markdown to the rendered deck. Regenerating the PPT of
+the same report skips both the LLM call and the marp render, and a report
+whose composed markdown was seen before still skips the render.
+"""
+
+# PPT工作流的两级产物缓存。
+# 第一级将报告映射到编排节点为其编写的幻灯片Markdown，第二级将幻灯片Markdown映射到渲染后的演示文稿。
+# 为同一报告重新生成PPT会同时跳过LLM调用和marp渲染；编排出的Markdown曾出现过的报告仍可跳过渲染。
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from src.config.agents import AGENT_LLM_MAP
+from src.prompts.template import get_prompt_template
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_PPT_CACHE_DIR = os.path.join(".cache", "ppt")
+DEFAULT_PPT_CACHE_MAX_MB = 256
+
+
+class PPTArtifactCache:
+    """Composed markdown keyed by report and rendered decks keyed by markdown, in one LRU directory."""
+
+    # 在同一个LRU目录中保存按报告索引的编排Markdown和按Markdown索引的渲染演示文稿
+
+    def __init__(self, store: DiskLRUCache):
+        self.store = store
+
+    @staticmethod
+    def _markdown_key(report: str) -> str:
+        # The composer's model and prompt are part of the key, so changing them invalidates entries
+        # 编排节点的模型和提示是键的一部分，修改它们会使条目失效
+        return json.dumps(
+            {
+                "level": "markdown",
+                "llm": AGENT_LLM_MAP["ppt_composer"],
+                "prompt": get_prompt_template("ppt/ppt_composer"),
+                "report": report,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+
+    @staticmethod
+    def _file_key(markdown: str, output_format: str) -> str:
+        return json.dumps(
+            {"level": "file", "format": output_format, "markdown": markdown},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+
+    def get_markdown(self, report: str) -> Optional[str]:
+        value = self.store.get(self._markdown_key(report))
+        record_cache_lookup("ppt_markdown", value is not None)
+        return None if value is None else value.decode("utf-8")
+
+    def put_markdown(self, report: str, markdown: str) -> None:
+        self.store.put(self._markdown_key(report), markdown.encode("utf-8"))
+
+    def get_file(self, markdown: str, output_format: str = "pptx") -> Optional[bytes]:
+        value = self.store.get(self._file_key(markdown, output_format))
+        record_cache_lookup("ppt_file", value is not None)
+        return value
+
+    def put_file(self, markdown: str, data: bytes, output_format: str = "pptx") -> None:
+        self.store.put(self._file_key(markdown, output_format), data)
+
+    def lookup(self, report: str, output_format: str = "pptx") -> Optional[bytes]:
+        """Return the deck rendered for `report` if both levels hit."""
+        # 两级缓存都命中时返回为`report`渲染的演示文稿
+        markdown = self.get_markdown(report)
+        return None if markdown is None else self.get_file(markdown, output_format)
+
+
+_ppt_cache: Optional[PPTArtifactCache] = None
+_ppt_cache_lock = threading.Lock()
+
+
+def get_ppt_cache() -> Optional[PPTArtifactCache]:
+    """
+    Return the shared PPT artifact cache, or None when it is disabled.
+
+    The cache lives in `PPT_CACHE_DIR` (default `.cache/ppt`) and holds up to
+    `PPT_CACHE_MAX_MB` MiB (default 256, 0 disables it).
+    """
+    # 返回共享的PPT产物缓存，禁用时返回None。
+    # 缓存位于`PPT_CACHE_DIR`（默认`.cache/ppt`），最多保存`PPT_CACHE_MAX_MB` MiB（默认256，0表示禁用）。
+    global _ppt_cache
+    env_value_str = os.getenv("PPT_CACHE_MAX_MB", str(DEFAULT_PPT_CACHE_MAX_MB))
+    try:
+        max_mb = int(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"PPT_CACHE_MAX_MB value '{env_value_str}' is not an integer. "
+            f"Using default value {DEFAULT_PPT_CACHE_MAX_MB}."
+        )
+        max_mb = DEFAULT_PPT_CACHE_MAX_MB
+    if max_mb <= 0:
+        return None
+    directory = os.getenv("PPT_CACHE_DIR", DEFAULT_PPT_CACHE_DIR)
+    with _ppt_cache_lock:
+        if _ppt_cache is None or _ppt_cache.store.directory != directory:
+            try:
+                _ppt_cache = PPTArtifactCache(
+                    DiskLRUCache(directory, max_mb * 1024 * 1024)
+                )
+            except OSError as e:
+                logger.warning(f"PPT cache directory '{directory}' is not usable: {e}")
+                return None
+        _ppt_cache.store.max_bytes = max_mb * 1024 * 1024
+        return _ppt_cache
@@ -35,3 +35,5 @@ if __name__ == "__main__":
 
     report_content = open("examples/nanjing_tangbao.md").read()  # 读取报告内容
     final_state = workflow.invoke({"input": report_content})  # 调用工作流
+    with open("final.pptx", "wb") as f:
+        f.write(final_state["generated_file"])  # 将生成的PPT写入文件
@@ -2,13 +2,12 @@
 # SPDX-License-Identifier: MIT
 
 import logging
-import os
-import uuid
 
 from langchain.schema import HumanMessage, SystemMessage
 
 from src.config.agents import AGENT_LLM_MAP
 from src.llms.llm import get_llm_by_type
+from src.ppt.cache import get_ppt_cache
 from src.prompts.template import get_prompt_template
 
 from .state import PPTState
@@ -20,14 +19,20 @@ def ppt_composer_node(state: PPTState):
     """
     PPT内容组合节点函数
     
-    使用LLM生成PPT内容
+    使用LLM生成PPT内容，同一报告的结果从PPT产物缓存中复用
     
     参数:
         state: PPT状态对象
         
     返回:
-        包含PPT内容和临时文件路径的字典
+        包含PPT内容（marp Markdown）的字典
     """
+    ppt_cache = get_ppt_cache()
+    if ppt_cache is not None:
+        cached = ppt_cache.get_markdown(state["input"])  # 同一报告直接复用已编排的Markdown
+        if cached is not None:
+            logger.info("Using cached ppt content")
+            return {"ppt_content": cached}
     logger.info("Generating ppt content...")  # 记录正在生成PPT内容的信息
     model = get_llm_by_type(AGENT_LLM_MAP["ppt_composer"])  # 获取PPT内容组合器的LLM模型
     ppt_content = model.invoke(
@@ -37,9 +42,8 @@ def ppt_composer_node(state: PPTState):
         ],
     )  # 调用LLM生成PPT内容
     logger.info(f"ppt_content: {ppt_content}")  # 记录生成的PPT内容
-    # save the ppt content in a temp file
-    # 将PPT内容保存到临时文件
-    temp_ppt_file_path = os.path.join(os.getcwd(), f"ppt_content_{uuid.uuid4()}.md")  # 创建临时文件路径
-    with open(temp_ppt_file_path, "w") as f:
-        f.write(ppt_content.content)  # 将PPT内容写入临时文件
-    return {"ppt_content": ppt_content, "ppt_file_path": temp_ppt_file_path}  # 返回包含PPT内容和临时文件路径的字典
+    if ppt_cache is not None:
+        ppt_cache.put_markdown(state["input"], ppt_content.content)
+    # The markdown stays in memory; the renderer manages its own temp files
+    # Markdown保留在内存中；渲染器自行管理其临时文件
+    return {"ppt_content": ppt_content.content}  # 返回包含PPT内容的字典
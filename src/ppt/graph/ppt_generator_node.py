@@ -2,11 +2,10 @@
 # SPDX-License-Identifier: MIT
 
 import logging
-import os
-import subprocess
-import uuid
 
+from src.ppt.cache import get_ppt_cache
 from src.ppt.graph.state import PPTState
+from src.ppt.renderer import get_marp_renderer
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
@@ -15,24 +14,27 @@ def ppt_generator_node(state: PPTState):
     """
     PPT生成节点函数
     
-    使用marp-cli工具将Markdown内容转换为PPT文件
+    使用marp渲染进程池将Markdown内容转换为PPT文件，输入和输出都在内存中传递；
+    相同Markdown的渲染结果从PPT产物缓存中复用
     
     参数:
         state: PPT状态对象
         
     返回:
-        包含生成的PPT文件路径的字典
+        包含生成的PPT文件内容的字典
     """
+    ppt_cache = get_ppt_cache()
+    if ppt_cache is not None:
+        cached = ppt_cache.get_file(state["ppt_content"])  # 相同的Markdown无需重新渲染
+        if cached is not None:
+            logger.info("Using cached ppt file")
+            return {"generated_file": cached}
     logger.info("Generating ppt file...")  # 记录正在生成PPT文件的信息
     # use marp cli to generate ppt file
     # 使用marp-cli工具生成PPT文件
     # https://github.com/marp-team/marp-cli?tab=readme-ov-file
-    generated_file_path = os.path.join(
-        os.getcwd(), f"generated_ppt_{uuid.uuid4()}.pptx"  # 创建生成的PPT文件路径
-    )
-    subprocess.run(["marp", state["ppt_file_path"], "-o", generated_file_path])  # 调用marp命令行工具生成PPT
-    # remove the temp file
-    # 删除临时文件
-    os.remove(state["ppt_file_path"])  # 删除临时Markdown文件
-    logger.info(f"generated_file_path: {generated_file_path}")  # 记录生成的PPT文件路径
-    return {"generated_file_path": generated_file_path}  # 返回包含生成的PPT文件路径的字典
+    generated_file = get_marp_renderer().render(state["ppt_content"], "pptx")  # 调用marp渲染进程池生成PPT
+    logger.info(f"generated ppt file: {len(generated_file)} bytes")  # 记录生成的PPT文件大小
+    if ppt_cache is not None:
+        ppt_cache.put_file(state["ppt_content"], generated_file)
+    return {"generated_file": generated_file}  # 返回包含生成的PPT文件内容的字典
@@ -19,9 +19,8 @@ class PPTState(MessagesState):
 
     # Output
     # 输出
-    generated_file_path: str = ""  # 生成的PPT文件路径
+    generated_file: Optional[bytes] = None  # 生成的PPT文件内容
 
     # Assets
     # 资源
-    ppt_content: str = ""  # PPT内容
-    ppt_file_path: str = ""  # PPT文件路径
+    ppt_content: str = ""  # PPT内容（marp Markdown）
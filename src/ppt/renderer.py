@@ -0,0 +1,448 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Pooled marp renderer used by the PPT workflow.
+
+By default (`PPT_RENDER_MODE=cli`) every render runs `marp` once in a
+temporary directory, which needs no open port. That starts Node, loads
+marp-cli and launches a headless browser every time, so
+`PPT_RENDER_MODE=server` keeps long-lived `marp --server` processes instead:
+each serves its own directory inside a temp dir owned by
+the pool, a deck is written there, converted by requesting it with the output
+format as query (`/deck.md?pptx`) and read back from the HTTP response, so the
+result never touches the working directory. Renders wait for a free slot,
+each one is bounded by a timeout that kills its server, and servers are
+recycled after a number of renders.
+
+marp-cli's server cannot be bound to an address, and it serves every
+in-flight deck. A new server is therefore probed on the host's other
+addresses, and the pool falls back to `cli` when it is reachable there.
+"""
+
+# PPT工作流使用的marp渲染进程池。
+# 默认（`PPT_RENDER_MODE=cli`）每次渲染在临时目录中运行一次`marp`，无需开放端口，
+# 但每次都要启动Node、加载marp-cli并启动无头浏览器；
+# `PPT_RENDER_MODE=server`改为保留长期运行的`marp --server`进程：每个进程在连接池拥有的临时目录中服务自己的目录，
+# 演示文稿写入其中，以输出格式作为查询参数请求（`/deck.md?pptx`）完成转换，并从HTTP响应读回，
+# 因此结果不会落到工作目录。渲染请求排队等待空闲槽位，每次渲染受超时限制（超时会终止其服务进程），
+# 服务进程渲染一定次数后会被回收。
+# marp-cli的服务无法绑定到指定地址，且会提供所有正在渲染的演示文稿，
+# 因此新的服务进程会在本机的其他地址上探测，能被访问时连接池回退到`cli`模式。
+
+import atexit
+import ipaddress
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextlib import suppress
+from typing import Optional
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+PPT_RENDER_EVENTS = REGISTRY.counter(
+    "deerflow_ppt_render_events_total",
+    "Marp renderer events (start, render, recycle, timeout, crash).",
+    ["event"],
+)
+PPT_RENDER_SECONDS = REGISTRY.histogram(
+    "deerflow_ppt_render_seconds",
+    "Time to render one deck with marp.",
+    ["mode"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+OUTPUT_FORMATS = ("pptx", "pdf", "html")
+
+MARP_HOST = "127.0.0.1"
+
+
+class MarpRenderError(RuntimeError):
+    """Raised when marp fails, times out or cannot be started."""
+
+    # marp失败、超时或无法启动时抛出
+
+
+def _env_float(name: str, default: float) -> float:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return float(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not a number. Using default value {default}."
+        )
+        return default
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((MARP_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _local_addresses() -> list[str]:
+    """Return the host's IPv4 addresses other than loopback."""
+    # 返回本机除回环地址以外的IPv4地址
+    addresses = set()
+    with suppress(OSError):
+        for *_, sockaddr in socket.getaddrinfo(
+            socket.gethostname(), None, socket.AF_INET
+        ):
+            addresses.add(sockaddr[0])
+    # Connecting a UDP socket sends nothing, it only picks the outgoing address
+    # 连接UDP套接字不会发送数据，只会选出出站地址
+    with suppress(OSError):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(("192.0.2.1", 9))
+            addresses.add(sock.getsockname()[0])
+    return sorted(
+        address
+        for address in addresses
+        if not ipaddress.ip_address(address).is_loopback
+    )
+
+
+def _log_tail(path: str, limit: int = 2000) -> str:
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - limit))
+            return f.read().decode(errors="replace").strip()
+    except OSError:
+        return ""
+
+
+class _MarpServer:
+    """One `marp --server` process and the directory it serves."""
+
+    # 一个`marp --server`进程及其服务的目录
+
+    def __init__(self, command: str, root: str):
+        self.directory = tempfile.mkdtemp(prefix="marp-", dir=root)
+        self.slides_dir = os.path.join(self.directory, "slides")
+        os.makedirs(self.slides_dir)
+        self.log_path = os.path.join(self.directory, "marp.log")
+        self.port = _free_port()
+        self.renders = 0
+        self.closed = False
+        try:
+            with open(self.log_path, "wb") as log:
+                self.process = subprocess.Popen(
+                    [command, "--server", self.slides_dir],
+                    env={**os.environ, "PORT": str(self.port)},
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,  # Signals reach the browser children too 信号也会到达浏览器子进程
+                )
+        except OSError as e:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise MarpRenderError(f"marp could not be started: {e}") from e
+        PPT_RENDER_EVENTS.labels("start").inc()
+
+    def wait_ready(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                raise MarpRenderError(
+                    f"marp server exited with code {self.process.returncode}: {_log_tail(self.log_path)}"
+                )
+            with suppress(OSError):
+                with socket.create_connection((MARP_HOST, self.port), timeout=1):
+                    return
+            if time.monotonic() >= deadline:
+                raise MarpRenderError(
+                    f"marp server did not start within {timeout} seconds"
+                )
+            time.sleep(0.05)
+
+    def exposed_address(self) -> Optional[str]:
+        """Return a non-loopback address of this host the server accepts connections on."""
+        # 返回服务进程可在其上接受连接的本机非回环地址
+        for address in _local_addresses():
+            with suppress(OSError):
+                with socket.create_connection((address, self.port), timeout=1):
+                    return address
+        return None
+
+    def render(self, markdown: str, output_format: str, timeout: float) -> bytes:
+        name = f"{uuid.uuid4().hex}.md"
+        path = os.path.join(self.slides_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        self.renders += 1
+        # The timer enforces the deadline for the whole render, not per socket read
+        # 定时器对整个渲染而不是每次套接字读取施加截止时间
+        timed_out = threading.Event()
+
+        def expire() -> None:
+            timed_out.set()
+            self.close()
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            url = f"http://{MARP_HOST}:{self.port}/{name}?{output_format}"
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode(errors="replace").strip()
+            raise MarpRenderError(
+                f"marp failed to render the deck ({e.code}): {detail[:500]}"
+            ) from e
+        except (OSError, urllib.error.URLError) as e:
+            if timed_out.is_set():
+                PPT_RENDER_EVENTS.labels("timeout").inc()
+                raise MarpRenderError(
+                    f"marp render timed out after {timeout:g} seconds"
+                ) from e
+            PPT_RENDER_EVENTS.labels("crash").inc()
+            self.close()
+            raise MarpRenderError(
+                f"marp server failed: {e}. {_log_tail(self.log_path)}"
+            ) from e
+        finally:
+            timer.cancel()
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.process.poll() is None:
+            with suppress(ProcessLookupError):
+                os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                with suppress(ProcessLookupError):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class MarpRendererPool:
+    """
+    Render marp markdown with a bounded set of long-lived marp processes.
+
+    Settings default to environment variables: `PPT_RENDER_MODE` (`cli`, the
+    default, or `server`), `PPT_RENDER_CONCURRENCY` (renders at the same
+    time, extra requests queue), `PPT_RENDER_TIMEOUT` (seconds per render),
+    `PPT_RENDER_MAX_RENDERS` (renders before a server is recycled),
+    `PPT_RENDER_WARM_WORKERS` (servers started by `warm`) and
+    `PPT_MARP_COMMAND` (the marp executable).
+    """
+
+    # 使用数量有限的长期运行marp进程渲染marp Markdown。设置默认从上述环境变量读取。
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_renders: Optional[int] = None,
+        warm_workers: Optional[int] = None,
+        command: Optional[str] = None,
+        startup_timeout: float = 60,
+    ):
+        self.mode = mode or os.getenv("PPT_RENDER_MODE", "cli")
+        if self.mode not in ("server", "cli"):
+            logger.warning(
+                f"PPT_RENDER_MODE value '{self.mode}' is not supported. Using cli."
+            )
+            self.mode = "cli"
+        self.concurrency = max(
+            1, concurrency or int(_env_float("PPT_RENDER_CONCURRENCY", 2))
+        )
+        self.timeout = (
+            timeout if timeout is not None else _env_float("PPT_RENDER_TIMEOUT", 120)
+        )
+        self.max_renders = max_renders or int(_env_float("PPT_RENDER_MAX_RENDERS", 50))
+        self.warm_workers = min(
+            self.concurrency,
+            (
+                warm_workers
+                if warm_workers is not None
+                else int(_env_float("PPT_RENDER_WARM_WORKERS", 0))
+            ),
+        )
+        self.command = command or os.getenv("PPT_MARP_COMMAND", "marp")
+        self.startup_timeout = startup_timeout
+        # Request queue 请求队列
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._idle: list[_MarpServer] = []
+        self._lock = threading.Lock()
+        self._root: Optional[str] = None
+        self._closed = False
+
+    def _root_dir(self) -> str:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Marp renderer pool is closed")
+            if self._root is None:
+                self._root = tempfile.mkdtemp(prefix="deerflow-marp-")
+            return self._root
+
+    def _start_server(self) -> Optional[_MarpServer]:
+        """Start a server, or switch the pool to `cli` and return None if it is exposed."""
+        # 启动服务进程；如果它暴露在非回环地址上，将连接池切换到`cli`模式并返回None
+        server = _MarpServer(self.command, self._root_dir())
+        try:
+            server.wait_ready(self.startup_timeout)
+            address = server.exposed_address()
+        except BaseException:
+            server.close()
+            raise
+        if address is None:
+            return server
+        server.close()
+        logger.error(
+            f"marp server accepts connections on {address}, which would expose the "
+            "decks being rendered. Falling back to PPT_RENDER_MODE=cli."
+        )
+        with self._lock:
+            self.mode = "cli"
+            servers, self._idle = self._idle, []
+        for idle in servers:
+            idle.close()
+        return None
+
+    def _checkout(self) -> Optional[_MarpServer]:
+        with self._lock:
+            while self._idle:
+                server = self._idle.pop()
+                if server.process.poll() is None:
+                    return server
+                PPT_RENDER_EVENTS.labels("crash").inc()
+                server.close()
+        return self._start_server()
+
+    def _checkin(self, server: _MarpServer) -> None:
+        if not server.closed and server.renders >= self.max_renders:
+            PPT_RENDER_EVENTS.labels("recycle").inc()
+            server.close()
+        with self._lock:
+            if self._closed or server.closed or self.mode != "server":
+                server.close()
+            else:
+                self._idle.append(server)
+
+    def warm(self) -> None:
+        """Start idle servers up to `warm_workers` so the first render skips the cold start."""
+        # 启动空闲服务进程直到`warm_workers`个，使第一次渲染跳过冷启动
+        if self.mode != "server":
+            return
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) >= self.warm_workers:
+                    return
+            server = self._start_server()
+            if server is None:
+                return
+            self._checkin(server)
+
+    def render(self, markdown: str, output_format: str = "pptx") -> bytes:
+        """
+        Render marp markdown to `output_format` and return the file content.
+
+        Args:
+            markdown: The deck in marp markdown
+            output_format: One of `pptx`, `pdf` or `html`
+
+        Returns:
+            The rendered file
+
+        Raises:
+            MarpRenderError: If marp fails, times out or cannot be started
+        """
+        # 将marp Markdown渲染为`output_format`并返回文件内容
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        with self._slots:
+            start = time.monotonic()
+            server = self._checkout() if self.mode == "server" else None
+            if server is None:
+                data = self._render_cli(markdown, output_format)
+            else:
+                try:
+                    data = server.render(markdown, output_format, self.timeout)
+                finally:
+                    self._checkin(server)
+            PPT_RENDER_EVENTS.labels("render").inc()
+            PPT_RENDER_SECONDS.labels(self.mode).observe(time.monotonic() - start)
+            return data
+
+    def _render_cli(self, markdown: str, output_format: str) -> bytes:
+        with tempfile.TemporaryDirectory(
+            prefix="marp-", dir=self._root_dir()
+        ) as directory:
+            input_path = os.path.join(directory, "deck.md")
+            output_path = os.path.join(directory, f"deck.{output_format}")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(markdown)
+            PPT_RENDER_EVENTS.labels("start").inc()
+            try:
+                completed = subprocess.run(
+                    [self.command, input_path, "-o", output_path],
+                    stdin=subprocess.DEVNULL,
+                    capture_output=True,
+                    timeout=self.timeout,
+                )
+            except subprocess.TimeoutExpired as e:
+                PPT_RENDER_EVENTS.labels("timeout").inc()
+                raise MarpRenderError(
+                    f"marp render timed out after {self.timeout:g} seconds"
+                ) from e
+            except OSError as e:
+                raise MarpRenderError(f"marp could not be started: {e}") from e
+            if completed.returncode != 0 or not os.path.exists(output_path):
+                detail = completed.stderr.decode(errors="replace").strip()
+                raise MarpRenderError(
+                    f"marp exited with code {completed.returncode}: {detail[:500]}"
+                )
+            with open(output_path, "rb") as f:
+                return f.read()
+
+    def close(self) -> None:
+        """Stop every marp server and remove the pool's temp dir."""
+        # 停止所有marp服务进程并删除连接池的临时目录
+        with self._lock:
+            self._closed = True
+            servers, self._idle = self._idle, []
+            root, self._root = self._root, None
+        for server in servers:
+            server.close()
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"idle": len(self._idle)}
+
+
+_pool: Optional[MarpRendererPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_marp_renderer() -> MarpRendererPool:
+    """Return the process-wide marp renderer pool, creating it on first use."""
+    # 返回进程级的marp渲染进程池，首次使用时创建
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = MarpRendererPool()
+            atexit.register(_pool.close)
+        return _pool
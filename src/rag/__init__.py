@@ -3,6 +3,10 @@
 
 from .retriever import Retriever, Document, Resource  # 导入检索器、文档和资源类
 from .ragflow import RAGFlowProvider  # 导入RAGFlow提供者
+from .local import LocalVectorProvider  # 导入本地向量检索提供者
+from .bm25 import BM25Provider  # 导入本地BM25检索提供者
+from .hybrid import HybridRetriever  # 导入混合检索器
+from .cache import CachedRetriever, invalidate_retriever_cache  # 导入检索器缓存和失效钩子
 from .builder import build_retriever  # 导入构建检索器函数
 
-__all__ = [Retriever, Document, Resource, RAGFlowProvider, build_retriever]  # 导出所有类和函数
+__all__ = [Retriever, Document, Resource, RAGFlowProvider, LocalVectorProvider, BM25Provider, HybridRetriever, CachedRetriever, invalidate_retriever_cache, build_retriever]  # 导出所有类和函数
@@ -0,0 +1,530 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Local lexical retriever: a BM25-scored inverted index on disk.
+
+Chunks are stored in a `ChunkStore` directory together with their token
+counts. The inverted index is a list of immutable segments, each holding the
+sorted vocabulary of the chunks it covers and, per term, a posting list of
+delta-encoded chunk rows followed by term frequencies, compressed as
+variable-length integers. Every commit writes the newly added chunks as a new
+small segment and merges the newest segments while they are of similar size,
+so the number of segments stays logarithmic and the postings of deleted
+documents are dropped as segments are rewritten.
+"""
+
+# 本地词法检索器：基于BM25打分的磁盘倒排索引。
+# 块连同其词元数量存储在`ChunkStore`目录中。倒排索引由不可变的段组成，每个段保存其覆盖的块的有序词表，
+# 以及每个词项的倒排列表：差分编码的块行号后接词频，以变长整数压缩。
+# 每次提交将新添加的块写成一个新的小段，并在最新的几个段大小相近时合并它们，
+# 因此段的数量保持对数级别，被删除文档的倒排项也会在段重写时被丢弃。
+
+import logging
+import math
+import os
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from src.rag.store import (
+    DEFAULT_DATASET,
+    ChunkStore,
+    LocalStoreRetriever,
+    env_int,
+    top_k_indices,
+)
+from src.rag.text import tokenize
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_BM25_RAG_DIR = os.path.join("data", "bm25_rag")
+# Merge the newest segment into the previous one once it is at least 1/4 of its size
+MERGE_FACTOR = 4
+# Uncommitted postings buffered in memory before a segment is written
+_FLUSH_POSTINGS = 2_000_000
+
+
+def count_terms(chunks: list[str]) -> list[Counter]:
+    """Term frequencies of each chunk, as indexed by `BM25Store`."""
+    # 每个块的词频，与`BM25Store`的索引方式一致
+    return [Counter(tokenize(chunk)) for chunk in chunks]
+
+
+def encode_varints(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    LEB128-encode non-negative integers below 2**35.
+
+    Returns:
+        `(bytes, lengths)`: the encoded uint8 array and the byte length of every value
+    """
+    # 将小于2**35的非负整数进行LEB128编码，返回编码后的uint8数组和每个值的字节长度
+    values = np.asarray(values, dtype=np.int64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        lengths += values >= (1 << shift)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    data = np.empty(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for k in range(int(lengths.max()) if len(values) else 0):
+        selected = lengths > k
+        byte = (values[selected] >> (7 * k)) & 0x7F
+        more = (lengths[selected] > k + 1).astype(np.int64) << 7
+        data[starts[selected] + k] = byte | more
+    return data, lengths
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a uint8 array of LEB128 integers into int64 values."""
+    # 将LEB128整数的uint8数组解码为int64值
+    data = np.asarray(data, dtype=np.uint8)
+    last = data < 0x80
+    if last.all():
+        return data.astype(np.int64)
+    ends = np.flatnonzero(last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.int64) << (7 * position)
+    return np.add.reduceat(parts, starts)
+
+
+def _group_starts(counts: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+
+class _Segment:
+    """An immutable slice of the inverted index, memory-mapped from four files."""
+
+    # 倒排索引的一个不可变片段，从四个文件内存映射而来
+
+    def __init__(self, prefix: str, info: dict):
+        self.info = info
+        with open(f"{prefix}.terms", encoding="utf-8") as f:
+            self.terms = f.read().split("\n") if info["terms"] else []
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.df = np.fromfile(f"{prefix}.df.i32", dtype=np.int32)
+        self.offsets = np.fromfile(f"{prefix}.offsets.i64", dtype=np.int64)
+        size = int(self.offsets[-1]) if len(self.offsets) else 0
+        self.postings = (
+            np.memmap(f"{prefix}.postings", dtype=np.uint8, mode="r", shape=(size,))
+            if size
+            else np.zeros(0, dtype=np.uint8)
+        )
+
+    @staticmethod
+    def write(
+        prefix: str,
+        terms: list[str],
+        term_ids: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+    ) -> dict:
+        """
+        Write postings sorted by `(term_ids, rows)` as a segment.
+
+        Each posting list stores `df` row gaps (the first one absolute) followed by `df` frequencies.
+        """
+        # 将按`(term_ids, rows)`排序的倒排项写为一个段。每个倒排列表存储`df`个行号差值（第一个为绝对值），后接`df`个词频
+        df = np.bincount(term_ids, minlength=len(terms)).astype(np.int32)
+        term_starts = _group_starts(df)
+        gaps = np.diff(rows, prepend=0)
+        gaps[term_starts] = rows[term_starts]
+        rank = np.arange(len(rows)) - term_starts[term_ids]
+        base = 2 * term_starts[term_ids]
+        values = np.empty(2 * len(rows), dtype=np.int64)
+        values[base + rank] = gaps
+        values[base + df[term_ids] + rank] = tfs
+        data, lengths = encode_varints(values)
+        term_bytes = (
+            np.add.reduceat(lengths, 2 * term_starts) if len(terms) else lengths[:0]
+        )
+        offsets = np.concatenate(([0], np.cumsum(term_bytes))).astype(np.int64)
+        with open(f"{prefix}.terms", "w", encoding="utf-8") as f:
+            f.write("\n".join(terms))
+        df.tofile(f"{prefix}.df.i32")
+        offsets.tofile(f"{prefix}.offsets.i64")
+        data.tofile(f"{prefix}.postings")
+        return {
+            "terms": len(terms),
+            "postings": int(len(rows)),
+            "bytes": int(len(data)),
+        }
+
+    def lookup(self, term: str) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """`(rows, frequencies)` of a term, or None if the segment does not contain it."""
+        # 词项的`(rows, frequencies)`，段中不包含该词项时返回None
+        index = self.term_ids.get(term)
+        if index is None:
+            return None
+        df = int(self.df[index])
+        values = decode_varints(
+            self.postings[self.offsets[index] : self.offsets[index + 1]]
+        )
+        return np.cumsum(values[:df]), values[df:]
+
+    def read_all(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All postings as `(term_ids, rows, frequencies)`, sorted by term then row."""
+        # 以`(term_ids, rows, frequencies)`返回所有倒排项，按词项再按行排序
+        df = self.df.astype(np.int64)
+        term_starts = _group_starts(df)
+        values = decode_varints(self.postings)
+        value_terms = np.repeat(np.arange(len(df)), 2 * df)
+        is_gap = np.arange(len(values)) - 2 * term_starts[value_terms] < df[value_terms]
+        gaps, tfs = values[is_gap], values[~is_gap]
+        term_ids = np.repeat(np.arange(len(df)), df)
+        cumulative = np.cumsum(gaps)
+        rows = cumulative - (cumulative[term_starts] - gaps[term_starts])[term_ids]
+        return term_ids, rows, tfs
+
+
+class BM25Store(ChunkStore):
+    """Chunk store with an inverted index scored by Okapi BM25."""
+
+    # 带倒排索引、以Okapi BM25打分的块存储
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # (first row, term counts per chunk)
+        self._pending: list[tuple[int, list[Counter]]] = []
+        self._pending_postings = 0
+        # Written but not in the manifest yet 已写入但尚未进入清单
+        self._new_segments: list[dict] = []
+        # Merged away, deleted after the commit 已被合并，提交后删除
+        self._obsolete: list[dict] = []
+        super().__init__(directory)
+
+    # -- files ------------------------------------------------------------------
+
+    def _new_manifest(self) -> dict:
+        return {
+            **super()._new_manifest(),
+            "index": "bm25",
+            "segments": [],
+            "next_segment": 0,
+        }
+
+    def _check_manifest(self, manifest: dict) -> None:
+        if manifest.get("index") != "bm25":
+            raise ValueError(f"{self.directory} is not a BM25 store")
+
+    def _row_files(self) -> dict[str, int]:
+        return {**super()._row_files(), "lengths.i32": 4}
+
+    def _segment_prefix(self, info: dict) -> str:
+        return self._path(f"segment-{info['id']:06d}")
+
+    def _load(self) -> None:
+        try:
+            super()._load()
+        except FileNotFoundError:
+            # A concurrent merge deleted a segment of the manifest just read
+            # 并发的合并删除了刚读取的清单中的段
+            super()._load()
+
+    def _map_files(self) -> None:
+        super()._map_files()
+        self._lengths = self._memmap("lengths.i32", np.int32, (self.rows,))
+        # Segments are immutable, so the ones already open are reused
+        # 段是不可变的，因此复用已经打开的段
+        opened = {
+            segment.info["id"]: segment for segment in getattr(self, "_segments", [])
+        }
+        self._segments = [
+            opened.get(info["id"]) or _Segment(self._segment_prefix(info), info)
+            for info in self._manifest["segments"]
+        ]
+        live = [doc for _, doc in self.live_documents()]
+        self._live_rows = sum(doc["end"] - doc["start"] for doc in live)
+        live_tokens = sum(doc["tokens"] for doc in live)
+        self._average_length = live_tokens / self._live_rows if self._live_rows else 0.0
+
+    # -- writes -----------------------------------------------------------------
+
+    def add_document(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        dataset: str = DEFAULT_DATASET,
+        title: str = "",
+        source: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+        counts: Optional[list[Counter]] = None,
+    ) -> None:
+        """
+        Tokenize and append a document's chunks, replacing an older version.
+
+        With `commit=False` the chunks only become searchable at the next
+        `commit`. `counts` are the chunks' `count_terms`, if already computed.
+        """
+        # 对文档的块分词并追加，替换旧版本。`commit=False`时，块直到下一次`commit`才可被搜索。
+        # `counts`是已经计算好的块的`count_terms`结果
+        if counts is None:
+            counts = count_terms(chunks)
+        lengths = np.array([sum(count.values()) for count in counts], dtype=np.int32)
+        with self._lock:
+            start = self._append_document(
+                doc_id,
+                chunks,
+                {"lengths.i32": lengths.tobytes()},
+                dataset,
+                title,
+                source,
+                metadata,
+                fields={"tokens": int(lengths.sum())},
+            )
+            self._pending.append((start, counts))
+            self._pending_postings += sum(len(count) for count in counts)
+            if self._pending_postings >= _FLUSH_POSTINGS:
+                self._write_pending()
+            if commit:
+                self.commit()
+
+    def _allocate_segment(self) -> dict:
+        info = {"id": self._manifest["next_segment"]}
+        self._manifest["next_segment"] += 1
+        return info
+
+    def _write_pending(self) -> None:
+        """Write the buffered postings as a segment that the next commit will publish."""
+        # 将缓冲的倒排项写为一个段，由下一次提交发布
+        if not self._pending_postings:
+            self._pending.clear()
+            return
+        postings: dict[str, tuple[list[int], list[int]]] = {}
+        for start, counts in self._pending:
+            for row, count in enumerate(counts, start):
+                for term, tf in count.items():
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = ([], [])
+                    entry[0].append(row)
+                    entry[1].append(tf)
+        terms = sorted(postings)
+        df = [len(postings[term][0]) for term in terms]
+        term_ids = np.repeat(np.arange(len(terms)), df)
+        rows = np.fromiter(
+            (row for term in terms for row in postings[term][0]), dtype=np.int64
+        )
+        tfs = np.fromiter(
+            (tf for term in terms for tf in postings[term][1]), dtype=np.int64
+        )
+        info = self._allocate_segment()
+        info.update(
+            _Segment.write(self._segment_prefix(info), terms, term_ids, rows, tfs)
+        )
+        self._new_segments.append(info)
+        self._pending.clear()
+        self._pending_postings = 0
+
+    def _live_rows_mask(self) -> np.ndarray:
+        mask = np.zeros(self.rows, dtype=bool)
+        for _, doc in self.live_documents():
+            mask[doc["start"] : doc["end"]] = True
+        return mask
+
+    def _merge(self, segments: list[dict]) -> dict:
+        """Rewrite `segments` as one, dropping the postings of deleted documents."""
+        # 将`segments`重写为一个段，并丢弃被删除文档的倒排项
+        live = self._live_rows_mask()
+        all_terms, all_ids, all_rows, all_tfs = [], [], [], []
+        for info in segments:
+            segment = _Segment(self._segment_prefix(info), info)
+            term_ids, rows, tfs = segment.read_all()
+            keep = live[rows]
+            all_terms.append(np.array(segment.terms, dtype=str))
+            all_ids.append(term_ids[keep])
+            all_rows.append(rows[keep])
+            all_tfs.append(tfs[keep])
+        vocabulary = (
+            np.unique(np.concatenate(all_terms))
+            if all_terms
+            else np.array([], dtype=str)
+        )
+        term_ids = np.concatenate(
+            [
+                np.searchsorted(vocabulary, terms)[ids]
+                for terms, ids in zip(all_terms, all_ids)
+            ]
+        )
+        rows, tfs = np.concatenate(all_rows), np.concatenate(all_tfs)
+        order = np.lexsort((rows, term_ids))
+        used, term_ids = np.unique(term_ids[order], return_inverse=True)
+        info = self._allocate_segment()
+        info.update(
+            _Segment.write(
+                self._segment_prefix(info),
+                vocabulary[used].tolist(),
+                term_ids.reshape(-1),
+                rows[order],
+                tfs[order],
+            )
+        )
+        return info
+
+    def _flush(self) -> None:
+        self._write_pending()
+        segments = self._manifest["segments"]
+        segments.extend(self._new_segments)
+        self._new_segments = []
+        while (
+            len(segments) > 1
+            and segments[-1]["postings"] * MERGE_FACTOR >= segments[-2]["postings"]
+        ):
+            merged = segments[-2:]
+            segment = self._merge(merged)
+            self._obsolete.extend(merged)
+            segments[-2:] = [segment] if segment["postings"] else []
+            if not segment["postings"]:
+                self._obsolete.append(segment)
+
+    def _remove_segments(self, segments: list[dict]) -> None:
+        for info in segments:
+            prefix = self._segment_prefix(info)
+            for suffix in (".terms", ".df.i32", ".offsets.i64", ".postings"):
+                try:
+                    os.remove(prefix + suffix)
+                except FileNotFoundError:
+                    pass
+
+    def _after_commit(self) -> None:
+        self._remove_segments(self._obsolete)
+        self._obsolete = []
+
+    def rollback(self) -> None:
+        with self._lock:
+            self._remove_segments(self._new_segments)
+            self._new_segments = []
+            self._pending.clear()
+            self._pending_postings = 0
+            super().rollback()
+
+    def optimize(self) -> None:
+        """Merge all segments into one, dropping every posting of a deleted document."""
+        # 将所有段合并为一个，丢弃被删除文档的所有倒排项
+        with self._lock:
+            self.refresh()
+            segments = self._manifest["segments"]
+            if len(segments) > 1 or any(doc["deleted"] for doc in self._documents):
+                if segments:
+                    segment = self._merge(segments)
+                    self._obsolete.extend(segments)
+                    self._manifest["segments"] = (
+                        [segment] if segment["postings"] else []
+                    )
+                    if not segment["postings"]:
+                        self._obsolete.append(segment)
+            self.commit()
+
+    # -- reads ------------------------------------------------------------------
+
+    def search(
+        self, query: str, top_k: int, allowed: Optional[Iterable[int]] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Return `(row, BM25 score)` of the best chunks for a query.
+
+        Args:
+            query: Query text, tokenized like the chunks
+            top_k: Number of chunks to return
+            allowed: Document ordinals to search; all when None
+        """
+        # 返回与查询最匹配的块的`(row, BM25分数)`
+        terms = set(tokenize(query))
+        if not terms or not self._live_rows:
+            return []
+        k1, b = self.k1, self.b
+        live_rows, average_length = self._live_rows, self._average_length or 1.0
+        hit_rows, hit_scores = [], []
+        for term in terms:
+            postings = [
+                p
+                for p in (segment.lookup(term) for segment in self._segments)
+                if p is not None
+            ]
+            if not postings:
+                continue
+            # Postings of deleted documents count until their segment is merged
+            # 被删除文档的倒排项在其所在段被合并之前仍会计入
+            df = sum(len(rows) for rows, _ in postings)
+            idf = math.log(1 + (max(live_rows, df) - df + 0.5) / (df + 0.5))
+            for rows, tfs in postings:
+                tf = tfs.astype(np.float32)
+                norm = np.float32(k1 / average_length * b) * self._lengths[
+                    rows
+                ] + np.float32(k1 * (1 - b))
+                hit_rows.append(rows)
+                hit_scores.append(np.float32(idf * (k1 + 1)) * tf / (tf + norm))
+        if not hit_rows:
+            return []
+        hits = sum(len(rows) for rows in hit_rows)
+        if len(hit_rows) == 1:
+            rows, scores = hit_rows[0], hit_scores[0]
+        elif hits * 16 >= self.rows:
+            # Many hits: accumulate into a dense array; rows are unique within one posting list
+            # 命中较多：累加到稠密数组中；同一倒排列表内的行号不重复
+            accumulator = np.zeros(self.rows, dtype=np.float32)
+            for rows, scores in zip(hit_rows, hit_scores):
+                accumulator[rows] += scores
+            rows = np.flatnonzero(accumulator)
+            scores = accumulator[rows]
+        else:
+            rows, inverse = np.unique(np.concatenate(hit_rows), return_inverse=True)
+            scores = np.bincount(
+                inverse.reshape(-1),
+                weights=np.concatenate(hit_scores),
+                minlength=len(rows),
+            )
+        keep = self.document_mask(allowed)[self._row_docs[rows]]
+        rows, scores = rows[keep], scores[keep]
+        best = top_k_indices(scores, top_k)
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+
+class BM25Provider(LocalStoreRetriever):
+    """
+    Lexical retriever over a local BM25 index, selected with `RAG_PROVIDER=bm25`.
+
+    Settings default to environment variables: `BM25_RAG_DIR` (index
+    directory, default `data/bm25_rag`) and `BM25_RAG_TOP_K` (chunks per query).
+    """
+
+    # 基于本地BM25索引的词法检索器，通过`RAG_PROVIDER=bm25`选择。设置默认从上述环境变量读取。
+
+    def __init__(self, directory: Optional[str] = None, top_k: Optional[int] = None):
+        self.top_k = top_k or env_int("BM25_RAG_TOP_K", 10)
+        self.store = BM25Store(
+            directory or os.getenv("BM25_RAG_DIR", DEFAULT_BM25_RAG_DIR)
+        )
+
+    def _add_chunks(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        dataset: str,
+        title: str,
+        source: Optional[str],
+        encoded: Optional[list[Counter]] = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+    ) -> None:
+        self.store.add_document(
+            doc_id,
+            chunks,
+            dataset=dataset,
+            title=title,
+            source=source,
+            metadata=metadata,
+            commit=commit,
+            counts=encoded,
+        )
+
+    def encoder(self) -> Callable[[list[str]], list[Counter]]:
+        return count_terms
+
+    def _search(
+        self, query: str, allowed: Optional[list[int]]
+    ) -> list[tuple[int, float]]:
+        return self.store.search(query, self.top_k, allowed)
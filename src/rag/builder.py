@@ -1,22 +1,89 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import os
+import threading
+
 from src.config.tools import SELECTED_RAG_PROVIDER, RAGProvider
+from src.rag.bm25 import BM25Provider
+from src.rag.cache import CachedRetriever
+from src.rag.hybrid import HybridRetriever, get_reranker
+from src.rag.local import LocalVectorProvider
 from src.rag.ragflow import RAGFlowProvider
 from src.rag.retriever import Retriever
 
+DEFAULT_HYBRID_PROVIDERS = "bm25,local"
+
+_cached_retrievers: dict[str, CachedRetriever] = {}
+_cached_retrievers_lock = threading.Lock()
+
+
+def build_provider(provider: str) -> Retriever:
+    """
+    构建指定名称的RAG提供者实例，不经过缓存
+
+    参数:
+        provider: `RAGProvider`的值
 
-def build_retriever() -> Retriever | None:
+    返回:
+        检索器实例
+    """
+    if provider == RAGProvider.RAGFLOW.value:
+        return RAGFlowProvider()  # 返回RAGFlow提供者实例
+    elif provider == RAGProvider.LOCAL.value:
+        return LocalVectorProvider()  # 返回本地向量检索提供者实例
+    elif provider == RAGProvider.BM25.value:
+        return BM25Provider()  # 返回本地BM25检索提供者实例
+    elif provider == RAGProvider.HYBRID.value:
+        # 混合检索：并发查询`HYBRID_RAG_PROVIDERS`中的各个提供者并融合结果
+        names = os.getenv("HYBRID_RAG_PROVIDERS", DEFAULT_HYBRID_PROVIDERS)
+        backends = [name.strip() for name in names.split(",") if name.strip()]
+        if RAGProvider.HYBRID.value in backends:
+            raise ValueError("HYBRID_RAG_PROVIDERS cannot include hybrid")
+        model = os.getenv("HYBRID_RAG_RERANKER")
+        return HybridRetriever(
+            [build_provider(name) for name in backends],
+            reranker=get_reranker(model) if model else None,  # 进程内共享的重排序器
+        )
+    raise ValueError(f"Unsupported RAG provider: {provider}")  # 不支持的RAG提供者
+
+
+def get_cached_retriever(provider: str) -> CachedRetriever:
+    """
+    获取指定名称的进程范围缓存检索器，首次使用时构建
+
+    构建提供者要打开本地存储并读取索引，因此每个提供者在进程中只构建一次；
+    本地存储通过`refresh()`和`cache_version()`自行感知新的提交
+
+    参数:
+        provider: `RAGProvider`的值
+
+    返回:
+        带缓存的检索器实例
+    """
+    with _cached_retrievers_lock:
+        retriever = _cached_retrievers.get(provider)
+        if retriever is None:
+            retriever = _cached_retrievers[provider] = CachedRetriever(
+                build_provider(provider), namespace=provider
+            )
+        return retriever
+
+
+def build_retriever(cached: bool = False) -> Retriever | None:
     """
     构建检索器实例
-    
+
     根据配置的RAG提供者类型创建相应的检索器实例
-    
+
+    参数:
+        cached: 是否返回进程范围共享的缓存检索器，由它提供资源列表和检索结果
+
     返回:
         检索器实例或None（如果未配置RAG提供者）
     """
-    if SELECTED_RAG_PROVIDER == RAGProvider.RAGFLOW.value:
-        return RAGFlowProvider()  # 返回RAGFlow提供者实例
-    elif SELECTED_RAG_PROVIDER:
-        raise ValueError(f"Unsupported RAG provider: {SELECTED_RAG_PROVIDER}")  # 不支持的RAG提供者
+    if SELECTED_RAG_PROVIDER:
+        if cached:
+            return get_cached_retriever(SELECTED_RAG_PROVIDER)
+        return build_provider(SELECTED_RAG_PROVIDER)
     return None  # 如果未配置RAG提供者，则返回None
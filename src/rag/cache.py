@@ -0,0 +1,253 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+In-process caches of RAG resource listings and retrieval results.
+
+The resource picker lists resources on every keystroke and the researcher
+repeats keywords, while the data behind them rarely changes. Listings are
+kept for a short TTL per query string, and retrieval results in an LRU keyed
+by the query and the selected resources. Entries are stored with the
+provider's `cache_version()` and dropped when it changes, so local stores are
+invalidated by their own commits, including those of other processes;
+`invalidate_retriever_cache` is the hook for changes the provider cannot see.
+"""
+
+# RAG资源列表和检索结果的进程内缓存。
+# 资源选择器在每次按键时都会列出资源，研究员也会重复使用关键词，而背后的数据很少变化。
+# 资源列表按查询字符串保存一个较短的TTL，检索结果保存在以查询和所选资源为键的LRU中。
+# 条目与提供者的`cache_version()`一起存储，版本变化时被丢弃，因此本地存储会因其自身的提交（包括其他进程的提交）而失效；
+# `invalidate_retriever_cache`是提供者无法感知的变化的失效钩子。
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from src.rag.retriever import Document, Resource, Retriever
+from src.utils.metrics import record_cache_lookup
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+# Seconds a resource listing is reused 资源列表被复用的秒数
+DEFAULT_RESOURCES_TTL = 30.0
+DEFAULT_QUERY_TTL = 300.0  # Seconds a retrieval result is reused 检索结果被复用的秒数
+DEFAULT_QUERY_CACHE_SIZE = 256  # Retrieval results kept 保留的检索结果数
+
+
+def _env_float(name: str, default: float) -> float:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return float(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not a number. Using default value {default}."
+        )
+        return default
+
+
+class _TTLCache:
+    """LRU of `(stored at, version, value)` entries that expire after `ttl` seconds."""
+
+    # 条目为`(存储时间, 版本, 值)`的LRU，条目在`ttl`秒后过期
+
+    def __init__(self, name: str, ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple[float, Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry[0] > self.ttl or entry[1] != version
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup(self.name, entry is not None)
+        return None if entry is None else entry[2]
+
+    def put(self, key: tuple, version: Any, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == namespace]:
+                    del self._entries[key]
+
+
+class RetrieverCache:
+    """
+    Resource listings and retrieval results of all providers, keyed by provider namespace.
+
+    Settings default to environment variables: `RAG_RESOURCES_CACHE_TTL`
+    (seconds, default 30), `RAG_QUERY_CACHE_TTL` (seconds, default 300) and
+    `RAG_QUERY_CACHE_SIZE` (entries, default 256); 0 disables a cache.
+    """
+
+    # 所有提供者的资源列表和检索结果，按提供者命名空间区分。设置默认从上述环境变量读取；0表示禁用对应缓存。
+
+    def __init__(
+        self,
+        resources_ttl: Optional[float] = None,
+        query_ttl: Optional[float] = None,
+        query_cache_size: Optional[int] = None,
+    ):
+        if resources_ttl is None:
+            resources_ttl = _env_float("RAG_RESOURCES_CACHE_TTL", DEFAULT_RESOURCES_TTL)
+        if query_ttl is None:
+            query_ttl = _env_float("RAG_QUERY_CACHE_TTL", DEFAULT_QUERY_TTL)
+        if query_cache_size is None:
+            query_cache_size = int(
+                _env_float("RAG_QUERY_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE)
+            )
+        self.resources = _TTLCache(
+            "rag_resources", resources_ttl, DEFAULT_QUERY_CACHE_SIZE
+        )
+        self.queries = _TTLCache("rag_query", query_ttl, query_cache_size)
+        self.flight = SingleFlight()
+
+    def invalidate(self, namespace: Optional[str] = None) -> None:
+        """Drop the entries of one provider namespace, or of all providers."""
+        # 丢弃某个提供者命名空间的条目，或所有提供者的条目
+        self.resources.invalidate(namespace)
+        self.queries.invalidate(namespace)
+
+
+_retriever_cache: Optional[RetrieverCache] = None
+_retriever_cache_lock = threading.Lock()
+
+
+def get_retriever_cache() -> RetrieverCache:
+    """Return the process-wide retriever cache."""
+    # 返回进程范围的检索器缓存
+    global _retriever_cache
+    with _retriever_cache_lock:
+        if _retriever_cache is None:
+            _retriever_cache = RetrieverCache()
+        return _retriever_cache
+
+
+def invalidate_retriever_cache(namespace: Optional[str] = None) -> None:
+    """Invalidation hook: call when datasets change behind a provider's back."""
+    # 失效钩子：在提供者无法感知的情况下数据集发生变化时调用
+    get_retriever_cache().invalidate(namespace)
+
+
+def _copy_documents(documents: list[Document]) -> list[Document]:
+    # Callers may append to `chunks`, which must not change the cached result;
+    # copying a document's chunks copies its flat buffers
+    # 调用方可能向`chunks`追加内容，这不能改变缓存的结果；复制文档的块只复制其扁平缓冲区
+    return [
+        Document(id=doc.id, url=doc.url, title=doc.title, chunks=doc.chunks)
+        for doc in documents
+    ]
+
+
+class CachedRetriever(Retriever):
+    """
+    Serve a retriever's listings and results from the shared `RetrieverCache`.
+
+    `namespace` separates providers, as the cache is shared by the whole
+    process.
+    """
+
+    # 从共享的`RetrieverCache`提供检索器的资源列表和结果。
+    # `namespace`区分不同的提供者，因为缓存由整个进程共享。
+
+    def __init__(
+        self,
+        retriever: Retriever,
+        namespace: str,
+        cache: Optional[RetrieverCache] = None,
+    ):
+        self.wrapped = retriever
+        self.namespace = namespace
+        self.cache = cache or get_retriever_cache()
+
+    def cache_version(self) -> Hashable | None:
+        return self.wrapped.cache_version()
+
+    @staticmethod
+    def _resources_key(resources: list[Resource]) -> tuple:
+        return tuple(sorted(resource.uri for resource in resources))
+
+    def _cached(self, cache: _TTLCache, key: tuple, load: Callable[[], Any]):
+        version = self.wrapped.cache_version()
+        value = cache.get(key, version)
+        if value is None:
+            value = load()
+            cache.put(key, version, value)
+        return value
+
+    async def _acached(self, cache: _TTLCache, key: tuple, load: Callable):
+        version = self.wrapped.cache_version()
+        value = cache.get(key, version)
+        if value is None:
+            # Concurrent misses for the same key share one backend call
+            # 同一键的并发未命中共享一次后端调用
+            value = await self.cache.flight.do((cache.name, key, version), load)
+            cache.put(key, version, value)
+        return value
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """
+        列出资源，同一查询字符串在TTL内复用上一次的结果
+        """
+        key = (self.namespace, query or "")
+        return list(
+            self._cached(
+                self.cache.resources, key, lambda: self.wrapped.list_resources(query)
+            )
+        )
+
+    async def alist_resources(self, query: str | None = None) -> list[Resource]:
+        key = (self.namespace, query or "")
+        return list(
+            await self._acached(
+                self.cache.resources, key, lambda: self.wrapped.alist_resources(query)
+            )
+        )
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """
+        查询相关文档，相同的查询和资源组合复用缓存的结果
+        """
+        key = (self.namespace, query, self._resources_key(resources))
+        return _copy_documents(
+            self._cached(
+                self.cache.queries,
+                key,
+                lambda: self.wrapped.query_relevant_documents(query, resources),
+            )
+        )
+
+    async def aquery_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        key = (self.namespace, query, self._resources_key(resources))
+        return _copy_documents(
+            await self._acached(
+                self.cache.queries,
+                key,
+                lambda: self.wrapped.aquery_relevant_documents(query, resources),
+            )
+        )
@@ -0,0 +1,53 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Local text embeddings that need no model download and no network.
+"""
+
+# 无需下载模型、无需网络的本地文本嵌入
+
+import math
+import zlib
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+from src.rag.text import tokenize
+
+
+class HashingEmbedder:
+    """
+    Embed text by hashing its terms into a fixed number of signed buckets.
+
+    Each term (see `tokenize`) adds `1 + log(tf)` to the bucket chosen by its
+    CRC-32, with a sign from another bit of the hash so collisions cancel out
+    on average. Vectors are L2-normalized, so the dot product is the cosine
+    similarity. This is a lexical embedding: it matches shared words, not
+    synonyms, but it is deterministic across processes and costs microseconds.
+    """
+
+    # 将文本的词项哈希到固定数量的带符号桶中来生成嵌入。
+    # 每个词项向其CRC-32选中的桶加上`1 + log(tf)`，符号取自哈希的另一位，使冲突平均相互抵消。
+    # 向量经过L2归一化，因此点积即余弦相似度。这是词法嵌入：匹配共同的词而不是同义词，
+    # 但在不同进程间是确定的，且只需微秒级开销。
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """Return a float32 matrix with one normalized row per text."""
+        # 返回每个文本对应一行归一化向量的float32矩阵
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term, count in Counter(tokenize(text)).items():
+                digest = zlib.crc32(term.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dim] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
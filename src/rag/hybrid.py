@@ -0,0 +1,443 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Hybrid retriever: several RAG backends queried concurrently and fused.
+
+Each backend's chunks are ranked by its own similarity, and the rankings are
+combined with reciprocal-rank fusion (RRF), which needs no calibration between
+score scales such as BM25 and cosine similarity. The same chunk returned by
+several backends is merged into one. An optional local cross-encoder then
+reorders the best candidates if it answers within a latency budget, and the
+result is cut to a chunk count and a token budget.
+"""
+
+# 混合检索器：并发查询多个RAG后端并融合结果。
+# 每个后端的块按其自身的相似度排序，再用倒数排名融合（RRF）合并各排名，无需在BM25和余弦相似度等不同分数尺度之间校准。
+# 多个后端返回的同一个块会被合并。可选的本地交叉编码器在延迟预算内对最佳候选重新排序，
+# 最后结果被截断到块数量和词元预算之内。
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from src.rag.retriever import Chunk, Document, Resource, Retriever
+from src.rag.store import env_int
+from src.rag.text import estimate_tokens
+from src.utils.metrics import record_tool_call
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_RRF_K = 60  # Damping constant of reciprocal-rank fusion 倒数排名融合的平滑常数
+
+
+class CrossEncoderReranker:
+    """
+    Score `(query, passage)` pairs with a sentence-transformers cross-encoder on the CPU.
+
+    Needs the optional `sentence-transformers` package; the model is loaded on first use.
+    Use `get_reranker` to share one instance, and its loaded model, per process.
+    """
+
+    # 在CPU上用sentence-transformers交叉编码器为`(query, passage)`对打分。
+    # 需要可选的`sentence-transformers`包；模型在第一次使用时加载。使用`get_reranker`在进程内共享同一个实例及其已加载的模型。
+
+    def __init__(self, model: str):
+        self.model_name = model
+        self._model = None
+
+    def load(self) -> None:
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            self._model = CrossEncoder(self.model_name, device="cpu")
+
+    def score(self, query: str, passages: list[str]) -> list[float]:
+        self.load()
+        return [
+            float(score)
+            for score in self._model.predict([(query, passage) for passage in passages])
+        ]
+
+
+_rerankers: dict[str, CrossEncoderReranker] = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(model: str) -> CrossEncoderReranker:
+    """Return the process-wide reranker of a cross-encoder model."""
+    # 返回某个交叉编码器模型的进程范围重排序器
+    with _rerankers_lock:
+        reranker = _rerankers.get(model)
+        if reranker is None:
+            reranker = _rerankers[model] = CrossEncoderReranker(model)
+        return reranker
+
+
+class _RerankRunner:
+    """
+    Run one reranker's work on its own thread, shared by every retriever using it.
+
+    The model is loaded in the background by `warm_up`; queries arriving before it
+    is ready keep the fused order. One rerank runs at a time, and a rerank that
+    overran its budget makes later queries skip reranking until it ends.
+    """
+
+    # 在专用线程上运行某个重排序器的工作，由使用它的所有检索器共享。
+    # 模型由`warm_up`在后台加载；在其就绪之前到达的查询保持融合顺序。
+    # 同一时间只做一次重排序；超出预算的重排序结束之前，后续查询跳过重排序。
+
+    def __init__(self):
+        self.disabled = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="rag-rerank"
+        )
+        self._lock = threading.Lock()
+        self._busy = False
+        self._loading = None
+
+    def warm_up(self, reranker) -> None:
+        with self._lock:
+            if self._loading is None:
+                self._loading = self._executor.submit(reranker.load)
+                self._loading.add_done_callback(self._check)
+
+    @property
+    def ready(self) -> bool:
+        return self._loading is not None and self._loading.done() and not self.disabled
+
+    def submit(self, reranker, query: str, passages: list[str]):
+        """Start scoring unless a rerank is already running; returns its future or None."""
+        # 除非已有重排序在运行，否则开始打分；返回其future或None
+        with self._lock:
+            if self._busy:
+                return None
+            self._busy = True
+        future = self._executor.submit(reranker.score, query, passages)
+        future.add_done_callback(self._done)
+        return future
+
+    def _check(self, future) -> None:
+        error = future.exception()
+        if isinstance(error, ImportError):
+            logger.warning(
+                "Reranking needs the optional `sentence-transformers` package; reranking is disabled"
+            )
+            self.disabled = True
+        elif error is not None:
+            logger.warning(f"Reranker failed: {error}")
+
+    def _done(self, future) -> None:
+        self._check(future)
+        with self._lock:
+            self._busy = False
+
+
+_runners: "weakref.WeakKeyDictionary[object, _RerankRunner]" = (
+    weakref.WeakKeyDictionary()
+)
+_backend_executor: Optional[ThreadPoolExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def _get_runner(reranker) -> _RerankRunner:
+    with _shared_lock:
+        # The runner holds no reference to the reranker, so the weak key can expire
+        # 执行器不持有重排序器的引用，因此弱引用键可以过期
+        runner = _runners.get(reranker)
+        if runner is None:
+            runner = _runners[reranker] = _RerankRunner()
+    runner.warm_up(reranker)
+    return runner
+
+
+def _get_backend_executor() -> ThreadPoolExecutor:
+    # Shared by every hybrid retriever, so building one per request starts no threads
+    # 由所有混合检索器共享，因此每个请求构建一个检索器不会启动新线程
+    global _backend_executor
+    with _shared_lock:
+        if _backend_executor is None:
+            _backend_executor = ThreadPoolExecutor(thread_name_prefix="rag-hybrid")
+        return _backend_executor
+
+
+def _content_key(content: str) -> str:
+    # Chunks that differ only in whitespace or case are the same chunk
+    # 只在空白或大小写上不同的块视为同一个块
+    return " ".join(content.split()).lower()
+
+
+class _Candidate:
+    __slots__ = ("document", "content", "score")
+
+    def __init__(self, document: Document, content: str, score: float):
+        self.document = document
+        self.content = content
+        self.score = score
+
+
+class HybridRetriever(Retriever):
+    """
+    Query several retrievers concurrently and fuse their chunks with reciprocal-rank fusion.
+
+    Settings default to environment variables: `HYBRID_RAG_TOP_K` (chunks
+    returned, default 8), `HYBRID_RAG_MAX_TOKENS` (token budget of the returned
+    chunks, default 4000), `HYBRID_RAG_TIMEOUT_MS` (how long to wait for the
+    backends, default 10000; late backends are left out), `HYBRID_RAG_RERANKER`
+    (cross-encoder model name; no reranking when unset),
+    `HYBRID_RAG_RERANK_BUDGET_MS` (default 300) and
+    `HYBRID_RAG_RERANK_CANDIDATES` (chunks reranked, default 30).
+    A backend that fails or times out is skipped; the query only fails when
+    every backend does.
+    """
+
+    # 并发查询多个检索器，并用倒数排名融合合并它们的块。设置默认从上述环境变量读取。
+    # 失败或超时的后端会被跳过；只有所有后端都失败时查询才失败。
+
+    def __init__(
+        self,
+        backends: list[Retriever],
+        top_k: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank_budget: Optional[float] = None,
+        rerank_candidates: Optional[int] = None,
+        rrf_k: int = DEFAULT_RRF_K,
+    ):
+        if not backends:
+            raise ValueError("HybridRetriever needs at least one backend")
+        self.backends = backends
+        self.top_k = top_k or env_int("HYBRID_RAG_TOP_K", 8)
+        self.max_tokens = max_tokens or env_int("HYBRID_RAG_MAX_TOKENS", 4000)
+        self.timeout = timeout or env_int("HYBRID_RAG_TIMEOUT_MS", 10000) / 1000
+        self.rerank_budget = (
+            rerank_budget or env_int("HYBRID_RAG_RERANK_BUDGET_MS", 300) / 1000
+        )
+        self.rerank_candidates = rerank_candidates or env_int(
+            "HYBRID_RAG_RERANK_CANDIDATES", 30
+        )
+        self.rrf_k = rrf_k
+        self._executor = _get_backend_executor()
+        # The reranker's thread and loaded model are shared across retrievers
+        # 重排序器的线程和已加载的模型在检索器之间共享
+        self.reranker = reranker
+        self._rerank_runner = _get_runner(reranker) if reranker is not None else None
+
+    # -- backends ---------------------------------------------------------------
+
+    def _call(self, backend: Retriever, method: str, *args):
+        start = time.perf_counter()
+        try:
+            result = getattr(backend, method)(*args)
+        except Exception:
+            record_tool_call(
+                "hybrid_retriever",
+                backend.__class__.__name__,
+                time.perf_counter() - start,
+                False,
+            )
+            raise
+        record_tool_call(
+            "hybrid_retriever", backend.__class__.__name__, time.perf_counter() - start
+        )
+        return result
+
+    async def _acall(self, backend: Retriever, method: str, *args):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                getattr(backend, method)(*args), self.timeout
+            )
+        except Exception:
+            record_tool_call(
+                "hybrid_retriever",
+                backend.__class__.__name__,
+                time.perf_counter() - start,
+                False,
+            )
+            raise
+        record_tool_call(
+            "hybrid_retriever", backend.__class__.__name__, time.perf_counter() - start
+        )
+        return result
+
+    def _collect(self, outcomes: list) -> list[list]:
+        """Keep the results of the backends that answered; raise if none did."""
+        # 保留已应答后端的结果；没有任何后端应答时抛出异常
+        results, errors = [], []
+        for backend, outcome in zip(self.backends, outcomes):
+            name = backend.__class__.__name__
+            if isinstance(outcome, TimeoutError):
+                logger.warning(
+                    f"Hybrid retriever backend {name} did not answer within {self.timeout}s"
+                )
+                errors.append(outcome)
+            elif isinstance(outcome, BaseException):
+                logger.warning(f"Hybrid retriever backend {name} failed: {outcome}")
+                errors.append(outcome)
+            else:
+                results.append(outcome)
+        if not results:
+            raise errors[0]
+        return results
+
+    def _gather(self, method: str, *args) -> list[list]:
+        """Call `method` on every backend concurrently; returns the results of those that answered in time."""
+        # 在所有后端上并发调用`method`，返回按时应答的后端的结果
+        futures = [
+            self._executor.submit(self._call, backend, method, *args)
+            for backend in self.backends
+        ]
+        wait(futures, timeout=self.timeout)
+        outcomes = []
+        for backend, future in zip(self.backends, futures):
+            if not future.done():
+                future.cancel()
+                outcomes.append(TimeoutError(f"{backend.__class__.__name__} timed out"))
+            else:
+                outcomes.append(future.exception() or future.result())
+        return self._collect(outcomes)
+
+    async def _agather(self, method: str, *args) -> list[list]:
+        """Async `_gather`, awaiting the backends' async methods."""
+        # `_gather`的异步版本，等待各后端的异步方法
+        outcomes = await asyncio.gather(
+            *(self._acall(backend, method, *args) for backend in self.backends),
+            return_exceptions=True,
+        )
+        return self._collect(outcomes)
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """
+        列出所有后端的资源，按URI去重
+
+        参数:
+            query: 可选的查询字符串，用于过滤资源
+
+        返回:
+            资源列表
+        """
+        return self._merge_resources(self._gather("list_resources", query))
+
+    async def alist_resources(self, query: str | None = None) -> list[Resource]:
+        return self._merge_resources(await self._agather("alist_resources", query))
+
+    def cache_version(self):
+        return tuple(backend.cache_version() for backend in self.backends)
+
+    @staticmethod
+    def _merge_resources(results: list[list[Resource]]) -> list[Resource]:
+        resources: dict[str, Resource] = {}
+        for backend_resources in results:
+            for resource in backend_resources:
+                resources.setdefault(resource.uri, resource)
+        return list(resources.values())
+
+    # -- ranking ----------------------------------------------------------------
+
+    def fuse(self, rankings: list[list[Document]]) -> list[_Candidate]:
+        """Merge the chunks of every backend's documents, scored by reciprocal-rank fusion."""
+        # 合并每个后端文档的块，并按倒数排名融合打分
+        candidates: dict[str, _Candidate] = {}
+        for documents in rankings:
+            chunks = [(doc, chunk) for doc in documents for chunk in doc.chunks]
+            chunks.sort(key=lambda item: item[1].similarity or 0.0, reverse=True)
+            for rank, (doc, chunk) in enumerate(chunks, 1):
+                key = _content_key(chunk.content)
+                candidate = candidates.get(key)
+                if candidate is None:
+                    candidate = candidates[key] = _Candidate(doc, chunk.content, 0.0)
+                candidate.score += 1.0 / (self.rrf_k + rank)
+        return sorted(
+            candidates.values(), key=lambda candidate: candidate.score, reverse=True
+        )
+
+    def rerank(self, query: str, candidates: list[_Candidate]) -> list[_Candidate]:
+        """Reorder the best candidates by cross-encoder score, or keep the fused order if it runs over budget."""
+        # 按交叉编码器分数重排最佳候选；超出预算时保持融合顺序
+        runner = self._rerank_runner
+        if runner is None or runner.disabled or len(candidates) < 2:
+            return candidates
+        if not runner.ready:
+            logger.info("Reranker model is still loading, keeping the fused order")
+            return candidates
+        head, tail = (
+            candidates[: self.rerank_candidates],
+            candidates[self.rerank_candidates :],
+        )
+        future = runner.submit(
+            self.reranker, query, [candidate.content for candidate in head]
+        )
+        if future is None:
+            logger.info("Reranker is busy, keeping the fused order")
+            return candidates
+        try:
+            scores = future.result(timeout=self.rerank_budget)
+        except FutureTimeoutError:
+            logger.warning(
+                f"Reranking took longer than {self.rerank_budget}s, keeping the fused order"
+            )
+            return candidates
+        except Exception:
+            return candidates
+        for candidate, score in zip(head, scores):
+            candidate.score = score
+        return sorted(head, key=lambda candidate: candidate.score, reverse=True) + tail
+
+    def pack(self, candidates: list[_Candidate]) -> list[Document]:
+        """Group the best candidates into documents, within the chunk count and the token budget."""
+        # 将最佳候选按文档分组，不超过块数量和词元预算
+        documents: dict[str, Document] = {}
+        tokens = taken = 0
+        for candidate in candidates:
+            if taken >= self.top_k:
+                break
+            cost = estimate_tokens(candidate.content)
+            if tokens + cost > self.max_tokens:
+                continue
+            tokens += cost
+            taken += 1
+            source = candidate.document
+            key = source.url or source.id
+            document = documents.get(key)
+            if document is None:
+                document = documents[key] = Document(
+                    id=source.id, url=source.url, title=source.title, chunks=[]
+                )
+            document.chunks.append(
+                Chunk(content=candidate.content, similarity=candidate.score)
+            )
+        return list(documents.values())
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """
+        并发查询所有后端，融合、重排序并按预算截断结果
+
+        参数:
+            query: 查询字符串
+            resources: 资源列表，原样传给每个后端
+
+        返回:
+            去重后的相关文档列表，按最佳块的排名排序
+        """
+        rankings = self._gather("query_relevant_documents", query, resources)
+        return self.pack(self.rerank(query, self.fuse(rankings)))
+
+    async def aquery_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        rankings = await self._agather("aquery_relevant_documents", query, resources)
+        candidates = self.fuse(rankings)
+        if self._rerank_runner is not None:
+            # Waiting for the reranker blocks for up to the budget, so it happens off the event loop
+            # 等待重排序最多阻塞一个预算时长，因此在事件循环之外进行
+            candidates = await asyncio.to_thread(self.rerank, query, candidates)
+        return self.pack(candidates)
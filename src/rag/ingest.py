@@ -0,0 +1,372 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Ingestion of files and directories into the local RAG stores.
+
+Files are read, chunked and encoded (embedded or tokenized) in a pool of
+worker processes, a batch of files per task, while the parent process writes
+the results in order and commits every `checkpoint_every` documents. Each
+document records the size and modification time of its file, so running the
+same ingestion again, for example after an interruption, skips the files
+already committed and re-ingests only new or changed ones.
+
+Usage:
+    python -m src.rag.ingest docs/ notes/ --dataset handbook --provider hybrid
+"""
+
+# 将文件和目录导入本地RAG存储。
+# 文件在工作进程池中被读取、分块并编码（生成嵌入或分词），每个任务处理一批文件；
+# 父进程按顺序写入结果，并每`checkpoint_every`个文档提交一次。
+# 每个文档记录其文件的大小和修改时间，因此再次运行相同的导入（例如中断之后）会跳过已提交的文件，只重新导入新增或变化的文件。
+
+import argparse
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from src.rag.builder import build_provider
+from src.rag.hybrid import HybridRetriever
+from src.rag.store import DEFAULT_DATASET, LocalStoreRetriever, dataset_uri
+from src.rag.text import SUPPORTED_EXTENSIONS, chunk_text, load_text
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+# Files read and encoded per worker task 每个工作进程任务读取和编码的文件数
+DEFAULT_BATCH_FILES = 16
+# Documents written between commits 两次提交之间写入的文档数
+DEFAULT_CHECKPOINT_EVERY = 500
+
+
+def find_files(paths: Iterable[str]) -> list[str]:
+    """
+    Absolute paths of the supported files under `paths`, in a stable order.
+
+    Directories are walked recursively, skipping hidden files and directories;
+    files named explicitly are always included.
+    """
+    # `paths`下受支持文件的绝对路径，顺序稳定。递归遍历目录并跳过隐藏文件和目录；显式指定的文件总是包含在内
+    files: list[str] = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(os.path.abspath(path))
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+            files.extend(
+                os.path.abspath(os.path.join(root, name))
+                for name in sorted(names)
+                if not name.startswith(".")
+                and name.lower().endswith(SUPPORTED_EXTENSIONS)
+            )
+    return list(dict.fromkeys(files))
+
+
+def file_stamp(path: str) -> dict:
+    """Size and modification time recorded with an ingested document."""
+    # 与导入的文档一起记录的文件大小和修改时间
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _prepare(
+    paths: list[str],
+    chunk_size: int,
+    overlap: int,
+    encoders: list[Callable[[list[str]], Any]],
+) -> list[tuple]:
+    """
+    Read, chunk and encode a batch of files; runs in a worker process.
+
+    The chunks of the whole batch are encoded with one call per encoder.
+    Returns `(path, stamp, title, chunks, encoded per encoder, error)` per file.
+    """
+    # 读取、分块并编码一批文件，在工作进程中运行。整批文件的块对每个编码器只调用一次
+    loaded = []
+    for path in paths:
+        try:
+            # Stamped before reading, so a change during the read is picked up next time
+            # 在读取之前记录标识，因此读取期间的修改会在下一次被导入
+            stamp = file_stamp(path)
+            title, text = load_text(path)
+            loaded.append(
+                (path, stamp, title, chunk_text(text, chunk_size, overlap), None)
+            )
+        except Exception as e:
+            loaded.append((path, None, None, None, f"{type(e).__name__}: {e}"))
+
+    all_chunks = [
+        chunk for *_, chunks, error in loaded if not error for chunk in chunks
+    ]
+    encoded = [encode(all_chunks) for encode in encoders]
+    results, offset = [], 0
+    for path, stamp, title, chunks, error in loaded:
+        if error:
+            results.append((path, None, None, None, None, error))
+            continue
+        end = offset + len(chunks)
+        results.append(
+            (path, stamp, title, chunks, [data[offset:end] for data in encoded], None)
+        )
+        offset = end
+    return results
+
+
+def local_providers(provider: str) -> list[LocalStoreRetriever]:
+    """The local stores written when ingesting for a `RAG_PROVIDER` value; hybrid means its local backends."""
+    # 为某个`RAG_PROVIDER`值导入时写入的本地存储；混合检索指其中的本地提供者
+    retriever = build_provider(provider)
+    backends = (
+        retriever.backends if isinstance(retriever, HybridRetriever) else [retriever]
+    )
+    providers = [
+        backend for backend in backends if isinstance(backend, LocalStoreRetriever)
+    ]
+    if not providers:
+        raise ValueError(f"RAG provider {provider} has no local store to ingest into")
+    return providers
+
+
+class Ingestor:
+    """
+    Ingest files into one or more local stores as the documents of a dataset.
+
+    Document IDs are the absolute file paths, so the ingested files appear in
+    `list_resources` under `rag://dataset/<dataset>` and single files can be
+    selected as `rag://dataset/<dataset>#<path>`.
+    """
+
+    # 将文件作为某个数据集的文档导入一个或多个本地存储。
+    # 文档ID为文件的绝对路径，因此导入的文件在`list_resources`中显示为`rag://dataset/<dataset>`，
+    # 单个文件可通过`rag://dataset/<dataset>#<path>`选择。
+
+    def __init__(
+        self,
+        providers: list[LocalStoreRetriever],
+        dataset: str = DEFAULT_DATASET,
+        chunk_size: int = 800,
+        overlap: int = 100,
+        workers: Optional[int] = None,
+        batch_files: int = DEFAULT_BATCH_FILES,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+    ):
+        self.providers = providers
+        self.dataset = dataset
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        # 0或1表示在当前进程中处理
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_files = max(1, batch_files)
+        self.checkpoint_every = max(1, checkpoint_every)
+
+    def _up_to_date(self, path: str) -> bool:
+        try:
+            stamp = file_stamp(path)
+        except OSError:
+            return False
+        for provider in self.providers:
+            document = provider.store.get_document(path)
+            if (
+                document is None
+                or document["dataset"] != self.dataset
+                or document.get("metadata", {}).get("file") != stamp
+            ):
+                return False
+        return True
+
+    def _prepared(self, batches: list[list[str]]) -> Iterator[list[tuple]]:
+        """Prepared batches in order, at most two per worker in flight."""
+        # 按顺序返回准备好的批次，每个工作进程最多有两个批次在处理中
+        encoders = [provider.encoder() for provider in self.providers]
+        if self.workers <= 1:
+            for batch in batches:
+                yield _prepare(batch, self.chunk_size, self.overlap, encoders)
+            return
+        # Spawned rather than forked, as the caller may be a threaded server
+        # 使用spawn而不是fork启动，因为调用方可能是多线程的服务器
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            pending: deque = deque()
+            queued = iter(batches)
+            for batch in queued:
+                pending.append(
+                    executor.submit(
+                        _prepare, batch, self.chunk_size, self.overlap, encoders
+                    )
+                )
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                results = pending.popleft().result()
+                batch = next(queued, None)
+                if batch is not None:
+                    pending.append(
+                        executor.submit(
+                            _prepare, batch, self.chunk_size, self.overlap, encoders
+                        )
+                    )
+                yield results
+
+    def _commit(self) -> None:
+        for provider in self.providers:
+            provider.commit()
+
+    def run(self, paths: Iterable[str]) -> dict:
+        """
+        Ingest the supported files under `paths`.
+
+        Documents are committed every `checkpoint_every` documents and at the
+        end; if the run fails, the documents since the last checkpoint are
+        rolled back and the next run starts from there.
+
+        Returns:
+            Counts of files found, ingested, skipped as unchanged and failed,
+            the chunks written, the elapsed seconds and the documents per second
+        """
+        # 导入`paths`下受支持的文件。每`checkpoint_every`个文档及结束时提交一次；
+        # 如果运行失败，回滚上一个检查点之后的文档，下一次运行从该处继续。
+        start = time.perf_counter()
+        files = find_files(paths)
+        todo = [path for path in files if not self._up_to_date(path)]
+        report = {
+            "files": len(files),
+            "ingested": 0,
+            "skipped": len(files) - len(todo),
+            "failed": 0,
+            "chunks": 0,
+        }
+        logger.info(
+            f"Ingesting {len(todo)} of {len(files)} files into dataset {self.dataset} "
+            f"with {self.workers} worker(s)"
+        )
+        batches = [
+            todo[i : i + self.batch_files]
+            for i in range(0, len(todo), self.batch_files)
+        ]
+        uncommitted = 0
+        try:
+            for results in self._prepared(batches):
+                for path, stamp, title, chunks, encoded, error in results:
+                    if error:
+                        report["failed"] += 1
+                        logger.warning(f"Failed to ingest {path}: {error}")
+                        continue
+                    for provider, data in zip(self.providers, encoded):
+                        provider.add_chunks(
+                            path,
+                            chunks,
+                            self.dataset,
+                            title,
+                            path,
+                            encoded=data,
+                            metadata={"file": stamp},
+                            commit=False,
+                        )
+                    report["ingested"] += 1
+                    report["chunks"] += len(chunks)
+                    uncommitted += 1
+                    if uncommitted >= self.checkpoint_every:
+                        self._commit()
+                        uncommitted = 0
+                        elapsed = time.perf_counter() - start
+                        logger.info(
+                            f"Ingested {report['ingested']}/{len(todo)} documents, "
+                            f"{report['ingested'] / elapsed:.1f} docs/s"
+                        )
+            self._commit()
+        except BaseException:
+            for provider in self.providers:
+                provider.rollback()
+            raise
+        report["seconds"] = time.perf_counter() - start
+        report["docs_per_second"] = (
+            report["ingested"] / report["seconds"] if report["seconds"] else 0.0
+        )
+        return report
+
+
+def ingest(
+    paths: Iterable[str],
+    dataset: str = DEFAULT_DATASET,
+    provider: Optional[str] = None,
+    **kwargs,
+) -> dict:
+    """
+    Ingest files and directories into the local stores of a RAG provider.
+
+    Args:
+        paths: Files and directories to ingest
+        dataset: Dataset the documents are added to
+        provider: `local`, `bm25` or `hybrid`; defaults to `RAG_PROVIDER`, or `local`
+        **kwargs: Further `Ingestor` settings
+
+    Returns:
+        The report of `Ingestor.run`
+    """
+    # 将文件和目录导入某个RAG提供者的本地存储
+    provider = provider or os.getenv("RAG_PROVIDER") or "local"
+    return Ingestor(local_providers(provider), dataset=dataset, **kwargs).run(paths)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Ingest files into the local RAG stores"
+    )
+    parser.add_argument("paths", nargs="+", help="Files and directories to ingest")
+    parser.add_argument(
+        "--dataset", default=DEFAULT_DATASET, help="Dataset the documents are added to"
+    )
+    parser.add_argument(
+        "--provider", help="local, bm25 or hybrid (default: RAG_PROVIDER, or local)"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Worker processes (default: CPU count, 0 for none)"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=800, help="Characters per chunk"
+    )
+    parser.add_argument(
+        "--overlap", type=int, default=100, help="Characters shared by adjacent chunks"
+    )
+    parser.add_argument(
+        "--batch-files",
+        type=int,
+        default=DEFAULT_BATCH_FILES,
+        help="Files per worker task",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        help="Documents between commits",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    report = ingest(
+        args.paths,
+        dataset=args.dataset,
+        provider=args.provider,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        batch_files=args.batch_files,
+        checkpoint_every=args.checkpoint_every,
+    )
+    print(
+        f"Ingested {report['ingested']} documents ({report['chunks']} chunks) in "
+        f"{report['seconds']:.1f}s, {report['docs_per_second']:.1f} docs/s; "
+        f"{report['skipped']} unchanged, {report['failed']} failed"
+    )
+    print(f"Resource: {dataset_uri(args.dataset)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Local embedded vector retriever.
+
+Chunks of ingested files are embedded on the CPU and stored in a `ChunkStore`
+directory, with the embeddings as one float32 matrix that is memory-mapped for
+search. Queries are answered by brute force, or once the store is large, by
+an IVF index (k-means centroids with inverted lists) that only scores the rows
+of the clusters closest to the query.
+"""
+
+# 本地嵌入式向量检索器。
+# 导入文件的块在CPU上生成嵌入并存储在`ChunkStore`目录中，嵌入是一个内存映射用于搜索的float32矩阵。
+# 查询通过暴力搜索回答；存储变大后，使用IVF索引（k-means质心加倒排列表），只对离查询最近的簇中的行打分。
+
+import logging
+import os
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from src.rag.embedding import HashingEmbedder
+from src.rag.store import (
+    DEFAULT_DATASET,
+    ChunkStore,
+    LocalStoreRetriever,
+    env_int,
+    top_k_indices,
+)
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_LOCAL_RAG_DIR = os.path.join("data", "local_rag")
+# Rows scored against the centroids at once 一次与质心比较的行数
+_ASSIGN_BATCH_ROWS = 65536
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), _ASSIGN_BATCH_ROWS):
+        block = np.asarray(data[start : start + _ASSIGN_BATCH_ROWS])
+        assignments[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(
+    data: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """
+    Spherical k-means: `nlist` unit-length centroids of the normalized rows of `data`.
+
+    Trained on a sample of at most 256 rows per centroid.
+    """
+    # 球面k-means：`data`中归一化行的`nlist`个单位长度质心，最多在每个质心256行的样本上训练
+    rng = np.random.default_rng(seed)
+    rows = len(data)
+    sample_size = min(rows, nlist * 256)
+    sample = np.asarray(data[np.sort(rng.choice(rows, sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids[filled] = sums
+        # Empty clusters restart from random rows
+        # 空簇从随机行重新开始
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[
+                rng.choice(sample_size, len(empty), replace=False)
+            ]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        np.divide(centroids, norms, out=centroids, where=norms > 0)
+    return centroids
+
+
+class LocalVectorStore(ChunkStore):
+    """Chunk store with a memory-mapped embedding matrix and an optional IVF index."""
+
+    # 带内存映射嵌入矩阵和可选IVF索引的块存储
+
+    def __init__(
+        self,
+        directory: str,
+        dim: int,
+        embedder_name: str = HashingEmbedder.name,
+        ivf_min_rows: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ):
+        self.dim = dim
+        self.embedder_name = embedder_name
+        self.ivf_min_rows = (
+            ivf_min_rows
+            if ivf_min_rows is not None
+            else env_int("LOCAL_RAG_IVF_MIN_ROWS", 50000)
+        )
+        self.nprobe = nprobe or env_int("LOCAL_RAG_NPROBE", 8)
+        super().__init__(directory)
+
+    # -- files ------------------------------------------------------------------
+
+    def _new_manifest(self) -> dict:
+        return {
+            **super()._new_manifest(),
+            "embedder": self.embedder_name,
+            "dim": self.dim,
+            "ivf": None,
+        }
+
+    def _check_manifest(self, manifest: dict) -> None:
+        if manifest["dim"] != self.dim or manifest["embedder"] != self.embedder_name:
+            raise ValueError(
+                f"Local RAG store {self.directory} was built with {manifest['embedder']} "
+                f"embeddings of dimension {manifest['dim']}"
+            )
+
+    def _row_files(self) -> dict[str, int]:
+        return {**super()._row_files(), "embeddings.f32": self.dim * 4}
+
+    def _map_files(self) -> None:
+        super()._map_files()
+        self._embeddings = self._memmap(
+            "embeddings.f32", np.float32, (self.rows, self.dim)
+        )
+        ivf = self._manifest["ivf"]
+        if ivf:
+            self._centroids = np.fromfile(
+                self._path("ivf_centroids.f32"), dtype=np.float32
+            ).reshape(ivf["nlist"], self.dim)
+            self._ivf_order = self._memmap("ivf_order.i32", np.int32, (ivf["rows"],))
+            self._ivf_offsets = np.fromfile(
+                self._path("ivf_offsets.i64"), dtype=np.int64
+            )
+        else:
+            self._centroids = None
+
+    # -- writes -----------------------------------------------------------------
+
+    def add_document(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        embeddings: np.ndarray,
+        dataset: str = DEFAULT_DATASET,
+        title: str = "",
+        source: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+    ) -> None:
+        """
+        Append a document's chunks and their embeddings, replacing an older version.
+
+        With `commit=False` the data is written but only becomes visible (and
+        durable) at the next `commit`, which lets a batch share one manifest write.
+        """
+        # 追加文档的块及其嵌入，替换旧版本。
+        # `commit=False`时数据已写入，但直到下一次`commit`才可见（且持久），因此一批文档可以共享一次清单写入。
+        if len(chunks) != len(embeddings):
+            raise ValueError("Every chunk needs one embedding")
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embeddings must have shape (n, {self.dim})")
+        with self._lock:
+            self._append_document(
+                doc_id,
+                chunks,
+                {"embeddings.f32": embeddings.tobytes()},
+                dataset,
+                title,
+                source,
+                metadata,
+            )
+            if commit:
+                self.commit()
+
+    def _after_commit(self) -> None:
+        # Rebuild the IVF index when it has fallen behind
+        # 当IVF索引落后太多时重建索引
+        ivf_rows = (self._manifest["ivf"] or {}).get("rows", 0)
+        if self.rows >= self.ivf_min_rows and self.rows - ivf_rows > self.rows // 4:
+            self.build_index()
+
+    def build_index(self, nlist: Optional[int] = None) -> None:
+        """Train IVF centroids over all rows and write the inverted lists."""
+        # 在所有行上训练IVF质心并写出倒排列表
+        with self._lock:
+            rows = self.rows
+            if rows == 0:
+                return
+            nlist = min(rows, nlist or max(1, min(4096, int(np.sqrt(rows)))))
+            logger.info(f"Building IVF index with {nlist} lists over {rows} rows")
+            centroids = train_centroids(self._embeddings, nlist)
+            assignments = _assign(self._embeddings, centroids)
+            order = np.argsort(assignments, kind="stable").astype(np.int32)
+            offsets = np.concatenate(
+                ([0], np.cumsum(np.bincount(assignments, minlength=nlist)))
+            ).astype(np.int64)
+            centroids.astype(np.float32).tofile(self._path("ivf_centroids.f32"))
+            order.tofile(self._path("ivf_order.i32"))
+            offsets.tofile(self._path("ivf_offsets.i64"))
+            self._manifest["ivf"] = {"nlist": nlist, "rows": rows}
+            self._write_manifest()
+            self._map_files()
+
+    # -- reads ------------------------------------------------------------------
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        """Rows of the clusters closest to the query plus rows added after the index; None means all."""
+        # 离查询最近的簇中的行，加上建立索引之后添加的行；None表示全部行
+        if self._centroids is None or nprobe >= len(self._centroids):
+            return None
+        probes = top_k_indices(self._centroids @ query, nprobe)
+        lists = [
+            self._ivf_order[self._ivf_offsets[c] : self._ivf_offsets[c + 1]]
+            for c in probes
+        ]
+        indexed = self._manifest["ivf"]["rows"]
+        lists.append(np.arange(indexed, self.rows, dtype=np.int32))
+        return np.concatenate(lists)
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        allowed: Optional[Iterable[int]] = None,
+        exact: bool = False,
+    ) -> list[tuple[int, float]]:
+        """
+        Return `(row, score)` of the best chunks for a normalized query vector.
+
+        Args:
+            query: Query embedding of shape `(dim,)`
+            top_k: Number of chunks to return
+            allowed: Document ordinals to search; all when None
+            exact: Score every row even when an IVF index exists
+        """
+        # 返回与归一化查询向量最匹配的块的`(row, score)`
+        embeddings, row_docs = self._embeddings, self._row_docs
+        if not len(embeddings):
+            return []
+        mask = self.document_mask(allowed)
+
+        candidates = None if exact else self._candidates(query, self.nprobe)
+        if candidates is None:
+            scores = np.asarray(embeddings @ query)
+            scores[~mask[row_docs]] = -np.inf
+            rows = top_k_indices(scores, top_k)
+            return [
+                (int(row), float(scores[row]))
+                for row in rows
+                if np.isfinite(scores[row])
+            ]
+        candidates = np.sort(candidates[mask[row_docs[candidates]]])
+        scores = np.asarray(embeddings[candidates] @ query)
+        best = top_k_indices(scores, top_k)
+        return [(int(candidates[i]), float(scores[i])) for i in best]
+
+
+class LocalVectorProvider(LocalStoreRetriever):
+    """
+    Retriever over a local vector store, selected with `RAG_PROVIDER=local`.
+
+    Settings default to environment variables: `LOCAL_RAG_DIR` (store
+    directory, default `data/local_rag`), `LOCAL_RAG_TOP_K` (chunks per query),
+    `LOCAL_RAG_EMBEDDING_DIM`, `LOCAL_RAG_IVF_MIN_ROWS` (rows before an IVF
+    index is built) and `LOCAL_RAG_NPROBE` (IVF lists scored per query).
+    """
+
+    # 基于本地向量存储的检索器，通过`RAG_PROVIDER=local`选择。设置默认从上述环境变量读取。
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        top_k: Optional[int] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        ivf_min_rows: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ):
+        self.embedder = embedder or HashingEmbedder(
+            env_int("LOCAL_RAG_EMBEDDING_DIM", 1024)
+        )
+        self.top_k = top_k or env_int("LOCAL_RAG_TOP_K", 10)
+        self.store = LocalVectorStore(
+            directory or os.getenv("LOCAL_RAG_DIR", DEFAULT_LOCAL_RAG_DIR),
+            self.embedder.dim,
+            self.embedder.name,
+            ivf_min_rows=ivf_min_rows,
+            nprobe=nprobe,
+        )
+
+    def _add_chunks(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        dataset: str,
+        title: str,
+        source: Optional[str],
+        encoded: Optional[np.ndarray] = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+    ) -> None:
+        self.store.add_document(
+            doc_id,
+            chunks,
+            encoded if encoded is not None else self.embedder.embed(chunks),
+            dataset=dataset,
+            title=title,
+            source=source,
+            metadata=metadata,
+            commit=commit,
+        )
+
+    def encoder(self) -> Callable[[list[str]], np.ndarray]:
+        return self.embedder.embed
+
+    def _search(
+        self, query: str, allowed: Optional[list[int]]
+    ) -> list[tuple[int, float]]:
+        return self.store.search(self.embedder.embed([query])[0], self.top_k, allowed)
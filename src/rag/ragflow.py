@@ -1,17 +1,85 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import logging
 import os
+import threading
+import time
+import weakref
+from typing import Callable
+from urllib.parse import urlparse
+
+import httpx
 import requests
+
 from src.rag.retriever import Chunk, Document, Resource, Retriever
-from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_TIMEOUT = 30.0  # Seconds per request 每个请求的秒数
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_MAX_CONNECTIONS = 20
+RETRY_STATUS_CODES = {429, 502, 503, 504}  # Transient errors worth retrying 值得重试的临时错误
+RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubled for each later one 第一次重试前的秒数，之后每次翻倍
+
+
+def _env_number(name: str, default, cast: Callable = float):
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return cast(env_value_str)
+    except ValueError:
+        logger.warning(f"{name} value '{env_value_str}' is not a number. Using default value {default}.")
+        return default
+
+
+# One pooled async client per event loop, shared by all provider instances,
+# as a provider is built for every retriever tool
+# 每个事件循环一个共享的连接池异步客户端，由所有提供者实例共用，因为每个检索工具都会新建一个提供者
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_clients_lock = threading.Lock()
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            max_connections = _env_number("RAGFLOW_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, int)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+async def close_async_clients() -> None:
+    """Close the pooled RAGFlow client of the running event loop."""
+    # 关闭当前事件循环的RAGFlow连接池客户端
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
 
 class RAGFlowProvider(Retriever):
     """
     RAGFlowProvider is a provider that uses RAGFlow to retrieve documents.
+
+    Requests time out after `RAGFLOW_TIMEOUT` seconds (default 30), and
+    connection errors, timeouts and 429/502/503/504 responses are retried up
+    to `RAGFLOW_MAX_RETRIES` times (default 2) with exponential backoff. The
+    async methods share a keep-alive connection pool of up to
+    `RAGFLOW_MAX_CONNECTIONS` connections (default 20).
     """
-    # RAGFlowProvider是使用RAGFlow检索文档的提供者
+    # RAGFlowProvider是使用RAGFlow检索文档的提供者。
+    # 请求在`RAGFLOW_TIMEOUT`秒（默认30）后超时；连接错误、超时以及429/502/503/504响应最多重试
+    # `RAGFLOW_MAX_RETRIES`次（默认2），并采用指数退避。异步方法共用一个最多`RAGFLOW_MAX_CONNECTIONS`个连接（默认20）的长连接池。
 
     api_url: str  # API URL
     api_key: str  # API密钥
@@ -20,7 +88,7 @@ class RAGFlowProvider(Retriever):
     def __init__(self):
         """
         初始化RAGFlow提供者
-        
+
         从环境变量中获取必要的配置信息
         """
         api_url = os.getenv("RAGFLOW_API_URL")
@@ -37,24 +105,55 @@ class RAGFlowProvider(Retriever):
         if page_size:
             self.page_size = int(page_size)
 
-    def query_relevant_documents(
-        self, query: str, resources: list[Resource] = []
-    ) -> list[Document]:
-        """
-        查询与给定查询相关的文档
-        
-        参数:
-            query: 查询字符串
-            resources: 资源列表
-            
-        返回:
-            相关文档列表
-        """
-        headers = {
+        self.timeout = _env_number("RAGFLOW_TIMEOUT", DEFAULT_TIMEOUT)  # 请求超时秒数
+        self.max_retries = max(0, _env_number("RAGFLOW_MAX_RETRIES", DEFAULT_MAX_RETRIES, int))  # 最大重试次数
+        self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
-        }
+        }  # 请求头，只构建一次
 
+    # -- transport --------------------------------------------------------------
+
+    def _send(self, send: Callable, url: str, **kwargs):
+        """Send a request with `requests`, retrying transient failures."""
+        # 使用`requests`发送请求，并重试临时性失败
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = send(url, headers=self.headers, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last:
+                    raise
+                logger.warning(f"RAGFlow request to {url} failed ({e}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last:
+                    return response
+                logger.warning(f"RAGFlow request to {url} returned {response.status_code}, retrying")
+            time.sleep(RETRY_BACKOFF * 2**attempt)
+
+    async def _asend(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request on the pooled async client, retrying transient failures."""
+        # 在连接池异步客户端上发送请求，并重试临时性失败
+        client = _get_async_client()
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = await client.request(
+                    method, url, headers=self.headers, timeout=self.timeout, **kwargs
+                )
+            except httpx.TransportError as e:
+                if last:
+                    raise
+                logger.warning(f"RAGFlow request to {url} failed ({e!r}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last:
+                    return response
+                logger.warning(f"RAGFlow request to {url} returned {response.status_code}, retrying")
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+
+    # -- requests and responses ------------------------------------------------
+
+    def _retrieval_payload(self, query: str, resources: list[Resource]) -> dict:
         dataset_ids: list[str] = []  # 数据集ID列表
         document_ids: list[str] = []  # 文档ID列表
 
@@ -64,22 +163,21 @@ class RAGFlowProvider(Retriever):
             if document_id:
                 document_ids.append(document_id)
 
-        payload = {
+        return {
             "question": query,  # 问题/查询
             "dataset_ids": dataset_ids,  # 数据集ID
             "document_ids": document_ids,  # 文档ID
             "page_size": self.page_size,  # 页面大小
         }
 
-        response = requests.post(
-            f"{self.api_url}/api/v1/retrieval", headers=headers, json=payload
-        )  # 发送POST请求
-
+    @staticmethod
+    def _parse_documents(response) -> list[Document]:
+        # `response` is a `requests` or `httpx` response; both have the same interface here
+        # `response`是`requests`或`httpx`的响应，两者在这里接口相同
         if response.status_code != 200:
             raise Exception(f"Failed to query documents: {response.text}")  # 查询文档失败
 
-        result = response.json()
-        data = result.get("data", {})
+        data = response.json().get("data", {})
         doc_aggs = data.get("doc_aggs", [])
         docs: dict[str, Document] = {
             doc.get("doc_id"): Document(
@@ -102,53 +200,92 @@ class RAGFlowProvider(Retriever):
 
         return list(docs.values())  # 返回文档列表
 
+    @staticmethod
+    def _parse_resources(response) -> list[Resource]:
+        if response.status_code != 200:
+            raise Exception(f"Failed to list resources: {response.text}")  # 列出资源失败
+
+        resources = []
+        for item in response.json().get("data", []):
+            item = Resource(
+                uri=f"rag://dataset/{item.get('id')}",  # 资源URI
+                title=item.get("name", ""),  # 资源标题
+                description=item.get("description", ""),  # 资源描述
+            )
+            resources.append(item)
+
+        return resources  # 返回资源列表
+
+    # -- retriever interface ----------------------------------------------------
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """
+        查询与给定查询相关的文档
+
+        参数:
+            query: 查询字符串
+            resources: 资源列表
+
+        返回:
+            相关文档列表
+        """
+        response = self._send(
+            requests.post,
+            f"{self.api_url}/api/v1/retrieval",
+            json=self._retrieval_payload(query, resources),
+        )  # 发送POST请求
+        return self._parse_documents(response)
+
+    async def aquery_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """
+        异步查询与给定查询相关的文档，使用共享的连接池
+        """
+        response = await self._asend(
+            "POST",
+            f"{self.api_url}/api/v1/retrieval",
+            json=self._retrieval_payload(query, resources),
+        )
+        return self._parse_documents(response)
+
     def list_resources(self, query: str | None = None) -> list[Resource]:
         """
         列出可用的资源
-        
+
         参数:
             query: 可选的查询字符串，用于过滤资源
-            
+
         返回:
             资源列表
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-
         params = {}
         if query:
             params["name"] = query  # 如果有查询，添加到参数中
 
-        response = requests.get(
-            f"{self.api_url}/api/v1/datasets", headers=headers, params=params
+        response = self._send(
+            requests.get, f"{self.api_url}/api/v1/datasets", params=params
         )  # 发送GET请求
+        return self._parse_resources(response)
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to list resources: {response.text}")  # 列出资源失败
-
-        result = response.json()
-        resources = []
-
-        for item in result.get("data", []):
-            item = Resource(
-                uri=f"rag://dataset/{item.get('id')}",  # 资源URI
-                title=item.get("name", ""),  # 资源标题
-                description=item.get("description", ""),  # 资源描述
-            )
-            resources.append(item)
-
-        return resources  # 返回资源列表
+    async def alist_resources(self, query: str | None = None) -> list[Resource]:
+        """
+        异步列出可用的资源，使用共享的连接池
+        """
+        params = {"name": query} if query else {}
+        response = await self._asend("GET", f"{self.api_url}/api/v1/datasets", params=params)
+        return self._parse_resources(response)
 
 
 def parse_uri(uri: str) -> tuple[str, str]:
     """
     解析RAG URI
-    
+
     参数:
         uri: RAG URI字符串
-        
+
     返回:
         (数据集ID, 文档ID)元组
     """
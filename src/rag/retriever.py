@@ -2,11 +2,20 @@
 # SPDX-License-Identifier: MIT
 
 import abc
+import asyncio
+import math
+from array import array
+from collections.abc import Iterable, Iterator, MutableSequence
+from typing import Hashable
+
 from pydantic import BaseModel, Field
 
 
 class Chunk:
     """文档块类，表示文档的一个片段"""
+
+    __slots__ = ("content", "similarity")
+
     content: str  # 内容
     similarity: float  # 相似度
 
@@ -21,6 +30,140 @@ class Chunk:
         self.content = content
         self.similarity = similarity
 
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Chunk):
+            return NotImplemented
+        return self.content == other.content and self.similarity == other.similarity
+
+    def __hash__(self) -> int:
+        return hash((self.content, self.similarity))
+
+    def __repr__(self) -> str:
+        return f"Chunk(content={self.content!r}, similarity={self.similarity!r})"
+
+
+CHUNK_SEPARATOR = "\n\n"  # Separator of the chunk contents in a document's content 文档内容中块内容之间的分隔符
+
+
+class ChunkList(MutableSequence):
+    """
+    The chunks of a document, stored in flat buffers instead of one object per chunk.
+
+    Contents are kept joined by `CHUNK_SEPARATOR` in a single string with an
+    array of end offsets, and similarities in a float array (NaN stands for
+    None). Appended contents are joined lazily on the next read, and the
+    joined string is the document's content, so `Document.to_dict` does not
+    build a new one. Items are materialized as `Chunk` objects on access;
+    changing such a chunk does not change the list.
+    """
+    # 文档的块，存储在扁平缓冲区中，而不是每个块一个对象。
+    # 内容以`CHUNK_SEPARATOR`连接保存在单个字符串中，并附带结束偏移数组；相似度保存在浮点数组中（NaN表示None）。
+    # 追加的内容在下一次读取时才被连接，连接后的字符串就是文档的内容，因此`Document.to_dict`无需构建新的字符串。
+    # 访问元素时才实例化为`Chunk`对象；修改该对象不会改变列表。
+
+    __slots__ = ("_text", "_pending", "_ends", "_similarities")
+
+    def __init__(self, chunks: Iterable[Chunk] = ()):
+        if isinstance(chunks, ChunkList):
+            chunks._compact()
+            self._text = chunks._text
+            self._pending: list[str] = []
+            self._ends = array("q", chunks._ends)
+            self._similarities = array("d", chunks._similarities)
+            return
+        self._text = ""  # 已连接的块内容
+        self._pending = []  # 尚未连接的追加内容
+        self._ends = array("q")  # 每个块内容在连接字符串中的结束偏移
+        self._similarities = array("d")  # 每个块的相似度
+        for chunk in chunks:
+            self.append(chunk)
+
+    def _compact(self) -> None:
+        if self._pending:
+            if len(self._ends) > len(self._pending):
+                self._pending.insert(0, self._text)
+            self._text = CHUNK_SEPARATOR.join(self._pending)
+            self._pending = []
+
+    def _bounds(self, index: int) -> tuple[int, int]:
+        start = self._ends[index - 1] + len(CHUNK_SEPARATOR) if index else 0
+        return start, self._ends[index]
+
+    def _chunk(self, index: int) -> Chunk:
+        start, end = self._bounds(index)
+        similarity = self._similarities[index]
+        return Chunk(self._text[start:end], None if math.isnan(similarity) else similarity)
+
+    def joined(self) -> str:
+        """Return the contents of all chunks joined by `CHUNK_SEPARATOR`."""
+        # 返回以`CHUNK_SEPARATOR`连接的所有块内容
+        self._compact()
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        self._compact()
+        if isinstance(index, slice):
+            return [self._chunk(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._chunk(index)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        self._compact()
+        for index in range(len(self)):
+            yield self._chunk(index)
+
+    def append(self, chunk: Chunk) -> None:
+        end = self._ends[-1] + len(CHUNK_SEPARATOR) if self._ends else 0
+        self._pending.append(chunk.content)
+        self._ends.append(end + len(chunk.content))
+        self._similarities.append(float("nan") if chunk.similarity is None else chunk.similarity)
+
+    def _replace(self, chunks: list[Chunk]) -> None:
+        # Rare in-place edits rebuild the buffers 少见的原地修改会重建缓冲区
+        self._text = ""
+        self._pending = []
+        self._ends = array("q")
+        self._similarities = array("d")
+        for chunk in chunks:
+            self.append(chunk)
+
+    def __setitem__(self, index, value) -> None:
+        chunks = list(self)
+        chunks[index] = value
+        self._replace(chunks)
+
+    def __delitem__(self, index) -> None:
+        chunks = list(self)
+        del chunks[index]
+        self._replace(chunks)
+
+    def insert(self, index: int, value: Chunk) -> None:
+        if index >= len(self):
+            self.append(value)
+            return
+        chunks = list(self)
+        chunks.insert(index, value)
+        self._replace(chunks)
+
+    def reverse(self) -> None:
+        self._replace(list(self)[::-1])
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (ChunkList, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ChunkList({list(self)!r})"
+
 
 class Document:
     """
@@ -28,17 +171,18 @@ class Document:
     """
     # 文档类，表示一个文档
 
+    __slots__ = ("id", "url", "title", "_chunks")
+
     id: str  # 文档ID
-    url: str | None = None  # 文档URL
-    title: str | None = None  # 文档标题
-    chunks: list[Chunk] = []  # 文档块列表
+    url: str | None  # 文档URL
+    title: str | None  # 文档标题
 
     def __init__(
         self,
         id: str,
         url: str | None = None,
         title: str | None = None,
-        chunks: list[Chunk] = [],
+        chunks: Iterable[Chunk] | None = None,
     ):
         """
         初始化文档
@@ -47,12 +191,26 @@ class Document:
             id: 文档ID
             url: 文档URL
             title: 文档标题
-            chunks: 文档块列表
+            chunks: 文档块，复制到文档自己的`ChunkList`中
         """
         self.id = id
         self.url = url
         self.title = title
-        self.chunks = chunks
+        self.chunks = chunks or ()
+
+    @property
+    def chunks(self) -> ChunkList:
+        """文档块列表"""
+        return self._chunks
+
+    @chunks.setter
+    def chunks(self, chunks: Iterable[Chunk]) -> None:
+        self._chunks = ChunkList(chunks)
+
+    @property
+    def content(self) -> str:
+        """所有块内容以空行连接后的文本，只在块变化后的第一次访问时构建"""
+        return self._chunks.joined()
 
     def to_dict(self) -> dict:
         """
@@ -63,7 +221,7 @@ class Document:
         """
         d = {
             "id": self.id,
-            "content": "\n\n".join([chunk.content for chunk in self.chunks]),  # 合并所有块的内容
+            "content": self.content,  # 合并所有块的内容
         }
         if self.url:
             d["url"] = self.url
@@ -106,3 +264,31 @@ class Retriever(abc.ABC):
         """
         # 从资源中查询相关文档
         pass
+
+    def cache_version(self) -> Hashable | None:
+        """
+        A token that changes whenever the provider's data changes, or None if unknown.
+
+        Result caches drop entries stored under another version; providers
+        returning None are only expired by time.
+        """
+        # 每当提供者的数据变化时就会改变的令牌，未知时为None。
+        # 结果缓存会丢弃在其他版本下存储的条目；返回None的提供者只按时间过期。
+        return None
+
+    async def alist_resources(self, query: str | None = None) -> list[Resource]:
+        """
+        Async version of `list_resources`.
+
+        Providers without native async I/O run the sync method in a worker
+        thread, so the event loop is never blocked.
+        """
+        # `list_resources`的异步版本。没有原生异步I/O的提供者在工作线程中运行同步方法，因此不会阻塞事件循环
+        return await asyncio.to_thread(self.list_resources, query)
+
+    async def aquery_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """Async version of `query_relevant_documents`, see `alist_resources`."""
+        # `query_relevant_documents`的异步版本，参见`alist_resources`
+        return await asyncio.to_thread(self.query_relevant_documents, query, resources)
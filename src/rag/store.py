@@ -0,0 +1,507 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+On-disk chunk storage shared by the local retrievers.
+
+A store is a directory holding the chunk texts as one UTF-8 blob with an
+offset array, the document of every chunk row, any per-row files of the
+retriever (embeddings, lengths) and a JSON manifest of the documents. Data
+files are appended first and the manifest is replaced atomically afterwards,
+so an interrupted write leaves the store at its previous state.
+"""
+
+# 本地检索器共用的磁盘块存储。
+# 存储是一个目录，保存：块文本（一个带偏移数组的UTF-8数据块）、每个块行所属的文档、
+# 检索器自己的按行文件（嵌入、长度），以及一个记录文档的JSON清单。
+# 先追加数据文件，再原子地替换清单，因此中断的写入会让存储保持之前的状态。
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from src.rag.ragflow import parse_uri
+from src.rag.retriever import Chunk, Document, Resource, Retriever
+from src.rag.text import chunk_text, load_text
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_DATASET = "default"
+MANIFEST = "manifest.json"
+
+
+def env_int(name: str, default: int) -> int:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return int(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not an integer. Using default value {default}."
+        )
+        return default
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    # 最高的`k`个分数的下标，按分数从高到低排列
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def dataset_uri(dataset: str, doc_id: Optional[str] = None) -> str:
+    """`rag://` URI of a local dataset, or of one document in it."""
+    # 本地数据集或其中某个文档的`rag://` URI
+    uri = f"rag://dataset/{quote(dataset, safe='')}"
+    return f"{uri}#{quote(doc_id, safe='')}" if doc_id else uri
+
+
+class ChunkStore:
+    """
+    Append-only store of document chunks.
+
+    Documents are deleted by marking them in the manifest; their rows stay in
+    the files but are never returned. Re-adding a document ID replaces it.
+    Subclasses declare their per-row files in `_row_files` and extend
+    `_new_manifest`, `_map_files`, `_flush` and `_after_commit`.
+    """
+
+    # 只追加的文档块存储。
+    # 删除文档只在清单中标记；其行仍保留在文件中，但永远不会被返回。重新添加同一文档ID会替换它。
+    # 子类在`_row_files`中声明自己的按行文件，并扩展`_new_manifest`、`_map_files`、`_flush`和`_after_commit`。
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._manifest_stamp: Optional[tuple] = None
+        self._dirty = False  # Rows written but not committed 已写入但未提交的行
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # -- files ------------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _new_manifest(self) -> dict:
+        return {"version": 1, "rows": 0, "text_bytes": 0, "documents": []}
+
+    def _check_manifest(self, manifest: dict) -> None:
+        """Raise ValueError if the store on disk is incompatible with this instance."""
+        # 如果磁盘上的存储与本实例不兼容，抛出ValueError
+
+    def _row_files(self) -> dict[str, int]:
+        """Files with one fixed-size record per chunk row, and their record sizes in bytes."""
+        # 每个块行对应一条定长记录的文件，以及记录的字节大小
+        return {"row_docs.i32": 4, "chunk_ends.i64": 8}
+
+    def _load(self) -> None:
+        path = self._path(MANIFEST)
+        if os.path.exists(path):
+            # Stamped before reading, so a commit racing with the read is reloaded later
+            # 在读取之前记录标识，因此与读取竞争的提交会在之后被重新加载
+            self._manifest_stamp = self.version()
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self._check_manifest(manifest)
+        else:
+            manifest = self._new_manifest()
+        self._manifest = manifest
+        self._documents: list[dict] = manifest["documents"]
+        self._by_id = {
+            doc["id"]: i for i, doc in enumerate(self._documents) if not doc["deleted"]
+        }
+        self._map_files()
+
+    def _truncate_files(self) -> None:
+        # Drop data appended by a write whose manifest was never committed; only
+        # done before writing, as readers may see a writer's uncommitted rows
+        # 丢弃清单未提交的写入所追加的数据；只在写入前执行，因为读取方可能看到写入方尚未提交的行
+        rows = self._manifest["rows"]
+        sizes = {name: rows * size for name, size in self._row_files().items()}
+        sizes["chunks.txt"] = self._manifest["text_bytes"]
+        for name, size in sizes.items():
+            path = self._path(name)
+            with open(path, "ab") as f:
+                if f.tell() != size:
+                    f.truncate(size)
+
+    def _memmap(self, name: str, dtype, shape) -> np.ndarray:
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=shape)
+
+    def _map_files(self) -> None:
+        rows = self._manifest["rows"]
+        self._row_docs = self._memmap("row_docs.i32", np.int32, (rows,))
+        self._chunk_ends = self._memmap("chunk_ends.i64", np.int64, (rows,))
+        self._text = self._memmap(
+            "chunks.txt", np.uint8, (self._manifest["text_bytes"],)
+        )
+
+    def _write_manifest(self) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".manifest-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # `json.dumps` uses the C encoder, `json.dump` the much slower pure Python one
+            # `json.dumps`使用C编码器，而`json.dump`使用慢得多的纯Python编码器
+            f.write(json.dumps(self._manifest, ensure_ascii=False))
+        os.replace(temp_path, self._path(MANIFEST))
+        self._manifest_stamp = self.version()
+
+    def refresh(self) -> None:
+        """Reload the store if another process committed changes."""
+        # 如果其他进程提交了更改，重新加载存储
+        if self._dirty:
+            # Reloading would drop this instance's uncommitted documents
+            # 重新加载会丢失本实例尚未提交的文档
+            return
+        stamp = self.version()
+        if stamp is not None and stamp != self._manifest_stamp:
+            with self._lock:
+                self._load()
+
+    def version(self) -> Optional[tuple]:
+        """
+        Identity of the manifest on disk, which changes with every commit of any process.
+
+        Each commit replaces the manifest with a new file, so the inode changes
+        even when two commits fall within the file system's timestamp resolution.
+        """
+        # 磁盘上清单的标识，任何进程的每次提交都会改变它。
+        # 每次提交都会用新文件替换清单，因此即使两次提交落在文件系统时间戳精度之内，inode也会改变。
+        try:
+            stat = os.stat(self._path(MANIFEST))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    # -- writes -----------------------------------------------------------------
+
+    @property
+    def rows(self) -> int:
+        return self._manifest["rows"]
+
+    def live_documents(self) -> list[tuple[int, dict]]:
+        """`(ordinal, manifest entry)` of the documents that are not deleted."""
+        # 未被删除的文档的`(序号, 清单条目)`
+        return [(i, self._documents[i]) for i in self._by_id.values()]
+
+    def get_document(self, doc_id: str) -> Optional[dict]:
+        index = self._by_id.get(doc_id)
+        return None if index is None else self._documents[index]
+
+    def _append_document(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        row_data: dict[str, bytes],
+        dataset: str,
+        title: str,
+        source: Optional[str],
+        metadata: Optional[dict],
+        fields: Optional[dict] = None,
+    ) -> int:
+        """
+        Append a document's chunks and the records of the subclass's row files.
+
+        Must be called with the lock held; returns the first row of the document.
+        """
+        # 追加文档的块以及子类按行文件的记录。必须在持有锁时调用，返回文档的第一行
+        if not self._dirty:
+            self.refresh()
+            self._truncate_files()
+            self._dirty = True
+        self._delete_locked(doc_id)
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        ordinal = len(self._documents)
+        start = self._manifest["rows"]
+        ends = self._manifest["text_bytes"] + np.cumsum(
+            [len(data) for data in encoded], dtype=np.int64
+        )
+        for name, data in row_data.items():
+            with open(self._path(name), "ab") as f:
+                f.write(data)
+        with open(self._path("row_docs.i32"), "ab") as f:
+            f.write(np.full(len(chunks), ordinal, dtype=np.int32).tobytes())
+        with open(self._path("chunk_ends.i64"), "ab") as f:
+            f.write(ends.tobytes())
+        with open(self._path("chunks.txt"), "ab") as f:
+            f.write(b"".join(encoded))
+        self._documents.append(
+            {
+                "id": doc_id,
+                "dataset": dataset,
+                "title": title,
+                "source": source,
+                "start": start,
+                "end": start + len(chunks),
+                "deleted": False,
+                **(fields or {}),
+                **({"metadata": metadata} if metadata else {}),
+            }
+        )
+        self._by_id[doc_id] = ordinal
+        self._manifest["rows"] = start + len(chunks)
+        if len(chunks):
+            self._manifest["text_bytes"] = int(ends[-1])
+        return start
+
+    def _delete_locked(self, doc_id: str) -> bool:
+        index = self._by_id.pop(doc_id, None)
+        if index is None:
+            return False
+        self._documents[index]["deleted"] = True
+        return True
+
+    def delete_document(self, doc_id: str) -> bool:
+        """Hide a document from search; returns whether it existed."""
+        # 在搜索中隐藏文档，返回该文档是否存在
+        with self._lock:
+            if not self._dirty:
+                self.refresh()
+            deleted = self._delete_locked(doc_id)
+            if deleted:
+                self.commit()
+            return deleted
+
+    def commit(self) -> None:
+        """Make written documents visible."""
+        # 使已写入的文档可见
+        with self._lock:
+            self._flush()
+            self._dirty = False
+            self._write_manifest()
+            self._map_files()
+            self._after_commit()
+
+    def rollback(self) -> None:
+        """Discard the documents written since the last commit."""
+        # 丢弃自上次提交以来写入的文档
+        with self._lock:
+            self._dirty = False
+            self._load()
+
+    def _flush(self) -> None:
+        """Write the subclass's pending data before the manifest is replaced."""
+        # 在替换清单之前写出子类待写入的数据
+
+    def _after_commit(self) -> None:
+        """Maintenance run after each commit, such as rebuilding an index."""
+        # 每次提交后运行的维护操作，例如重建索引
+
+    # -- reads ------------------------------------------------------------------
+
+    def chunk_text(self, row: int) -> str:
+        end = int(self._chunk_ends[row])
+        start = int(self._chunk_ends[row - 1]) if row else 0
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def document_mask(self, allowed: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Boolean array over document ordinals: the allowed ones, or all live ones when None."""
+        # 按文档序号的布尔数组：允许的文档，为None时为所有未删除的文档
+        mask = np.zeros(len(self._documents), dtype=bool)
+        mask[list(allowed) if allowed is not None else list(self._by_id.values())] = (
+            True
+        )
+        return mask
+
+    def document_ordinal(self, row: int) -> int:
+        return int(self._row_docs[row])
+
+    def document_at(self, ordinal: int) -> dict:
+        return self._documents[ordinal]
+
+    def datasets(self) -> dict[str, int]:
+        """Number of documents per dataset."""
+        # 每个数据集的文档数量
+        counts: dict[str, int] = {}
+        for _, doc in self.live_documents():
+            counts[doc["dataset"]] = counts.get(doc["dataset"], 0) + 1
+        return counts
+
+
+class LocalStoreRetriever(Retriever):
+    """
+    Retriever over a `ChunkStore`, listing its datasets as `rag://dataset/<name>` resources.
+
+    A `#<document id>` fragment in a resource URI restricts a query to one
+    document. Subclasses set `self.store` and implement `_add_chunks` and `_search`.
+    """
+
+    # 基于`ChunkStore`的检索器，将数据集以`rag://dataset/<name>`资源列出。
+    # 资源URI中的`#<document id>`片段将查询限制在一个文档中。子类设置`self.store`并实现`_add_chunks`和`_search`。
+
+    store: ChunkStore
+    top_k: int
+
+    def _add_chunks(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        dataset: str,
+        title: str,
+        source: Optional[str],
+        encoded: Any = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+    ) -> None:
+        raise NotImplementedError
+
+    def encoder(self) -> Callable[[list[str]], Any]:
+        """
+        Picklable function computing the per-chunk data of `add_chunks` (embeddings, term counts).
+
+        Ingestion runs it in worker processes and passes the result as `encoded`.
+        """
+        # 计算`add_chunks`所需的按块数据（嵌入、词频）的可序列化函数。导入时在工作进程中运行，并将结果作为`encoded`传入
+        raise NotImplementedError
+
+    def _search(
+        self, query: str, allowed: Optional[list[int]]
+    ) -> list[tuple[int, float]]:
+        """Return `(row, score)` of the best chunks for the query, best first."""
+        # 返回与查询最匹配的块的`(row, score)`，按分数从高到低排列
+        raise NotImplementedError
+
+    def add_text(
+        self,
+        doc_id: str,
+        text: str,
+        dataset: str = DEFAULT_DATASET,
+        title: str = "",
+        source: Optional[str] = None,
+    ) -> int:
+        """Chunk, index and store a text; returns the number of chunks."""
+        # 对文本分块、建立索引并存储，返回块的数量
+        chunks = chunk_text(text)
+        self.add_chunks(doc_id, chunks, dataset, title, source)
+        return len(chunks)
+
+    def add_chunks(
+        self,
+        doc_id: str,
+        chunks: list[str],
+        dataset: str = DEFAULT_DATASET,
+        title: str = "",
+        source: Optional[str] = None,
+        encoded: Any = None,
+        metadata: Optional[dict] = None,
+        commit: bool = True,
+    ) -> None:
+        """
+        Store already chunked text, replacing an older version of the document.
+
+        Args:
+            encoded: Result of `encoder()(chunks)` if already computed
+            metadata: JSON-serializable data kept with the document
+            commit: Publish the document now; otherwise at the next `commit`
+        """
+        # 存储已分块的文本，替换文档的旧版本
+        self._add_chunks(
+            doc_id, chunks, dataset, title, source, encoded, metadata, commit
+        )
+
+    def commit(self) -> None:
+        """Publish the documents added with `commit=False`."""
+        # 发布以`commit=False`添加的文档
+        self.store.commit()
+
+    def rollback(self) -> None:
+        """Discard the documents added with `commit=False` since the last commit."""
+        # 丢弃自上次提交以来以`commit=False`添加的文档
+        self.store.rollback()
+
+    def add_file(
+        self, path: str, dataset: str = DEFAULT_DATASET, doc_id: Optional[str] = None
+    ) -> int:
+        """Ingest a markdown, text or PDF file; the document ID defaults to its absolute path."""
+        # 导入markdown、文本或PDF文件；文档ID默认为其绝对路径
+        title, text = load_text(path)
+        path = os.path.abspath(path)
+        return self.add_text(
+            doc_id or path, text, dataset=dataset, title=title, source=path
+        )
+
+    def delete_document(self, doc_id: str) -> bool:
+        return self.store.delete_document(doc_id)
+
+    def cache_version(self):
+        return self.store.version()
+
+    def list_resources(self, query: str | None = None) -> list[Resource]:
+        """
+        列出本地数据集资源
+
+        参数:
+            query: 可选的查询字符串，按数据集名称过滤
+
+        返回:
+            资源列表
+        """
+        self.store.refresh()
+        return [
+            Resource(
+                uri=dataset_uri(dataset),
+                title=dataset,
+                description=f"Local dataset with {count} document(s)",
+            )
+            for dataset, count in sorted(self.store.datasets().items())
+            if not query or query.lower() in dataset.lower()
+        ]
+
+    def _allowed(self, resources: list[Resource]) -> Optional[list[int]]:
+        if not resources:
+            return None
+        datasets, doc_ids = set(), set()
+        for resource in resources:
+            dataset, doc_id = parse_uri(resource.uri)
+            if doc_id:
+                doc_ids.add(unquote(doc_id))
+            else:
+                datasets.add(unquote(dataset))
+        return [
+            ordinal
+            for ordinal, info in self.store.live_documents()
+            if info["dataset"] in datasets or info["id"] in doc_ids
+        ]
+
+    def query_relevant_documents(
+        self, query: str, resources: list[Resource] = []
+    ) -> list[Document]:
+        """
+        查询与给定查询相关的文档
+
+        参数:
+            query: 查询字符串
+            resources: 资源列表，为空时搜索所有数据集
+
+        返回:
+            相关文档列表，按最佳块的分数排序
+        """
+        self.store.refresh()
+        hits = self._search(query, self._allowed(resources))
+        documents: dict[int, Document] = {}
+        for row, score in hits:
+            if score <= 0:
+                continue
+            ordinal = self.store.document_ordinal(row)
+            doc = documents.get(ordinal)
+            if doc is None:
+                info = self.store.document_at(ordinal)
+                doc = documents[ordinal] = Document(
+                    id=info["id"],
+                    url=dataset_uri(info["dataset"], info["id"]),
+                    title=info["title"] or None,
+                    chunks=[],
+                )
+            doc.chunks.append(
+                Chunk(content=self.store.chunk_text(row), similarity=score)
+            )
+        return list(documents.values())
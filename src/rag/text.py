@@ -0,0 +1,145 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Text loading, tokenization and chunking shared by the local RAG providers.
+"""
+
+# 本地RAG提供者共用的文本加载、分词和分块
+
+import os
+import re
+
+from src.crawler.readability_extractor import ReadabilityExtractor
+
+# Han, kana, hangul: written without spaces, so they are indexed as character bigrams
+# 汉字、假名、谚文：书写时没有空格，因此按字符二元组索引
+_CJK = "぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+TEXT_EXTENSIONS = (".md", ".markdown", ".txt")
+HTML_EXTENSIONS = (".html", ".htm")
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + HTML_EXTENSIONS + (".pdf",)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase terms for indexing.
+
+    Words of space-delimited scripts are kept whole; runs of CJK characters
+    become overlapping character bigrams ("三打白骨精" -> "三打", "打白", ...),
+    and a single CJK character stays a unigram.
+    """
+    # 将文本切分为用于索引的小写词项。
+    # 以空格分词的文字保留整个单词；连续的CJK字符变为重叠的字符二元组，单个CJK字符保留为一元组。
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if _CJK_RE.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i : i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> list[str]:
+    """
+    Split text into chunks of about `chunk_size` characters.
+
+    Paragraphs are packed together while they fit; longer paragraphs are cut
+    into windows. Each chunk after the first starts with the last `overlap`
+    characters of the previous one, so a sentence cut at a boundary is still
+    retrievable from one chunk.
+    """
+    # 将文本切分为约`chunk_size`个字符的块。
+    # 段落在放得下时合并在一起，更长的段落被切成窗口。
+    # 除第一个块外，每个块都以前一个块的最后`overlap`个字符开头，因此在边界处被截断的句子仍能从一个块中检索到。
+    overlap = max(0, min(overlap, chunk_size // 2))
+    pieces: list[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        step = chunk_size - overlap
+        while len(paragraph) > chunk_size:
+            pieces.append(paragraph[:chunk_size])
+            paragraph = paragraph[step:]
+        pieces.append(paragraph)
+
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > chunk_size:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            current = (
+                f"{tail}\n\n{piece}"
+                if tail and len(tail) + 2 + len(piece) <= chunk_size
+                else piece
+            )
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def load_text(path: str) -> tuple[str, str]:
+    """
+    Read a markdown, text, HTML or PDF file.
+
+    The article of an HTML page is extracted with `ReadabilityExtractor` and
+    converted to markdown, dropping navigation and other boilerplate.
+
+    Returns:
+        `(title, text)`; the title is the first markdown heading, the page or
+        PDF title, or the file name
+
+    Raises:
+        ValueError: If the file type is not supported, or a PDF is read without `pypdf`
+    """
+    # 读取markdown、文本、HTML或PDF文件，返回标题和文本。
+    # HTML页面的正文用`ReadabilityExtractor`提取并转换为markdown，去掉导航等样板内容
+    extension = os.path.splitext(path)[1].lower()
+    title = os.path.splitext(os.path.basename(path))[0]
+    if extension in TEXT_EXTENSIONS:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        heading = re.search(r"^#\s+(.+)$", text, re.MULTILINE)
+        if heading:
+            title = heading.group(1).strip()
+        return title, text
+    if extension in HTML_EXTENSIONS:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            article = ReadabilityExtractor().extract_article(f.read())
+        text = (
+            article.to_markdown(including_title=False) if article.html_content else ""
+        )
+        return article.title or title, text
+    if extension == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise ValueError("Reading PDF files needs the optional `pypdf` package")
+        reader = PdfReader(path)
+        text = "\n\n".join(page.extract_text() or "" for page in reader.pages)
+        if reader.metadata and reader.metadata.title:
+            title = reader.metadata.title
+        return title, text
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token count of a text: one per CJK character, one per four other characters.
+
+    Good enough to keep retrieved context under a budget without loading a tokenizer.
+    """
+    # 粗略估计文本的LLM词元数：每个CJK字符算一个，其他字符每四个算一个。
+    # 足以在不加载分词器的情况下让检索到的上下文保持在预算之内。
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
@@ -1,27 +1,35 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import base64
+import hashlib
 import json
 import logging
 import os
+from contextlib import asynccontextmanager, suppress
 from typing import Annotated, List, cast
 from uuid import uuid4
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, StreamingResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from langchain_core.messages import AIMessageChunk, ToolMessage, BaseMessage
 from langgraph.types import Command
 
 from src.config.report_style import ReportStyle
 from src.config.tools import SELECTED_RAG_PROVIDER
 from src.graph.builder import build_graph_with_memory
+from src.podcast.audio import MEDIA_TYPES, create_encoder
 from src.podcast.graph.builder import build_graph as build_podcast_graph
+from src.podcast.streaming import open_podcast_stream
+from src.ppt.cache import get_ppt_cache
 from src.ppt.graph.builder import build_graph as build_ppt_graph
+from src.ppt.renderer import MarpRenderError, get_marp_renderer
 from src.prose.graph.builder import build_graph as build_prose_graph
 from src.prompt_enhancer.graph.builder import build_graph as build_prompt_enhancer_graph
 from src.rag.builder import build_retriever
+from src.rag.ragflow import close_async_clients
 from src.rag.retriever import Resource
 from src.server.chat_request import (
     ChatMessage,
@@ -33,22 +41,60 @@ from src.server.chat_request import (
     TTSRequest,
 )
 from src.server.mcp_request import MCPServerMetadataRequest, MCPServerMetadataResponse
-from src.server.mcp_utils import load_mcp_tools
+from src.server.mcp_utils import discover_mcp_tools
+from src.server.metrics import (
+    SSE_STREAMS_IN_FLIGHT,
+    MetricsMiddleware,
+    register_checkpointer_metrics,
+)
 from src.server.rag_request import (
     RAGConfigResponse,
     RAGResourceRequest,
     RAGResourcesResponse,
 )
-from src.tools import VolcengineTTS
+from src.tools import (
+    VolcengineTTS,
+    get_mcp_session_pool,
+    get_python_repl_pool,
+    get_tts_cache,
+)
+from src.utils.metrics import REGISTRY, monitor_event_loop_lag
+from src.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
 INTERNAL_SERVER_ERROR_DETAIL = "Internal Server Error"  # 内部服务器错误详情
 
+_ppt_flight = SingleFlight()  # 合并相同报告的并发PPT生成
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background tasks for the lifetime of the application."""
+    # 在应用生命周期内运行后台任务
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())  # 监控事件循环延迟
+    await asyncio.to_thread(get_python_repl_pool().warm)  # 预热Python沙箱工作进程
+    try:
+        await asyncio.to_thread(get_marp_renderer().warm)  # 预热marp渲染进程
+    except MarpRenderError as e:
+        logger.warning(f"Failed to warm the marp renderer: {e}")
+    try:
+        yield
+    finally:
+        lag_monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await lag_monitor
+        await get_mcp_session_pool().close()  # 关闭MCP会话池中的会话
+        await asyncio.to_thread(get_python_repl_pool().close)  # 停止Python沙箱工作进程
+        await asyncio.to_thread(get_marp_renderer().close)  # 停止marp渲染进程
+        await close_async_clients()  # 关闭RAGFlow连接池
+
+
 app = FastAPI(
     title="DeerFlow API",
     description="API for Deer",
     version="0.1.0",
+    lifespan=lifespan,
 )  # 创建FastAPI应用实例
 
 # Add CORS middleware
@@ -60,8 +106,21 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods 允许所有方法
     allow_headers=["*"],  # Allows all headers 允许所有头部
 )
+# Record request counts and latencies per route
+# 按路由记录请求数和延迟
+app.add_middleware(MetricsMiddleware)
 
 graph = build_graph_with_memory()  # 构建带有记忆的图
+register_checkpointer_metrics(graph.checkpointer)  # 暴露检查点保存器大小指标
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose process metrics in the Prometheus text format."""
+    # 以Prometheus文本格式暴露进程指标
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 @app.post("/api/chat/stream")
@@ -91,6 +150,7 @@ async def chat_stream(request: ChatRequest):
             request.mcp_settings,  # MCP设置
             request.enable_background_investigation,  # 启用背景调查
             request.report_style,  # 报告风格
+            request.stream_plan_events,  # 流式输出部分计划
         ),
         media_type="text/event-stream",  # 媒体类型为事件流
     )
@@ -108,6 +168,7 @@ async def _astream_workflow_generator(
     mcp_settings: dict,
     enable_background_investigation: bool,
     report_style: ReportStyle,
+    stream_plan_events: bool = False,
 ):
     """
     异步工作流生成器，用于生成聊天事件流
@@ -124,6 +185,8 @@ async def _astream_workflow_generator(
         mcp_settings: MCP设置
         enable_background_investigation: 是否启用背景调查
         report_style: 报告风格
+        stream_plan_events: 是否发送plan_field/plan_step事件。这些事件没有消息ID，
+            因此只发送给请求了它们的客户端
         
     生成:
         聊天事件流
@@ -146,82 +209,95 @@ async def _astream_workflow_generator(
         if messages:
             resume_msg += f" {messages[-1]['content']}"
         input_ = Command(resume=resume_msg)  # 创建恢复命令
-    async for agent, _, event_data in graph.astream(
-        input_,
-        config={
-            "thread_id": thread_id,
-            "resources": resources,
-            "max_plan_iterations": max_plan_iterations,
-            "max_step_num": max_step_num,
-            "max_search_results": max_search_results,
-            "mcp_settings": mcp_settings,
-            "report_style": report_style.value,
-        },
-        stream_mode=["messages", "updates"],
-        subgraphs=True,
-    ):
-        # 处理事件数据
-        if isinstance(event_data, dict):
-            if "__interrupt__" in event_data:
-                # 如果是中断事件
-                yield _make_event(
-                    "interrupt",
-                    {
-                        "thread_id": thread_id,
-                        "id": event_data["__interrupt__"][0].ns[0],
-                        "role": "assistant",
-                        "content": event_data["__interrupt__"][0].value,
-                        "finish_reason": "interrupt",
-                        "options": [
-                            {"text": "Edit plan", "value": "edit_plan"},  # 编辑计划选项
-                            {"text": "Start research", "value": "accepted"},  # 开始研究选项
-                        ],
-                    },
-                )
-            continue
-        message_chunk, message_metadata = cast(
-            tuple[BaseMessage, dict[str, any]], event_data
-        )
-        event_stream_message: dict[str, any] = {
-            "thread_id": thread_id,
-            "agent": agent[0].split(":")[0],  # 代理名称
-            "id": message_chunk.id,  # 消息ID
-            "role": "assistant",  # 角色
-            "content": message_chunk.content,  # 内容
-        }
-        if message_chunk.response_metadata.get("finish_reason"):
-            # 如果有完成原因
-            event_stream_message["finish_reason"] = message_chunk.response_metadata.get(
-                "finish_reason"
+    SSE_STREAMS_IN_FLIGHT.inc()  # 正在进行的SSE流数量加1
+    try:
+        async for agent, stream_mode, event_data in graph.astream(
+            input_,
+            config={
+                "thread_id": thread_id,
+                "resources": resources,
+                "max_plan_iterations": max_plan_iterations,
+                "max_step_num": max_step_num,
+                "max_search_results": max_search_results,
+                "mcp_settings": mcp_settings,
+                "report_style": report_style.value,
+            },
+            stream_mode=["messages", "updates"]
+            + (["custom"] if stream_plan_events else []),
+            subgraphs=True,
+        ):
+            if stream_mode == "custom":
+                # Structured events written by nodes, e.g. partial plans
+                # 节点写出的结构化事件，例如部分计划
+                if isinstance(event_data, dict) and "event" in event_data:
+                    custom_event = dict(event_data)
+                    event_type = custom_event.pop("event")
+                    yield _make_event(event_type, {"thread_id": thread_id, **custom_event})
+                continue
+            # 处理事件数据
+            if isinstance(event_data, dict):
+                if "__interrupt__" in event_data:
+                    # 如果是中断事件
+                    yield _make_event(
+                        "interrupt",
+                        {
+                            "thread_id": thread_id,
+                            "id": event_data["__interrupt__"][0].ns[0],
+                            "role": "assistant",
+                            "content": event_data["__interrupt__"][0].value,
+                            "finish_reason": "interrupt",
+                            "options": [
+                                {"text": "Edit plan", "value": "edit_plan"},  # 编辑计划选项
+                                {"text": "Start research", "value": "accepted"},  # 开始研究选项
+                            ],
+                        },
+                    )
+                continue
+            message_chunk, message_metadata = cast(
+                tuple[BaseMessage, dict[str, any]], event_data
             )
-        if isinstance(message_chunk, ToolMessage):
-            # Tool Message - Return the result of the tool call
-            # 工具消息 - 返回工具调用结果
-            event_stream_message["tool_call_id"] = message_chunk.tool_call_id  # 工具调用ID
-            yield _make_event("tool_call_result", event_stream_message)  # 生成工具调用结果事件
-        elif isinstance(message_chunk, AIMessageChunk):
-            # AI Message - Raw message tokens
-            # AI消息 - 原始消息令牌
-            if message_chunk.tool_calls:
-                # AI Message - Tool Call
-                # AI消息 - 工具调用
-                event_stream_message["tool_calls"] = message_chunk.tool_calls  # 工具调用
-                event_stream_message["tool_call_chunks"] = (
-                    message_chunk.tool_call_chunks  # 工具调用块
-                )
-                yield _make_event("tool_calls", event_stream_message)  # 生成工具调用事件
-            elif message_chunk.tool_call_chunks:
-                # AI Message - Tool Call Chunks
-                # AI消息 - 工具调用块
-                event_stream_message["tool_call_chunks"] = (
-                    message_chunk.tool_call_chunks  # 工具调用块
+            event_stream_message: dict[str, any] = {
+                "thread_id": thread_id,
+                "agent": agent[0].split(":")[0],  # 代理名称
+                "id": message_chunk.id,  # 消息ID
+                "role": "assistant",  # 角色
+                "content": message_chunk.content,  # 内容
+            }
+            if message_chunk.response_metadata.get("finish_reason"):
+                # 如果有完成原因
+                event_stream_message["finish_reason"] = message_chunk.response_metadata.get(
+                    "finish_reason"
                 )
-                yield _make_event("tool_call_chunks", event_stream_message)  # 生成工具调用块事件
-            else:
+            if isinstance(message_chunk, ToolMessage):
+                # Tool Message - Return the result of the tool call
+                # 工具消息 - 返回工具调用结果
+                event_stream_message["tool_call_id"] = message_chunk.tool_call_id  # 工具调用ID
+                yield _make_event("tool_call_result", event_stream_message)  # 生成工具调用结果事件
+            elif isinstance(message_chunk, AIMessageChunk):
                 # AI Message - Raw message tokens
                 # AI消息 - 原始消息令牌
-                yield _make_event("message_chunk", event_stream_message)  # 生成消息块事件
-
+                if message_chunk.tool_calls:
+                    # AI Message - Tool Call
+                    # AI消息 - 工具调用
+                    event_stream_message["tool_calls"] = message_chunk.tool_calls  # 工具调用
+                    event_stream_message["tool_call_chunks"] = (
+                        message_chunk.tool_call_chunks  # 工具调用块
+                    )
+                    yield _make_event("tool_calls", event_stream_message)  # 生成工具调用事件
+                elif message_chunk.tool_call_chunks:
+                    # AI Message - Tool Call Chunks
+                    # AI消息 - 工具调用块
+                    event_stream_message["tool_call_chunks"] = (
+                        message_chunk.tool_call_chunks  # 工具调用块
+                    )
+                    yield _make_event("tool_call_chunks", event_stream_message)  # 生成工具调用块事件
+                else:
+                    # AI Message - Raw message tokens
+                    # AI消息 - 原始消息令牌
+                    yield _make_event("message_chunk", event_stream_message)  # 生成消息块事件
+
+    finally:
+        SSE_STREAMS_IN_FLIGHT.dec()  # 正在进行的SSE流数量减1
 
 def _make_event(event_type: str, data: dict[str, any]):
     """
@@ -262,6 +338,7 @@ async def text_to_speech(request: TTSRequest):
             access_token=access_token,
             cluster=cluster,
             voice_type=voice_type,
+            cache=get_tts_cache(),  # 与播客生成共享音频缓存
         )  # 创建火山引擎TTS客户端
         # Call the TTS API
         # 调用TTS API
@@ -308,20 +385,40 @@ async def generate_podcast(request: GeneratePodcastRequest):
         request: 生成播客请求对象
         
     返回:
-        音频响应，包含生成的播客
+        音频响应，包含生成的播客；`stream`为真时以分块传输在合成过程中逐步返回音频
     """
     try:
         report_content = request.content  # 获取报告内容
         print(report_content)  # 打印报告内容
+        if request.stream:
+            # Audio is sent while the script is still being written and synthesized
+            # 在脚本仍在编写和合成时发送音频
+            encoder = create_encoder()
+            audio = await open_podcast_stream(report_content, encoder)
+            return StreamingResponse(audio, media_type=encoder.media_type)
         workflow = build_podcast_graph()  # 构建播客图
         final_state = workflow.invoke({"input": report_content})  # 调用工作流
         audio_bytes = final_state["output"]  # 获取音频字节
-        return Response(content=audio_bytes, media_type="audio/mp3")  # 返回MP3格式的音频响应
+        audio_format = final_state.get("output_format", "mp3")  # 获取音频格式
+        return Response(
+            content=audio_bytes,
+            media_type=MEDIA_TYPES.get(audio_format, f"audio/{audio_format}"),
+        )  # 返回音频响应
     except Exception as e:
         logger.exception(f"Error occurred during podcast generation: {str(e)}")  # 记录播客生成错误
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_DETAIL)  # 抛出内部服务器错误
 
 
+async def _generate_ppt_file(report_content: str) -> bytes:
+    """Run the PPT workflow for a report and return the rendered deck."""
+    # 为报告运行PPT工作流并返回渲染后的演示文稿
+    workflow = build_ppt_graph()  # 构建PPT图
+    # Run off the event loop so renders queue in the marp pool instead of blocking the server
+    # 在事件循环之外运行，使渲染在marp进程池中排队，而不是阻塞服务器
+    final_state = await asyncio.to_thread(workflow.invoke, {"input": report_content})  # 调用工作流
+    return final_state["generated_file"]  # 获取PPT文件字节
+
+
 @app.post("/api/ppt/generate")
 async def generate_ppt(request: GeneratePPTRequest):
     """
@@ -336,11 +433,17 @@ async def generate_ppt(request: GeneratePPTRequest):
     try:
         report_content = request.content  # 获取报告内容
         print(report_content)  # 打印报告内容
-        workflow = build_ppt_graph()  # 构建PPT图
-        final_state = workflow.invoke({"input": report_content})  # 调用工作流
-        generated_file_path = final_state["generated_file_path"]  # 获取生成的文件路径
-        with open(generated_file_path, "rb") as f:
-            ppt_bytes = f.read()  # 读取PPT文件字节
+        ppt_cache = get_ppt_cache()
+        ppt_bytes = None
+        if ppt_cache is not None:
+            # Cache hits are served without building the graph
+            # 缓存命中时无需构建图，直接返回
+            ppt_bytes = await asyncio.to_thread(ppt_cache.lookup, report_content)
+        if ppt_bytes is None:
+            # Identical concurrent requests share one composition and render
+            # 相同的并发请求共享一次编排和渲染
+            key = hashlib.sha256(report_content.encode("utf-8")).hexdigest()
+            ppt_bytes = await _ppt_flight.do(key, lambda: _generate_ppt_file(report_content))
         return Response(
             content=ppt_bytes,
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",  # PPT文件的MIME类型
@@ -451,23 +554,31 @@ async def mcp_server_metadata(request: MCPServerMetadataRequest):
         MCP服务器元数据响应
     """
     try:
-        # Load the MCP tools
-        # 加载MCP工具
-        tools = load_mcp_tools()
+        # Load the MCP tools through the discovery cache
+        # 通过发现缓存加载MCP工具
+        tools = await discover_mcp_tools(
+            server_type=request.transport,
+            command=request.command,
+            args=request.args,
+            url=request.url,
+            env=request.env,
+            timeout_seconds=request.timeout_seconds or 60,
+            refresh=request.refresh,
+        )
 
         # Construct the response
         # 构建响应
         response = MCPServerMetadataResponse(
-            schema_version="v1",
-            server_info={
-                "name": "DeerFlow",
-                "version": "0.1.0",
-            },
-            capabilities={
-                "tools": tools,
-            },
+            transport=request.transport,
+            command=request.command,
+            args=request.args,
+            url=request.url,
+            env=request.env,
+            tools=tools,
         )
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error in MCP server metadata endpoint: {str(e)}")  # 记录MCP服务器元数据端点错误
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_DETAIL)  # 抛出内部服务器错误
@@ -496,8 +607,10 @@ async def rag_resources(request: Annotated[RAGResourceRequest, Query()]):
         RAG资源响应
     """
     try:
-        retriever = build_retriever(request.provider)  # 构建检索器
-        return {"resources": retriever.get_resources()}  # 返回资源列表
+        retriever = build_retriever(cached=True)  # 构建带缓存的检索器，资源选择器在每次按键时都会请求
+        if retriever is None:
+            return {"resources": []}  # 未配置RAG提供者
+        return {"resources": await retriever.alist_resources(request.query)}  # 返回资源列表
     except Exception as e:
         logger.exception(f"Error in RAG resources endpoint: {str(e)}")  # 记录RAG资源端点错误
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_DETAIL)  # 抛出内部服务器错误
@@ -65,6 +65,10 @@ class ChatRequest(BaseModel):
     report_style: Optional[ReportStyle] = Field(
         ReportStyle.ACADEMIC, description="The style of the report"  # 报告的风格
     )
+    stream_plan_events: Optional[bool] = Field(
+        False,
+        description="Whether to stream the plan as plan_field/plan_step events while it is written",  # 是否在编写计划时以事件流式输出计划
+    )
 
 
 class TTSRequest(BaseModel):
@@ -87,6 +91,10 @@ class TTSRequest(BaseModel):
 class GeneratePodcastRequest(BaseModel):
     """生成播客请求模型"""
     content: str = Field(..., description="The content of the podcast")  # 播客的内容
+    stream: bool = Field(
+        False,
+        description="Stream the audio while later lines are still being synthesized",
+    )  # 在后续行仍在合成时流式返回音频
 
 
 class GeneratePPTRequest(BaseModel):
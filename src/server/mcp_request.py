@@ -32,6 +32,10 @@ class MCPServerMetadataRequest(BaseModel):
         None, description="Optional custom timeout in seconds for the operation"
         # 操作的可选自定义超时时间（秒）
     )
+    refresh: bool = Field(
+        False, description="Bypass the discovery cache and query the server again"
+        # 绕过发现缓存，重新查询服务器
+    )
 
 
 class MCPServerMetadataResponse(BaseModel):
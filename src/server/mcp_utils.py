@@ -1,7 +1,11 @@
 # Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
 # SPDX-License-Identifier: MIT
 
+import asyncio
 import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -10,8 +14,24 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 
+from src.tools.mcp_pool import server_config_key
+from src.utils.metrics import record_cache_lookup
+from src.utils.singleflight import SingleFlight
+
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
+# Discovered tools are fresh for MCP_DISCOVERY_TTL seconds; after that they are
+# still served (and refreshed in the background) until MCP_DISCOVERY_MAX_STALE
+# 发现的工具在MCP_DISCOVERY_TTL秒内是新鲜的；之后在MCP_DISCOVERY_MAX_STALE之前
+# 仍会返回（并在后台刷新）
+DISCOVERY_TTL_SECONDS = float(os.getenv("MCP_DISCOVERY_TTL", "300"))
+DISCOVERY_MAX_STALE_SECONDS = float(os.getenv("MCP_DISCOVERY_MAX_STALE", "86400"))
+DISCOVERY_CACHE_SIZE = 128
+
+_discovery_cache: "OrderedDict[str, Tuple[float, List]]" = OrderedDict()
+_discovery_flight = SingleFlight()
+_background_refreshes: set = set()
+
 
 async def _get_tools_from_client_session(
     client_context_manager: Any, timeout_seconds: int = 10
@@ -135,3 +155,89 @@ async def load_mcp_tools(
             logger.exception(f"Error loading MCP tools: {str(e)}")  # 加载MCP工具时出错
             raise HTTPException(status_code=500, detail=str(e))
         raise
+
+
+async def _discover(key: str, load_kwargs: Dict[str, Any]) -> List:
+    """Run one discovery and store its result."""
+    # 执行一次发现并保存结果
+    tools = await load_mcp_tools(**load_kwargs)
+    _discovery_cache[key] = (time.monotonic(), tools)
+    _discovery_cache.move_to_end(key)
+    while len(_discovery_cache) > DISCOVERY_CACHE_SIZE:
+        _discovery_cache.popitem(last=False)
+    return tools
+
+
+def _refresh_in_background(key: str, load_kwargs: Dict[str, Any]) -> None:
+    if _discovery_flight.in_flight(key):
+        return
+
+    async def refresh():
+        try:
+            await _discovery_flight.do(key, lambda: _discover(key, load_kwargs))
+        except Exception as e:
+            # Keep serving the stale tools; the next request retries
+            # 继续返回过期的工具；下一次请求会重试
+            logger.warning(f"Background MCP discovery refresh failed: {e}")
+
+    task = asyncio.create_task(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
+
+
+async def discover_mcp_tools(
+    server_type: str,
+    command: Optional[str] = None,
+    args: Optional[List[str]] = None,
+    url: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    timeout_seconds: int = 60,
+    refresh: bool = False,
+) -> List:
+    """
+    Load tools from an MCP server through the discovery cache.
+
+    Results are keyed by transport, command, args, url and env. Fresh results
+    are returned directly; stale ones are returned while a background refresh
+    runs; concurrent discoveries of the same server share one connection.
+
+    Args:
+        server_type: The type of MCP server connection (stdio or sse)
+        command: The command to execute (for stdio type)
+        args: Command arguments (for stdio type)
+        url: The URL of the SSE server (for sse type)
+        env: Environment variables
+        timeout_seconds: Timeout in seconds for a discovery
+        refresh: Ignore cached results and discover again
+
+    Returns:
+        List of available tools from the MCP server
+
+    Raises:
+        HTTPException: If there's an error loading the tools
+    """
+    # 通过发现缓存从MCP服务器加载工具。
+    # 结果以传输方式、命令、参数、URL和环境变量为键。新鲜结果直接返回；
+    # 过期结果在后台刷新的同时返回；同一服务器的并发发现共享一次连接。
+    load_kwargs = {
+        "server_type": server_type,
+        "command": command,
+        "args": args,
+        "url": url,
+        "env": env,
+        "timeout_seconds": timeout_seconds,
+    }
+    key = server_config_key(
+        {"transport": server_type, "command": command, "args": args, "url": url, "env": env}
+    )
+    cached = None if refresh else _discovery_cache.get(key)
+    record_cache_lookup("mcp_discovery", cached is not None)
+    if cached is not None:
+        fetched_at, tools = cached
+        age = time.monotonic() - fetched_at
+        if age <= DISCOVERY_TTL_SECONDS:
+            return tools
+        if age <= DISCOVERY_MAX_STALE_SECONDS:
+            _refresh_in_background(key, load_kwargs)  # 过期但可用：后台刷新
+            return tools
+    return await _discovery_flight.do(key, lambda: _discover(key, load_kwargs))
@@ -0,0 +1,131 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+HTTP-level metrics for the DeerFlow API server.
+"""
+
+# DeerFlow API服务器的HTTP层指标
+
+import time
+from typing import Any
+
+from src.utils.metrics import REGISTRY
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "deerflow_http_requests_total",
+    "HTTP requests by method, route and status code.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "deerflow_http_request_duration_seconds",
+    "Time from receiving a request until the last body chunk is sent.",
+    ["method", "route"],
+)
+SSE_STREAMS_IN_FLIGHT = REGISTRY.gauge(
+    "deerflow_sse_streams_in_flight",
+    "Number of chat SSE streams currently open.",
+)
+
+# Routes that are not matched are folded into one label value to bound cardinality
+# 未匹配的路由归为同一个标签值，以限制标签基数
+UNMATCHED_ROUTE = "__unmatched__"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts and latencies per route.
+
+    It does not buffer or copy response bodies, so streaming responses only pay
+    one extra function call per sent message.
+    """
+
+    # 纯ASGI中间件，按路由记录请求数和延迟。
+    # 它不缓冲或复制响应体，因此流式响应每条消息只多一次函数调用。
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope.get("method", "")
+            HTTP_REQUESTS.labels(method, route_path, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path).observe(
+                time.perf_counter() - start
+            )
+
+
+def _serialized_size(value: Any) -> int:
+    """Sum the size of serialized payloads nested in checkpointer tuples."""
+    # 计算检查点元组中嵌套的序列化数据大小之和
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_serialized_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_serialized_size(item) for item in value.values())
+    return 0
+
+
+def checkpointer_stats(checkpointer: Any) -> dict[str, int]:
+    """
+    Collect size statistics from an in-memory checkpointer.
+
+    Args:
+        checkpointer: A LangGraph `InMemorySaver` (other savers report zeros)
+
+    Returns:
+        Dictionary with the number of threads, checkpoints and serialized bytes
+    """
+    # 从内存检查点保存器中收集大小统计信息
+    storage = getattr(checkpointer, "storage", None)
+    if storage is None:
+        return {"threads": 0, "checkpoints": 0, "bytes": 0}
+    checkpoints = 0
+    size = 0
+    for namespaces in list(storage.values()):
+        for checkpoints_by_id in list(namespaces.values()):
+            checkpoints += len(checkpoints_by_id)
+            size += _serialized_size(list(checkpoints_by_id.values()))
+    size += _serialized_size(list(getattr(checkpointer, "writes", {}).values()))
+    size += _serialized_size(list(getattr(checkpointer, "blobs", {}).values()))
+    return {"threads": len(storage), "checkpoints": checkpoints, "bytes": size}
+
+
+def register_checkpointer_metrics(checkpointer: Any) -> None:
+    """Expose checkpointer size as gauges that are computed once per scrape."""
+    # 将检查点保存器的大小作为每次采集计算一次的仪表暴露出来
+    gauges = {
+        key: REGISTRY.gauge(f"deerflow_checkpointer_{key}", documentation)
+        for key, documentation in (
+            ("threads", "Threads held by the checkpointer."),
+            ("checkpoints", "Checkpoints held by the checkpointer."),
+            ("bytes", "Approximate serialized size of the checkpointer in bytes."),
+        )
+    }
+
+    def collect() -> None:
+        stats = checkpointer_stats(checkpointer)  # 每次采集只遍历一次检查点
+        for key, gauge in gauges.items():
+            gauge.set(stats[key])
+
+    REGISTRY.add_collector(collect)
@@ -4,10 +4,12 @@
 import os
 
 from .crawl import crawl_tool  # 爬取工具
+from .mcp_pool import MCPSessionPool, get_mcp_session_pool  # MCP会话池
 from .python_repl import python_repl_tool  # Python REPL工具
+from .python_sandbox import PythonREPLPool, get_python_repl_pool  # Python沙箱工作进程池
 from .retriever import get_retriever_tool  # 检索工具
 from .search import get_web_search_tool  # 网页搜索工具
-from .tts import VolcengineTTS  # 火山引擎TTS（文本转语音）
+from .tts import VolcengineTTS, get_tts_cache  # 火山引擎TTS（文本转语音）及其音频缓存
 
 __all__ = [
     "crawl_tool",        # 爬取工具
@@ -15,4 +17,9 @@ __all__ = [
     "get_web_search_tool",  # 获取网页搜索工具
     "get_retriever_tool",   # 获取检索工具
     "VolcengineTTS",        # 火山引擎TTS
+    "get_tts_cache",        # 获取共享的TTS音频缓存
+    "MCPSessionPool",       # MCP会话池
+    "get_mcp_session_pool",  # 获取当前事件循环的MCP会话池
+    "PythonREPLPool",        # Python沙箱工作进程池
+    "get_python_repl_pool",  # 获取进程级的Python沙箱工作进程池
 ]
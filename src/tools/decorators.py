@@ -3,8 +3,13 @@
 
 import logging
 import functools
+import time
 from typing import Any, Callable, Type, TypeVar
 
+from langchain_core.tools import BaseTool
+
+from src.utils.metrics import record_tool_call
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")  # 类型变量T
@@ -38,9 +43,15 @@ def log_io(func: Callable) -> Callable:
         )
         logger.info(f"Tool {func_name} called with parameters: {params}")
 
-        # Execute the function
-        # 执行函数
-        result = func(*args, **kwargs)
+        # Execute the function and record its latency
+        # 执行函数并记录其延迟
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            record_tool_call(func_name, "builtin", time.perf_counter() - start, False)
+            raise
+        record_tool_call(func_name, "builtin", time.perf_counter() - start)
 
         # Log the output
         # 记录输出
@@ -68,12 +79,59 @@ class LoggedToolMixin:
         """Override _run method to add logging."""
         # 重写_run方法以添加日志记录
         self._log_operation("_run", *args, **kwargs)
-        result = super()._run(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = super()._run(*args, **kwargs)
+        except BaseException:
+            self._record_call(start, False)
+            raise
+        self._record_call(start)
         logger.debug(
             f"Tool {self.__class__.__name__.replace('Logged', '')} returned: {result}"
         )
         return result
 
+    @classmethod
+    @functools.cache
+    def _arun_delegates_to_run(cls) -> bool:
+        """Whether the wrapped tool keeps `BaseTool._arun`, which calls `_run` in an executor."""
+        # 被包装的工具是否沿用`BaseTool._arun`，它在执行器中调用`_run`
+        for base in cls.__mro__[cls.__mro__.index(LoggedToolMixin) + 1 :]:
+            if "_arun" in base.__dict__:
+                return base.__dict__["_arun"] is BaseTool.__dict__["_arun"]
+        return True
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        """Override _arun method to add logging."""
+        # 重写_arun方法以添加日志记录
+        if self._arun_delegates_to_run():
+            # The instrumented _run logs and records the call, so it is not counted twice
+            # 已添加日志的_run会记录此次调用，因此不会重复计数
+            return await super()._arun(*args, **kwargs)
+        self._log_operation("_arun", *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = await super()._arun(*args, **kwargs)
+        except BaseException:
+            self._record_call(start, False)
+            raise
+        self._record_call(start)
+        logger.debug(
+            f"Tool {self.__class__.__name__.replace('Logged', '')} returned: {result}"
+        )
+        return result
+
+    def _record_call(self, start: float, success: bool = True) -> None:
+        """Record the latency and outcome of a call in the metrics registry."""
+        # 在指标注册表中记录调用的延迟和结果
+        provider = self.__class__.__name__.replace("Logged", "")
+        record_tool_call(
+            getattr(self, "name", provider),
+            provider,
+            time.perf_counter() - start,
+            success,
+        )
+
 
 def create_logged_tool(base_tool_class: Type[T]) -> Type[T]:
     """
@@ -0,0 +1,424 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Long-lived MCP client sessions shared across workflow steps and threads.
+
+Opening `MultiServerMCPClient` for every researcher or coder step spawns the
+stdio server (or opens the SSE stream), runs the MCP handshake and lists tools
+each time. The pool keeps one session per server configuration instead, checks
+its health while idle, restarts it when the server crashes, closes it after an
+idle timeout, and limits concurrent calls per server.
+"""
+
+# 在工作流步骤和线程之间共享的长期MCP客户端会话。
+# 每个研究员或编码员步骤都打开`MultiServerMCPClient`会每次启动stdio服务器（或打开SSE流）、
+# 执行MCP握手并列出工具。连接池为每个服务器配置保留一个会话，空闲时检查其健康状况，
+# 服务器崩溃时重启，空闲超时后关闭，并限制每个服务器的并发调用数。
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import weakref
+from contextlib import suppress
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+import anyio
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.types import CallToolResult, TextContent
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+MCP_SESSION_EVENTS = REGISTRY.counter(
+    "deerflow_mcp_session_events_total",
+    "MCP pool session lifecycle events (start, restart, idle_close, health_check_failed).",
+    ["event"],
+)
+
+# Errors raised by a session whose transport is gone
+# 传输已断开的会话抛出的错误
+_TRANSPORT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    BrokenPipeError,
+    ConnectionError,
+)
+
+_CONFIG_KEYS = ("transport", "command", "args", "url", "env")
+
+
+def _env_float(name: str, default: float) -> float:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return float(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not a number. Using default value {default}."
+        )
+        return default
+
+
+def _convert_call_tool_result(result: CallToolResult) -> tuple[Any, Optional[list]]:
+    """Split an MCP tool result into text content and artifacts, like the MCP adapters do."""
+    # 像MCP适配器一样，将MCP工具结果拆分为文本内容和附件
+    texts = [
+        content.text for content in result.content if isinstance(content, TextContent)
+    ]
+    artifacts = [
+        content for content in result.content if not isinstance(content, TextContent)
+    ]
+    tool_content: Any = texts[0] if len(texts) == 1 else texts
+    if result.isError:
+        raise ToolException(tool_content)
+    return tool_content, artifacts or None
+
+
+def server_config_key(config: dict[str, Any]) -> str:
+    """Stable hash of the parts of a server config that identify its process or endpoint."""
+    # 服务器配置中标识其进程或端点部分的稳定哈希
+    identity = {key: config.get(key) for key in _CONFIG_KEYS}
+    return hashlib.sha256(
+        json.dumps(identity, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+class _PooledServer:
+    """One MCP server session owned by a dedicated task."""
+
+    # 由专用任务持有的单个MCP服务器会话
+
+    def __init__(
+        self,
+        key: str,
+        config: dict[str, Any],
+        max_concurrency: int,
+        on_tools_changed: Callable[[], None],
+    ):
+        self.key = key
+        self.config = config
+        self._on_tools_changed = on_tools_changed
+        self.session: Optional[ClientSession] = None
+        self.tools: list = []  # MCP tool definitions MCP工具定义
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._start_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._started_once = False
+
+    @property
+    def running(self) -> bool:
+        return (
+            self.session is not None
+            and self._task is not None
+            and not self._task.done()
+        )
+
+    def _transport(self):
+        transport = self.config.get("transport")
+        if transport == "stdio":
+            env = dict(self.config.get("env") or {})
+            # Commands such as `uvx` or `npx` need PATH
+            # `uvx`或`npx`等命令需要PATH
+            env.setdefault("PATH", os.environ.get("PATH", ""))
+            return stdio_client(
+                StdioServerParameters(
+                    command=self.config["command"],
+                    args=self.config.get("args") or [],
+                    env=env,
+                )
+            )
+        if transport == "sse":
+            return sse_client(url=self.config["url"])
+        raise ValueError(f"Unsupported MCP transport: {transport}")
+
+    async def _run(self, ready: asyncio.Future, stop: asyncio.Event, timeout: float):
+        # The transport and session are entered and exited in this task, as
+        # anyio requires for their cancel scopes
+        # 传输和会话在此任务中进入和退出，这是anyio取消作用域的要求
+        try:
+            async with self._transport() as (read, write):
+                async with ClientSession(
+                    read, write, read_timeout_seconds=timedelta(seconds=timeout)
+                ) as session:
+                    await session.initialize()
+                    listed = await session.list_tools()
+                    self.session = session
+                    self.tools = listed.tools
+                    ready.set_result(None)
+                    await stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(
+                    e if isinstance(e, Exception) else RuntimeError(str(e))
+                )
+            elif not stop.is_set():
+                logger.warning(f"MCP session {self.key} ended unexpectedly: {e!r}")
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self.session = None
+
+    async def start(self, timeout: float) -> None:
+        """Start the session unless it is running."""
+        # 如果会话未运行则启动它
+        async with self._start_lock:
+            if self.running:
+                return
+            await self._shutdown()
+            previous = [tool.model_dump() for tool in self.tools]
+            loop = asyncio.get_running_loop()
+            ready = loop.create_future()
+            self._stop = asyncio.Event()
+            self._task = loop.create_task(self._run(ready, self._stop, timeout))
+            try:
+                await asyncio.wait_for(asyncio.shield(ready), timeout)
+            except BaseException:
+                await self._shutdown()
+                raise
+            MCP_SESSION_EVENTS.labels(
+                "restart" if self._started_once else "start"
+            ).inc()
+            logger.info(f"MCP session {self.key} started with {len(self.tools)} tools")
+            changed = self._started_once and previous != [
+                tool.model_dump() for tool in self.tools
+            ]
+            self._started_once = True
+            self.last_used = time.monotonic()
+        if changed:
+            self._on_tools_changed()
+
+    async def _shutdown(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stop.set()
+        # `asyncio.wait` does not raise, so errors from tearing down a crashed
+        # server stay inside the owner task
+        # `asyncio.wait`不会抛出异常，关闭已崩溃服务器时的错误留在持有任务内部
+        done, _ = await asyncio.wait({task}, timeout=5)
+        if not done:
+            task.cancel()
+            await asyncio.wait({task}, timeout=5)
+        self.session = None
+
+    async def close(self) -> None:
+        async with self._start_lock:
+            await self._shutdown()
+
+    async def call_tool(self, name: str, arguments: dict, timeout: float) -> Any:
+        async with self._semaphore:
+            self.in_use += 1
+            try:
+                for attempt in range(2):
+                    if not self.running:
+                        await self.start(timeout)
+                    try:
+                        return await self.session.call_tool(name, arguments)
+                    except _TRANSPORT_ERRORS as e:
+                        if attempt:
+                            raise
+                        logger.warning(
+                            f"MCP session {self.key} lost ({e!r}), restarting"
+                        )
+                        await self.close()
+            finally:
+                self.in_use -= 1
+                self.last_used = time.monotonic()
+
+    async def ping(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session {self.key} failed health check: {e!r}")
+            return False
+
+
+class MCPSessionPool:
+    """
+    Pool of MCP sessions keyed by server config hash.
+
+    Tools returned by `get_tools` are stable objects that route calls through
+    the pool, so they survive session restarts and let compiled agents be
+    reused. One pool exists per event loop, see `get_mcp_session_pool`.
+    """
+
+    # 以服务器配置哈希为键的MCP会话池。
+    # `get_tools`返回的工具是通过连接池路由调用的稳定对象，
+    # 因此它们在会话重启后仍然可用，也让已编译的代理可以复用。
+    # 每个事件循环有一个连接池，参见`get_mcp_session_pool`。
+
+    def __init__(
+        self,
+        idle_timeout: Optional[float] = None,
+        health_check_interval: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.idle_timeout = (
+            idle_timeout
+            if idle_timeout is not None
+            else _env_float("MCP_IDLE_TIMEOUT", 300)
+        )
+        self.health_check_interval = (
+            health_check_interval
+            if health_check_interval is not None
+            else _env_float("MCP_HEALTH_CHECK_INTERVAL", 30)
+        )
+        self.max_concurrency = max_concurrency or int(
+            _env_float("MCP_SERVER_CONCURRENCY", 4)
+        )
+        self.timeout = timeout if timeout is not None else _env_float("MCP_TIMEOUT", 60)
+        self._servers: dict[str, _PooledServer] = {}
+        self._tools: dict[tuple, BaseTool] = {}
+        self._maintenance: Optional[asyncio.Task] = None
+
+    def _server(self, config: dict[str, Any]) -> _PooledServer:
+        config = {
+            key: config.get(key) for key in _CONFIG_KEYS if config.get(key) is not None
+        }
+        key = server_config_key(config)
+        server = self._servers.get(key)
+        if server is None:
+            server = self._servers[key] = _PooledServer(
+                key, config, self.max_concurrency, self._on_tools_changed
+            )
+        if self._maintenance is None or self._maintenance.done():
+            self._maintenance = asyncio.get_running_loop().create_task(self._maintain())
+        return server
+
+    async def get_tools(
+        self, server_name: str, config: dict[str, Any]
+    ) -> list[BaseTool]:
+        """
+        Return LangChain tools for a server, starting its session if needed.
+
+        Args:
+            server_name: Name of the server in the MCP settings, used in descriptions
+            config: Server config with transport, command, args, url and env
+
+        Returns:
+            Tools whose calls go through the pooled session
+        """
+        # 返回服务器的LangChain工具，必要时启动其会话
+        server = self._server(config)
+        await server.start(self.timeout)
+        tools = []
+        for mcp_tool in server.tools:
+            description = f"Powered by '{server_name}'.\n{mcp_tool.description or ''}"
+            cache_key = (
+                server.key,
+                mcp_tool.name,
+                description,
+                json.dumps(mcp_tool.inputSchema, sort_keys=True),
+            )
+            tool = self._tools.get(cache_key)
+            if tool is None:
+                tool = self._tools[cache_key] = self._make_tool(
+                    server.key, mcp_tool, description
+                )
+            tools.append(tool)
+        return tools
+
+    def _make_tool(self, key: str, mcp_tool: Any, description: str) -> BaseTool:
+        name = mcp_tool.name
+        pool_ref = weakref.ref(self)
+
+        async def call_tool(**arguments: Any):
+            pool = pool_ref()
+            if pool is None or key not in pool._servers:
+                raise RuntimeError(
+                    f"MCP server for tool '{name}' is no longer available"
+                )
+            result = await pool._servers[key].call_tool(name, arguments, pool.timeout)
+            return _convert_call_tool_result(result)
+
+        return StructuredTool(
+            name=name,
+            description=description,
+            args_schema=mcp_tool.inputSchema,
+            coroutine=call_tool,
+            response_format="content_and_artifact",
+        )
+
+    def _on_tools_changed(self) -> None:
+        # Agents compiled with the previous tool set must be rebuilt
+        # 使用旧工具集编译的代理必须重建
+        from src.agents import invalidate_agent_cache
+
+        logger.info("MCP tool set changed, invalidating cached agents")
+        invalidate_agent_cache()
+
+    async def _maintain(self) -> None:
+        """Close idle sessions and health check the others."""
+        # 关闭空闲会话，并对其他会话进行健康检查
+        while self._servers:
+            await asyncio.sleep(self.health_check_interval)
+            now = time.monotonic()
+            for server in list(self._servers.values()):
+                if not server.running or server.in_use:
+                    continue
+                if now - server.last_used > self.idle_timeout:
+                    logger.info(f"Closing idle MCP session {server.key}")
+                    MCP_SESSION_EVENTS.labels("idle_close").inc()
+                    await server.close()
+                elif not await server.ping(min(self.timeout, 10)):
+                    MCP_SESSION_EVENTS.labels("health_check_failed").inc()
+                    await server.close()
+                    with suppress(Exception):
+                        await server.start(self.timeout)
+
+    async def close(self) -> None:
+        """Close every session of the pool."""
+        # 关闭连接池的所有会话
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            with suppress(BaseException):
+                await self._maintenance
+            self._maintenance = None
+        for server in list(self._servers.values()):
+            await server.close()
+        self._servers.clear()
+        self._tools.clear()
+
+    def stats(self) -> dict[str, int]:
+        running = [server for server in self._servers.values() if server.running]
+        return {
+            "servers": len(self._servers),
+            "running": len(running),
+            "in_use": sum(server.in_use for server in running),
+        }
+
+
+# Sessions are bound to the loop that opened them, so each loop gets a pool
+# 会话绑定到打开它们的事件循环，因此每个事件循环有自己的连接池
+_pools: dict[asyncio.AbstractEventLoop, MCPSessionPool] = {}
+
+
+def get_mcp_session_pool() -> MCPSessionPool:
+    """Return the MCP session pool of the running event loop."""
+    # 返回当前运行事件循环的MCP会话池
+    loop = asyncio.get_running_loop()
+    for closed in [other for other in _pools if other.is_closed()]:
+        del _pools[closed]
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = MCPSessionPool()
+    return pool
+
+
+REGISTRY.gauge(
+    "deerflow_mcp_sessions_running", "MCP sessions currently open in the pool."
+).set_function(lambda: sum(pool.stats()["running"] for pool in list(_pools.values())))
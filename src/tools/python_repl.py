@@ -3,16 +3,31 @@
 
 import logging
 from typing import Annotated
+
+from langchain_core.runnables import ensure_config
 from langchain_core.tools import tool
-from langchain_experimental.utilities import PythonREPL
+from langgraph.config import get_stream_writer
+
 from .decorators import log_io
+from .python_sandbox import get_python_repl_pool
 
-# Initialize REPL and logger
-# 初始化REPL和日志记录器
-repl = PythonREPL()
+# Initialize logger
+# 初始化日志记录器
 logger = logging.getLogger(__name__)
 
 
+def _output_streamer():
+    """Forward printed output as custom stream events while the graph is streaming."""
+    # 图正在流式输出时，将打印内容作为自定义流事件转发
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return None  # Not running inside a graph 不在图中运行
+    return lambda chunk: writer(
+        {"event": "tool_output", "tool": "python_repl_tool", "content": chunk}
+    )
+
+
 @tool
 @log_io
 def python_repl_tool(
@@ -33,21 +48,28 @@ def python_repl_tool(
         # 错误：代码必须是字符串
 
     logger.info("Executing Python code")  # 执行Python代码
+    # Each workflow thread runs in its own sandboxed worker process
+    # 每个工作流线程在自己的沙箱工作进程中运行
+    session_id = ensure_config().get("configurable", {}).get("thread_id") or "default"
     try:
-        result = repl.run(code)
-        # Check if the result is an error message by looking for typical error patterns
-        # 通过查找典型的错误模式来检查结果是否为错误消息
-        if isinstance(result, str) and ("Error" in result or "Exception" in result):
-            logger.error(result)
-            return f"Error executing code:\n```python\n{code}\n```\nError: {result}"
-            # 执行代码时出错
-        logger.info("Code execution successful")  # 代码执行成功
+        result = get_python_repl_pool().execute(
+            code, session_id=str(session_id), on_output=_output_streamer()
+        )
     except BaseException as e:
         error_msg = repr(e)
         logger.error(error_msg)
         return f"Error executing code:\n```python\n{code}\n```\nError: {error_msg}"
         # 执行代码时出错
 
-    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result}"
+    if not result.ok:
+        logger.error(result.error)
+        error_str = f"Error executing code:\n```python\n{code}\n```\nError: {result.error}"
+        if result.output:
+            error_str += f"\nStdout: {result.output}"
+        return error_str
+        # 执行代码时出错
+    logger.info("Code execution successful")  # 代码执行成功
+
+    result_str = f"Successfully executed:\n```python\n{code}\n```\nStdout: {result.output}"
     # 成功执行：[代码] 标准输出：[结果]
     return result_str
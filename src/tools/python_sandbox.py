@@ -0,0 +1,622 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Sandboxed Python REPL worker pool used by `python_repl_tool`.
+
+Every session (workflow thread) gets its own worker process, so variables do
+not leak between users and a hung or CPU-heavy snippet cannot block the API
+process. Each execution is bounded by wall time and CPU time, each worker by an
+address space limit. Workers import numpy and pandas before they are handed
+out, a few spare workers are kept warm, and a worker is recycled after a number
+of executions.
+
+Where `os.fork` is available, workers are forked from a template process that
+imported the heavy modules once, so starting a worker (for a new session, after
+a timeout or when recycling) does not pay for those imports again. The import
+time each snippet would otherwise have spent is reported as a metric.
+"""
+
+# `python_repl_tool`使用的沙箱Python REPL工作进程池。
+# 每个会话（工作流线程）有自己的工作进程，因此变量不会在用户之间泄漏，
+# 挂起或占用大量CPU的代码片段也不会阻塞API进程。每次执行受墙钟时间和CPU时间限制，
+# 每个工作进程受地址空间限制。工作进程在分配前预先导入numpy和pandas，
+# 连接池保留少量预热的备用工作进程，工作进程执行一定次数后会被回收。
+# 在支持`os.fork`的平台上，工作进程从只导入过一次重量级模块的模板进程派生，
+# 因此启动工作进程（新会话、超时后或回收时）无需再次支付导入开销。
+# 每个代码片段本应花费的导入时间会作为指标上报。
+
+import ast
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from multiprocessing.connection import Connection
+from multiprocessing.reduction import recv_handle
+from typing import Callable, NamedTuple, Optional
+
+from src.utils.metrics import REGISTRY
+from src.utils.python_worker import sanitize_input, template_main, worker_main
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+DEFAULT_PRELOAD_MODULES = ("numpy", "pandas", "yfinance")
+
+PYTHON_REPL_WORKER_EVENTS = REGISTRY.counter(
+    "deerflow_python_repl_worker_events_total",
+    "Python REPL worker lifecycle events (start, recycle, timeout, crash, idle_close, evict).",
+    ["event"],
+)
+PYTHON_REPL_IMPORT_SECONDS_SAVED = REGISTRY.histogram(
+    "deerflow_python_repl_import_seconds_saved",
+    "Import time per execution avoided because the modules were preloaded in the worker.",
+    buckets=(0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def _env_float(name: str, default: float) -> float:
+    env_value_str = os.getenv(name, str(default))
+    try:
+        return float(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"{name} value '{env_value_str}' is not a number. Using default value {default}."
+        )
+        return default
+
+
+def _env_modules(name: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    env_value_str = os.getenv(name)
+    if env_value_str is None:
+        return default
+    return tuple(
+        module.strip() for module in env_value_str.split(",") if module.strip()
+    )
+
+
+def _imported_modules(code: str) -> set[str]:
+    """Top-level names of the modules a snippet imports."""
+    # 代码片段导入的模块的顶层名称
+    try:
+        tree = ast.parse(sanitize_input(code))
+    except (SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+class ExecutionResult(NamedTuple):
+    """Outcome of running one snippet in a worker."""
+
+    # 在工作进程中运行一个代码片段的结果
+
+    ok: bool
+    output: str  # Everything printed to stdout 打印到标准输出的全部内容
+    error: Optional[str]  # `repr` of the exception when not ok 失败时异常的`repr`
+    duration: float
+    # Cold import time of preloaded modules this snippet imported first in its worker
+    # 该代码片段在其工作进程中首次导入的预加载模块的冷启动导入时间
+    import_seconds_saved: float = 0.0
+
+
+class _ForkedProcess:
+    """Handle of a worker forked by the template; it is not our child, so it has no exit code."""
+
+    # 由模板派生的工作进程的句柄；它不是本进程的子进程，因此没有退出码
+
+    exitcode = None
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def is_alive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except (ProcessLookupError, PermissionError):
+            return False
+        return True
+
+    def _signal(self, signum: int) -> None:
+        with suppress(ProcessLookupError, PermissionError):
+            os.kill(self.pid, signum)
+
+    def terminate(self) -> None:
+        self._signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self._signal(signal.SIGKILL)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_alive() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+
+
+class _Worker:
+    """One worker process and the parent end of its pipe."""
+
+    # 一个工作进程及其管道的父进程端
+
+    def __init__(self, conn: Connection, process):
+        self.conn = conn
+        self.process = process  # multiprocessing.Process or _ForkedProcess
+        self.lock = threading.Lock()
+        self.executions = 0
+        self.last_used = time.monotonic()
+        self.ready_info: Optional[dict] = None
+        self.imported: set[str] = set()
+        self.closed = False
+        PYTHON_REPL_WORKER_EVENTS.labels("start").inc()
+
+    @classmethod
+    def spawn(cls, context, preload: tuple[str, ...], memory_mb: int) -> "_Worker":
+        conn, child_conn = context.Pipe(duplex=True)
+        process = context.Process(
+            target=worker_main,
+            args=(child_conn, preload, memory_mb),
+            name="python-repl-worker",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return cls(conn, process)
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready_info is not None:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Python worker did not start within {timeout} seconds")
+        message = self.conn.recv()
+        self.ready_info = message[1]
+
+    def import_seconds_saved(self, code: str) -> float:
+        """Import time `code` avoids because this worker preloaded the modules it imports."""
+        # 由于该工作进程预加载了`code`导入的模块而节省的导入时间
+        preloaded = (self.ready_info or {}).get("preloaded", {})
+        first_imports = (_imported_modules(code) & preloaded.keys()) - self.imported
+        self.imported.update(first_imports)
+        return sum(preloaded[name] for name in first_imports)
+
+    def execute(
+        self,
+        code: str,
+        timeout: float,
+        cpu_seconds: float,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> ExecutionResult:
+        start = time.monotonic()
+        deadline = start + timeout
+        output: list[str] = []
+        self.executions += 1
+        self.last_used = start
+        sent = False
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if not sent:
+                    self.conn.send(("exec", code, cpu_seconds))
+                    sent = True
+                if remaining <= 0 or not self.conn.poll(remaining):
+                    PYTHON_REPL_WORKER_EVENTS.labels("timeout").inc()
+                    self.close()
+                    error = (
+                        f"TimeoutError('Execution timed out after {timeout:g} seconds')"
+                    )
+                    return ExecutionResult(
+                        False, "".join(output), error, time.monotonic() - start
+                    )
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                # The worker died, e.g. killed by the kernel for memory or CPU use
+                # 工作进程已退出，例如因内存或CPU使用被内核终止
+                PYTHON_REPL_WORKER_EVENTS.labels("crash").inc()
+                self.process.join(1)
+                exitcode = self.process.exitcode
+                self.close()
+                error = "RuntimeError('Python worker exited unexpectedly"
+                error += f" with code {exitcode}')" if exitcode is not None else "')"
+                return ExecutionResult(
+                    False, "".join(output), error, time.monotonic() - start
+                )
+            if message[0] == "stdout":
+                output.append(message[1])
+                if on_output is not None:
+                    try:
+                        on_output(message[1])
+                    except Exception as e:
+                        logger.warning(f"Python REPL output callback failed: {e}")
+            elif message[0] == "done":
+                self.last_used = time.monotonic()
+                return ExecutionResult(
+                    message[1], "".join(output), message[2], self.last_used - start
+                )
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join(1)
+
+
+class _Template:
+    """A process with the preloaded modules imported that forks new workers."""
+
+    # 已导入预加载模块、用于派生新工作进程的进程
+
+    def __init__(self, context, preload: tuple[str, ...], memory_mb: int):
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(
+            target=template_main,
+            args=(child_conn, preload, memory_mb),
+            name="python-repl-template",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+        self.ready_info: Optional[dict] = None
+
+    def fork(self, timeout: float) -> _Worker:
+        with self.lock:
+            if self.ready_info is None:
+                if not self.conn.poll(timeout):
+                    raise TimeoutError(
+                        f"Python template did not start within {timeout} seconds"
+                    )
+                self.ready_info = self.conn.recv()[1]
+            self.conn.send(("fork",))
+            if not self.conn.poll(timeout):
+                raise TimeoutError(
+                    f"Python template did not fork within {timeout} seconds"
+                )
+            _, pid = self.conn.recv()
+            fd = recv_handle(self.conn)
+        return _Worker(Connection(fd), _ForkedProcess(pid))
+
+    def close(self) -> None:
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+        self.process.join(1)
+
+
+class PythonREPLPool:
+    """
+    Worker processes keyed by session, plus warm spares.
+
+    Settings default to environment variables: `PYTHON_REPL_TIMEOUT` (wall
+    seconds per execution), `PYTHON_REPL_CPU_SECONDS`, `PYTHON_REPL_MEMORY_MB`,
+    `PYTHON_REPL_MAX_EXECUTIONS`, `PYTHON_REPL_MAX_SESSIONS`,
+    `PYTHON_REPL_WARM_WORKERS`, `PYTHON_REPL_IDLE_TIMEOUT`,
+    `PYTHON_REPL_PRELOAD` (comma-separated module names) and
+    `PYTHON_REPL_START_METHOD` (`template` to fork workers from a warm
+    template process, the default where `os.fork` exists, or `spawn`).
+    """
+
+    # 按会话分配的工作进程，外加预热的备用进程。设置默认从上述环境变量读取。
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+        memory_mb: Optional[int] = None,
+        max_executions: Optional[int] = None,
+        max_sessions: Optional[int] = None,
+        warm_workers: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        preload: Optional[tuple[str, ...]] = None,
+        start_method: Optional[str] = None,
+        startup_timeout: float = 60,
+    ):
+        self.timeout = (
+            timeout if timeout is not None else _env_float("PYTHON_REPL_TIMEOUT", 60)
+        )
+        self.cpu_seconds = (
+            cpu_seconds
+            if cpu_seconds is not None
+            else _env_float("PYTHON_REPL_CPU_SECONDS", 30)
+        )
+        self.memory_mb = (
+            memory_mb
+            if memory_mb is not None
+            else int(_env_float("PYTHON_REPL_MEMORY_MB", 2048))
+        )
+        self.max_executions = max_executions or int(
+            _env_float("PYTHON_REPL_MAX_EXECUTIONS", 50)
+        )
+        self.max_sessions = max_sessions or int(
+            _env_float("PYTHON_REPL_MAX_SESSIONS", 8)
+        )
+        self.warm_workers = (
+            warm_workers
+            if warm_workers is not None
+            else int(_env_float("PYTHON_REPL_WARM_WORKERS", 1))
+        )
+        self.idle_timeout = (
+            idle_timeout
+            if idle_timeout is not None
+            else _env_float("PYTHON_REPL_IDLE_TIMEOUT", 600)
+        )
+        self.preload = (
+            tuple(preload)
+            if preload is not None
+            else _env_modules("PYTHON_REPL_PRELOAD", DEFAULT_PRELOAD_MODULES)
+        )
+        self.start_method = start_method or os.getenv(
+            "PYTHON_REPL_START_METHOD", "template" if hasattr(os, "fork") else "spawn"
+        )
+        if self.start_method not in ("template", "spawn") or (
+            self.start_method == "template" and not hasattr(os, "fork")
+        ):
+            logger.warning(
+                f"PYTHON_REPL_START_METHOD value '{self.start_method}' is not supported. Using spawn."
+            )
+            self.start_method = "spawn"
+        self.startup_timeout = startup_timeout
+        # The API process runs threads, so neither workers nor the template are
+        # forked from it directly; forking happens in the single-threaded template
+        # API进程运行着多个线程，因此工作进程和模板都不直接从它派生；派生在单线程的模板中进行
+        self._context = multiprocessing.get_context("spawn")
+        self._template: Optional[_Template] = None
+        self._sessions: OrderedDict[str, _Worker] = OrderedDict()
+        self._spares: list[_Worker] = []
+        # Workers are started outside `_lock`, since starting one can block for up to
+        # `startup_timeout`; `_starting` reserves the slot of a session being started
+        # 工作进程在`_lock`之外启动，因为启动可能阻塞最多`startup_timeout`秒；
+        # `_starting`为正在启动的会话预留位置
+        self._starting: dict[str, threading.Event] = {}
+        self._spares_starting = 0
+        self._lock = threading.Lock()
+        self._template_lock = threading.Lock()  # 保护模板进程的创建和重启
+        self._closed = False
+
+    def _start_worker(self) -> _Worker:
+        if self.start_method == "spawn":
+            return _Worker.spawn(self._context, self.preload, self.memory_mb)
+        with self._template_lock:
+            for attempt in range(2):
+                if self._template is None or not self._template.process.is_alive():
+                    if self._template is not None:
+                        PYTHON_REPL_WORKER_EVENTS.labels("template_restart").inc()
+                        self._template.close()
+                    self._template = _Template(
+                        self._context, self.preload, self.memory_mb
+                    )
+                try:
+                    return self._template.fork(self.startup_timeout)
+                except (EOFError, OSError):
+                    # The template died; start a new one and try once more
+                    # 模板已退出；启动一个新模板并重试一次
+                    if attempt:
+                        raise
+                    self._template.close()
+                    self._template = None
+
+    def warm(self) -> None:
+        """Start spare workers up to `warm_workers` so the next session gets one immediately."""
+        # 启动备用工作进程直到`warm_workers`个，让下一个会话立即获得一个
+        self._fill_spares()
+
+    def _fill_spares(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._spares = [
+                worker for worker in self._spares if worker.process.is_alive()
+            ]
+            needed = self.warm_workers - len(self._spares) - self._spares_starting
+            if needed <= 0:
+                return
+            self._spares_starting += needed
+        started: list[_Worker] = []
+        try:
+            for _ in range(needed):
+                started.append(self._start_worker())
+        finally:
+            with self._lock:
+                self._spares_starting -= needed
+                closed = self._closed
+                if not closed:
+                    self._spares.extend(started)
+            if closed:
+                for worker in started:
+                    worker.close()
+
+    def _checkout(self, session_id: str) -> _Worker:
+        while True:
+            stale: list[_Worker] = []
+            starting = None
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Python REPL pool is closed")
+                now = time.monotonic()
+                for other_id, other in list(self._sessions.items()):
+                    if other.closed or (
+                        not other.busy and now - other.last_used > self.idle_timeout
+                    ):
+                        if not other.closed:
+                            PYTHON_REPL_WORKER_EVENTS.labels("idle_close").inc()
+                        del self._sessions[other_id]
+                        stale.append(other)
+                worker = self._sessions.get(session_id)
+                pending = self._starting.get(session_id)
+                if worker is None and pending is None:
+                    # Make room by evicting the least recently used idle session
+                    # 淘汰最久未使用的空闲会话以腾出空间
+                    while (
+                        len(self._sessions) + len(self._starting) >= self.max_sessions
+                    ):
+                        victim_id = next(
+                            (
+                                other_id
+                                for other_id, other in self._sessions.items()
+                                if not other.busy
+                            ),
+                            None,
+                        )
+                        if victim_id is None:
+                            break
+                        PYTHON_REPL_WORKER_EVENTS.labels("evict").inc()
+                        stale.append(self._sessions.pop(victim_id))
+                    if self._spares:
+                        worker = self._sessions[session_id] = self._spares.pop(0)
+                    else:
+                        starting = self._starting[session_id] = threading.Event()
+                if worker is not None:
+                    self._sessions.move_to_end(session_id)
+            for other in stale:
+                other.close()
+            if pending is not None:
+                # Another call of the same session is starting its worker
+                # 同一会话的另一个调用正在启动其工作进程
+                pending.wait()
+                continue
+            if starting is not None:
+                worker = self._start_reserved(session_id, starting)
+            self._fill_spares()
+            return worker
+
+    def _start_reserved(self, session_id: str, starting: threading.Event) -> _Worker:
+        """Start the worker of a session whose slot was reserved, then register it."""
+        # 启动已预留位置的会话的工作进程，然后注册它
+        worker = None
+        try:
+            worker = self._start_worker()
+        finally:
+            with self._lock:
+                del self._starting[session_id]
+                closed = self._closed
+                if worker is not None and not closed:
+                    self._sessions[session_id] = worker
+            starting.set()
+        if closed:
+            worker.close()
+            raise RuntimeError("Python REPL pool is closed")
+        return worker
+
+    def _retire(self, session_id: str, worker: _Worker) -> None:
+        with self._lock:
+            if self._sessions.get(session_id) is worker:
+                del self._sessions[session_id]
+        worker.close()
+
+    def execute(
+        self,
+        code: str,
+        session_id: str = "default",
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> ExecutionResult:
+        """
+        Run `code` in the worker of `session_id`, keeping its variables for later calls.
+
+        Args:
+            code: Python source to execute
+            session_id: Identifies the namespace, usually the workflow thread ID
+            on_output: Called with stdout chunks as they are printed
+
+        Returns:
+            The execution result; timeouts and crashes are reported as errors
+        """
+        # 在`session_id`的工作进程中运行`code`，其变量会保留给后续调用
+        while True:
+            worker = self._checkout(session_id)
+            with worker.lock:
+                if worker.closed:
+                    # Retired by a concurrent call of the same session
+                    # 已被同一会话的并发调用回收
+                    continue
+                try:
+                    worker.wait_ready(self.startup_timeout)
+                except (TimeoutError, EOFError, OSError) as e:
+                    self._retire(session_id, worker)
+                    PYTHON_REPL_WORKER_EVENTS.labels("crash").inc()
+                    return ExecutionResult(False, "", repr(e), 0.0)
+                result = worker.execute(code, self.timeout, self.cpu_seconds, on_output)
+                saved = worker.import_seconds_saved(code)
+                PYTHON_REPL_IMPORT_SECONDS_SAVED.observe(saved)
+                result = result._replace(import_seconds_saved=saved)
+                if worker.closed:
+                    self._retire(session_id, worker)
+                elif worker.executions >= self.max_executions:
+                    PYTHON_REPL_WORKER_EVENTS.labels("recycle").inc()
+                    self._retire(session_id, worker)
+                return result
+
+    def reset(self, session_id: str) -> None:
+        """Drop the worker of `session_id` and its variables."""
+        # 丢弃`session_id`的工作进程及其变量
+        with self._lock:
+            worker = self._sessions.pop(session_id, None)
+        if worker is not None:
+            worker.close()
+
+    def close(self) -> None:
+        """Stop every worker of the pool."""
+        # 停止连接池的所有工作进程
+        with self._lock:
+            self._closed = True
+            workers = [*self._sessions.values(), *self._spares]
+            self._sessions.clear()
+            self._spares.clear()
+            template, self._template = self._template, None
+        for worker in workers:
+            worker.close()
+        if template is not None:
+            template.close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "busy": sum(worker.busy for worker in self._sessions.values()),
+                "spares": len(self._spares),
+            }
+
+
+_pool: Optional[PythonREPLPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_python_repl_pool() -> PythonREPLPool:
+    """Return the process-wide Python REPL pool, creating it on first use."""
+    # 返回进程级的Python REPL工作进程池，首次使用时创建
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = PythonREPLPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+REGISTRY.gauge(
+    "deerflow_python_repl_workers", "Python REPL worker processes held by the pool."
+).set_function(
+    lambda: (
+        0
+        if _pool is None
+        else sum(_pool.stats()[key] for key in ("sessions", "spares"))
+    )
+)
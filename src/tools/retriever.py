@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+import time
 from typing import List, Optional, Type
 from langchain_core.tools import BaseTool
 from langchain_core.callbacks import (
@@ -12,6 +13,7 @@ from pydantic import BaseModel, Field
 
 from src.config.tools import SELECTED_RAG_PROVIDER
 from src.rag import Document, Retriever, Resource, build_retriever
+from src.utils.metrics import record_tool_call
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
@@ -42,18 +44,47 @@ class RetrieverTool(BaseTool):
         logger.info(
             f"Retriever tool query: {keywords}", extra={"resources": self.resources}
         )  # 记录检索工具查询信息
-        documents = self.retriever.query_relevant_documents(keywords, self.resources)  # 查询相关文档
+        start = time.perf_counter()
+        try:
+            documents = self.retriever.query_relevant_documents(keywords, self.resources)  # 查询相关文档
+        except BaseException:
+            self._record_call(start, False)
+            raise
+        self._record_call(start)
+        return self._format(documents)
+
+    @staticmethod
+    def _format(documents: list[Document]) -> list[dict] | str:
         if not documents:
             return "No results found from the local knowledge base."  # 从本地知识库中未找到结果
         return [doc.to_dict() for doc in documents]  # 返回文档字典列表
 
+    def _record_call(self, start: float, success: bool = True) -> None:
+        """在指标注册表中记录检索调用的延迟和结果"""
+        record_tool_call(
+            self.name,
+            getattr(self.retriever, "wrapped", self.retriever).__class__.__name__,
+            time.perf_counter() - start,
+            success,
+        )
+
     async def _arun(
         self,
         keywords: str,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> list[Document]:
-        """异步执行检索操作"""
-        return self._run(keywords, run_manager.get_sync())  # 调用同步方法
+        """异步执行检索操作，不阻塞事件循环"""
+        logger.info(
+            f"Retriever tool query: {keywords}", extra={"resources": self.resources}
+        )  # 记录检索工具查询信息
+        start = time.perf_counter()
+        try:
+            documents = await self.retriever.aquery_relevant_documents(keywords, self.resources)  # 异步查询相关文档
+        except BaseException:
+            self._record_call(start, False)
+            raise
+        self._record_call(start)
+        return self._format(documents)
 
 
 def get_retriever_tool(resources: List[Resource]) -> RetrieverTool | None:
@@ -69,7 +100,7 @@ def get_retriever_tool(resources: List[Resource]) -> RetrieverTool | None:
     if not resources:
         return None  # 如果没有资源，则返回None
     logger.info(f"create retriever tool: {SELECTED_RAG_PROVIDER}")  # 记录创建检索工具信息
-    retriever = build_retriever()  # 构建检索器
+    retriever = build_retriever(cached=True)  # 构建带缓存的检索器
 
     if not retriever:
         return None  # 如果没有检索器，则返回None
@@ -6,14 +6,59 @@ Text-to-Speech module using volcengine TTS API.
 """
 # 使用火山引擎TTS API的文本转语音模块
 
+import base64
 import json
+import os
+import threading
 import uuid
 import logging
 import requests
 from typing import Optional, Dict, Any
 
+from src.utils.disk_cache import DiskLRUCache
+from src.utils.metrics import record_cache_lookup
+
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
+DEFAULT_TTS_CACHE_DIR = os.path.join(".cache", "tts")
+DEFAULT_TTS_CACHE_MAX_MB = 512
+
+_tts_cache: Optional[DiskLRUCache] = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> Optional[DiskLRUCache]:
+    """
+    Return the shared TTS audio cache, or None when it is disabled.
+
+    The cache lives in `TTS_CACHE_DIR` (default `.cache/tts`) and holds up to
+    `TTS_CACHE_MAX_MB` MiB of decoded audio (default 512, 0 disables it).
+    """
+    # 返回共享的TTS音频缓存，禁用时返回None。
+    # 缓存位于`TTS_CACHE_DIR`（默认`.cache/tts`），最多保存`TTS_CACHE_MAX_MB` MiB的解码音频（默认512，0表示禁用）。
+    global _tts_cache
+    env_value_str = os.getenv("TTS_CACHE_MAX_MB", str(DEFAULT_TTS_CACHE_MAX_MB))
+    try:
+        max_mb = int(env_value_str)
+    except ValueError:
+        logger.warning(
+            f"TTS_CACHE_MAX_MB value '{env_value_str}' is not an integer. "
+            f"Using default value {DEFAULT_TTS_CACHE_MAX_MB}."
+        )
+        max_mb = DEFAULT_TTS_CACHE_MAX_MB
+    if max_mb <= 0:
+        return None
+    directory = os.getenv("TTS_CACHE_DIR", DEFAULT_TTS_CACHE_DIR)
+    with _tts_cache_lock:
+        if _tts_cache is None or _tts_cache.directory != directory:
+            try:
+                _tts_cache = DiskLRUCache(directory, max_mb * 1024 * 1024)
+            except OSError as e:
+                logger.warning(f"TTS cache directory '{directory}' is not usable: {e}")
+                return None
+        _tts_cache.max_bytes = max_mb * 1024 * 1024
+        return _tts_cache
+
 
 class VolcengineTTS:
     """
@@ -28,6 +73,7 @@ class VolcengineTTS:
         cluster: str = "volcano_tts",
         voice_type: str = "BV700_V2_streaming",
         host: str = "openspeech.bytedance.com",
+        cache: Optional[DiskLRUCache] = None,
     ):
         """
         Initialize the volcengine TTS client.
@@ -38,6 +84,7 @@ class VolcengineTTS:
             cluster: TTS cluster name
             voice_type: Voice type to use
             host: API host
+            cache: Audio cache shared with other clients, see `get_tts_cache`
         """
         # 初始化火山引擎TTS客户端
         #
@@ -47,6 +94,7 @@ class VolcengineTTS:
         #     cluster: TTS集群名称
         #     voice_type: 要使用的语音类型
         #     host: API主机
+        #     cache: 与其他客户端共享的音频缓存，参见`get_tts_cache`
         
         self.appid = appid
         self.access_token = access_token
@@ -55,6 +103,7 @@ class VolcengineTTS:
         self.host = host
         self.api_url = f"https://{host}/api/v1/tts"  # API URL
         self.header = {"Authorization": f"Bearer;{access_token}"}  # 认证头
+        self.cache = cache  # 音频缓存
 
     def text_to_speech(
         self,
@@ -67,6 +116,7 @@ class VolcengineTTS:
         with_frontend: int = 1,
         frontend_type: str = "unitTson",
         uid: Optional[str] = None,
+        voice_type: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Convert text to speech using volcengine TTS API.
@@ -81,9 +131,11 @@ class VolcengineTTS:
             with_frontend: Whether to use frontend processing
             frontend_type: Frontend type
             uid: User ID (generated if not provided)
+            voice_type: Voice type for this request (defaults to the client's voice type)
 
         Returns:
-            Dictionary containing the API response and base64-encoded audio data
+            Dictionary containing the API response and base64-encoded audio data.
+            Audio served from the cache has `cached` set and no `response`.
         """
         # 使用火山引擎TTS API将文本转换为语音
         #
@@ -97,10 +149,42 @@ class VolcengineTTS:
         #     with_frontend: 是否使用前端处理
         #     frontend_type: 前端类型
         #     uid: 用户ID（如果未提供则生成）
+        #     voice_type: 本次请求的语音类型（默认为客户端的语音类型）
         #
         # 返回:
-        #     包含API响应和base64编码的音频数据的字典
+        #     包含API响应和base64编码的音频数据的字典。来自缓存的音频会设置`cached`且没有`response`
         
+        voice_type = voice_type or self.voice_type
+        cache_key = None
+        if self.cache is not None:
+            # Everything that changes the audio, but not the user or request IDs
+            # 包含所有会改变音频的参数，但不包括用户ID和请求ID
+            cache_key = json.dumps(
+                [
+                    self.host,
+                    self.cluster,
+                    voice_type,
+                    encoding,
+                    speed_ratio,
+                    volume_ratio,
+                    pitch_ratio,
+                    text_type,
+                    with_frontend,
+                    frontend_type,
+                    text,
+                ],
+                ensure_ascii=False,
+            )
+            audio = self.cache.get(cache_key)
+            record_cache_lookup("tts", audio is not None)
+            if audio is not None:
+                return {
+                    "success": True,
+                    "response": None,
+                    "audio_data": base64.b64encode(audio).decode(),
+                    "cached": True,
+                }
+
         if not uid:
             uid = str(uuid.uuid4())  # 生成唯一ID
 
@@ -112,7 +196,7 @@ class VolcengineTTS:
             },
             "user": {"uid": uid},
             "audio": {
-                "voice_type": self.voice_type,
+                "voice_type": voice_type,
                 "encoding": encoding,
                 "speed_ratio": speed_ratio,
                 "volume_ratio": volume_ratio,
@@ -148,6 +232,12 @@ class VolcengineTTS:
                     "audio_data": None,
                 }
 
+            if cache_key is not None:
+                try:
+                    self.cache.put(cache_key, base64.b64decode(response_json["data"]))
+                except Exception as e:
+                    logger.warning(f"Failed to cache TTS audio: {e}")  # 缓存TTS音频失败
+
             return {
                 "success": True,
                 "response": response_json,
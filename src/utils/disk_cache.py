@@ -0,0 +1,149 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Size-bounded content-addressed byte cache on disk.
+"""
+
+# 磁盘上有容量上限、按内容寻址的字节缓存
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+
+class DiskLRUCache:
+    """
+    Store byte values in files named by the SHA-256 of their key.
+
+    An in-memory index keeps entry sizes in least recently used order, so
+    lookups do not touch the directory and eviction is cheap. The index is
+    rebuilt from file modification times when the cache is opened, and hits
+    update the modification time, so the order survives restarts. Writes are
+    atomic, which lets several processes share one directory; an entry removed
+    by another process is simply a miss.
+    """
+
+    # 将字节值存储在以其键的SHA-256命名的文件中。
+    # 内存索引按最近最少使用的顺序记录条目大小，因此查找无需访问目录，淘汰开销也很小。
+    # 打开缓存时根据文件修改时间重建索引，命中时更新修改时间，因此顺序在重启后仍然保留。
+    # 写入是原子的，多个进程可以共享同一目录；被其他进程删除的条目只会视为未命中。
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _load_index(self) -> None:
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and len(entry.name) == 64:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._index[digest] = size
+            self._size += size
+        self._evict_locked()
+
+    def _forget_locked(self, digest: str) -> None:
+        self._size -= self._index.pop(digest, 0)
+
+    def _evict_locked(self) -> None:
+        while self._size > self.max_bytes and self._index:
+            digest, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value stored for `key`, or None."""
+        # 返回`key`对应的值，不存在时返回None
+        digest = self._digest(key)
+        with self._lock:
+            if digest not in self._index:
+                return None
+            self._index.move_to_end(digest)
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget_locked(digest)
+            return None
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store `value` for `key`, evicting least recently used entries beyond `max_bytes`."""
+        # 为`key`存储`value`，超出`max_bytes`时淘汰最近最少使用的条目
+        if len(value) > self.max_bytes:
+            return
+        digest = self._digest(key)
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self._forget_locked(digest)
+            self._index[digest] = len(value)
+            self._size += len(value)
+            self._evict_locked()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._digest(key) in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    @property
+    def size(self) -> int:
+        """Total bytes of the indexed entries."""
+        # 已索引条目的总字节数
+        return self._size
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        # 删除所有条目
+        with self._lock:
+            digests = list(self._index)
+            self._index.clear()
+            self._size = 0
+        for digest in digests:
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
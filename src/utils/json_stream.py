@@ -0,0 +1,201 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Incremental parsing of a JSON object that arrives as a token stream.
+"""
+
+# 对以令牌流形式到达的JSON对象进行增量解析
+
+import json
+import logging
+from typing import Any, Iterable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JSONStreamEvent(NamedTuple):
+    """A top-level field or an array item that has been fully received."""
+
+    # 已完整接收的顶层字段或数组元素
+
+    kind: str  # "field" or "item"
+    key: str
+    value: Any
+    index: Optional[int] = None  # Position of an "item" in its array 数组元素的位置
+
+
+class JSONStreamParser:
+    """
+    Parse a streamed JSON object and report values as soon as they complete.
+
+    Top-level fields are reported when their value is closed, and elements of
+    the fields named in `array_fields` are reported one by one, so a consumer
+    can act on the first plan step before the model has written the second.
+    Anything before the opening brace (e.g. a markdown code fence) is skipped.
+    Each character is scanned once; completed values are decoded with
+    `json.loads` on their slice of the buffer.
+    """
+
+    # 解析流式JSON对象，并在值完成时立即报告。
+    # 顶层字段在其值闭合时报告，`array_fields`中指定字段的元素逐个报告，
+    # 这样调用方可以在模型写出第二个步骤之前就处理第一个计划步骤。
+    # 左花括号之前的任何内容（例如markdown代码块标记）都会被跳过。
+    # 每个字符只扫描一次；完成的值通过对缓冲区切片调用`json.loads`解码。
+
+    def __init__(self, array_fields: Iterable[str] = ()):
+        self._array_fields = frozenset(array_fields)
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._awaiting_value = False
+        self._value_start: Optional[int] = None
+        self._streaming_array = False
+        self._awaiting_item = False
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+        self.done = False
+        self.result: dict[str, Any] = {}  # Fields completed so far 目前已完成的字段
+        self._skipped = False
+
+    @property
+    def text(self) -> str:
+        """All text received so far."""
+        # 目前已接收的全部文本
+        return self._buffer
+
+    @property
+    def complete(self) -> bool:
+        """Whether the object was closed and every field in it decoded."""
+        # 对象是否已闭合且其中每个字段都已解码
+        return self.done and not self._skipped
+
+    def feed(self, chunk: str) -> list[JSONStreamEvent]:
+        """
+        Consume the next chunk of text.
+
+        Args:
+            chunk: Text appended to the stream
+
+        Returns:
+            Events for the fields and array items completed by this chunk
+        """
+        # 处理下一段文本，返回本段文本完成的字段和数组元素事件
+        events: list[JSONStreamEvent] = []
+        if not chunk:
+            return events
+        self._buffer += chunk
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            if self.done:
+                break
+            char = buffer[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buffer[self._key_start : pos + 1])
+                        self._key_start = None
+                continue
+
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                continue
+
+            if not char.isspace():
+                if self._awaiting_value:
+                    self._awaiting_value = False
+                    self._value_start = pos
+                    self._streaming_array = (
+                        char == "[" and self._key in self._array_fields
+                    )
+                elif self._awaiting_item and char != "]":
+                    self._awaiting_item = False
+                    self._item_start = pos
+                elif (
+                    self._depth == 1
+                    and self._value_start is None
+                    and char not in '":,}'
+                ):
+                    # Not valid JSON here (e.g. single quotes); leave it to the repairer
+                    # 此处不是有效的JSON（例如单引号），交给修复器处理
+                    self._skipped = True
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = pos
+            elif char == ":":
+                if (
+                    self._depth == 1
+                    and self._key is not None
+                    and self._value_start is None
+                ):
+                    self._awaiting_value = True
+            elif char in "{[":
+                self._depth += 1
+                if (
+                    self._streaming_array
+                    and self._depth == 2
+                    and pos == self._value_start
+                ):
+                    self._awaiting_item = True
+                    self._item_index = 0
+            elif char in "}]":
+                if self._streaming_array and self._depth == 2:
+                    self._finish_item(pos, events)
+                    self._awaiting_item = False
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_field(pos, events)
+                    self.done = True
+            elif char == ",":
+                if self._depth == 1:
+                    self._finish_field(pos, events)
+                elif self._streaming_array and self._depth == 2:
+                    self._finish_item(pos, events)
+                    self._awaiting_item = True
+        self._pos = len(buffer)
+        return events
+
+    def _decode(self, start: int, end: int) -> tuple[bool, Any]:
+        try:
+            return True, json.loads(self._buffer[start:end])
+        except json.JSONDecodeError:
+            logger.debug(
+                f"Skipping undecodable streamed value: {self._buffer[start:end]!r}"
+            )
+            self._skipped = True
+            return False, None
+
+    def _finish_item(self, end: int, events: list[JSONStreamEvent]) -> None:
+        if self._item_start is None:
+            return
+        ok, value = self._decode(self._item_start, end)
+        if ok:
+            events.append(JSONStreamEvent("item", self._key, value, self._item_index))
+        self._item_index += 1
+        self._item_start = None
+
+    def _finish_field(self, end: int, events: list[JSONStreamEvent]) -> None:
+        if self._key is not None and self._value_start is not None:
+            ok, value = self._decode(self._value_start, end)
+            if ok:
+                self.result[self._key] = value
+                events.append(JSONStreamEvent("field", self._key, value))
+        elif self._key is not None:
+            self._skipped = True  # Key without a value 只有键没有值
+        self._key = None
+        self._value_start = None
+        self._awaiting_value = False
+        self._streaming_array = False
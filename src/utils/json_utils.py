@@ -3,10 +3,112 @@
 
 import logging
 import json
+from typing import Any, TypeVar
+
 import json_repair
+from pydantic import BaseModel, ValidationError
 
 logger = logging.getLogger(__name__)  # 获取日志记录器
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+_CODE_FENCE_PREFIXES = ("```json", "```ts", "```")
+
+
+def _looks_like_json(content: str) -> bool:
+    """Whether stripped LLM output is worth handing to the JSON repairer."""
+    # 去除空白后的LLM输出是否值得交给JSON修复器
+    return content.startswith(("{", "[")) or "```json" in content or "```ts" in content
+
+
+def _strip_code_fence(content: str) -> str:
+    """Remove a surrounding markdown code fence from stripped content."""
+    # 移除已去除空白的内容外层的markdown代码块标记
+    for prefix in _CODE_FENCE_PREFIXES:
+        if content.startswith(prefix):
+            content = content.removeprefix(prefix)
+            break
+    if content.endswith("```"):
+        content = content.removesuffix("```")
+    return content.strip()
+
+
+def _repair_json(content: str, text: str, error: json.JSONDecodeError) -> Any:
+    """Slow path: repair JSON that failed strict parsing, re-raising `error` if hopeless."""
+    # 慢速路径：修复严格解析失败的JSON，无法修复时重新抛出`error`
+    if not _looks_like_json(content):
+        raise error
+    try:
+        repaired = json_repair.loads(text)  # 使用json_repair库加载并修复JSON
+    except Exception as repair_error:
+        logger.warning(f"JSON repair failed: {repair_error}")  # JSON修复失败
+        raise error
+    if repaired == "":
+        # json_repair returns an empty string when it finds no JSON at all
+        # json_repair在完全找不到JSON时返回空字符串
+        raise error
+    logger.debug("Parsed LLM output after JSON repair")
+    return repaired
+
+
+def parse_json_output(content: str) -> Any:
+    """
+    Parse JSON produced by an LLM into Python objects.
+
+    Well-formed output (optionally inside a code fence) is parsed with a single
+    strict `json.loads`; `json_repair` only runs when that fails.
+
+    Args:
+        content (str): String content that may contain JSON
+
+    Returns:
+        Any: The parsed value
+
+    Raises:
+        json.JSONDecodeError: If the content is not JSON and cannot be repaired
+    """
+    # 将LLM生成的JSON解析为Python对象。
+    # 格式正确的输出（可以包含在代码块中）只需一次严格的`json.loads`；
+    # 只有在失败时才运行`json_repair`。
+    content = content.strip()  # 去除首尾空白
+    text = _strip_code_fence(content)
+    try:
+        return json.loads(text)  # 快速路径：严格解析
+    except json.JSONDecodeError as e:
+        return _repair_json(content, text, e)
+
+
+def parse_model_output(content: str, model: type[ModelT]) -> ModelT:
+    """
+    Parse LLM output straight into a pydantic model.
+
+    Well-formed JSON is validated directly from the string by pydantic without
+    building an intermediate dict; malformed JSON is repaired first.
+
+    Args:
+        content (str): String content that may contain JSON
+        model: The pydantic model class to validate into
+
+    Returns:
+        An instance of `model`
+
+    Raises:
+        json.JSONDecodeError: If the content is not JSON and cannot be repaired
+        pydantic.ValidationError: If the JSON does not match the model
+    """
+    # 将LLM输出直接解析为pydantic模型。
+    # 格式正确的JSON由pydantic直接从字符串校验，不构建中间字典；格式错误的JSON先进行修复。
+    content = content.strip()  # 去除首尾空白
+    text = _strip_code_fence(content)
+    try:
+        return model.model_validate_json(text)  # 快速路径：解析并校验
+    except ValidationError as e:
+        json_errors = [error for error in e.errors() if error["type"] == "json_invalid"]
+        if not json_errors:
+            raise
+        decode_error = json.JSONDecodeError(json_errors[0]["msg"], text, 0)
+    return model.model_validate(_repair_json(content, text, decode_error))
+
 
 def repair_json_output(content: str) -> str:
     """
@@ -25,26 +127,12 @@ def repair_json_output(content: str) -> str:
     #
     # 返回:
     #     str: 修复后的JSON字符串，如果不是JSON则返回原始内容
-    
+
     content = content.strip()  # 去除首尾空白
-    if content.startswith(("{", "[")) or "```json" in content or "```ts" in content:
+    if _looks_like_json(content):
         # 如果内容以{或[开头，或包含```json或```ts标记
         try:
-            # If content is wrapped in ```json code block, extract the JSON part
-            # 如果内容被```json代码块包裹，提取JSON部分
-            if content.startswith("```json"):
-                content = content.removeprefix("```json")  # 移除```json前缀
-
-            if content.startswith("```ts"):
-                content = content.removeprefix("```ts")  # 移除```ts前缀
-
-            if content.endswith("```"):
-                content = content.removesuffix("```")  # 移除```后缀
-
-            # Try to repair and parse JSON
-            # 尝试修复和解析JSON
-            repaired_content = json_repair.loads(content)  # 使用json_repair库加载并修复JSON
-            return json.dumps(repaired_content, ensure_ascii=False)  # 转换为JSON字符串，确保非ASCII字符不被转义
+            return json.dumps(parse_json_output(content), ensure_ascii=False)  # 转换为JSON字符串，确保非ASCII字符不被转义
         except Exception as e:
             logger.warning(f"JSON repair failed: {e}")  # JSON修复失败
     return content  # 返回内容
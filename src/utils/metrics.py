@@ -0,0 +1,515 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+In-process metrics registry rendered in the Prometheus text exposition format.
+"""
+
+# 进程内指标注册表，以Prometheus文本格式输出
+
+import asyncio
+import functools
+import inspect
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)  # 获取日志记录器
+
+# Default latency buckets in seconds, covering fast cache hits up to slow LLM calls
+# 默认延迟分桶（秒），覆盖从快速缓存命中到较慢的LLM调用
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects it."""
+    # 按Prometheus要求的格式输出样本值
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    # 转义标签值中的特殊字符
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _CounterChild:
+    """A single labelled counter time series."""
+
+    # 单个带标签的计数器时间序列
+
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    """A single labelled gauge time series."""
+
+    # 单个带标签的仪表时间序列
+
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the gauge lazily at collection time instead of storing a value."""
+        # 在采集时惰性计算仪表值，而不是存储值
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception as e:
+                logger.warning(f"Failed to collect gauge value: {e}")  # 采集仪表值失败
+                return math.nan
+        return self._value
+
+
+class _HistogramChild:
+    """A single labelled histogram time series."""
+
+    # 单个带标签的直方图时间序列
+
+    __slots__ = ("_bounds", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is the +Inf bucket
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> "_Timer":
+        """Return a context manager that observes the elapsed wall time."""
+        # 返回一个记录耗时的上下文管理器
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric:
+    """Base class for metric families that hold one child per label set."""
+
+    # 指标族基类，每组标签值对应一个子序列
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child_for(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child_for(self, key: tuple[str, ...]):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def labels(self, *values: str, **kwargs: str):
+        """
+        Return the child series for the given label values.
+
+        Hot paths should call this once and keep the returned child around.
+        """
+        # 返回给定标签值对应的子序列；热点路径应缓存返回的子序列
+        if kwargs:
+            if values:
+                raise ValueError("Use either positional or keyword label values")
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        return self._child_for(tuple(str(v) for v in values))
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    # 单调递增的计数器
+
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    # 可增可减的仪表
+
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    # 在固定分桶上统计观测值的分布
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        bounds = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        if not bounds:
+            raise ValueError("Histogram needs at least one finite bucket")
+        self.buckets = bounds
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def _samples(self) -> list[str]:
+        samples = []
+        bucket_names = self.labelnames + ("le",)
+        for key, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_names, key + (_format_value(bound),))
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            samples.append(f"{self.name}_count{labels} {count}")
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Registry holding all metric families of the process.
+    """
+
+    # 保存进程内所有指标族的注册表
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric_cls, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, metric_cls):
+                    raise ValueError(f"Metric {name} is already registered")
+                return existing
+            metric = metric_cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, function: Callable[[], None]) -> None:
+        """Call `function` once before every render, e.g. to set several gauges from one snapshot."""
+        # 在每次输出之前调用一次`function`，例如从一次快照设置多个仪表
+        with self._lock:
+            self._collectors.append(function)
+
+    def render(self) -> str:
+        """Render every metric family in the Prometheus text format (v0.0.4)."""
+        # 以Prometheus文本格式（v0.0.4）输出所有指标族
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Process-wide default registry
+# 进程级默认注册表
+REGISTRY = MetricsRegistry()
+
+# Shared metric families used across modules
+# 各模块共享的指标族
+NODE_DURATION = REGISTRY.histogram(
+    "deerflow_graph_node_duration_seconds",
+    "Execution time of graph nodes.",
+    ["graph", "node"],
+)
+TOOL_CALL_DURATION = REGISTRY.histogram(
+    "deerflow_tool_call_duration_seconds",
+    "Latency of tool calls.",
+    ["tool", "provider"],
+)
+TOOL_CALLS = REGISTRY.counter(
+    "deerflow_tool_calls_total",
+    "Number of tool calls by outcome.",
+    ["tool", "provider", "status"],
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "deerflow_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup so the hit rate can be derived from the registry."""
+    # 记录一次缓存查找，以便从注册表计算命中率
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_tool_call(
+    tool: str, provider: str, duration: float, success: bool = True
+) -> None:
+    """Record the latency and outcome of a single tool call."""
+    # 记录单次工具调用的延迟和结果
+    TOOL_CALL_DURATION.labels(tool, provider).observe(duration)
+    TOOL_CALLS.labels(tool, provider, "ok" if success else "error").inc()
+
+
+def instrument_node(graph: str, node: str, func: Callable) -> Callable:
+    """
+    Wrap a graph node so its execution time is recorded.
+
+    The wrapper keeps the original signature, so LangGraph still sees the
+    `config` parameter and the `Command[...]` return annotation.
+
+    Args:
+        graph: Name of the graph the node belongs to
+        node: Name of the node
+        func: The node function (sync or async)
+
+    Returns:
+        The wrapped node function
+    """
+    # 包装图节点以记录其执行耗时；包装函数保留原始签名，
+    # 因此LangGraph仍能识别config参数和Command[...]返回注解
+    child = NODE_DURATION.labels(graph, node)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+EVENT_LOOP_LAG = REGISTRY.gauge(
+    "deerflow_event_loop_lag_seconds",
+    "Most recent delay between a scheduled wake-up and its actual execution.",
+)
+EVENT_LOOP_LAG_HISTOGRAM = REGISTRY.histogram(
+    "deerflow_event_loop_lag_distribution_seconds",
+    "Distribution of event loop lag samples.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """
+    Sample the event loop lag forever; run it as a background task.
+
+    Args:
+        interval: Seconds between two samples
+    """
+    # 持续采样事件循环延迟；应作为后台任务运行
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
@@ -0,0 +1,247 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Entry point of sandboxed Python REPL worker processes.
+
+This module only depends on the standard library so that starting a worker
+does not import the application. The parent side lives in
+`src.tools.python_sandbox`.
+
+Workers are either started directly (`worker_main`) or forked from a template
+process that has already imported the heavy modules (`template_main`), so new
+workers skip those imports.
+
+Protocol over the duplex pipe:
+
+- worker -> parent: ``("ready", info)`` once the preloads are imported, where
+  ``info["preloaded"]`` maps module names to their cold import seconds
+- parent -> worker: ``("exec", code, cpu_seconds)``
+- worker -> parent: ``("stdout", text)`` chunks while the code runs, then
+  ``("done", ok, error)`` where `error` is the `repr` of the raised exception
+"""
+
+# 沙箱Python REPL工作进程的入口。
+# 本模块只依赖标准库，启动工作进程时不会导入整个应用。父进程一侧位于`src.tools.python_sandbox`。
+# 工作进程可以直接启动（`worker_main`），也可以从已导入重量级模块的模板进程派生（`template_main`），
+# 这样新的工作进程无需再导入这些模块。
+
+import importlib
+import io
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import time
+from multiprocessing.reduction import send_handle
+from typing import Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Flush streamed stdout once this many characters are buffered
+# 缓冲的字符数达到该值时刷新流式标准输出
+STDOUT_CHUNK_CHARS = 4096
+
+
+class CPUTimeLimitExceeded(TimeoutError):
+    """Raised inside the worker when a snippet uses up its CPU time budget."""
+
+    # 代码片段用完CPU时间预算时在工作进程内抛出
+
+
+def sanitize_input(query: str) -> str:
+    """Strip whitespace, backticks and a leading `python`, like `PythonREPL` does."""
+    # 与`PythonREPL`一样，去除空白、反引号和开头的`python`
+    query = re.sub(r"^(\s|`)*(?i:python)?\s*", "", query)
+    query = re.sub(r"(\s|`)*$", "", query)
+    return query
+
+
+class _PipeWriter(io.TextIOBase):
+    """A stdout replacement that streams what is printed to the parent."""
+
+    # 将打印内容流式发送给父进程的标准输出替代品
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._buffer: list[str] = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            self._buffer.append(text)
+            self._size += len(text)
+            if self._size >= STDOUT_CHUNK_CHARS or "\n" in text:
+                self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer:
+            chunk = "".join(self._buffer)
+            self._buffer.clear()
+            self._size = 0
+            self._conn.send(("stdout", chunk))
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPUTimeLimitExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_limit(cpu_seconds: Optional[float]) -> None:
+    """Allow `cpu_seconds` more CPU time from now on (RLIMIT_CPU counts the whole process)."""
+    # 从现在起再允许`cpu_seconds`的CPU时间（RLIMIT_CPU按整个进程累计）
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if not cpu_seconds:
+        soft = hard
+    else:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _set_memory_limit(memory_mb: int) -> None:
+    if resource is None or memory_mb <= 0:
+        return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def preload_modules(names) -> dict[str, float]:
+    """Import `names`, skipping ones that are not installed, and return import seconds per module."""
+    # 导入`names`，跳过未安装的模块，并返回每个模块的导入耗时（秒）
+    timings = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def _execute(conn, namespace: dict[str, Any], code: str) -> tuple[bool, Optional[str]]:
+    writer = _PipeWriter(conn)
+    old_stdout = sys.stdout
+    sys.stdout = writer
+    try:
+        exec(sanitize_input(code), namespace)
+        return True, None
+    except BaseException as e:
+        return False, repr(e)
+    finally:
+        sys.stdout = old_stdout
+        try:
+            writer.flush()
+        except Exception:
+            pass
+
+
+def _init_process() -> None:
+    # Interrupts are meant for the parent's process group, not for us
+    # 中断信号是发给父进程的进程组的，不应影响工作进程
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None and hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    sys.stdin = open(os.devnull)
+
+
+def _serve(conn, preloaded: dict[str, float], memory_mb: int) -> None:
+    """Report ready, then serve `exec` requests until the pipe closes."""
+    # 报告就绪，然后处理`exec`请求直到管道关闭
+    _set_memory_limit(memory_mb)
+    namespace: dict[str, Any] = {"__name__": "__main__", "__builtins__": __builtins__}
+    conn.send(("ready", {"pid": os.getpid(), "preloaded": preloaded}))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message[0] != "exec":
+            continue
+        _, code, cpu_seconds = message
+        _set_cpu_limit(cpu_seconds)
+        ok, error = _execute(conn, namespace, code)
+        _set_cpu_limit(None)
+        conn.send(("done", ok, error))
+
+
+def worker_main(conn, preload: tuple, memory_mb: int) -> None:
+    """
+    Import `preload` and serve `exec` requests from the parent until the pipe closes.
+
+    Args:
+        conn: Worker end of a duplex `multiprocessing.Pipe`
+        preload: Module names to import before reporting ready
+        memory_mb: Address space limit in MiB, 0 for none
+    """
+    # 导入`preload`并处理来自父进程的`exec`请求，直到管道关闭
+    _init_process()
+    _serve(conn, preload_modules(preload), memory_mb)
+
+
+def template_main(control, preload: tuple, memory_mb: int) -> None:
+    """
+    Import `preload` once, then fork a worker for every ``("fork",)`` request.
+
+    For each fork the template replies ``("forked", pid)`` and passes the parent
+    end of the new worker's pipe over `control` as a file descriptor. Workers
+    inherit the imported modules, so they are ready within milliseconds.
+
+    Args:
+        control: Template end of a duplex `multiprocessing.Pipe` (a Unix socket)
+        preload: Module names to import before reporting ready
+        memory_mb: Address space limit in MiB applied to each forked worker
+    """
+    # 只导入一次`preload`，然后为每个``("fork",)``请求派生一个工作进程。
+    # 每次派生后，模板回复``("forked", pid)``并通过`control`以文件描述符形式传递新工作进程管道的父进程端。
+    # 工作进程继承已导入的模块，因此在几毫秒内即可就绪。
+    _init_process()
+    # Forked workers are reaped automatically; their parent tracks them by pid
+    # 派生的工作进程会被自动回收；其父进程按pid跟踪它们
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    preloaded = preload_modules(preload)
+    parent_pid = os.getppid()
+    control.send(("ready", {"pid": os.getpid(), "preloaded": preloaded}))
+
+    while True:
+        try:
+            message = control.recv()
+        except (EOFError, OSError):
+            return
+        if message[0] != "fork":
+            continue
+        parent_end, child_end = multiprocessing.Pipe(duplex=True)
+        pid = os.fork()
+        if pid == 0:
+            exitcode = 0
+            try:
+                control.close()
+                parent_end.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                _serve(child_end, preloaded, memory_mb)
+            except BaseException:
+                exitcode = 1
+            finally:
+                os._exit(exitcode)
+        child_end.close()
+        control.send(("forked", pid))
+        send_handle(control, parent_end.fileno(), parent_pid)
+        parent_end.close()
@@ -0,0 +1,52 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""
+Coalesce concurrent calls for the same key into a single execution.
+"""
+
+# 将相同键的并发调用合并为一次执行
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Run at most one coroutine per key at a time and share its result.
+
+    Callers that arrive while a call for the same key is in flight await that
+    call instead of starting another one. A caller being cancelled does not
+    cancel the shared call.
+    """
+
+    # 每个键同一时间最多运行一个协程，并共享其结果。
+    # 同一键的调用正在进行时到达的调用方会等待该调用，而不是再启动一次。
+    # 某个调用方被取消不会取消共享的调用。
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await `func()` for `key`, joining a call that is already running.
+
+        Args:
+            key: Identifies calls that can share a result
+            func: Creates the coroutine to run when no call is in flight
+
+        Returns:
+            The result of the shared call
+        """
+        # 为`key`等待`func()`的结果，如果已有调用在运行则加入该调用
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
@@ -2,7 +2,13 @@
 # SPDX-License-Identifier: MIT
 
 import asyncio
+import json
 import logging
+import sys
+from typing import AsyncIterator, Optional, TextIO
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
 from src.graph import build_graph
 
 # Configure logging
@@ -30,15 +36,231 @@ logger = logging.getLogger(__name__)  # 获取当前模块的日志记录器
 graph = build_graph()  # 构建工作流图
 
 
+def build_initial_state(user_input: str, enable_background_investigation: bool = True) -> dict:
+    """
+    构建工作流的初始状态
+
+    参数:
+        user_input: 用户的查询或请求
+        enable_background_investigation: 如果为True，在规划前执行网络搜索以增强上下文
+
+    返回:
+        初始状态字典
+    """
+    return {
+        # Runtime Variables
+        # 运行时变量
+        "messages": [{"role": "user", "content": user_input}],  # 初始消息
+        "auto_accepted_plan": True,  # 自动接受计划
+        "enable_background_investigation": enable_background_investigation,  # 启用背景调查
+    }
+
+
+def build_workflow_config(
+    thread_id: str = "default",
+    max_plan_iterations: int = 1,
+    max_step_num: int = 3,
+) -> dict:
+    """
+    构建工作流的运行配置
+
+    参数:
+        thread_id: 工作流线程ID，同时运行的工作流应使用不同的ID
+        max_plan_iterations: 计划迭代的最大次数
+        max_step_num: 计划中步骤的最大数量
+
+    返回:
+        运行配置字典
+    """
+    return {
+        "configurable": {
+            "thread_id": thread_id,  # 线程ID
+            "max_plan_iterations": max_plan_iterations,  # 最大计划迭代次数
+            "max_step_num": max_step_num,  # 最大步骤数
+            "mcp_settings": {
+                "servers": {
+                    "mcp-github-trending": {
+                        "transport": "stdio",  # 传输方式
+                        "command": "uvx",  # 命令
+                        "args": ["mcp-github-trending"],  # 参数
+                        "enabled_tools": ["get_github_trending_repositories"],  # 启用的工具
+                        "add_to_agents": ["researcher"],  # 添加到代理
+                    }
+                }
+            },
+        },
+        "recursion_limit": 100,  # 递归限制
+    }
+
+
+OUTPUT_FORMATS = ("text", "jsonl")
+
+
+def _agent_name(namespace: tuple, metadata: dict) -> str:
+    # Messages of the researcher and coder subgraphs carry their node in the namespace
+    # 研究员和编码员子图的消息在命名空间中携带其节点
+    if namespace:
+        return namespace[0].split(":")[0]
+    return metadata.get("langgraph_node", "")
+
+
+async def stream_workflow_events(
+    user_input: str,
+    max_plan_iterations: int = 1,
+    max_step_num: int = 3,
+    enable_background_investigation: bool = True,
+    thread_id: str = "default",
+) -> AsyncIterator[dict]:
+    """
+    以事件字典的形式流式输出工作流
+
+    使用`messages`、`updates`和`custom`流模式，因此每个事件只包含新的令牌、
+    工具调用或节点名称，而不是整个状态。事件类型与服务器的SSE事件相同
+    （message_chunk、tool_call_chunks、tool_calls、tool_call_result、
+    plan_field、plan_step），另外还有每个顶层节点完成时的`node`事件和
+    报告员完成时的`final_report`事件。
+
+    参数:
+        user_input: 用户的查询或请求
+        max_plan_iterations: 计划迭代的最大次数
+        max_step_num: 计划中步骤的最大数量
+        enable_background_investigation: 如果为True，在规划前执行网络搜索以增强上下文
+        thread_id: 工作流线程ID
+
+    返回:
+        事件字典的异步迭代器
+    """
+    async for namespace, stream_mode, data in graph.astream(
+        input=build_initial_state(user_input, enable_background_investigation),
+        config=build_workflow_config(thread_id, max_plan_iterations, max_step_num),
+        stream_mode=["messages", "updates", "custom"],
+        subgraphs=True,
+    ):
+        if stream_mode == "custom":
+            # Structured events written by nodes, e.g. partial plans
+            # 节点写出的结构化事件，例如部分计划
+            if isinstance(data, dict) and "event" in data:
+                yield dict(data)
+        elif stream_mode == "updates":
+            # Only report the top-level nodes, not the steps inside the agents
+            # 只报告顶层节点，不报告智能体内部的步骤
+            if namespace or not isinstance(data, dict):
+                continue
+            for node, update in data.items():
+                if node.startswith("__"):
+                    continue
+                yield {"event": "node", "agent": node}
+                if isinstance(update, dict) and update.get("final_report"):
+                    yield {"event": "final_report", "agent": node, "content": update["final_report"]}
+        else:
+            message, metadata = data
+            event = {"agent": _agent_name(namespace, metadata), "id": message.id}
+            if isinstance(message, ToolMessage):
+                yield {
+                    "event": "tool_call_result",
+                    **event,
+                    "tool_call_id": message.tool_call_id,
+                    "content": message.content,
+                }
+            elif isinstance(message, AIMessageChunk):
+                if message.tool_call_chunks:
+                    event["tool_call_chunks"] = message.tool_call_chunks
+                    if message.tool_calls:
+                        event["tool_calls"] = message.tool_calls
+                    yield {"event": "tool_calls" if message.tool_calls else "tool_call_chunks", **event}
+                elif message.content:
+                    yield {"event": "message_chunk", **event, "content": message.content}
+
+
+class _TextPrinter:
+    """Print streamed tokens as they arrive, with a header whenever another agent speaks."""
+    # 在令牌到达时打印它们，每当另一个智能体发言时打印标题
+
+    def __init__(self, out: TextIO):
+        self._out = out
+        self._current = None  # 当前正在输出的(智能体, 消息ID)
+        self._at_line_start = True
+        self._streamed = set()  # 已流式输出令牌的智能体
+
+    def _write(self, text: str) -> None:
+        if text:
+            self._out.write(text)
+            self._at_line_start = text.endswith("\n")
+
+    def _start(self, key, header: str) -> None:
+        if key == self._current:
+            return
+        self._current = key
+        if not self._at_line_start:
+            self._write("\n")
+        self._write(f"\n{header}\n")
+
+    def __call__(self, event: dict) -> None:
+        kind = event["event"]
+        agent = event.get("agent", "")
+        if kind == "message_chunk":
+            self._streamed.add(agent)
+            self._start((agent, event.get("id")), f"[{agent}]")
+            content = event["content"]
+            self._write(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+        elif kind in ("tool_calls", "tool_call_chunks"):
+            self._start((agent, event.get("id")), f"[{agent}]")
+            for chunk in event["tool_call_chunks"]:
+                if chunk.get("name"):
+                    if not self._at_line_start:
+                        self._write("\n")
+                    self._write(f"-> {chunk['name']} ")
+                self._write(chunk.get("args") or "")
+        elif kind == "tool_call_result":
+            self._current = None
+            content = str(event.get("content", ""))
+            preview = content[:200].replace("\n", " ")
+            if not self._at_line_start:
+                self._write("\n")
+            self._write(f"<- [{agent}] {preview}{'...' if len(content) > 200 else ''}\n")
+        elif kind == "final_report" and agent not in self._streamed:
+            # The model did not stream, so the report has not been printed yet
+            # 模型没有流式输出，因此报告尚未打印
+            self._start((agent, None), f"[{agent}]")
+            self._write(event["content"])
+        self._out.flush()
+
+    def close(self) -> None:
+        if not self._at_line_start:
+            self._write("\n")
+        self._out.flush()
+
+
+class _JsonLinesPrinter:
+    """Write each event as one JSON line, for scripts reading the output."""
+    # 将每个事件写为一行JSON，供读取输出的脚本使用
+
+    def __init__(self, out: TextIO, thread_id: str):
+        self._out = out
+        self._thread_id = thread_id
+
+    def __call__(self, event: dict) -> None:
+        self._out.write(
+            json.dumps({**event, "thread_id": self._thread_id}, ensure_ascii=False, default=str) + "\n"
+        )
+        self._out.flush()
+
+    def close(self) -> None:
+        self._out.flush()
+
+
 async def run_agent_workflow_async(
     user_input: str,
     debug: bool = False,
     max_plan_iterations: int = 1,
     max_step_num: int = 3,
     enable_background_investigation: bool = True,
+    thread_id: str = "default",
+    output_format: str = "text",
+    out: Optional[TextIO] = None,
 ):
     """
-    使用给定的用户输入异步运行代理工作流
+    使用给定的用户输入异步运行代理工作流，并在输出产生时将其流式写出
     
     参数:
         user_input: 用户的查询或请求
@@ -46,11 +268,14 @@ async def run_agent_workflow_async(
         max_plan_iterations: 计划迭代的最大次数
         max_step_num: 计划中步骤的最大数量
         enable_background_investigation: 如果为True，在规划前执行网络搜索以增强上下文
+        thread_id: 工作流线程ID
+        output_format: "text"在令牌到达时打印它们，"jsonl"每个事件写一行JSON
+        out: 输出流，默认为标准输出
     
     返回:
-        工作流完成后的最终状态
+        最终报告，如果工作流没有生成报告则为None
     """
-    # 使用给定的用户输入异步运行代理工作流
+    # 使用给定的用户输入异步运行代理工作流，并在输出产生时将其流式写出
     #
     # 参数：
     #     user_input: 用户的查询或请求
@@ -58,65 +283,43 @@ async def run_agent_workflow_async(
     #     max_plan_iterations: 计划迭代的最大次数
     #     max_step_num: 计划中步骤的最大数量
     #     enable_background_investigation: 如果为True，在规划前执行网络搜索以增强上下文
+    #     thread_id: 工作流线程ID
+    #     output_format: "text"在令牌到达时打印它们，"jsonl"每个事件写一行JSON
+    #     out: 输出流，默认为标准输出
     #
     # 返回：
-    #     工作流完成后的最终状态
+    #     最终报告，如果工作流没有生成报告则为None
     if not user_input:
         raise ValueError("Input could not be empty")  # 输入不能为空
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")  # 未知的输出格式
 
     if debug:
         enable_debug_logging()  # 如果debug为True，启用调试日志
 
     logger.info(f"Starting async workflow with user input: {user_input}")  # 记录开始异步工作流的信息
-    initial_state = {
-        # Runtime Variables
-        # 运行时变量
-        "messages": [{"role": "user", "content": user_input}],  # 初始消息
-        "auto_accepted_plan": True,  # 自动接受计划
-        "enable_background_investigation": enable_background_investigation,  # 启用背景调查
-    }
-    config = {
-        "configurable": {
-            "thread_id": "default",  # 默认线程ID
-            "max_plan_iterations": max_plan_iterations,  # 最大计划迭代次数
-            "max_step_num": max_step_num,  # 最大步骤数
-            "mcp_settings": {
-                "servers": {
-                    "mcp-github-trending": {
-                        "transport": "stdio",  # 传输方式
-                        "command": "uvx",  # 命令
-                        "args": ["mcp-github-trending"],  # 参数
-                        "enabled_tools": ["get_github_trending_repositories"],  # 启用的工具
-                        "add_to_agents": ["researcher"],  # 添加到代理
-                    }
-                }
-            },
-        },
-        "recursion_limit": 100,  # 递归限制
-    }
-    last_message_cnt = 0  # 上一次消息计数
-    async for s in graph.astream(
-        input=initial_state, config=config, stream_mode="values"
-    ):  # 异步流式处理
-        try:
-            if isinstance(s, dict) and "messages" in s:
-                if len(s["messages"]) <= last_message_cnt:
-                    continue  # 如果消息数量没有增加，则继续
-                last_message_cnt = len(s["messages"])  # 更新消息计数
-                message = s["messages"][-1]  # 获取最新消息
-                if isinstance(message, tuple):
-                    print(message)  # 如果消息是元组，直接打印
-                else:
-                    message.pretty_print()  # 否则使用pretty_print方法打印
-            else:
-                # For any other output format
-                # 对于任何其他输出格式
-                print(f"Output: {s}")  # 打印输出
-        except Exception as e:
-            logger.error(f"Error processing stream output: {e}")  # 记录处理流输出错误
-            print(f"Error processing output: {str(e)}")  # 打印错误信息
+    out = out or sys.stdout
+    printer = _JsonLinesPrinter(out, thread_id) if output_format == "jsonl" else _TextPrinter(out)
+    final_report = None
+    try:
+        async for event in stream_workflow_events(
+            user_input,
+            max_plan_iterations=max_plan_iterations,
+            max_step_num=max_step_num,
+            enable_background_investigation=enable_background_investigation,
+            thread_id=thread_id,
+        ):
+            if event["event"] == "final_report":
+                final_report = event["content"]
+            try:
+                printer(event)
+            except Exception as e:
+                logger.error(f"Error processing stream output: {e}")  # 记录处理流输出错误
+    finally:
+        printer.close()
 
     logger.info("Async workflow completed successfully")  # 异步工作流成功完成
+    return final_report
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.tools import BaseTool, StructuredTool, tool
+
+from src.agents import agents
+from src.agents import create_agent, invalidate_agent_cache
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+@pytest.fixture(autouse=True)
+def fake_agent_factory(monkeypatch):
+    invalidate_agent_cache()
+    model = MagicMock()
+    with (
+        patch.object(agents, "get_llm_by_type", return_value=model),
+        patch.object(
+            agents, "create_react_agent", side_effect=lambda **kwargs: MagicMock()
+        ) as factory,
+    ):
+        yield factory
+    invalidate_agent_cache()
+
+
+def test_same_tools_reuse_compiled_agent(fake_agent_factory):
+    first = create_agent("researcher", "researcher", [lookup], "researcher")
+    second = create_agent("researcher", "researcher", [lookup], "researcher")
+    assert first is second
+    assert fake_agent_factory.call_count == 1
+
+
+class SearchTool(BaseTool):
+    name: str = "web_search"
+    description: str = "Search the web."
+    max_results: int = 3
+
+    def _run(self, query: str) -> str:
+        return query
+
+
+def test_equivalent_tool_instances_share_an_agent(fake_agent_factory):
+    first = create_agent("researcher", "researcher", [SearchTool()], "researcher")
+    assert (
+        create_agent("researcher", "researcher", [SearchTool()], "researcher") is first
+    )
+    assert (
+        create_agent(
+            "researcher", "researcher", [SearchTool(max_results=5)], "researcher"
+        )
+        is not first
+    )
+
+
+def test_different_tools_or_types_build_new_agents(fake_agent_factory):
+    other = StructuredTool.from_function(
+        func=lambda query: query, name="lookup", description="Look something up."
+    )
+    a = create_agent("researcher", "researcher", [lookup], "researcher")
+    b = create_agent("researcher", "researcher", [other], "researcher")
+    c = create_agent("coder", "coder", [lookup], "coder")
+    assert len({id(a), id(b), id(c)}) == 3
+
+
+def test_invalidate_by_type_and_lru_bound(fake_agent_factory, monkeypatch):
+    researcher = create_agent("researcher", "researcher", [lookup], "researcher")
+    coder = create_agent("coder", "coder", [lookup], "coder")
+    invalidate_agent_cache("researcher")
+    assert create_agent("coder", "coder", [lookup], "coder") is coder
+    assert (
+        create_agent("researcher", "researcher", [lookup], "researcher")
+        is not researcher
+    )
+
+    monkeypatch.setenv("AGENT_CACHE_SIZE", "1")
+    invalidate_agent_cache()
+    first = create_agent("researcher", "researcher", [lookup], "researcher")
+    create_agent("coder", "coder", [lookup], "coder")
+    assert create_agent("researcher", "researcher", [lookup], "researcher") is not first
+
+
+def test_cache_can_be_disabled(fake_agent_factory, monkeypatch):
+    monkeypatch.setenv("AGENT_CACHE_SIZE", "0")
+    create_agent("researcher", "researcher", [lookup], "researcher")
+    create_agent("researcher", "researcher", [lookup], "researcher")
+    assert fake_agent_factory.call_count == 2
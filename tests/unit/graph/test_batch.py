@@ -0,0 +1,151 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from src.batch import BatchRunner, UsageCallbackHandler, query_id, read_queries
+
+
+class FakeGraph:
+    def __init__(self, delay=0.05, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+
+    async def ainvoke(self, state, config):
+        query = state["messages"][0]["content"]
+        self.calls.append(
+            (
+                query,
+                config["configurable"]["thread_id"],
+                config["configurable"]["max_step_num"],
+            )
+        )
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            usage = config["callbacks"][0]
+            message = AIMessage(
+                "plan",
+                usage_metadata={
+                    "input_tokens": 10,
+                    "output_tokens": 5,
+                    "total_tokens": 15,
+                },
+            )
+            usage.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+            if query in self.fail:
+                raise RuntimeError("search down")
+            return {"final_report": f"Report on {query}", "messages": [1, 2]}
+        finally:
+            self.running -= 1
+
+
+def write_lines(path, lines):
+    path.write_text(
+        "\n".join(json.dumps(line) for line in lines) + "\n", encoding="utf-8"
+    )
+
+
+def read_records(path):
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            pass
+    return records
+
+
+def test_read_queries(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    write_lines(path, ["deer", {"id": "q2", "query": "flow", "max_step_num": 5}])
+    assert read_queries(str(path)) == [
+        {"id": query_id("deer"), "query": "deer"},
+        {"id": "q2", "query": "flow", "max_step_num": 5},
+    ]
+    write_lines(path, ["deer", "deer"])
+    with pytest.raises(ValueError):
+        read_queries(str(path))
+
+
+def test_runs_concurrently_with_isolated_threads(tmp_path):
+    queries, output = tmp_path / "queries.jsonl", tmp_path / "out" / "results.jsonl"
+    write_lines(
+        queries,
+        [f"topic {i}" for i in range(6)]
+        + [{"id": "custom", "query": "topic x", "max_step_num": 7}],
+    )
+    graph = FakeGraph(fail={"topic 3"})
+
+    summary = asyncio.run(
+        BatchRunner(graph, concurrency=3).run(str(queries), str(output))
+    )
+    assert (
+        summary["queries"] == 7 and summary["succeeded"] == 6 and summary["failed"] == 1
+    )
+    assert graph.max_running == 3
+    assert len({thread_id for _, thread_id, _ in graph.calls}) == 7
+    assert ("topic x", graph.calls[-1][1], 7) in graph.calls
+
+    records = {record["query"]: record for record in read_records(output)}
+    assert records["topic 0"]["final_report"] == "Report on topic 0"
+    assert records["topic 0"]["metrics"]["input_tokens"] == 10
+    assert records["topic 0"]["metrics"]["llm_calls"] == 1
+    assert (
+        records["topic 3"]["status"] == "error"
+        and "search down" in records["topic 3"]["error"]
+    )
+
+
+def test_rerun_skips_finished_queries(tmp_path):
+    queries, output = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    write_lines(queries, ["a", "b", "c"])
+    asyncio.run(BatchRunner(FakeGraph(fail={"b"})).run(str(queries), str(output)))
+    # A crash in the middle of writing a record
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": "partial", "sta')
+
+    graph = FakeGraph()
+    summary = asyncio.run(BatchRunner(graph).run(str(queries), str(output)))
+    assert [query for query, _, _ in graph.calls] == ["b"]
+    assert (summary["skipped"], summary["succeeded"]) == (2, 1)
+    assert output.read_text(encoding="utf-8").count("\n") == 5
+    assert sum(1 for record in read_records(output) if record["status"] == "ok") == 3
+
+
+def test_timeout_is_recorded(tmp_path):
+    queries, output = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    write_lines(queries, ["slow"])
+    summary = asyncio.run(
+        BatchRunner(FakeGraph(delay=1.0), timeout=0.05).run(str(queries), str(output))
+    )
+    assert summary["failed"] == 1
+    assert read_records(output)[0]["status"] == "timeout"
+
+
+def test_usage_handler_falls_back_to_token_usage():
+    usage = UsageCallbackHandler()
+    usage.on_llm_end(
+        LLMResult(
+            generations=[[ChatGeneration(message=AIMessage("x"))]],
+            llm_output={"token_usage": {"prompt_tokens": 3, "completion_tokens": 2}},
+        )
+    )
+    usage.on_tool_start({}, "query")
+    assert usage.to_dict() == {
+        "llm_calls": 1,
+        "llm_errors": 0,
+        "input_tokens": 3,
+        "output_tokens": 2,
+        "tool_calls": 1,
+        "tool_errors": 0,
+    }
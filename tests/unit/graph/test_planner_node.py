@@ -0,0 +1,90 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.graph import nodes
+from src.prompts.planner_model import Plan
+
+PLAN = (
+    '{"locale": "en-US", "has_enough_context": false, "thought": "t", '
+    '"title": "Deer", "steps": [{"need_search": true, "title": "Deer diet", '
+    '"description": "d", "step_type": "research"}]}'
+)
+
+
+class FakeLLM:
+    def __init__(self, response):
+        self.response = response
+
+    def bind(self, **kwargs):
+        return self
+
+    def stream(self, messages):
+        for i in range(0, len(self.response), 16):
+            yield AIMessageChunk(content=self.response[i : i + 16])
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    monkeypatch.setattr(nodes, "apply_prompt_template", lambda *args: [])
+
+    def run(response, plan_iterations=0, thread_id=None):
+        monkeypatch.setattr(
+            nodes, "get_llm_by_type", lambda llm_type: FakeLLM(response)
+        )
+        state = {"messages": [], "plan_iterations": plan_iterations}
+        config = {"configurable": {"thread_id": thread_id} if thread_id else {}}
+        return nodes.planner_node(state, config)
+
+    return run
+
+
+def test_planner_stores_the_validated_plan(planner, monkeypatch):
+    command = planner(PLAN)
+    assert command.goto == "human_feedback"
+    plan = command.update["current_plan"]
+    assert plan == Plan.model_validate_json(PLAN)
+
+    # The accepted plan is used as is, without parsing it again
+    monkeypatch.setattr(Plan, "model_validate", None)
+    monkeypatch.setattr(Plan, "model_validate_json", None)
+    state = {"current_plan": plan, "auto_accepted_plan": True}
+    command = nodes.human_feedback_node(state)
+    assert command.goto == "research_team"
+    assert command.update["current_plan"] is plan
+    assert command.update["plan_iterations"] == 1
+
+
+def test_responses_the_stream_cannot_decode_are_repaired(planner, monkeypatch):
+    parsed = []
+    parse_model_output = nodes.parse_model_output
+    monkeypatch.setattr(
+        nodes,
+        "parse_model_output",
+        lambda content, model: parsed.append(content)
+        or parse_model_output(content, model),
+    )
+    fenced = f"```json\n{PLAN[:-1]},\n```"  # fenced, with a trailing comma
+    plan = planner(fenced).update["current_plan"]
+    assert plan == Plan.model_validate_json(PLAN)
+    assert parsed == [fenced]
+
+
+@pytest.mark.parametrize(
+    "response", ["I cannot make a plan for this.", '{"title": "missing fields"}', "[]"]
+)
+def test_invalid_plans_end_the_workflow(planner, response):
+    assert planner(response).goto == "__end__"
+    assert planner(response, plan_iterations=1).goto == "reporter"
+
+
+def test_a_new_plan_discards_the_searches_prefetched_for_the_last_one(
+    planner, monkeypatch
+):
+    discarded = []
+    monkeypatch.setattr(nodes.search_prefetcher, "discard", discarded.append)
+    planner(PLAN, plan_iterations=1, thread_id="t1")
+    planner(PLAN)
+    assert discarded == ["t1"]
@@ -0,0 +1,86 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+from src.graph.prefetch import SearchPrefetcher, get_prefetch_step_limit
+
+
+def test_take_returns_result_once():
+    prefetcher = SearchPrefetcher(max_workers=1)
+    assert prefetcher.submit("t1", "step", lambda: ["result"])
+    assert not prefetcher.submit("t1", "step", lambda: ["other"])
+    assert prefetcher.take("t1", "step", timeout=1) == ["result"]
+    assert prefetcher.take("t1", "step", timeout=1) is None
+
+
+def test_take_gives_up_on_slow_search():
+    release = threading.Event()
+    prefetcher = SearchPrefetcher(max_workers=1)
+    prefetcher.submit("t1", "step", lambda: release.wait(5))
+    assert prefetcher.take("t1", "step", timeout=0.01) is None
+    release.set()
+
+
+def test_failed_search_yields_none():
+    def boom():
+        raise RuntimeError("search failed")
+
+    prefetcher = SearchPrefetcher(max_workers=1)
+    prefetcher.submit("t1", "step", boom)
+    assert prefetcher.take("t1", "step", timeout=1) is None
+
+
+def test_entries_are_scoped_by_thread_and_expire():
+    prefetcher = SearchPrefetcher(max_workers=1, ttl=0)
+    prefetcher.submit("t1", "step", lambda: "a")
+    assert prefetcher.take("t2", "step") is None
+    prefetcher.submit("t1", "other", lambda: "b")  # expires the first entry
+    assert prefetcher.take("t1", "step") is None
+
+
+def test_take_expires_unclaimed_entries_of_other_threads():
+    prefetcher = SearchPrefetcher(max_workers=1, ttl=0.05)
+    prefetcher.submit("t1", "step", lambda: "a")
+    time.sleep(0.1)
+    assert prefetcher.take("t2", "step") is None
+    assert prefetcher._entries == {}
+
+
+def test_discard_drops_the_entries_of_a_thread():
+    prefetcher = SearchPrefetcher(max_workers=1)
+    prefetcher.submit("t1", "step", lambda: "a")
+    prefetcher.submit("t2", "step", lambda: "b")
+    prefetcher.discard("t1")
+    assert prefetcher.take("t1", "step", timeout=1) is None
+    assert prefetcher.take("t2", "step", timeout=1) == "b"
+
+
+def test_prefetch_step_limit_from_env(monkeypatch):
+    monkeypatch.setenv("PLANNER_PREFETCH_STEPS", "2")
+    assert get_prefetch_step_limit() == 2
+    monkeypatch.setenv("PLANNER_PREFETCH_STEPS", "nope")
+    assert get_prefetch_step_limit() == 1
+
+
+def test_plan_stream_prefetches_only_auto_accepted_plans(monkeypatch):
+    from src.graph import nodes
+
+    submitted = []
+    monkeypatch.setattr(
+        nodes.search_prefetcher,
+        "submit",
+        lambda thread_id, key, search: submitted.append((thread_id, key)),
+    )
+    plan = (
+        '{"locale": "en-US", "has_enough_context": false, "thought": "t", '
+        '"title": "Deer", "steps": [{"need_search": true, "title": "Deer diet", '
+        '"description": "d", "step_type": "research"}]}'
+    )
+    config = {"configurable": {"thread_id": "t1"}}
+
+    nodes._PlanStreamHandler(config, prefetch=False).feed(plan)
+    assert submitted == []
+    nodes._PlanStreamHandler(config, prefetch=True).feed(plan)
+    assert submitted == [("t1", "Deer diet")]
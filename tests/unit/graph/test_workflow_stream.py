@@ -0,0 +1,135 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import io
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+import src.workflow as workflow
+from src.workflow import run_agent_workflow_async, stream_workflow_events
+
+
+class FakeGraph:
+    def __init__(self, items):
+        self.items = items
+        self.kwargs = None
+
+    async def astream(self, **kwargs):
+        self.kwargs = kwargs
+        for item in self.items:
+            yield item
+
+
+def tool_call_chunk(name, args, id):
+    return AIMessageChunk(
+        content="",
+        id="call-msg",
+        tool_call_chunks=[{"name": name, "args": args, "id": id, "index": 0}],
+    )
+
+
+STREAM = [
+    (
+        (),
+        "custom",
+        {"event": "plan_field", "agent": "planner", "field": "title", "value": "Deer"},
+    ),
+    (
+        (),
+        "messages",
+        (AIMessageChunk(content="Planning ", id="p1"), {"langgraph_node": "planner"}),
+    ),
+    (
+        (),
+        "messages",
+        (AIMessageChunk(content="done", id="p1"), {"langgraph_node": "planner"}),
+    ),
+    ((), "updates", {"planner": {"current_plan": "..."}}),
+    (
+        ("researcher:1",),
+        "messages",
+        (
+            tool_call_chunk("web_search", '{"query": ', "t1"),
+            {"langgraph_node": "agent"},
+        ),
+    ),
+    (
+        ("researcher:1",),
+        "messages",
+        (tool_call_chunk(None, '"deer"}', None), {"langgraph_node": "agent"}),
+    ),
+    (("researcher:1",), "updates", {"agent": {"messages": []}}),
+    (
+        ("researcher:1",),
+        "messages",
+        (ToolMessage(content="Deer eat grass.", tool_call_id="t1", id="r1"), {}),
+    ),
+    # Whole messages written to the state are not repeated
+    (
+        ("researcher:1",),
+        "messages",
+        (AIMessage(content="Deer eat grass.", id="a1"), {}),
+    ),
+    ((), "updates", {"reporter": {"final_report": "# Deer"}}),
+]
+
+
+def test_stream_events(monkeypatch):
+    graph = FakeGraph(STREAM)
+    monkeypatch.setattr(workflow, "graph", graph)
+
+    async def collect():
+        return [event async for event in stream_workflow_events("deer", thread_id="t")]
+
+    events = asyncio.run(collect())
+    assert graph.kwargs["stream_mode"] == ["messages", "updates", "custom"]
+    assert graph.kwargs["config"]["configurable"]["thread_id"] == "t"
+    assert [event["event"] for event in events] == [
+        "plan_field",
+        "message_chunk",
+        "message_chunk",
+        "node",
+        "tool_calls",
+        "tool_call_chunks",
+        "tool_call_result",
+        "node",
+        "final_report",
+    ]
+    assert events[4]["agent"] == "researcher"
+    assert events[4]["tool_calls"][0]["name"] == "web_search"
+    assert events[-1] == {
+        "event": "final_report",
+        "agent": "reporter",
+        "content": "# Deer",
+    }
+
+
+def test_text_output_streams_tokens(monkeypatch):
+    monkeypatch.setattr(workflow, "graph", FakeGraph(STREAM))
+    out = io.StringIO()
+    report = asyncio.run(run_agent_workflow_async("deer", out=out))
+    assert report == "# Deer"
+    assert out.getvalue() == (
+        "\n[planner]\nPlanning done\n"
+        '\n[researcher]\n-> web_search {"query": "deer"}\n'
+        "<- [researcher] Deer eat grass.\n"
+        "\n[reporter]\n# Deer\n"
+    )
+
+
+def test_jsonl_output(monkeypatch):
+    monkeypatch.setattr(workflow, "graph", FakeGraph(STREAM))
+    out = io.StringIO()
+    asyncio.run(
+        run_agent_workflow_async("deer", output_format="jsonl", thread_id="t", out=out)
+    )
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(events) == 9
+    assert all(event["thread_id"] == "t" for event in events)
+    assert events[1]["content"] == "Planning "
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_agent_workflow_async("deer", output_format="yaml"))
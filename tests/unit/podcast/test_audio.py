@@ -0,0 +1,129 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import io
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from src.podcast.audio import (
+    SAMPLE_RATE,
+    FFmpegMP3Encoder,
+    WavStreamEncoder,
+    fix_wav_header,
+    mix_lines,
+    normalize_loudness,
+    pcm_to_samples,
+    samples_to_pcm,
+)
+from src.podcast.graph.audio_mixer_node import audio_mixer_node
+
+
+def _tone(seconds, amplitude, frequency=220.0):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return samples_to_pcm(amplitude * np.sin(2 * np.pi * frequency * t))
+
+
+def _rms_dbfs(samples):
+    return 20 * np.log10(np.sqrt(np.mean(np.square(samples))))
+
+
+def _read_wav(data):
+    with wave.open(io.BytesIO(fix_wav_header(data))) as wav:
+        assert wav.getframerate() == SAMPLE_RATE
+        assert wav.getnchannels() == 1 and wav.getsampwidth() == 2
+        return pcm_to_samples(wav.readframes(wav.getnframes()))
+
+
+def test_lines_are_normalized_to_the_same_loudness():
+    quiet = normalize_loudness(pcm_to_samples(_tone(0.5, 0.02)), -20)
+    loud = normalize_loudness(pcm_to_samples(_tone(0.5, 0.9)), -20)
+    assert _rms_dbfs(quiet) == pytest.approx(-20, abs=0.1)
+    assert _rms_dbfs(loud) == pytest.approx(-20, abs=0.1)
+
+
+def test_peaks_are_limited_and_silence_is_untouched():
+    spiky = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    spiky[::1000] = 0.5
+    assert np.max(np.abs(normalize_loudness(spiky, -10))) <= 10 ** (-1 / 20) + 1e-6
+    silence = np.zeros(100, dtype=np.float32)
+    assert not normalize_loudness(silence).any()
+
+
+def test_pauses_depend_on_speaker_changes():
+    lines = [
+        ("male", _tone(0.1, 0.3)),
+        ("male", _tone(0.1, 0.3)),
+        ("female", _tone(0.1, 0.3)),
+    ]
+    output = b"".join(
+        mix_lines(lines, WavStreamEncoder(), pause_ms=100, speaker_pause_ms=500)
+    )
+    samples = _read_wav(output)
+
+    assert samples.size == int(SAMPLE_RATE * (0.3 + 0.1 + 0.5))
+    gap_same = samples[int(SAMPLE_RATE * 0.1) : int(SAMPLE_RATE * 0.2)]
+    gap_change = samples[int(SAMPLE_RATE * 0.3) : int(SAMPLE_RATE * 0.8)]
+    assert not gap_same.any() and not gap_change.any()
+
+
+def test_audio_is_yielded_before_later_lines_are_produced():
+    produced = []
+
+    def lines():
+        for i in range(3):
+            produced.append(i)
+            yield ("male", _tone(0.1, 0.3))
+
+    stream = mix_lines(lines(), WavStreamEncoder(), pause_ms=0, speaker_pause_ms=0)
+    first = next(stream)
+    assert first.startswith(b"RIFF")
+    assert produced == [0]
+    rest = b"".join(stream)
+    assert produced == [0, 1, 2]
+    assert _read_wav(first + rest).size == int(SAMPLE_RATE * 0.3)
+
+
+def test_mixer_node_produces_a_valid_file(monkeypatch):
+    monkeypatch.setenv("PODCAST_AUDIO_FORMAT", "wav")
+    result = audio_mixer_node(
+        {
+            "audio_chunks": [_tone(0.2, 0.1), _tone(0.2, 0.5)],
+            "audio_speakers": ["male", "female"],
+        }
+    )
+    assert result["output_format"] == "wav"
+    samples = _read_wav(result["output"])
+    assert samples.size > int(SAMPLE_RATE * 0.4)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_mp3_encoding_streams():
+    lines = [("male", _tone(1.0, 0.3)), ("female", _tone(1.0, 0.3))]
+    output = b"".join(mix_lines(lines, FFmpegMP3Encoder(ffmpeg=shutil.which("ffmpeg"))))
+    assert output[:3] == b"ID3" or output[0] == 0xFF
+
+
+def test_podcast_graph_encodes_lines_as_they_are_synthesized(monkeypatch):
+    import base64
+
+    from src.podcast.graph import tts_node as tts_node_module
+    from src.podcast.graph.builder import build_graph
+    from src.podcast.types import Script, ScriptLine
+
+    class ToneTTS:
+        def text_to_speech(self, text, **kwargs):
+            audio = base64.b64encode(_tone(0.2, 0.3)).decode()
+            return {"success": True, "audio_data": audio}
+
+    monkeypatch.setenv("PODCAST_AUDIO_FORMAT", "wav")
+    monkeypatch.setattr(tts_node_module, "_create_tts_client", ToneTTS)
+    script = Script(lines=[ScriptLine(speaker="male", paragraph="hi")] * 3)
+
+    state = build_graph().invoke({"script": script})
+    assert state["output_format"] == "wav"
+    assert not state.get("audio_chunks")
+    assert _read_wav(state["output"]).size > int(SAMPLE_RATE * 0.6)
+    assert FFmpegMP3Encoder.media_type == "audio/mpeg"
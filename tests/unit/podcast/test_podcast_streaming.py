@@ -0,0 +1,97 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import base64
+import importlib
+import io
+import threading
+import time
+import wave
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.podcast.audio import SAMPLE_RATE, WavStreamEncoder, fix_wav_header
+from src.podcast.graph import tts_node as tts_node_module
+from src.podcast import streaming as streaming_module
+from src.podcast.streaming import stream_podcast_audio
+from src.podcast.types import Script, ScriptLine
+
+LINE_PCM = b"\x10\x00\xf0\xff" * (SAMPLE_RATE // 20)  # 0.1 seconds
+
+
+class SlowTTS:
+    """Line 0 is fast, every other line takes `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.finished = 0
+        self._lock = threading.Lock()
+
+    def text_to_speech(self, text, encoding="mp3", speed_ratio=1.0, voice_type=None):
+        if text != "line 0":
+            time.sleep(self.delay)
+        with self._lock:
+            self.finished += 1
+        return {"success": True, "audio_data": base64.b64encode(LINE_PCM).decode()}
+
+
+def _script(count):
+    return Script(lines=[ScriptLine(paragraph=f"line {i}") for i in range(count)])
+
+
+@pytest.fixture
+def slow_tts(monkeypatch):
+    monkeypatch.setenv("PODCAST_TTS_CONCURRENCY", "2")
+    client = SlowTTS(delay=0.2)
+    monkeypatch.setattr(tts_node_module, "_create_tts_client", lambda: client)
+    return client
+
+
+def _frames(data):
+    with wave.open(io.BytesIO(fix_wav_header(data))) as wav:
+        return wav.getnframes()
+
+
+def test_first_audio_is_sent_before_later_lines_finish(slow_tts):
+    stream = stream_podcast_audio(_script(6).lines, WavStreamEncoder())
+    first = next(stream)
+    assert slow_tts.finished < 6
+    data = first + b"".join(stream)
+    assert slow_tts.finished == 6
+    assert _frames(data) >= 6 * len(LINE_PCM) // 2
+
+
+def test_closing_the_stream_cancels_pending_lines(slow_tts):
+    stream = stream_podcast_audio(_script(20).lines, WavStreamEncoder())
+    next(stream)
+    stream.close()
+    time.sleep(0.5)
+    assert slow_tts.finished < 20
+
+
+def test_podcast_endpoint_streams_audio(slow_tts, monkeypatch):
+    monkeypatch.setenv("PODCAST_AUDIO_FORMAT", "wav")
+    app_module = importlib.import_module("src.server.app")
+    monkeypatch.setattr(
+        streaming_module, "ScriptStream", lambda content: _script(3).lines
+    )
+
+    client = TestClient(app_module.app)
+    with client.stream(
+        "POST", "/api/podcast/generate", json={"content": "report", "stream": True}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/wav"
+        data = b"".join(response.iter_bytes())
+    assert _frames(data) >= 3 * len(LINE_PCM) // 2
+
+
+def test_podcast_endpoint_fails_before_streaming_without_script(slow_tts, monkeypatch):
+    app_module = importlib.import_module("src.server.app")
+    monkeypatch.setattr(streaming_module, "ScriptStream", lambda content: [])
+
+    response = TestClient(app_module.app).post(
+        "/api/podcast/generate", json={"content": "report", "stream": True}
+    )
+    assert response.status_code == 500
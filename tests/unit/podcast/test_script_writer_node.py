@@ -0,0 +1,79 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.podcast.graph import script_writer_node as script_writer_module
+from src.podcast.graph.script_writer_node import ScriptStream
+
+SCRIPT = {
+    "locale": "zh",
+    "lines": [
+        {"speaker": "male", "paragraph": "Hello Deer"},
+        {"speaker": "female", "paragraph": "今天聊聊汤包"},
+        {"speaker": "male", "paragraph": "好的"},
+    ],
+}
+
+
+class FakeStreamingLLM:
+    def __init__(self, text, chunk_size=7):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.streamed = 0
+        self.bound = None
+
+    def bind(self, **kwargs):
+        self.bound = kwargs
+        return self
+
+    def stream(self, messages):
+        for start in range(0, len(self.text), self.chunk_size):
+            self.streamed = start + self.chunk_size
+            yield SimpleNamespace(content=self.text[start : start + self.chunk_size])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def install(text):
+        llm = FakeStreamingLLM(text)
+        monkeypatch.setattr(script_writer_module, "get_llm_by_type", lambda _: llm)
+        return llm
+
+    return install
+
+
+def test_lines_are_yielded_while_the_script_is_written(fake_llm):
+    text = json.dumps(SCRIPT, ensure_ascii=False)
+    llm = fake_llm(text)
+    stream = ScriptStream("report")
+
+    lines = iter(stream)
+    first = next(lines)
+    assert first.paragraph == "Hello Deer"
+    assert llm.streamed < len(text)
+    assert stream.script is None
+
+    assert [line.paragraph for line in lines] == ["今天聊聊汤包", "好的"]
+    assert stream.script.locale == "zh"
+    assert len(stream.script.lines) == 3
+    assert llm.bound == {"response_format": {"type": "json_object"}}
+
+
+def test_truncated_response_is_repaired_after_streaming(fake_llm):
+    # The last line is cut off; json_repair recovers it once the stream ends
+    text = json.dumps(SCRIPT, ensure_ascii=False)
+    fake_llm(text[: text.rindex('"}')])
+    stream = ScriptStream("report")
+
+    assert [line.paragraph for line in stream] == ["Hello Deer", "今天聊聊汤包", "好的"]
+    assert stream.script.locale == "zh"
+
+
+def test_invalid_response_without_lines_raises(fake_llm):
+    fake_llm("I cannot write this podcast.")
+    with pytest.raises(ValueError):
+        list(ScriptStream("report"))
@@ -0,0 +1,207 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import base64
+import threading
+import time
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+from src.podcast.graph import tts_node as tts_node_module
+from src.podcast.graph.state import PodcastState
+from src.podcast.graph.tts_node import tts_node
+from src.podcast.types import Script, ScriptLine
+
+
+class FakeTTS:
+    def __init__(self, failures=None, delays=None):
+        self.failures = dict(failures or {})  # text -> failures before success
+        self.delays = delays or {}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def text_to_speech(self, text, encoding="mp3", speed_ratio=1.0, voice_type=None):
+        assert encoding == "pcm"
+        with self._lock:
+            self.calls.append((text, voice_type))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delays.get(text, 0.01))
+            with self._lock:
+                if self.failures.get(text, 0) > 0:
+                    self.failures[text] -= 1
+                    return {"success": False, "error": "busy", "audio_data": None}
+            return {
+                "success": True,
+                "audio_data": base64.b64encode(f"<{text}>".encode()).decode(),
+            }
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _script(count):
+    return Script(
+        lines=[
+            ScriptLine(
+                speaker="male" if i % 2 == 0 else "female", paragraph=f"line {i}"
+            )
+            for i in range(count)
+        ]
+    )
+
+
+class FakeEncoder:
+    format = "fake"
+
+
+def fake_mix_lines(lines, encoder):
+    # Tag each line with its speaker so tests can check order and speakers
+    for speaker, pcm in lines:
+        yield f"{speaker}:".encode() + pcm + b"|"
+
+
+@pytest.fixture
+def fake_tts(monkeypatch):
+    monkeypatch.setattr(tts_node_module, "RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(tts_node_module, "mix_lines", fake_mix_lines)
+    monkeypatch.setattr(tts_node_module, "create_encoder", FakeEncoder)
+
+    def install(**kwargs):
+        client = FakeTTS(**kwargs)
+        monkeypatch.setattr(tts_node_module, "_create_tts_client", lambda: client)
+        return client
+
+    return install
+
+
+def test_lines_are_synthesized_concurrently_in_script_order(fake_tts, monkeypatch):
+    monkeypatch.setenv("PODCAST_TTS_CONCURRENCY", "3")
+    # Earlier lines take longer, so they finish last
+    client = fake_tts(delays={f"line {i}": 0.05 - i * 0.01 for i in range(5)})
+
+    result = tts_node({"script": _script(5), "audio_chunks": []})
+
+    assert result["output"] == b"".join(
+        f"{'male' if i % 2 == 0 else 'female'}:<line {i}>|".encode() for i in range(5)
+    )
+    assert result["output_format"] == "fake"
+    assert client.max_active == 3
+    voices = dict(client.calls)
+    assert voices["line 0"] == "BV002_streaming"
+    assert voices["line 1"] == "BV001_streaming"
+
+
+def test_failed_lines_are_retried_then_skipped(fake_tts, monkeypatch):
+    monkeypatch.setenv("PODCAST_TTS_RETRIES", "1")
+    client = fake_tts(failures={"line 1": 1, "line 2": 5})
+
+    result = tts_node({"script": _script(4), "audio_chunks": []})
+
+    assert result["output"] == b"male:<line 0>|female:<line 1>|female:<line 3>|"
+    assert [text for text, _ in client.calls].count("line 2") == 2
+
+
+def test_raising_client_fails_the_line_instead_of_hanging(fake_tts, monkeypatch):
+    monkeypatch.setenv("PODCAST_TTS_RETRIES", "1")
+    client = fake_tts()
+    text_to_speech = client.text_to_speech
+
+    def flaky(text, **kwargs):
+        if text == "line 1":
+            raise ConnectionError("reset by peer")
+        if text == "line 2":
+            return {"success": True, "audio_data": "not base64!"}
+        return text_to_speech(text, **kwargs)
+
+    client.text_to_speech = flaky
+    result = tts_node({"script": _script(4), "audio_chunks": []})
+    assert result["output"] == b"male:<line 0>|female:<line 3>|"
+
+
+def test_unexpected_synthesis_errors_are_reported(fake_tts, monkeypatch):
+    fake_tts()
+
+    def synthesize(tts_client, line, retries):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(tts_node_module, "_synthesize_line", synthesize)
+    events = []
+    lines = list(
+        tts_node_module.iter_synthesized_lines(
+            _script(2).lines, on_progress=events.append
+        )
+    )
+    assert [audio for _, _, audio in lines] == [None, None]
+    assert [event["success"] for event in events] == [False, False]
+
+
+def test_progress_events_are_streamed(fake_tts):
+    fake_tts(failures={"line 0": 10})
+    builder = StateGraph(PodcastState)
+    builder.add_node("tts", tts_node)
+    builder.add_edge(START, "tts")
+    builder.add_edge("tts", END)
+    graph = builder.compile()
+
+    events = list(graph.stream({"script": _script(3)}, stream_mode="custom"))
+
+    assert [event["completed"] for event in events] == [1, 2, 3]
+    assert sorted(event["index"] for event in events) == [0, 1, 2]
+    by_index = {event["index"]: event for event in events}
+    assert by_index[0]["success"] is False
+    assert by_index[0]["attempts"] == 3
+    assert all(
+        event["event"] == "podcast_line" and event["total"] == 3 for event in events
+    )
+
+
+def test_lines_are_synthesized_while_the_script_is_written(fake_tts):
+    client = fake_tts()
+    started_before_line_2 = []
+
+    def writer():
+        for i in range(3):
+            if i == 2:
+                time.sleep(0.1)
+                started_before_line_2.append(len(client.calls))
+            yield ScriptLine(paragraph=f"line {i}")
+
+    results = list(tts_node_module.iter_synthesized_lines(writer()))
+
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert started_before_line_2 == [2]
+
+
+def test_script_errors_are_raised_to_the_consumer(fake_tts):
+    fake_tts()
+
+    def writer():
+        yield ScriptLine(paragraph="line 0")
+        raise ValueError("LLM failed")
+
+    with pytest.raises(ValueError, match="LLM failed"):
+        list(tts_node_module.iter_synthesized_lines(writer()))
+
+
+def test_tts_node_writes_the_script_when_missing(fake_tts, monkeypatch):
+    fake_tts()
+
+    class FakeScriptStream:
+        def __init__(self, content):
+            self.script = None
+
+        def __iter__(self):
+            yield from _script(2).lines
+            self.script = _script(2)
+
+    monkeypatch.setattr(tts_node_module, "ScriptStream", FakeScriptStream)
+
+    result = tts_node({"input": "report"})
+
+    assert result["script"] == _script(2)
+    assert result["output"] == b"male:<line 0>|female:<line 1>|"
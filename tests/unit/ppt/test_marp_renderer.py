@@ -0,0 +1,199 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src.ppt.renderer import MarpRenderError, MarpRendererPool, _local_addresses
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="the fake marp is a POSIX script"
+)
+
+# Stands in for marp-cli: `--server DIR` serves `GET /deck.md?pptx` on $PORT,
+# like marp-cli it takes no bind address from the pool (tests pick one with
+# $FAKE_MARP_BIND), and `INPUT -o OUTPUT` converts one file. The "rendered" deck is the markdown plus
+# the pid of the process, so tests can tell which process rendered it.
+FAKE_MARP = """#!{python}
+import http.server, os, sys, time
+
+def convert(markdown):
+    if "SLEEP" in markdown:
+        time.sleep(30)
+    if "FAIL" in markdown:
+        raise ValueError("bad deck")
+    return f"PPTX {{os.getpid()}}\\n{{markdown}}".encode()
+
+if sys.argv[1] == "--server":
+    root = sys.argv[2]
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            path, _, query = self.path[1:].partition("?")
+            with open(os.path.join(root, path)) as f:
+                markdown = f.read()
+            try:
+                body, status = convert(markdown), 200
+            except ValueError as e:
+                body, status = str(e).encode(), 500
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer(
+        (os.environ.get("FAKE_MARP_BIND", "127.0.0.1"), int(os.environ["PORT"])),
+        Handler,
+    )
+    server.serve_forever()
+else:
+    with open(sys.argv[1]) as f:
+        markdown = f.read()
+    try:
+        data = convert(markdown)
+    except ValueError as e:
+        sys.exit(str(e))
+    with open(sys.argv[3], "wb") as f:
+        f.write(data)
+"""
+
+
+@pytest.fixture
+def fake_marp(tmp_path):
+    path = tmp_path / "marp"
+    path.write_text(FAKE_MARP.format(python=sys.executable))
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def pool(fake_marp):
+    pool = MarpRendererPool(
+        mode="server",
+        concurrency=2,
+        timeout=10,
+        max_renders=3,
+        warm_workers=1,
+        command=fake_marp,
+    )
+    yield pool
+    pool.close()
+
+
+def _pid(data):
+    return data.split(b"\n", 1)[0].split()[1]
+
+
+def test_server_is_reused_and_leaves_no_files(pool):
+    first = pool.render("# Deck one")
+    second = pool.render("# Deck two")
+    assert first.endswith(b"# Deck one")
+    assert _pid(first) == _pid(second)
+    slides_dirs = [server.slides_dir for server in pool._idle]
+    assert [os.listdir(directory) for directory in slides_dirs] == [[]]
+
+
+def test_server_is_recycled_after_max_renders(pool):
+    pids = [_pid(pool.render(f"# Deck {i}")) for i in range(4)]
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0]
+
+
+def test_cli_is_the_default_mode(monkeypatch, fake_marp):
+    monkeypatch.delenv("PPT_RENDER_MODE", raising=False)
+    assert MarpRendererPool(command=fake_marp).mode == "cli"
+    monkeypatch.setenv("PPT_RENDER_MODE", "nope")
+    assert MarpRendererPool(command=fake_marp).mode == "cli"
+
+
+@pytest.mark.skipif(not _local_addresses(), reason="no non-loopback address")
+def test_exposed_server_falls_back_to_cli(pool, monkeypatch):
+    pool.warm()
+    assert pool.mode == "server"
+    [loopback_server] = pool._idle
+    assert loopback_server.exposed_address() is None
+
+    monkeypatch.setenv("FAKE_MARP_BIND", "0.0.0.0")
+    pool.max_renders = 1  # the next render replaces the loopback server
+    first = pool.render("# Deck one")
+    second = pool.render("# Deck two")
+    third = pool.render("# Deck three")
+    assert first.endswith(b"# Deck one")
+    assert pool.mode == "cli"
+    assert pool._idle == []
+    assert loopback_server.closed
+    assert _pid(second) != _pid(third)  # one marp run per deck
+
+
+def test_render_errors_keep_the_server(pool):
+    with pytest.raises(MarpRenderError, match="bad deck"):
+        pool.render("FAIL")
+    assert pool.render("# ok").endswith(b"# ok")
+
+
+def test_timeout_kills_the_server_and_pool_recovers(pool):
+    pool.timeout = 0.5
+    before = _pid(pool.render("# warm"))
+    with pytest.raises(MarpRenderError, match="timed out"):
+        pool.render("SLEEP")
+    pool.timeout = 10
+    assert _pid(pool.render("# again")) != before
+
+
+def test_concurrency_is_bounded(pool):
+    active, peak = 0, 0
+    lock = threading.Lock()
+    original = pool._checkout
+
+    def checkout():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return original()
+
+    pool._checkout = checkout
+    threads = [threading.Thread(target=pool.render, args=(f"# {i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 2
+
+
+def test_warm_starts_servers_and_close_removes_temp_dir(pool):
+    pool.warm()
+    assert pool.stats() == {"idle": 1}
+    root = pool._root
+    assert os.path.isdir(root)
+    pool.close()
+    assert not os.path.exists(root)
+    with pytest.raises(RuntimeError):
+        pool.render("# closed")
+
+
+def test_cli_mode(fake_marp):
+    pool = MarpRendererPool(mode="cli", timeout=10, command=fake_marp)
+    try:
+        assert pool.render("# Deck").endswith(b"# Deck")
+        with pytest.raises(MarpRenderError, match="bad deck"):
+            pool.render("FAIL")
+        assert os.listdir(pool._root) == []
+    finally:
+        pool.close()
+
+
+def test_missing_marp_is_reported():
+    pool = MarpRendererPool(mode="server", command="/nonexistent/marp")
+    try:
+        with pytest.raises(MarpRenderError, match="could not be started"):
+            pool.render("# Deck")
+    finally:
+        pool.close()
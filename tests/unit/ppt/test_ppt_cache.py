@@ -0,0 +1,101 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import importlib
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.ppt.cache import get_ppt_cache
+from src.ppt.graph import ppt_composer_node as composer_module
+from src.ppt.graph import ppt_generator_node as generator_module
+
+
+class Counting:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+
+
+@pytest.fixture
+def fakes(monkeypatch, tmp_path):
+    monkeypatch.setenv("PPT_CACHE_DIR", str(tmp_path / "ppt"))
+    llm, renderer = Counting(), Counting(delay=0.2)
+
+    def invoke(messages):
+        llm.hit()
+        return SimpleNamespace(content=f"# Slides for {messages[-1].content}")
+
+    def render(markdown, output_format="pptx"):
+        renderer.hit()
+        return f"PPTX {markdown}".encode()
+
+    monkeypatch.setattr(
+        composer_module, "get_llm_by_type", lambda _: SimpleNamespace(invoke=invoke)
+    )
+    monkeypatch.setattr(
+        generator_module, "get_marp_renderer", lambda: SimpleNamespace(render=render)
+    )
+    return llm, renderer
+
+
+def test_both_levels_are_cached(fakes):
+    llm, renderer = fakes
+    state = {"input": "report"}
+    markdown = composer_module.ppt_composer_node(state)["ppt_content"]
+    assert composer_module.ppt_composer_node(state)["ppt_content"] == markdown
+    assert llm.calls == 1
+
+    generated = generator_module.ppt_generator_node({"ppt_content": markdown})
+    assert generator_module.ppt_generator_node({"ppt_content": markdown}) == generated
+    assert renderer.calls == 1
+    assert get_ppt_cache().lookup("report") == generated["generated_file"]
+    assert get_ppt_cache().lookup("other report") is None
+
+
+def test_cache_can_be_disabled(fakes, monkeypatch):
+    llm, _ = fakes
+    monkeypatch.setenv("PPT_CACHE_MAX_MB", "0")
+    composer_module.ppt_composer_node({"input": "report"})
+    composer_module.ppt_composer_node({"input": "report"})
+    assert llm.calls == 2
+
+
+def test_endpoint_coalesces_and_serves_cache_hits(fakes, monkeypatch):
+    llm, renderer = fakes
+    app_module = importlib.import_module("src.server.app")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post("/api/ppt/generate", json={"content": "report"})
+                    for _ in range(3)
+                )
+            )
+            # Served from the cache without running the graph
+            monkeypatch.setattr(app_module, "build_ppt_graph", None)
+            responses.append(
+                await client.post("/api/ppt/generate", json={"content": "report"})
+            )
+            return responses
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.content for response in responses}) == 1
+    assert responses[0].content == b"PPTX # Slides for report"
+    assert llm.calls == 1
+    assert renderer.calls == 1
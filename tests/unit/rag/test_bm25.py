@@ -0,0 +1,127 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+
+import numpy as np
+import pytest
+
+from src.rag import builder as builder_module
+from src.rag.bm25 import BM25Provider, BM25Store, decode_varints, encode_varints
+from src.rag.retriever import Resource
+from src.rag.store import dataset_uri
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16384, 2**31 - 1, 5])
+    data, lengths = encode_varints(values)
+    assert lengths.tolist() == [1, 1, 1, 2, 2, 3, 5, 1]
+    assert len(data) == lengths.sum()
+    assert decode_varints(data).tolist() == values.tolist()
+
+
+@pytest.fixture
+def provider(tmp_path):
+    provider = BM25Provider(directory=str(tmp_path / "index"), top_k=5)
+    provider.add_text(
+        "journey",
+        "孙悟空三打白骨精，唐僧却误会了他。",
+        dataset="classics",
+        title="西游记",
+    )
+    provider.add_text(
+        "deer",
+        "Deer live in forests and eat grass and leaves.",
+        dataset="nature",
+        title="deer",
+    )
+    provider.add_text(
+        "cows", "Cows eat grass on the farm.", dataset="nature", title="cows"
+    )
+    return provider
+
+
+def test_query_ranks_by_bm25(provider):
+    documents = provider.query_relevant_documents("三打白骨精")
+    assert [doc.title for doc in documents] == ["西游记"]
+    assert documents[0].chunks[0].similarity > 0
+
+    documents = provider.query_relevant_documents("deer grass")
+    assert [doc.title for doc in documents] == ["deer", "cows"]
+    assert documents[0].url == dataset_uri("nature", "deer")
+
+
+def test_resources_filter_queries(provider):
+    assert [r.uri for r in provider.list_resources()] == [
+        "rag://dataset/classics",
+        "rag://dataset/nature",
+    ]
+    classics = [Resource(uri=dataset_uri("classics"), title="classics")]
+    assert provider.query_relevant_documents("grass", classics) == []
+    one_doc = [Resource(uri=dataset_uri("nature", "cows"), title="cows")]
+    assert [
+        doc.title for doc in provider.query_relevant_documents("grass", one_doc)
+    ] == ["cows"]
+
+
+def test_incremental_delete_and_replace(provider, tmp_path):
+    reopened = BM25Provider(directory=str(tmp_path / "index"))
+    assert reopened.delete_document("deer")
+    assert [doc.title for doc in reopened.query_relevant_documents("deer grass")] == [
+        "cows"
+    ]
+
+    provider.add_text(
+        "deer", "Reindeer pull sleighs.", dataset="nature", title="deer v2"
+    )
+    assert [doc.title for doc in reopened.query_relevant_documents("reindeer")] == [
+        "deer v2"
+    ]
+    assert reopened.query_relevant_documents("leaves") == []
+
+
+def test_segments_merge_and_drop_deleted_postings(tmp_path):
+    store = BM25Store(str(tmp_path))
+    for i in range(40):
+        store.add_document(f"doc{i}", [f"common term{i}", f"shared words {i % 3}"])
+    # Merging keeps the number of segments logarithmic
+    assert len(store._manifest["segments"]) <= 4
+
+    for i in range(0, 40, 2):
+        store.delete_document(f"doc{i}")
+    store.optimize()
+    segments = store._manifest["segments"]
+    assert len(segments) == 1 and segments[0]["postings"] == 20 * 5
+    files = {name for name in os.listdir(tmp_path) if name.startswith("segment-")}
+    assert files == {
+        f"segment-{segments[0]['id']:06d}{suffix}"
+        for suffix in (".terms", ".df.i32", ".offsets.i64", ".postings")
+    }
+
+    hits = store.search("term7 common", 5)
+    assert store.chunk_text(hits[0][0]) == "common term7"
+    assert all(
+        store.document_at(store.document_ordinal(row))["id"] != "doc8"
+        for row, _ in store.search("term8", 5)
+    )
+
+
+def test_uncommitted_documents_are_discarded(tmp_path):
+    store = BM25Store(str(tmp_path))
+    store.add_document("a", ["alpha"])
+    store.add_document("b", ["beta"], commit=False)
+
+    reopened = BM25Store(str(tmp_path))
+    assert reopened.search("beta", 5) == []
+    reopened.add_document("c", ["gamma"])
+    assert [reopened.chunk_text(row) for row in range(reopened.rows)] == [
+        "alpha",
+        "gamma",
+    ]
+    assert reopened.chunk_text(reopened.search("gamma", 5)[0][0]) == "gamma"
+
+
+def test_builder_selects_bm25_provider(monkeypatch, tmp_path):
+    monkeypatch.setattr(builder_module, "SELECTED_RAG_PROVIDER", "bm25")
+    monkeypatch.setenv("BM25_RAG_DIR", str(tmp_path))
+    assert isinstance(builder_module.build_retriever(), BM25Provider)
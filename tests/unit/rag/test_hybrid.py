@@ -0,0 +1,212 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import threading
+import time
+
+import pytest
+
+from src.rag import builder as builder_module
+from src.rag.bm25 import BM25Provider
+from src.rag.hybrid import HybridRetriever, get_reranker
+from src.rag.local import LocalVectorProvider
+from src.rag.retriever import Chunk, Document, Resource, Retriever
+from src.rag.text import estimate_tokens
+
+
+class FakeRetriever(Retriever):
+    def __init__(self, documents=None, resources=None, delay=0.0, error=None):
+        self.documents = documents or []
+        self.resources = resources or []
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def list_resources(self, query=None):
+        return self.resources
+
+    def query_relevant_documents(self, query, resources=[]):
+        self.calls.append((query, resources, threading.current_thread().name))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.documents
+
+
+def doc(id, *chunks):
+    return Document(
+        id=id,
+        url=f"rag://dataset/d#{id}",
+        title=id,
+        chunks=[Chunk(c, s) for c, s in chunks],
+    )
+
+
+def test_rrf_fuses_and_deduplicates_chunks():
+    lexical = FakeRetriever(
+        [doc("a", ("alpha", 12.0), ("beta", 3.0)), doc("b", ("gamma", 5.0))]
+    )
+    vector = FakeRetriever([doc("b", ("gamma", 0.9)), doc("a", ("Alpha ", 0.2))])
+    retriever = HybridRetriever([lexical, vector], top_k=10, max_tokens=1000)
+
+    # "alpha" (ranks 1 and 2) and "gamma" (ranks 2 and 1) tie above "beta" (rank 3 only)
+    fused = retriever.fuse([lexical.documents, vector.documents])
+    assert [candidate.content for candidate in fused] == ["alpha", "gamma", "beta"]
+
+    documents = retriever.query_relevant_documents(
+        "q", [Resource(uri="rag://dataset/d", title="d")]
+    )
+    assert [(d.id, [c.content for c in d.chunks]) for d in documents] == [
+        ("a", ["alpha", "beta"]),
+        ("b", ["gamma"]),
+    ]
+    assert lexical.calls[0][1][0].uri == "rag://dataset/d"
+    assert all(document.url.startswith("rag://") for document in documents)
+
+
+def test_backends_run_concurrently_and_failures_are_skipped():
+    slow = [
+        FakeRetriever([doc(f"d{i}", (f"text {i}", 1.0))], delay=0.2) for i in range(3)
+    ]
+    broken = FakeRetriever(error=RuntimeError("down"))
+    retriever = HybridRetriever([*slow, broken], top_k=10)
+
+    start = time.perf_counter()
+    documents = retriever.query_relevant_documents("q")
+    assert time.perf_counter() - start < 0.5
+    assert {document.id for document in documents} == {"d0", "d1", "d2"}
+    assert len({backend.calls[0][2] for backend in slow}) == 3
+
+
+def test_late_backend_is_left_out_and_all_failing_raises():
+    fast = FakeRetriever([doc("fast", ("fast", 1.0))])
+    late = FakeRetriever([doc("late", ("late", 1.0))], delay=0.5)
+    retriever = HybridRetriever([fast, late], timeout=0.1)
+    assert [document.id for document in retriever.query_relevant_documents("q")] == [
+        "fast"
+    ]
+
+    with pytest.raises(RuntimeError):
+        HybridRetriever(
+            [FakeRetriever(error=RuntimeError("down"))]
+        ).query_relevant_documents("q")
+
+
+def test_token_budget_and_top_k():
+    chunks = [(f"chunk {i} " + "word " * 40, 10.0 - i) for i in range(6)]
+    cost = estimate_tokens(chunks[0][0])
+    retriever = HybridRetriever(
+        [FakeRetriever([doc("a", *chunks)])], top_k=10, max_tokens=cost * 3 + 1
+    )
+    assert len(retriever.query_relevant_documents("q")[0].chunks) == 3
+    retriever = HybridRetriever(
+        [FakeRetriever([doc("a", *chunks)])], top_k=2, max_tokens=10000
+    )
+    assert len(retriever.query_relevant_documents("q")[0].chunks) == 2
+
+
+class FakeReranker:
+    def __init__(self, delay=0.0, load_delay=0.0):
+        self.delay = delay
+        self.load_delay = load_delay
+        self.loads = 0
+
+    def load(self):
+        time.sleep(self.load_delay)
+        self.loads += 1
+
+    def score(self, query, passages):
+        time.sleep(self.delay)
+        return [float(len(passage)) for passage in passages]
+
+
+def test_reranker_reorders_within_budget_and_is_skipped_over_budget():
+    backend = FakeRetriever([doc("a", ("short", 3.0), ("a much longer chunk", 2.0))])
+    retriever = HybridRetriever([backend], reranker=FakeReranker(), rerank_budget=1.0)
+    time.sleep(0.05)  # let the model load finish
+    assert [c.content for c in retriever.query_relevant_documents("q")[0].chunks] == [
+        "a much longer chunk",
+        "short",
+    ]
+
+    retriever = HybridRetriever(
+        [backend], reranker=FakeReranker(delay=0.3), rerank_budget=0.05
+    )
+    time.sleep(0.05)
+    assert [c.content for c in retriever.query_relevant_documents("q")[0].chunks] == [
+        "short",
+        "a much longer chunk",
+    ]
+
+
+def test_reranker_is_shared_and_warm_up_is_not_a_busy_rerank():
+    backend = FakeRetriever([doc("a", ("short", 3.0), ("a much longer chunk", 2.0))])
+    reranker = FakeReranker(load_delay=0.2)
+    first = HybridRetriever([backend], reranker=reranker, rerank_budget=1.0)
+    # Still loading: the fused order is kept without waiting
+    assert first.query_relevant_documents("q")[0].chunks[0].content == "short"
+    time.sleep(0.3)
+
+    # A retriever built later reuses the loaded model and reranks its first query
+    second = HybridRetriever([backend], reranker=reranker, rerank_budget=1.0)
+    assert (
+        second.query_relevant_documents("q")[0].chunks[0].content
+        == "a much longer chunk"
+    )
+    assert reranker.loads == 1
+    assert second._executor is first._executor
+    assert get_reranker("cross-encoder/model") is get_reranker("cross-encoder/model")
+
+
+def test_hybrid_over_local_providers(tmp_path):
+    lexical = BM25Provider(directory=str(tmp_path / "bm25"))
+    vector = LocalVectorProvider(directory=str(tmp_path / "vector"))
+    for provider in (lexical, vector):
+        provider.add_text(
+            "journey", "孙悟空三打白骨精。", dataset="classics", title="西游记"
+        )
+        provider.add_text("deer", "Deer eat grass.", dataset="nature", title="deer")
+    retriever = HybridRetriever([lexical, vector])
+
+    assert [r.uri for r in retriever.list_resources()] == [
+        "rag://dataset/classics",
+        "rag://dataset/nature",
+    ]
+    documents = retriever.query_relevant_documents("白骨精")
+    assert documents[0].title == "西游记"
+    assert len(documents[0].chunks) == 1
+
+
+def test_builder_builds_hybrid(monkeypatch, tmp_path):
+    monkeypatch.setattr(builder_module, "SELECTED_RAG_PROVIDER", "hybrid")
+    monkeypatch.setenv("HYBRID_RAG_PROVIDERS", "bm25, local")
+    monkeypatch.setenv("BM25_RAG_DIR", str(tmp_path / "bm25"))
+    monkeypatch.setenv("LOCAL_RAG_DIR", str(tmp_path / "vector"))
+    retriever = builder_module.build_retriever()
+    assert isinstance(retriever, HybridRetriever)
+    assert [type(backend) for backend in retriever.backends] == [
+        BM25Provider,
+        LocalVectorProvider,
+    ]
+
+
+def test_async_query_awaits_backends_concurrently():
+    import asyncio
+
+    class AsyncRetriever(FakeRetriever):
+        async def aquery_relevant_documents(self, query, resources=[]):
+            await asyncio.sleep(self.delay)
+            if self.error:
+                raise self.error
+            return self.documents
+
+    backends = [
+        AsyncRetriever([doc(f"d{i}", (f"text {i}", 1.0))], delay=0.2) for i in range(3)
+    ]
+    late = AsyncRetriever([doc("late", ("late", 1.0))], delay=1.0)
+    retriever = HybridRetriever([*backends, late], timeout=0.5)
+
+    start = time.perf_counter()
+    documents = asyncio.run(retriever.aquery_relevant_documents("q"))
+    assert time.perf_counter() - start < 0.8
+    assert {document.id for document in documents} == {"d0", "d1", "d2"}
@@ -0,0 +1,133 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+
+import pytest
+
+from src.crawler.article import Article
+from src.crawler.readability_extractor import ReadabilityExtractor
+from src.rag.bm25 import BM25Provider
+from src.rag.ingest import Ingestor, find_files, ingest
+from src.rag.local import LocalVectorProvider
+from src.rag.retriever import Resource
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "corpus"
+    (root / "sub").mkdir(parents=True)
+    (root / ".hidden").mkdir()
+    for i in range(5):
+        (root / "sub" / f"note{i}.md").write_text(
+            f"# Note {i}\n\nDeer number {i} eats grass."
+        )
+    (root / "journey.txt").write_text("孙悟空三打白骨精。")
+    (root / "image.png").write_bytes(b"\x89PNG")
+    (root / ".hidden" / "secret.md").write_text("hidden")
+    return root
+
+
+def providers(tmp_path):
+    return [
+        BM25Provider(directory=str(tmp_path / "bm25")),
+        LocalVectorProvider(directory=str(tmp_path / "vector")),
+    ]
+
+
+def test_find_files_walks_supported_files(corpus):
+    files = find_files([str(corpus), str(corpus / "journey.txt")])
+    assert [os.path.relpath(f, corpus) for f in files] == [
+        "journey.txt",
+        *(os.path.join("sub", f"note{i}.md") for i in range(5)),
+    ]
+
+
+def test_ingest_writes_every_store_and_resumes(corpus, tmp_path):
+    stores = providers(tmp_path)
+    report = Ingestor(stores, dataset="notes", workers=0, batch_files=2).run(
+        [str(corpus)]
+    )
+    assert report["ingested"] == 6 and report["skipped"] == 0 and report["failed"] == 0
+    assert report["docs_per_second"] > 0
+
+    for provider in providers(tmp_path):
+        assert [r.uri for r in provider.list_resources()] == ["rag://dataset/notes"]
+        documents = provider.query_relevant_documents(
+            "白骨精", [Resource(uri="rag://dataset/notes", title="")]
+        )
+        assert documents[0].id == str(corpus / "journey.txt")
+
+    (corpus / "sub" / "note3.md").write_text("# Note 3\n\nFoxes eat grass.")
+    report = Ingestor(providers(tmp_path), dataset="notes", workers=0).run(
+        [str(corpus)]
+    )
+    assert (report["ingested"], report["skipped"]) == (1, 5)
+    assert (
+        BM25Provider(directory=str(tmp_path / "bm25"))
+        .query_relevant_documents("foxes")[0]
+        .title
+        == "Note 3"
+    )
+
+
+def test_failed_files_are_reported(corpus, tmp_path):
+    report = Ingestor(providers(tmp_path), workers=0).run(
+        [str(corpus / "image.png"), str(corpus / "journey.txt")]
+    )
+    assert (report["ingested"], report["failed"]) == (1, 1)
+
+
+def test_interrupted_run_keeps_checkpoints(corpus, tmp_path, monkeypatch):
+    stores = providers(tmp_path)
+    calls = []
+
+    def add_chunks(doc_id, *args, **kwargs):
+        calls.append(doc_id)
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        original(doc_id, *args, **kwargs)
+
+    original = stores[0].add_chunks
+    monkeypatch.setattr(stores[0], "add_chunks", add_chunks)
+    with pytest.raises(KeyboardInterrupt):
+        Ingestor(stores, workers=0, checkpoint_every=2).run([str(corpus)])
+    # The first checkpoint of two documents survives, the third document is rolled back
+    assert len(stores[0].store.live_documents()) == 2
+    assert len(stores[1].store.live_documents()) == 2
+
+    report = Ingestor(providers(tmp_path), workers=0).run([str(corpus)])
+    assert (report["ingested"], report["skipped"]) == (4, 2)
+
+
+def test_html_uses_readability(tmp_path, monkeypatch):
+    page = tmp_path / "page.html"
+    page.write_text(
+        "<html><body><nav>menu</nav><article><p>Deer eat grass.</p></article></body></html>"
+    )
+    monkeypatch.setattr(
+        ReadabilityExtractor,
+        "extract_article",
+        lambda self, html: Article(title="Deer", html_content="<p>Deer eat grass.</p>"),
+    )
+    stores = providers(tmp_path)
+    Ingestor(stores, workers=0).run([str(page)])
+    document = stores[0].query_relevant_documents("grass")[0]
+    assert document.title == "Deer"
+    assert document.chunks[0].content == "Deer eat grass."
+
+
+def test_ingest_with_worker_processes(corpus, tmp_path, monkeypatch):
+    monkeypatch.setenv("BM25_RAG_DIR", str(tmp_path / "bm25"))
+    monkeypatch.setenv("LOCAL_RAG_DIR", str(tmp_path / "vector"))
+    monkeypatch.setenv("HYBRID_RAG_PROVIDERS", "bm25,local")
+    report = ingest(
+        [str(corpus)], dataset="notes", provider="hybrid", workers=2, batch_files=2
+    )
+    assert report["ingested"] == 6
+    assert LocalVectorProvider(
+        directory=str(tmp_path / "vector")
+    ).query_relevant_documents("deer grass")
+
+    with pytest.raises(ValueError):
+        ingest([str(corpus)], provider="ragflow")
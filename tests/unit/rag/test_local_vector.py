@@ -0,0 +1,132 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import numpy as np
+import pytest
+
+from src.rag import builder as builder_module
+from src.rag.embedding import HashingEmbedder
+from src.rag.local import LocalVectorProvider, LocalVectorStore
+from src.rag.retriever import Resource
+from src.rag.store import dataset_uri
+from src.rag.text import chunk_text, tokenize
+
+
+def test_tokenize_uses_cjk_bigrams():
+    assert tokenize("Hello, 三打白骨精!") == ["hello", "三打", "打白", "白骨", "骨精"]
+    assert tokenize("孙 悟空 2025") == ["孙", "悟空", "2025"]
+
+
+def test_chunk_text_overlaps_and_respects_size():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 40 for i in range(10))
+    chunks = chunk_text(text, chunk_size=300, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert chunks[1].startswith(chunks[0][-50:])
+
+
+def test_hashing_embedder_is_normalized_and_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["deer flow", "", "deer flow"])
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[1].any()
+    assert np.array_equal(vectors[0], vectors[2])
+
+
+@pytest.fixture
+def provider(tmp_path):
+    provider = LocalVectorProvider(directory=str(tmp_path / "store"), top_k=5)
+    (tmp_path / "journey.md").write_text(
+        "# 西游记\n\n孙悟空三打白骨精，唐僧却误会了他。\n\n猪八戒在一旁煽风点火。",
+        encoding="utf-8",
+    )
+    (tmp_path / "deer.txt").write_text("Deer live in forests and eat grass and leaves.")
+    provider.add_file(str(tmp_path / "journey.md"), dataset="classics")
+    provider.add_file(str(tmp_path / "deer.txt"), dataset="nature")
+    return provider
+
+
+def test_query_returns_the_relevant_document(provider):
+    documents = provider.query_relevant_documents("三打白骨精")
+    assert documents[0].title == "西游记"
+    assert "白骨精" in documents[0].chunks[0].content
+    assert 0 < documents[0].chunks[0].similarity <= 1
+
+    assert provider.query_relevant_documents("what do deer eat")[0].title == "deer"
+
+
+def test_resources_filter_queries(provider, tmp_path):
+    resources = provider.list_resources()
+    assert [resource.uri for resource in resources] == [
+        "rag://dataset/classics",
+        "rag://dataset/nature",
+    ]
+    assert [resource.title for resource in provider.list_resources("nat")] == ["nature"]
+
+    nature_only = [Resource(uri=dataset_uri("nature"), title="nature")]
+    assert provider.query_relevant_documents("三打白骨精", nature_only) == []
+    one_doc = [
+        Resource(uri=dataset_uri("classics", str(tmp_path / "journey.md")), title="doc")
+    ]
+    assert provider.query_relevant_documents("唐僧", one_doc)[0].title == "西游记"
+
+
+def test_store_persists_and_supports_delete_and_replace(provider, tmp_path):
+    reopened = LocalVectorProvider(directory=str(tmp_path / "store"))
+    assert reopened.query_relevant_documents("白骨精")[0].title == "西游记"
+
+    doc_id = str(tmp_path / "deer.txt")
+    assert reopened.delete_document(doc_id)
+    assert reopened.query_relevant_documents("deer grass") == []
+    # The first provider sees the change made through the other instance
+    provider.add_text(
+        doc_id, "Reindeer pull sleighs.", dataset="nature", title="deer v2"
+    )
+    assert reopened.query_relevant_documents("reindeer sleighs")[0].title == "deer v2"
+    assert [r.description for r in reopened.list_resources("nature")] == [
+        "Local dataset with 1 document(s)"
+    ]
+
+
+def test_uncommitted_rows_are_discarded(tmp_path):
+    embedder = HashingEmbedder(dim=32)
+    store = LocalVectorStore(str(tmp_path), embedder.dim)
+    store.add_document("a", ["alpha"], embedder.embed(["alpha"]))
+    store.add_document("b", ["beta"], embedder.embed(["beta"]), commit=False)
+
+    reopened = LocalVectorStore(str(tmp_path), embedder.dim)
+    assert reopened.rows == 1
+    reopened.add_document("c", ["gamma"], embedder.embed(["gamma"]))
+    assert [reopened.chunk_text(row) for row in range(reopened.rows)] == [
+        "alpha",
+        "gamma",
+    ]
+
+
+def test_ivf_search_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(1)
+    dim = 32
+    # Clustered data, as real embeddings are
+    centers = rng.normal(size=(20, dim))
+    data = centers[rng.integers(0, 20, 4000)] + 0.1 * rng.normal(size=(4000, dim))
+    data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+    store = LocalVectorStore(str(tmp_path), dim, ivf_min_rows=1000, nprobe=4)
+    for i in range(0, 4000, 500):
+        store.add_document(
+            f"doc{i}", [f"row {j}" for j in range(i, i + 500)], data[i : i + 500]
+        )
+    assert store._centroids is not None
+
+    recalls = []
+    for query in data[rng.integers(0, 4000, 20)]:
+        exact = {row for row, _ in store.search(query, 10, exact=True)}
+        approximate = {row for row, _ in store.search(query, 10)}
+        recalls.append(len(exact & approximate) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_builder_selects_local_provider(monkeypatch, tmp_path):
+    monkeypatch.setattr(builder_module, "SELECTED_RAG_PROVIDER", "local")
+    monkeypatch.setenv("LOCAL_RAG_DIR", str(tmp_path))
+    assert isinstance(builder_module.build_retriever(), LocalVectorProvider)
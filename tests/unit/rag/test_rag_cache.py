@@ -0,0 +1,149 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+from src.rag import builder as builder_module
+from src.rag.bm25 import BM25Provider
+from src.rag.cache import CachedRetriever, RetrieverCache
+from src.rag.retriever import Chunk, Document, Resource, Retriever
+
+
+class CountingRetriever(Retriever):
+    def __init__(self):
+        self.list_calls = 0
+        self.query_calls = 0
+        self.version = 1
+        self.fail = False
+
+    def list_resources(self, query=None):
+        self.list_calls += 1
+        return [Resource(uri=f"rag://dataset/{query}", title=str(query))]
+
+    def query_relevant_documents(self, query, resources=[]):
+        self.query_calls += 1
+        if self.fail:
+            raise RuntimeError("down")
+        return [Document(id="a", title=query, chunks=[Chunk(query, 1.0)])]
+
+    async def aquery_relevant_documents(self, query, resources=[]):
+        self.query_calls += 1
+        await asyncio.sleep(0.05)
+        return [Document(id="a", title=query, chunks=[Chunk(query, 1.0)])]
+
+    def cache_version(self):
+        return self.version
+
+
+def cached(backend, **kwargs):
+    return CachedRetriever(backend, namespace="test", cache=RetrieverCache(**kwargs))
+
+
+def test_hits_are_served_from_cache_and_copied():
+    backend = CountingRetriever()
+    retriever = cached(backend)
+    d = [Resource(uri="rag://dataset/d", title="d")]
+
+    assert retriever.list_resources("de")[0].uri == "rag://dataset/de"
+    retriever.list_resources("de")
+    retriever.list_resources("dee")
+    assert backend.list_calls == 2
+
+    first = retriever.query_relevant_documents("q", d)
+    first[0].chunks.append(Chunk("extra", 0.0))
+    second = retriever.query_relevant_documents("q", d)
+    assert backend.query_calls == 1
+    assert [c.content for c in second[0].chunks] == ["q"]
+    retriever.query_relevant_documents("q")  # other resources, other entry
+    assert backend.query_calls == 2
+
+
+def test_ttl_version_and_invalidate_expire_entries():
+    backend = CountingRetriever()
+    retriever = cached(backend, resources_ttl=0, query_ttl=60)
+    retriever.list_resources()
+    retriever.list_resources()
+    assert backend.list_calls == 2
+
+    retriever.query_relevant_documents("q")
+    backend.version = 2
+    retriever.query_relevant_documents("q")
+    assert backend.query_calls == 2
+
+    retriever.cache.invalidate("other")
+    retriever.query_relevant_documents("q")
+    assert backend.query_calls == 2
+    retriever.cache.invalidate("test")
+    retriever.query_relevant_documents("q")
+    assert backend.query_calls == 3
+
+
+def test_errors_are_not_cached():
+    backend = CountingRetriever()
+    retriever = cached(backend)
+    backend.fail = True
+    for _ in range(2):
+        try:
+            retriever.query_relevant_documents("q")
+        except RuntimeError:
+            pass
+    assert backend.query_calls == 2
+
+
+def test_concurrent_async_misses_share_one_call():
+    backend = CountingRetriever()
+    retriever = cached(backend)
+
+    async def main():
+        return await asyncio.gather(
+            *(retriever.aquery_relevant_documents("q") for _ in range(5))
+        )
+
+    results = asyncio.run(main())
+    assert backend.query_calls == 1
+    assert all(result[0].chunks[0].content == "q" for result in results)
+    assert results[0][0] is not results[1][0]
+
+
+def test_local_store_commit_invalidates(tmp_path):
+    provider = BM25Provider(directory=str(tmp_path / "bm25"))
+    provider.add_text("deer", "Deer eat grass.", dataset="nature")
+    retriever = cached(provider)
+    assert len(retriever.list_resources()) == 1
+    assert retriever.query_relevant_documents("grass")[0].id == "deer"
+
+    # another process writing to the same directory
+    writer = BM25Provider(directory=str(tmp_path / "bm25"))
+    writer.add_text("fox", "Foxes eat grass too.", dataset="wild")
+    assert len(retriever.list_resources()) == 2
+    assert {d.id for d in retriever.query_relevant_documents("grass")} == {
+        "deer",
+        "fox",
+    }
+
+
+def test_builder_shares_one_cached_retriever(monkeypatch, tmp_path):
+    monkeypatch.setattr(builder_module, "SELECTED_RAG_PROVIDER", "bm25")
+    monkeypatch.setattr(builder_module, "_cached_retrievers", {})
+    monkeypatch.setenv("BM25_RAG_DIR", str(tmp_path / "bm25"))
+    built = []
+    build_provider = builder_module.build_provider
+    monkeypatch.setattr(
+        builder_module,
+        "build_provider",
+        lambda provider: built.append(provider) or build_provider(provider),
+    )
+
+    retriever = builder_module.build_retriever(cached=True)
+    assert isinstance(retriever, CachedRetriever)
+    assert isinstance(retriever.wrapped, BM25Provider)
+    assert retriever.namespace == "bm25"
+    assert builder_module.build_retriever(cached=True) is retriever
+    assert built == ["bm25"]
+
+    # documents committed by another instance are still picked up
+    writer = BM25Provider(directory=str(tmp_path / "bm25"))
+    writer.add_text("deer", "Deer eat grass.", dataset="nature")
+    assert [r.title for r in retriever.list_resources()] == ["nature"]
+
+    assert builder_module.build_retriever() is not retriever.wrapped
@@ -179,3 +179,114 @@ def test_list_resources_error(mock_get, monkeypatch):
     mock_get.return_value = mock_response
     with pytest.raises(Exception):
         provider.list_resources()
+
+
+@pytest.fixture
+def async_transport(monkeypatch):
+    import httpx
+
+    import src.rag.ragflow as ragflow
+
+    monkeypatch.setenv("RAGFLOW_API_URL", "http://api")
+    monkeypatch.setenv("RAGFLOW_API_KEY", "key")
+    monkeypatch.setattr(ragflow, "RETRY_BACKOFF", 0)
+    requests_seen = []
+    responses = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return responses.pop(0)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ragflow, "_get_async_client", lambda: client)
+    return requests_seen, responses
+
+
+def test_aquery_relevant_documents_uses_pooled_client(async_transport):
+    import asyncio
+    import json
+
+    import httpx
+
+    requests_seen, responses = async_transport
+    responses.append(
+        httpx.Response(
+            200,
+            json={
+                "data": {
+                    "doc_aggs": [{"doc_id": "doc456", "doc_name": "Doc Title"}],
+                    "chunks": [
+                        {
+                            "document_id": "doc456",
+                            "content": "chunk text",
+                            "similarity": 0.9,
+                        }
+                    ],
+                }
+            },
+        )
+    )
+    provider = RAGFlowProvider()
+    docs = asyncio.run(
+        provider.aquery_relevant_documents(
+            "query", [DummyResource("rag://dataset/123#doc456")]
+        )
+    )
+    assert docs[0].id == "doc456"
+    assert docs[0].chunks[0].content == "chunk text"
+    request = requests_seen[0]
+    assert request.url == "http://api/api/v1/retrieval"
+    assert request.headers["Authorization"] == "Bearer key"
+    assert json.loads(request.content)["dataset_ids"] == ["123"]
+
+
+def test_alist_resources_retries_transient_errors(async_transport):
+    import asyncio
+
+    import httpx
+
+    requests_seen, responses = async_transport
+    responses.extend(
+        [
+            httpx.Response(503, text="busy"),
+            httpx.Response(
+                200,
+                json={"data": [{"id": "123", "name": "Dataset1", "description": "d"}]},
+            ),
+        ]
+    )
+    resources = asyncio.run(RAGFlowProvider().alist_resources("Data"))
+    assert [r.uri for r in resources] == ["rag://dataset/123"]
+    assert len(requests_seen) == 2
+    assert requests_seen[0].url.params["name"] == "Data"
+
+
+def test_alist_resources_gives_up_after_max_retries(async_transport, monkeypatch):
+    import asyncio
+
+    import httpx
+
+    monkeypatch.setenv("RAGFLOW_MAX_RETRIES", "1")
+    requests_seen, responses = async_transport
+    responses.extend(
+        [httpx.Response(503, text="busy"), httpx.Response(503, text="busy")]
+    )
+    with pytest.raises(Exception, match="busy"):
+        asyncio.run(RAGFlowProvider().alist_resources())
+    assert len(requests_seen) == 2
+
+
+@patch("src.rag.ragflow.requests.post")
+def test_query_relevant_documents_retries_connection_errors(mock_post, monkeypatch):
+    import src.rag.ragflow as ragflow
+
+    monkeypatch.setenv("RAGFLOW_API_URL", "http://api")
+    monkeypatch.setenv("RAGFLOW_API_KEY", "key")
+    monkeypatch.setenv("RAGFLOW_TIMEOUT", "7")
+    monkeypatch.setattr(ragflow, "RETRY_BACKOFF", 0)
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"data": {"doc_aggs": [], "chunks": []}}
+    mock_post.side_effect = [requests.ConnectionError("reset"), ok]
+    assert RAGFlowProvider().query_relevant_documents("query", []) == []
+    assert mock_post.call_count == 2
+    assert mock_post.call_args.kwargs["timeout"] == 7.0
@@ -2,7 +2,7 @@
 # SPDX-License-Identifier: MIT
 
 import pytest
-from src.rag.retriever import Chunk, Document, Resource, Retriever
+from src.rag.retriever import Chunk, ChunkList, Document, Resource, Retriever
 
 
 def test_chunk_init():
@@ -38,6 +38,38 @@ def test_document_to_dict_optional_fields():
     assert "title" not in d
 
 
+def test_document_chunks_are_not_shared():
+    first, second = Document(id="a"), Document(id="b")
+    first.chunks.append(Chunk("x", 1.0))
+    assert len(second.chunks) == 0
+
+    chunks = [Chunk("x", 1.0)]
+    doc = Document(id="c", chunks=chunks)
+    copy = Document(id="d", chunks=doc.chunks)
+    chunks.append(Chunk("y", 0.5))
+    copy.chunks.append(Chunk("z", 0.1))
+    assert doc.chunks == [Chunk("x", 1.0)]
+    assert [c.content for c in copy.chunks] == ["x", "z"]
+
+
+def test_chunk_list_appends_edits_and_joins_lazily():
+    chunks = ChunkList([Chunk("", 0.1), Chunk("白骨精", None)])
+    chunks.append(Chunk("deer", 2))
+    assert chunks.joined() == "\n\n白骨精\n\ndeer"
+    chunks.append(Chunk("fox", 0.3))
+    assert chunks[-1] == Chunk("fox", 0.3)
+    assert chunks[1].similarity is None
+    assert [c.content for c in chunks[1:3]] == ["白骨精", "deer"]
+
+    chunks[0] = Chunk("a", 1.0)
+    del chunks[1]
+    chunks.insert(0, Chunk("b", 0.0))
+    assert [c.content for c in chunks] == ["b", "a", "deer", "fox"]
+    assert chunks.joined() == "b\n\na\n\ndeer\n\nfox"
+    with pytest.raises(IndexError):
+        chunks[4]
+
+
 def test_resource_model():
     resource = Resource(uri="uri1", title="Resource Title")
     assert resource.uri == "uri1"
@@ -70,3 +102,22 @@ def test_retriever_abstract_methods():
 def test_retriever_cannot_instantiate():
     with pytest.raises(TypeError):
         Retriever()
+
+
+def test_default_async_methods_run_in_a_worker_thread():
+    import asyncio
+    import threading
+
+    class SyncRetriever(Retriever):
+        def list_resources(self, query=None):
+            return [
+                Resource(uri="rag://dataset/a", title=threading.current_thread().name)
+            ]
+
+        def query_relevant_documents(self, query, resources=[]):
+            return [Document(id=threading.current_thread().name)]
+
+    retriever = SyncRetriever()
+    main = threading.current_thread().name
+    assert asyncio.run(retriever.alist_resources())[0].title != main
+    assert asyncio.run(retriever.aquery_relevant_documents("q"))[0].id != main
@@ -0,0 +1,83 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server import mcp_utils
+from src.server.app import app
+
+
+@pytest.fixture
+def fake_loader(monkeypatch):
+    calls = []
+
+    async def load_mcp_tools(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        return [{"name": f"tool-{len(calls)}"}]
+
+    monkeypatch.setattr(mcp_utils, "load_mcp_tools", load_mcp_tools)
+    mcp_utils._discovery_cache.clear()
+    yield calls
+    mcp_utils._discovery_cache.clear()
+
+
+def test_fresh_results_are_cached(fake_loader):
+    async def main():
+        first = await mcp_utils.discover_mcp_tools("stdio", command="uvx", args=["a"])
+        second = await mcp_utils.discover_mcp_tools("stdio", command="uvx", args=["a"])
+        other = await mcp_utils.discover_mcp_tools("stdio", command="uvx", args=["b"])
+        return first, second, other
+
+    first, second, other = asyncio.run(main())
+    assert first == second == [{"name": "tool-1"}]
+    assert other == [{"name": "tool-2"}]
+    assert len(fake_loader) == 2
+
+
+def test_concurrent_discoveries_are_coalesced(fake_loader):
+    async def main():
+        return await asyncio.gather(
+            *(mcp_utils.discover_mcp_tools("sse", url="http://mcp") for _ in range(5))
+        )
+
+    results = asyncio.run(main())
+    assert all(result == [{"name": "tool-1"}] for result in results)
+    assert len(fake_loader) == 1
+
+
+def test_refresh_bypasses_cache(fake_loader):
+    async def main():
+        await mcp_utils.discover_mcp_tools("sse", url="http://mcp")
+        return await mcp_utils.discover_mcp_tools("sse", url="http://mcp", refresh=True)
+
+    assert asyncio.run(main()) == [{"name": "tool-2"}]
+
+
+def test_stale_results_are_served_while_revalidating(fake_loader, monkeypatch):
+    monkeypatch.setattr(mcp_utils, "DISCOVERY_TTL_SECONDS", 0)
+
+    async def main():
+        await mcp_utils.discover_mcp_tools("sse", url="http://mcp")
+        stale = await mcp_utils.discover_mcp_tools("sse", url="http://mcp")
+        await asyncio.gather(*mcp_utils._background_refreshes)
+        return stale
+
+    assert asyncio.run(main()) == [{"name": "tool-1"}]
+    assert len(fake_loader) == 2
+    assert next(iter(mcp_utils._discovery_cache.values()))[1] == [{"name": "tool-2"}]
+
+
+def test_metadata_endpoint(fake_loader):
+    client = TestClient(app)
+    body = {"transport": "stdio", "command": "uvx", "args": ["mcp-github-trending"]}
+    first = client.post("/api/mcp/server/metadata", json=body)
+    second = client.post("/api/mcp/server/metadata", json=body)
+    assert first.status_code == 200
+    assert first.json()["tools"] == second.json()["tools"] == [{"name": "tool-1"}]
+    refreshed = client.post("/api/mcp/server/metadata", json={**body, "refresh": True})
+    assert refreshed.json()["tools"] == [{"name": "tool-2"}]
+    assert refreshed.json()["command"] == "uvx"
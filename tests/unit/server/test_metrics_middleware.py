@@ -0,0 +1,67 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.server.metrics import (
+    HTTP_REQUESTS,
+    MetricsMiddleware,
+    UNMATCHED_ROUTE,
+    checkpointer_stats,
+    register_checkpointer_metrics,
+)
+from src.server import metrics as metrics_module
+from src.utils.metrics import REGISTRY
+
+
+def _make_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    return app
+
+
+def test_middleware_labels_requests_with_route_template():
+    client = TestClient(_make_app())
+    before = HTTP_REQUESTS.labels("GET", "/items/{item_id}", "200").value
+    client.get("/items/1")
+    client.get("/items/2")
+    after = HTTP_REQUESTS.labels("GET", "/items/{item_id}", "200").value
+    assert after - before == 2
+
+
+def test_middleware_folds_unmatched_routes():
+    client = TestClient(_make_app())
+    before = HTTP_REQUESTS.labels("GET", UNMATCHED_ROUTE, "404").value
+    client.get("/does-not-exist")
+    assert HTTP_REQUESTS.labels("GET", UNMATCHED_ROUTE, "404").value == before + 1
+
+
+def test_checkpointer_stats_empty_and_unknown():
+    assert checkpointer_stats(MemorySaver()) == {
+        "threads": 0,
+        "checkpoints": 0,
+        "bytes": 0,
+    }
+    assert checkpointer_stats(object())["threads"] == 0
+
+
+def test_checkpointer_stats_are_computed_once_per_scrape(monkeypatch):
+    calls = []
+
+    def stats(checkpointer):
+        calls.append(checkpointer)
+        return {"threads": 2, "checkpoints": 5, "bytes": 100}
+
+    monkeypatch.setattr(metrics_module, "checkpointer_stats", stats)
+    checkpointer = MemorySaver()
+    register_checkpointer_metrics(checkpointer)
+    text = REGISTRY.render()
+    assert "deerflow_checkpointer_checkpoints 5" in text
+    assert calls.count(checkpointer) == 1
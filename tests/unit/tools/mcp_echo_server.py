@@ -0,0 +1,32 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+"""Minimal stdio MCP server used by the MCP session pool tests."""
+
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("echo")
+
+
+@server.tool()
+def echo(text: str) -> str:
+    """Echo the text back."""
+    return text
+
+
+@server.tool()
+def pid() -> str:
+    """Return the server process id."""
+    return str(os.getpid())
+
+
+@server.tool()
+def crash() -> str:
+    """Terminate the server process."""
+    os._exit(1)
+
+
+if __name__ == "__main__":
+    server.run()
@@ -0,0 +1,43 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+from langchain_core.tools import BaseTool
+
+from src.tools import decorators
+from src.tools.decorators import create_logged_tool
+
+
+class SyncTool(BaseTool):
+    name: str = "sync_tool"
+    description: str = "Echo the query."
+
+    def _run(self, query: str) -> str:
+        return query
+
+
+class AsyncTool(SyncTool):
+    name: str = "async_tool"
+
+    async def _arun(self, query: str) -> str:
+        return query
+
+
+def test_async_calls_are_recorded_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        decorators, "record_tool_call", lambda *args: calls.append(args)
+    )
+
+    for tool_class in (SyncTool, AsyncTool):
+        tool = create_logged_tool(tool_class)()
+        assert asyncio.run(tool.ainvoke("deer")) == "deer"
+        assert tool.invoke("deer") == "deer"
+
+    assert [(name, provider) for name, provider, _, _ in calls] == [
+        ("sync_tool", "SyncTool"),
+        ("sync_tool", "SyncTool"),
+        ("async_tool", "AsyncTool"),
+        ("async_tool", "AsyncTool"),
+    ]
@@ -0,0 +1,124 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+import os
+import sys
+
+import pytest
+from langchain_core.tools import ToolException
+
+from src.tools.mcp_pool import MCPSessionPool, server_config_key
+
+SERVER = {
+    "transport": "stdio",
+    "command": sys.executable,
+    "args": [os.path.join(os.path.dirname(__file__), "mcp_echo_server.py")],
+}
+
+
+def _tool(tools, name):
+    return next(tool for tool in tools if tool.name == name)
+
+
+def test_server_config_key_ignores_unrelated_fields():
+    assert server_config_key(SERVER) == server_config_key(
+        {**SERVER, "enabled_tools": ["echo"], "add_to_agents": ["researcher"]}
+    )
+    assert server_config_key(SERVER) != server_config_key({**SERVER, "env": {"A": "1"}})
+
+
+def test_session_is_reused_and_tools_are_stable():
+    async def main():
+        pool = MCPSessionPool(health_check_interval=60, timeout=30)
+        try:
+            tools = await pool.get_tools("echo-server", SERVER)
+            assert {tool.name for tool in tools} >= {"echo", "pid"}
+            assert _tool(tools, "echo").description.startswith(
+                "Powered by 'echo-server'."
+            )
+            first_pid = await _tool(tools, "pid").ainvoke({})
+            again = await pool.get_tools("echo-server", SERVER)
+            assert _tool(again, "pid") is _tool(tools, "pid")
+            assert await _tool(again, "pid").ainvoke({}) == first_pid
+            assert await _tool(again, "echo").ainvoke({"text": "hi"}) == "hi"
+            assert pool.stats() == {"servers": 1, "running": 1, "in_use": 0}
+        finally:
+            await pool.close()
+        assert pool.stats()["running"] == 0
+
+    asyncio.run(main())
+
+
+def test_crashed_server_is_restarted_on_next_call():
+    async def main():
+        pool = MCPSessionPool(health_check_interval=60, timeout=2)
+        try:
+            tools = await pool.get_tools("echo-server", SERVER)
+            first_pid = await _tool(tools, "pid").ainvoke({})
+            with pytest.raises(Exception):
+                await _tool(tools, "crash").ainvoke({})
+            assert await _tool(tools, "pid").ainvoke({}) != first_pid
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_idle_session_is_closed():
+    async def main():
+        pool = MCPSessionPool(idle_timeout=0, health_check_interval=0.05, timeout=30)
+        try:
+            await pool.get_tools("echo-server", SERVER)
+            for _ in range(100):
+                if not pool.stats()["running"]:
+                    break
+                await asyncio.sleep(0.05)
+            assert pool.stats()["running"] == 0
+            tools = await pool.get_tools("echo-server", SERVER)
+            assert await _tool(tools, "echo").ainvoke({"text": "back"}) == "back"
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_calls_are_limited_per_server():
+    async def main():
+        pool = MCPSessionPool(health_check_interval=60, max_concurrency=2, timeout=30)
+        try:
+            tools = await pool.get_tools("echo-server", SERVER)
+            echo = _tool(tools, "echo")
+            server = next(iter(pool._servers.values()))
+            peak = 0
+            original = server.session.call_tool
+
+            async def tracking_call(*args, **kwargs):
+                nonlocal peak
+                peak = max(peak, server.in_use)
+                await asyncio.sleep(0.05)
+                return await original(*args, **kwargs)
+
+            server.session.call_tool = tracking_call
+            results = await asyncio.gather(
+                *(echo.ainvoke({"text": str(i)}) for i in range(6))
+            )
+            assert results == [str(i) for i in range(6)]
+            assert peak == 2
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_tool_errors_are_raised_as_tool_exceptions():
+    async def main():
+        pool = MCPSessionPool(health_check_interval=60, timeout=30)
+        try:
+            tools = await pool.get_tools("echo-server", SERVER)
+            with pytest.raises(ToolException):
+                await _tool(tools, "echo").coroutine()
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
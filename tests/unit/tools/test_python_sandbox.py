@@ -0,0 +1,195 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+import signal
+import sys
+import threading
+
+import pytest
+
+from src.tools.python_sandbox import PythonREPLPool
+
+START_METHODS = ["spawn"] + (["template"] if hasattr(os, "fork") else [])
+
+
+@pytest.fixture(params=START_METHODS)
+def pool(request):
+    pool = PythonREPLPool(
+        timeout=10,
+        cpu_seconds=5,
+        memory_mb=512,
+        max_executions=50,
+        max_sessions=4,
+        warm_workers=0,
+        preload=(),
+        start_method=request.param,
+    )
+    yield pool
+    pool.close()
+
+
+def test_state_is_kept_per_session_and_isolated(pool):
+    assert pool.execute("x = 41", session_id="a").ok
+    assert pool.execute("print(x + 1)", session_id="a").output == "42\n"
+
+    result = pool.execute("print(x)", session_id="b")
+    assert not result.ok
+    assert "NameError" in result.error
+
+
+def test_errors_are_reported_with_output(pool):
+    result = pool.execute("print('before')\n1 / 0", session_id="a")
+    assert not result.ok
+    assert result.output == "before\n"
+    assert "ZeroDivisionError" in result.error
+
+
+def test_output_is_streamed(pool):
+    chunks = []
+    result = pool.execute(
+        "for i in range(3):\n    print(i)", session_id="a", on_output=chunks.append
+    )
+    assert result.ok
+    assert "".join(chunks) == result.output == "0\n1\n2\n"
+    assert len(chunks) == 3
+
+
+def test_wall_timeout_kills_worker_and_session_recovers(pool):
+    pool.timeout = 0.5
+    result = pool.execute("import time\ntime.sleep(5)", session_id="a")
+    assert not result.ok
+    assert "TimeoutError" in result.error
+    assert pool.stats()["sessions"] == 0
+
+    pool.timeout = 10
+    assert pool.execute("print('again')", session_id="a").output == "again\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource limits need POSIX")
+def test_cpu_limit(pool):
+    pool.cpu_seconds = 1
+    result = pool.execute("while True:\n    pass", session_id="a")
+    assert not result.ok
+    assert "CPUTimeLimitExceeded" in result.error
+    # The worker survives and the limit applies again to the next snippet
+    assert pool.execute("print('alive')", session_id="a").ok
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="resource limits need POSIX")
+def test_memory_limit(pool):
+    result = pool.execute("data = bytearray(1024 * 1024 * 1024)", session_id="a")
+    assert not result.ok
+    assert "MemoryError" in result.error
+
+
+def test_worker_is_recycled_after_max_executions(pool):
+    pool.max_executions = 2
+    pool.execute("import os\nprint(os.getpid())", session_id="a")
+    first = pool.execute("print(os.getpid())", session_id="a").output
+    result = pool.execute("print(os.getpid())", session_id="a")
+    # The recycled worker starts from a clean namespace
+    assert "NameError" in result.error
+    assert pool.execute("import os\nprint(os.getpid())", session_id="a").output != first
+
+
+def test_least_recently_used_session_is_evicted(pool):
+    pool.max_sessions = 2
+    for session_id in ("a", "b", "c"):
+        pool.execute(f"name = {session_id!r}", session_id=session_id)
+    assert pool.stats()["sessions"] == 2
+    assert not pool.execute("print(name)", session_id="a").ok
+    assert pool.execute("print(name)", session_id="c").output == "c\n"
+
+
+def test_slow_worker_start_does_not_block_other_sessions(pool):
+    assert pool.execute("x = 1", session_id="b").ok
+    start_worker = pool._start_worker
+    release = threading.Event()
+    started = []
+
+    def slow_start():
+        started.append(1)
+        release.wait(10)
+        return start_worker()
+
+    pool._start_worker = slow_start
+    results = {}
+    callers = [
+        threading.Thread(
+            target=lambda i=i: results.setdefault(
+                i, pool.execute("print(2)", session_id="a")
+            )
+        )
+        for i in range(2)
+    ]
+    for caller in callers:
+        caller.start()
+    while not started:
+        threading.Event().wait(0.01)
+    # Session "a" is starting its worker; session "b" is served meanwhile
+    other = threading.Thread(
+        target=lambda: results.setdefault("b", pool.execute("print(x)", session_id="b"))
+    )
+    other.start()
+    other.join(5)
+    assert not other.is_alive() and results["b"].output == "1\n"
+    release.set()
+    for caller in callers:
+        caller.join(10)
+    assert [results[i].output for i in range(2)] == ["2\n", "2\n"]
+    assert len(started) == 1  # Both calls of "a" share the same worker
+
+
+def test_warm_spares_are_handed_out():
+    pool = PythonREPLPool(timeout=10, warm_workers=1, preload=())
+    try:
+        pool.warm()
+        assert pool.stats()["spares"] == 1
+        assert pool.execute("print(1)", session_id="a").ok
+        # The spare was taken and replaced
+        assert pool.stats() == {"sessions": 1, "busy": 0, "spares": 1}
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="templates need os.fork")
+def test_template_workers_inherit_preloaded_modules():
+    pool = PythonREPLPool(
+        timeout=10, warm_workers=0, preload=("json",), start_method="template"
+    )
+    try:
+        result = pool.execute(
+            "import sys\nprint('json' in sys.modules)", session_id="a"
+        )
+        assert result.output == "True\n"
+        pids = {
+            pool.execute("import os\nprint(os.getpid())", session_id=session_id).output
+            for session_id in ("a", "b")
+        }
+        assert len(pids) == 2
+
+        # Only the first import of a preloaded module in a worker counts as saved
+        first = pool.execute("import json", session_id="c")
+        again = pool.execute("from json import dumps", session_id="c")
+        assert first.import_seconds_saved > 0
+        assert again.import_seconds_saved == 0
+        assert pool.execute("import csv", session_id="c").import_seconds_saved == 0
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="templates need os.fork")
+def test_template_is_restarted_when_it_dies():
+    pool = PythonREPLPool(
+        timeout=10, warm_workers=0, preload=(), start_method="template"
+    )
+    try:
+        assert pool.execute("print(1)", session_id="a").ok
+        os.kill(pool._template.process.pid, signal.SIGKILL)
+        pool._template.process.join(5)
+        assert pool.execute("print(2)", session_id="b").output == "2\n"
+        # Workers forked earlier keep running without the template
+        assert pool.execute("print(3)", session_id="a").output == "3\n"
+    finally:
+        pool.close()
@@ -0,0 +1,47 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+from src.rag.retriever import Chunk, Document, Resource, Retriever
+from src.tools.retriever import RetrieverTool
+
+
+class AsyncOnlyRetriever(Retriever):
+    def list_resources(self, query=None):
+        raise AssertionError("sync method called")
+
+    def query_relevant_documents(self, query, resources=[]):
+        raise AssertionError("sync method called")
+
+    async def aquery_relevant_documents(self, query, resources=[]):
+        await asyncio.sleep(0.05)
+        return (
+            [Document(id=query, chunks=[Chunk("text", 1.0)])] if query != "none" else []
+        )
+
+
+def test_arun_awaits_the_async_retriever_without_blocking():
+    tool = RetrieverTool(
+        retriever=AsyncOnlyRetriever(),
+        resources=[Resource(uri="rag://dataset/a", title="a")],
+    )
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(tool.ainvoke("deer"), tool.ainvoke("none"))
+        task.cancel()
+        return results, ticks
+
+    (found, missing), ticks = asyncio.run(main())
+    assert found == [{"id": "deer", "content": "text"}]
+    assert missing == "No results found from the local knowledge base."
+    assert ticks >= 3
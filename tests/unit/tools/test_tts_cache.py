@@ -0,0 +1,79 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import base64
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.tools import tts as tts_module
+from src.tools.tts import VolcengineTTS, get_tts_cache
+from src.utils.disk_cache import DiskLRUCache
+
+
+@pytest.fixture
+def mock_post():
+    with patch("src.tools.tts.requests.post") as post:
+
+        def respond(url, data, headers):
+            text = json.loads(data)["request"]["text"]
+            response = MagicMock(status_code=200)
+            response.json.return_value = {
+                "code": 3000,
+                "data": base64.b64encode(f"audio:{text}".encode()).decode(),
+            }
+            return response
+
+        post.side_effect = respond
+        yield post
+
+
+def _client(cache):
+    return VolcengineTTS(appid="app", access_token="token", cache=cache)
+
+
+def test_repeated_requests_are_served_from_cache(tmp_path, mock_post):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+    first = _client(cache).text_to_speech("hello", uid="user-1")
+    second = _client(cache).text_to_speech("hello", uid="user-2")
+
+    assert mock_post.call_count == 1
+    assert second["cached"] is True
+    assert second["audio_data"] == first["audio_data"]
+    assert base64.b64decode(second["audio_data"]) == b"audio:hello"
+
+
+def test_voice_and_prosody_are_part_of_the_key(tmp_path, mock_post):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+    client = _client(cache)
+    client.text_to_speech("hello")
+    client.text_to_speech("hello", voice_type="BV002_streaming")
+    client.text_to_speech("hello", speed_ratio=1.05)
+    client.text_to_speech("hello", pitch_ratio=0.9)
+    client.text_to_speech("hello", voice_type="BV002_streaming")
+
+    assert mock_post.call_count == 4
+    assert len(cache) == 4
+
+
+def test_failures_are_not_cached(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1024)
+    with patch("src.tools.tts.requests.post") as post:
+        post.return_value = MagicMock(status_code=500)
+        post.return_value.json.return_value = {"code": 500}
+        assert not _client(cache).text_to_speech("hello")["success"]
+    assert len(cache) == 0
+
+
+def test_shared_cache_is_configured_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts_module, "_tts_cache", None)
+    monkeypatch.setenv("TTS_CACHE_DIR", str(tmp_path / "tts"))
+    monkeypatch.setenv("TTS_CACHE_MAX_MB", "2")
+    cache = get_tts_cache()
+    assert cache is get_tts_cache()
+    assert cache.directory == str(tmp_path / "tts")
+    assert cache.max_bytes == 2 * 1024 * 1024
+
+    monkeypatch.setenv("TTS_CACHE_MAX_MB", "0")
+    assert get_tts_cache() is None
@@ -0,0 +1,69 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import os
+import time
+
+from src.utils.disk_cache import DiskLRUCache
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    assert cache.get("a") is None
+    cache.put("a", b"12345")
+    assert cache.get("a") == b"12345"
+    assert "a" in cache and len(cache) == 1 and cache.size == 5
+
+    cache.put("a", b"123")
+    assert cache.get("a") == b"123"
+    assert cache.size == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    cache.put("c", b"c" * 10)
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", b"d" * 10)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.size == 30
+    files = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert len(files) == 3
+
+
+def test_values_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=4)
+    cache.put("big", b"12345")
+    assert cache.get("big") is None
+    assert cache.size == 0
+
+
+def test_index_is_rebuilt_in_lru_order(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=30)
+    cache.put("a", b"a" * 10)
+    cache.put("b", b"b" * 10)
+    time.sleep(0.01)
+    cache.get("a")
+
+    reopened = DiskLRUCache(str(tmp_path), max_bytes=30)
+    assert reopened.get("a") == b"a" * 10
+    assert reopened.size == 20
+    reopened.max_bytes = 10
+    reopened.put("c", b"c" * 10)
+    assert "b" not in reopened and "a" not in reopened and "c" in reopened
+
+
+def test_entry_removed_by_another_process_is_a_miss(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    other = DiskLRUCache(str(tmp_path), max_bytes=100)
+    cache.put("a", b"value")
+    other_view = DiskLRUCache(str(tmp_path), max_bytes=100)
+    other_view.clear()
+
+    assert cache.get("a") is None
+    assert cache.size == 0
+    assert other.get("a") is None
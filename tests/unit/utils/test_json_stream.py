@@ -0,0 +1,82 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pytest
+from src.utils.json_stream import JSONStreamParser
+
+PLAN = {
+    "locale": "en-US",
+    "has_enough_context": False,
+    "thought": 'Quotes " and braces {} [] inside, strings',
+    "title": "Plan",
+    "steps": [
+        {
+            "need_search": True,
+            "title": "A",
+            "description": "x,}]",
+            "step_type": "research",
+        },
+        {
+            "need_search": False,
+            "title": "B",
+            "description": "y",
+            "step_type": "processing",
+        },
+    ],
+}
+
+
+def _feed_all(parser, text, size):
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i : i + size])
+    return events
+
+
+@pytest.mark.parametrize("size", [1, 5, 10000])
+def test_fields_and_items_are_reported_in_order(size):
+    text = "```json\n" + json.dumps(PLAN, indent=2) + "\n```"
+    parser = JSONStreamParser(array_fields=["steps"])
+    events = _feed_all(parser, text, size)
+
+    assert [(e.kind, e.key, e.index) for e in events] == [
+        ("field", "locale", None),
+        ("field", "has_enough_context", None),
+        ("field", "thought", None),
+        ("field", "title", None),
+        ("item", "steps", 0),
+        ("item", "steps", 1),
+        ("field", "steps", None),
+    ]
+    assert events[4].value == PLAN["steps"][0]
+    assert parser.done
+    assert parser.result == PLAN
+    assert parser.text == text
+
+
+def test_step_is_reported_before_the_plan_finishes():
+    text = json.dumps(PLAN)
+    cut = text.index('{"need_search": false')
+    parser = JSONStreamParser(array_fields=["steps"])
+    events = parser.feed(text[:cut])
+    assert events[-1].kind == "item"
+    assert events[-1].value["title"] == "A"
+    assert not parser.done
+
+
+def test_nested_values_of_other_fields_are_not_split():
+    parser = JSONStreamParser(array_fields=["steps"])
+    events = parser.feed('{"a": [1, 2], "b": {"c": [3]}, "steps": []}')
+    assert [(e.kind, e.key, e.value) for e in events] == [
+        ("field", "a", [1, 2]),
+        ("field", "b", {"c": [3]}),
+        ("field", "steps", []),
+    ]
+
+
+def test_undecodable_value_is_skipped():
+    parser = JSONStreamParser()
+    events = parser.feed('{"a": tru, "b": 1}')
+    assert [(e.key, e.value) for e in events] == [("b", 1)]
@@ -0,0 +1,67 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from src.prompts.planner_model import Plan
+from src.utils.json_utils import (
+    parse_json_output,
+    parse_model_output,
+    repair_json_output,
+)
+
+PLAN = {
+    "locale": "en-US",
+    "has_enough_context": False,
+    "thought": "思考",
+    "title": "Plan",
+    "steps": [
+        {
+            "need_search": True,
+            "title": "Step",
+            "description": "Collect data",
+            "step_type": "research",
+        }
+    ],
+}
+
+
+def _dumps(value, **kwargs):
+    return json.dumps(value, ensure_ascii=False, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        _dumps(PLAN),
+        "```json\n" + _dumps(PLAN, indent=2) + "\n```",
+        "```\n" + _dumps(PLAN) + "\n```",
+        _dumps(PLAN, indent=2).replace('"research"\n', '"research",\n'),
+        _dumps(PLAN).replace("false", "False").replace("true", "True"),
+        "Here is the plan:\n```json\n" + _dumps(PLAN) + "\n```",
+    ],
+)
+def test_parse_json_and_model_output(text):
+    assert parse_json_output(text) == PLAN
+    assert parse_model_output(text, Plan) == Plan.model_validate(PLAN)
+
+
+def test_parse_json_output_rejects_plain_text():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_output("I cannot make a plan for this.")
+    with pytest.raises(json.JSONDecodeError):
+        parse_model_output("I cannot make a plan for this.", Plan)
+
+
+def test_parse_model_output_schema_errors_are_not_repaired():
+    with pytest.raises(ValidationError):
+        parse_model_output(json.dumps({"title": "missing fields"}), Plan)
+
+
+def test_repair_json_output_is_compatible():
+    assert json.loads(repair_json_output('```json\n{"a": 1,}\n```')) == {"a": 1}
+    assert repair_json_output('{"a": "中文"}') == '{"a": "中文"}'
+    assert repair_json_output("  plain text  ") == "plain text"
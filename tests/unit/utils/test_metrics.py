@@ -0,0 +1,108 @@
+# Copyright (c) 2025 Bytedance Ltd. and/or its affiliates
+# SPDX-License-Identifier: MIT
+
+import asyncio
+
+import pytest
+
+from src.utils.metrics import MetricsRegistry, instrument_node, NODE_DURATION
+
+
+def test_counter_render_with_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ["route"])
+    counter.labels("/a").inc()
+    counter.labels(route="/a").inc(2)
+    counter.labels("/b").inc()
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'requests_total{route="/b"} 1' in text
+
+
+def test_counter_rejects_negative_increment():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "C.")
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+
+
+def test_labels_arity_is_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "C.", ["a", "b"])
+    with pytest.raises(ValueError):
+        counter.labels("only-one")
+
+
+def test_registering_same_name_returns_existing_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("c_total", "C.")
+    assert registry.counter("c_total", "C.") is first
+    with pytest.raises(ValueError):
+        registry.gauge("c_total", "C.")
+
+
+def test_gauge_set_inc_dec_and_function():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("in_flight", "In flight.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    assert "in_flight 1" in registry.render()
+    gauge.set_function(lambda: 42)
+    assert "in_flight 42" in registry.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    text = registry.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "latency_seconds_sum 5.55" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "C.", ["name"])
+    counter.labels('a"b\nc').inc()
+    assert 'c_total{name="a\\"b\\nc"} 1' in registry.render()
+
+
+def test_instrument_node_sync_keeps_signature_and_records():
+    def node(state, config):
+        """doc"""
+        return state["x"]
+
+    wrapped = instrument_node("test", "sync_node", node)
+    assert wrapped({"x": 1}, config={}) == 1
+    assert wrapped.__doc__ == "doc"
+    assert NODE_DURATION.labels("test", "sync_node").count == 1
+
+
+def test_instrument_node_async_records_even_on_error():
+    async def node(state):
+        raise RuntimeError("boom")
+
+    wrapped = instrument_node("test", "async_node", node)
+    assert asyncio.iscoroutinefunction(wrapped)
+    with pytest.raises(RuntimeError):
+        asyncio.run(wrapped({}))
+    assert NODE_DURATION.labels("test", "async_node").count == 1
+
+
+def test_collectors_run_once_per_render():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("queue_depth", "Depth.")
+    calls = []
+    registry.add_collector(lambda: (calls.append(1), gauge.set(len(calls))))
+    # A failing collector does not break the scrape
+    registry.add_collector(lambda: 1 / 0)
+    assert "queue_depth 1" in registry.render()
+    assert "queue_depth 2" in registry.render()
+    assert len(calls) == 2
@@ -30,8 +30,10 @@ export async function generatePodcast(content: string) {
   // 将响应转换为ArrayBuffer
   const arrayBuffer = await response.arrayBuffer();
   
-  // 创建音频Blob对象
-  const blob = new Blob([arrayBuffer], { type: "audio/mp3" });
+  // 创建音频Blob对象，使用服务器返回的实际格式（未安装ffmpeg时为WAV）
+  const blob = new Blob([arrayBuffer], {
+    type: response.headers.get("Content-Type") ?? "audio/mpeg",
+  });
   
   // 创建并返回Blob URL
   const audioUrl = URL.createObjectURL(blob);